@@ -6,7 +6,8 @@ NUMERIC = [
     "prior_claims_count","claimant_age","paid_ratio","reserve_ratio"
 ]
 
-def enrich(df: pd.DataFrame) -> pd.DataFrame:
+def enrich(df: pd.DataFrame, peers: pd.DataFrame | None = None) -> pd.DataFrame:
+    """peers: optional FeatureStore.read_frame(df) columns to append (aligned on index)."""
     df = df.copy()
     num_cast = ["claim_amount","paid_to_date","reserve","late_report_days",
                 "prior_claims_count","claimant_age","police_report"]
@@ -23,4 +24,6 @@ def enrich(df: pd.DataFrame) -> pd.DataFrame:
             d = pd.to_datetime(df[col], errors="coerce")
             df[f"{col}_dow"] = d.dt.dayofweek.fillna(-1)
             df[f"{col}_month"] = d.dt.month.fillna(0)
+    if peers is not None:
+        df = df.join(peers)
     return df
@@ -0,0 +1,394 @@
+"""
+Claims link graph for fraud-ring detection.
+
+Two claims are linked when they share entities of two or more kinds - the
+same provider and repair shop, the same policy and VIN, ... - so a claim is
+attached to one node per pair of entities it references
+("provider+shop:PR1|RS1") and connected components of that graph are
+candidate rings. Linking on single entities percolates: on a realistic book
+a busy provider or body shop joins everything to everything and one
+component ends up holding most of the claims. Components are tracked with
+a union-find over compact arrays, so a new claim is merged in O(alpha(n))
+and every component carries running stats at its root (claims, distinct
+providers/shops, amount, a 30-day decayed claim rate).
+
+A pair seen on more than HUB_DEGREE claims (a fleet policy at its usual
+shop) is a hub: only its first HUB_DEGREE claims, in arrival order, link -
+in observe() and from_frame() alike.
+
+ring_flagged is per claim, not per component: a claim is flagged when it
+references a ring provider/shop from rings.yaml, or shares an entity pair
+with a claim that does. The flag does not spread further through the ring.
+
+Undated claims are recorded at the graph clock and don't move it (as in
+claimsight_ai.feature_store).
+
+A frozen graph (pre-fork workers, see claimsight_ai/api/serve.py) answers
+observe() like lookup() and adds nothing.
+"""
+import math
+import os
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# (entity kind, claim field) in link order
+LINK_FIELDS = [("provider", "provider_id"), ("shop", "repair_shop_id"),
+               ("policy", "policy_id"), ("vin", "vin")]
+DATE_FIELDS = ["report_date", "incident_date", "loss_dt", "loss_date"]
+
+HUB_DEGREE = int(os.getenv("FRAUD_RING_HUB_DEGREE", "50"))
+VELOCITY_DAYS = float(os.getenv("FRAUD_RING_VELOCITY_DAYS", "30"))
+RING_MIN_CLAIMS = int(os.getenv("FRAUD_RING_MIN_CLAIMS", "4"))
+RING_VELOCITY = float(os.getenv("FRAUD_RING_VELOCITY", "3"))
+
+_DAY = 86400.0
+
+
+def _ts(c: Dict[str, Any]) -> Optional[float]:
+    for f in DATE_FIELDS:
+        v = c.get(f)
+        if v:
+            try:
+                return datetime.fromisoformat(str(v)[:10]).replace(tzinfo=timezone.utc).timestamp()
+            except ValueError:
+                continue
+    return None
+
+
+def _entities(c: Dict[str, Any]) -> List[Tuple[str, str]]:
+    out = []
+    for kind, field in LINK_FIELDS:
+        v = str(c.get(field) or "").strip()
+        if v:
+            out.append((kind, v))
+    return out
+
+
+def _pairs(ents: List[Tuple[str, str]]) -> List[str]:
+    """Link keys of a claim: one per pair of entities of different kinds."""
+    return [f"{a[0]}+{b[0]}:{a[1]}|{b[1]}" for i, a in enumerate(ents) for b in ents[i + 1:]]
+
+
+class RingGraph:
+    def __init__(self, seeds: Optional[Dict[str, Iterable[str]]] = None):
+        self._lock = threading.RLock()
+        self.frozen = False
+        self._ids: Dict[str, int] = {}  # claim and link-key nodes
+        self._ents: Dict[str, int] = {}  # providers and shops, for distinct counts
+        self._parent = array("q")
+        self._rank = array("q")        # node count per root
+        self._claims = array("q")
+        self._providers = array("q")
+        self._shops = array("q")
+        self._degree = array("q")
+        self._flagged = array("b")     # claim: flagged when observed; link key: used by a seeded claim
+        self._amount = array("d")
+        self._vel = array("d")
+        self._vel_t = array("d")
+        self._prov = array("q")        # claim -> provider id (-1: none)
+        self._shop = array("q")        # claim -> shop id (-1: none)
+        self._rep = array("q")         # root -> one claim in the component (-1: none)
+        self._sets: Dict[int, Tuple[Set[int], Set[int]]] = {}  # root -> (providers, shops), multi-claim only
+        self._clock = 0.0
+        self._seed_keys = set()
+        for k in (seeds or {}).get("ring_providers", []):
+            self._seed_keys.add(f"provider:{k}")
+        for k in (seeds or {}).get("ring_shops", []):
+            self._seed_keys.add(f"shop:{k}")
+
+    # ---- union-find core ----
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def _ent(self, kind: str, ents: List[Tuple[str, str]]) -> int:
+        v = next((v for k, v in ents if k == kind), None)
+        if v is None:
+            return -1
+        return self._ents.setdefault(f"{kind}:{v}", len(self._ents))
+
+    def _node(self, key: str, ents: Optional[List[Tuple[str, str]]] = None) -> int:
+        i = self._ids.get(key)
+        if i is not None:
+            return i
+        i = len(self._parent)
+        self._ids[key] = i
+        claim = ents is not None
+        prov = self._ent("provider", ents) if claim else -1
+        shop = self._ent("shop", ents) if claim else -1
+        self._parent.append(i); self._rank.append(1)
+        self._claims.append(1 if claim else 0)
+        self._providers.append(1 if prov >= 0 else 0)
+        self._shops.append(1 if shop >= 0 else 0)
+        self._degree.append(0)
+        self._flagged.append(0)
+        self._amount.append(0.0); self._vel.append(0.0); self._vel_t.append(self._clock)
+        self._prov.append(prov); self._shop.append(shop)
+        self._rep.append(i if claim else -1)
+        return i
+
+    def _find(self, i: int) -> int:
+        p = self._parent
+        while p[i] != i:
+            p[i] = p[p[i]]
+            i = p[i]
+        return i
+
+    def _decayed(self, r: int, t: float) -> float:
+        return self._vel[r] * math.exp(-(t - self._vel_t[r]) / (VELOCITY_DAYS * _DAY))
+
+    def _members(self, r: int) -> Tuple[Set[int], Set[int]]:
+        got = self._sets.pop(r, None)
+        if got is not None:
+            return got
+        rep = self._rep[r]
+        return ({self._prov[rep]} - {-1}, {self._shop[rep]} - {-1})
+
+    def _union(self, a: int, b: int) -> int:
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return ra
+        if self._rank[ra] < self._rank[rb]:
+            ra, rb = rb, ra
+        t = max(self._vel_t[ra], self._vel_t[rb])
+        self._vel[ra] = self._decayed(ra, t) + self._decayed(rb, t)
+        self._vel_t[ra] = t
+        self._parent[rb] = ra
+        self._rank[ra] += self._rank[rb]
+        self._amount[ra] += self._amount[rb]
+        if self._rep[rb] >= 0 and self._rep[ra] < 0:
+            self._rep[ra] = self._rep[rb]
+            self._providers[ra], self._shops[ra] = self._providers[rb], self._shops[rb]
+            if rb in self._sets:
+                self._sets[ra] = self._sets.pop(rb)
+        elif self._rep[rb] >= 0:
+            (pa, sa), (pb, sb) = self._members(ra), self._members(rb)
+            if len(pa) + len(sa) < len(pb) + len(sb):
+                pa, sa, pb, sb = pb, sb, pa, sa
+            pa |= pb
+            sa |= sb
+            self._sets[ra] = (pa, sa)
+            self._providers[ra], self._shops[ra] = len(pa), len(sa)
+        self._claims[ra] += self._claims[rb]
+        return ra
+
+    # ---- public API ----
+    def _is_flagged(self, node: Optional[int], ents: List[Tuple[str, str]], pairs: List[str]) -> bool:
+        if node is not None and self._flagged[node]:
+            return True
+        if any(f"{k}:{v}" in self._seed_keys for k, v in ents):
+            return True
+        return any(self._flagged[self._ids[k]] for k in pairs if k in self._ids)
+
+    def observe(self, c: Dict[str, Any]) -> Dict[str, Any]:
+        """Add one claim (idempotent per claim_id) and return its ring stats."""
+        if self.frozen:
+            return self.lookup(c)
+        cid = str(c.get("claim_id") or "").strip()
+        ents = _entities(c)
+        pairs = _pairs(ents)
+        with self._lock:
+            if cid and f"claim:{cid}" in self._ids:
+                node = self._ids[f"claim:{cid}"]
+                return self._stats(self._find(node), self._is_flagged(node, ents, pairs))
+            t = _ts(c)
+            t = self._clock if t is None else t
+            self._clock = max(self._clock, t)
+            node = self._node(f"claim:{cid}" if cid else f"claim:#{len(self._parent)}", ents)
+            seeded = any(f"{k}:{v}" in self._seed_keys for k, v in ents)
+            for key in pairs:
+                e = self._node(key)
+                self._degree[e] += 1
+                if seeded:
+                    self._flagged[e] = 1
+                if self._degree[e] <= HUB_DEGREE:
+                    self._union(node, e)
+            flagged = self._is_flagged(node, ents, pairs)
+            self._flagged[node] = int(flagged)
+            r = self._find(node)
+            self._vel[r] = self._decayed(r, t) + 1.0
+            self._vel_t[r] = t
+            self._amount[r] += float(c.get("claim_amount", c.get("amount", 0)) or 0)
+            return self._stats(r, flagged)
+
+    def lookup(self, c: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ring stats for a claim without adding it (largest component it would
+        join). The flag is re-derived from the claim's fields, so pass them to
+        see ring entities that turned up after the claim was observed.
+        """
+        with self._lock:
+            cid = str(c.get("claim_id") or "").strip()
+            ents = _entities(c)
+            pairs = _pairs(ents)
+            node = self._ids.get(f"claim:{cid}") if cid else None
+            flagged = self._is_flagged(node, ents, pairs)
+            keys = ([f"claim:{cid}"] if cid else []) + pairs
+            roots = {self._find(self._ids[k]) for k in keys if k in self._ids}
+            if not roots:
+                return {**self._empty(), "ring_flagged": flagged, "ring_risk": 0.5 if flagged else 0.0}
+            return self._stats(max(roots, key=lambda r: self._claims[r]), flagged)
+
+    def observe_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """observe() every row of a frame; returns ring stats aligned with df."""
+        rows = [self.observe(c) for c in df.to_dict("records")]
+        return pd.DataFrame(rows, index=df.index) if rows else pd.DataFrame(columns=list(self._empty()))
+
+    def lookup_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """lookup() for every row of a frame; returns columns aligned with df."""
+        rows = [self.lookup(c) for c in df.to_dict("records")]
+        return pd.DataFrame(rows, index=df.index) if rows else pd.DataFrame(columns=list(self._empty()))
+
+    def _empty(self) -> Dict[str, Any]:
+        return {"ring_id": None, "ring_claims": 0, "ring_providers": 0, "ring_shops": 0,
+                "ring_amount": 0.0, "ring_velocity_30d": 0.0, "ring_flagged": False, "ring_risk": 0.0}
+
+    def _stats(self, r: int, flagged: bool) -> Dict[str, Any]:
+        vel = self._decayed(r, self._clock)
+        claims = self._claims[r]
+        size_term = min(1.0, max(0, claims - 1) / (2 * RING_MIN_CLAIMS))
+        vel_term = min(1.0, vel / (2 * RING_VELOCITY))
+        risk = min(1.0, (0.5 if flagged else 0.0) + 0.25 * size_term + 0.25 * vel_term)
+        return {"ring_id": int(r), "ring_claims": int(claims), "ring_providers": int(self._providers[r]),
+                "ring_shops": int(self._shops[r]), "ring_amount": float(self._amount[r]),
+                "ring_velocity_30d": round(vel, 3), "ring_flagged": bool(flagged), "ring_risk": round(risk, 3)}
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            roots = {self._find(i) for i in range(len(self._parent))}
+            multi = [r for r in roots if self._claims[r] > 1]
+            flagged = {self._find(i) for k, i in self._ids.items() if k.startswith("claim:") and self._flagged[i]}
+            return {"nodes": len(self._parent), "components": len(roots),
+                    "rings": len(multi), "largest_ring_claims": max((self._claims[r] for r in multi), default=0),
+                    "flagged_rings": sum(1 for r in multi if r in flagged)}
+    # ---- batch rebuild ----
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, seeds: Optional[Dict[str, Iterable[str]]] = None) -> "RingGraph":
+        """
+        Build from historical claims with vectorized connected components
+        (scipy) instead of one union at a time. Gives the same rings as
+        observe() over the rows in order: a pair links only its first
+        HUB_DEGREE claims.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        g = cls(seeds)
+        n = len(df)
+        if n == 0:
+            return g
+        cid = df["claim_id"].astype(str).str.strip() if "claim_id" in df else pd.Series(np.arange(n)).astype(str)
+        cid = cid.where(cid != "", "#" + pd.Series(np.arange(n), index=df.index).astype(str))
+        claim_keys = ("claim:" + cid).to_numpy()
+        _, first = np.unique(claim_keys, return_index=True)  # dedupe claim ids, keep arrival order
+        first = np.sort(first)
+        claim_keys = claim_keys[first]
+        sub = df.iloc[first]
+        m = len(sub)
+
+        vals, present = {}, []
+        for kind, field in LINK_FIELDS:
+            if field in sub:
+                vals[kind] = sub[field].fillna("").astype(str).str.strip().reset_index(drop=True)
+                present.append(kind)
+        pair_keys, pair_claim = [], []
+        for i, a in enumerate(present):
+            for b in present[i + 1:]:
+                ok = ((vals[a] != "") & (vals[b] != "")).to_numpy()
+                pair_keys.append((f"{a}+{b}:" + vals[a][ok] + "|" + vals[b][ok]).to_numpy(dtype=object))
+                pair_claim.append(np.nonzero(ok)[0])
+        pair_keys = np.concatenate(pair_keys) if pair_keys else np.array([], dtype=object)
+        pair_claim = np.concatenate(pair_claim) if pair_claim else np.array([], dtype=np.int64)
+        order = np.argsort(pair_claim, kind="stable")  # arrival order within each pair
+        pair_keys, pair_claim = pair_keys[order], pair_claim[order]
+
+        codes, uniq = pd.factorize(pair_keys)
+        degree = np.bincount(codes, minlength=len(uniq)) if len(uniq) else np.zeros(0, np.int64)
+        keys = np.concatenate([claim_keys.astype(object), uniq.astype(object)])
+        N = m + len(uniq)
+        link = pd.Series(codes).groupby(codes).cumcount().to_numpy() < HUB_DEGREE
+        adj = coo_matrix((np.ones(int(link.sum()), dtype=np.int8), (pair_claim[link], m + codes[link])),
+                         shape=(N, N))
+        ncomp, labels = connected_components(adj, directed=False)
+
+        # seeded claims flag their pairs; a claim is flagged when seeded or on a flagged pair
+        seeded = np.zeros(m, dtype=bool)
+        ent_ids = {}
+        for kind in ("provider", "shop"):
+            if kind in vals:
+                v = vals[kind]
+                seeded |= (kind + ":" + v).isin(g._seed_keys).to_numpy()
+                ent = pd.Series(np.where(v != "", kind + ":" + v, None))
+                ids, names = pd.factorize(ent)  # -1 for missing
+                base = len(g._ents)
+                g._ents.update((name, base + j) for j, name in enumerate(names))
+                ent_ids[kind] = np.where(ids >= 0, base + ids, -1)
+            else:
+                ent_ids[kind] = np.full(m, -1, dtype=np.int64)
+        hot = np.bincount(codes, weights=seeded[pair_claim], minlength=len(uniq)) > 0
+        on_hot = np.bincount(pair_claim, weights=hot[codes], minlength=m) > 0
+        flagged = np.r_[seeded | on_hot, hot].astype(np.int8)
+
+        amt_col = "claim_amount" if "claim_amount" in sub else ("amount" if "amount" in sub else None)
+        amount = pd.to_numeric(sub[amt_col], errors="coerce").fillna(0).to_numpy(float) if amt_col else np.zeros(m)
+        ts = np.full(m, np.nan)
+        for f in DATE_FIELDS:
+            if f in sub:
+                d = pd.to_datetime(sub[f], errors="coerce")
+                cand = (d.astype("int64").to_numpy() / 1e9)
+                cand[d.isna().to_numpy()] = np.nan
+                ts = np.where(np.isnan(ts), cand, ts)
+        clock = float(np.nanmax(ts)) if np.isfinite(ts).any() else 0.0
+        ts = np.where(np.isnan(ts), clock, ts)
+        decay = np.exp(-(clock - ts) / (VELOCITY_DAYS * _DAY))
+
+        # root = smallest node index in each component (a claim, when it has any)
+        root_of = np.full(ncomp, N, dtype=np.int64)
+        np.minimum.at(root_of, labels, np.arange(N))
+        parent = root_of[labels]
+
+        def per_root(values, dtype):
+            out = np.zeros(N, dtype=dtype)
+            out[root_of] = np.bincount(labels, weights=values, minlength=ncomp).astype(dtype)
+            return out
+
+        claims = per_root(np.r_[np.ones(m), np.zeros(len(uniq))], np.int64)
+        comp = labels[:m]
+        distinct = {}
+        for kind in ("provider", "shop"):
+            e = ent_ids[kind]
+            has = e >= 0
+            pairs = pd.DataFrame({"comp": comp[has], "ent": e[has]}).drop_duplicates()
+            out = np.zeros(N, dtype=np.int64)
+            out[root_of] = np.bincount(pairs["comp"].to_numpy(), minlength=ncomp)
+            distinct[kind] = out
+        multi = claims[root_of[comp]] > 1
+        if multi.any():
+            for lab, grp in pd.DataFrame({"comp": comp[multi], "p": ent_ids["provider"][multi],
+                                          "s": ent_ids["shop"][multi]}).groupby("comp"):
+                g._sets[int(root_of[lab])] = (set(grp["p"][grp["p"] >= 0].tolist()),
+                                              set(grp["s"][grp["s"] >= 0].tolist()))
+        rep = np.full(N, -1, dtype=np.int64)
+        rep[:m] = np.arange(m)
+        rep[root_of] = np.where(root_of < m, root_of, -1)
+
+        g._ids = dict(zip(keys.tolist(), range(N)))
+        g._parent = array("q", parent.astype(np.int64).tobytes())
+        g._rank = array("q", per_root(np.ones(N), np.int64).tobytes())
+        g._claims = array("q", claims.tobytes())
+        g._providers = array("q", distinct["provider"].tobytes())
+        g._shops = array("q", distinct["shop"].tobytes())
+        g._degree = array("q", np.r_[np.zeros(m, np.int64), degree].astype(np.int64).tobytes())
+        g._flagged = array("b", flagged.tobytes())
+        g._amount = array("d", per_root(np.r_[amount, np.zeros(len(uniq))], np.float64).tobytes())
+        g._vel = array("d", per_root(np.r_[decay, np.zeros(len(uniq))], np.float64).tobytes())
+        g._vel_t = array("d", np.full(N, clock).tobytes())
+        g._prov = array("q", np.r_[ent_ids["provider"], np.full(len(uniq), -1)].astype(np.int64).tobytes())
+        g._shop = array("q", np.r_[ent_ids["shop"], np.full(len(uniq), -1)].astype(np.int64).tobytes())
+        g._rep = array("q", rep.tobytes())
+        g._clock = clock
+        return g
@@ -1,49 +1,18 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from pathlib import Path
 import os, json
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter
-from pydantic import BaseModel
-import yaml
-# add near the existing imports
-from typing import Any
 from pydantic import BaseModel, field_validator
-
-class SimpleClaim(BaseModel):
-    claim_id: str
-    line_of_business: str = "Auto"
-    late_report_days: int = 0
-    claim_amount: float = 0.0
-    paid_to_date: float = 0.0
-    reserve: float = 0.0
-    claimant_age: int = 40
-    injury_severity: int = 0
-    police_report: int | bool = 0
-    prior_claims_count: int = 0
-    repair_shop_id: str | None = None
-    provider_id: str | None = None
-
-    # make booleans or "true"/"false" work for police_report
-    @field_validator("police_report", mode="before")
-    @classmethod
-    def coerce_police(cls, v: Any) -> int:
-        if isinstance(v, bool): return int(v)
-        if isinstance(v, (int, float)): return int(v)
-        if isinstance(v, str): return 1 if v.strip().lower() in {"1","true","yes","y"} else 0
-        return 0
-
-@router.post("/score_simple")
-def score_simple(payload: SimpleClaim):
-    """
-    Friendlier scoring: fills defaults & coerces types, then reuses the same logic.
-    """
-    # convert to the strict Claim used by /score
-    strict = Claim(**payload.model_dump())
-    return score_one(strict)
-
-from .scoring_rules import score_rules
+import yaml
+from .scoring_rules import score_rules, score_rules_frame
 from .features import enrich
+from .ring_graph import RingGraph
+from claimsight_ai.feature_store import FeatureStore, get_store, set_store
+from claimsight_ai import near_dup
+from claimsight_ai.metrics import timed
 
 # Config
 CFG_PATH = os.path.join(os.path.dirname(__file__), "config", "rings.yaml")
@@ -54,6 +23,9 @@ RINGS = {
     "ring_shops": set(cfg.get("ring_shops", [])),
 }
 
+# Claims link graph; seeded with the static lists, grown as claims are scored
+RING_GRAPH = RingGraph(RINGS)
+
 # Optional ML
 MODEL = None
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "model", "model.joblib")
@@ -79,12 +51,15 @@ class Claim(BaseModel):
     vin: Optional[str] = ""
     provider_id: Optional[str] = ""
     repair_shop_id: Optional[str] = ""
+    notes: Optional[str] = ""
 
 router = APIRouter(prefix="/fraud", tags=["fraud"])
 
-def score_ml(c: Dict[str, Any]) -> Dict[str, Any]:
+@timed("fraud_ml")
+def score_ml(c: Dict[str, Any], ring: Optional[Dict[str, Any]] = None,
+             peers: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
     if MODEL is None:
-        return score_rules(c, RINGS)
+        return score_rules(c, RINGS, ring, peers)
     import pandas as pd
     df = enrich(pd.DataFrame([c]))
     prob = float(MODEL.predict_proba(df)[0,1])
@@ -97,13 +72,130 @@ def health():
 @router.post("/score")
 def score_one(payload: Claim):
     c = payload.dict()
-    return score_ml(c) if ENGINE == "ml" else score_rules(c, RINGS)
+    ring, peers = _observe(c)
+    return score_ml(c, ring, peers) if ENGINE == "ml" else score_rules(c, RINGS, ring, peers)
+
+def _observe(c: Dict[str, Any], peers: Optional[Dict[str, Any]] = None):
+    """Peer features as of before this claim, then record it in the graph + store (peers: already recorded)."""
+    if peers is None:
+        store = get_store()
+        peers = store.read(c)
+        store.update(c)
+    dups = near_dup.check_and_add(c)
+    if dups:
+        peers.update(near_dup_similarity=dups[0]["similarity"], near_dup_claim_id=dups[0]["claim_id"])
+    return RING_GRAPH.observe(c), peers
 
 @router.post("/bulk_score")
 def score_bulk(payload: List[Claim]):
+    import pandas as pd
+    rows = [p.dict() for p in payload]
+    # same store pass as the columnar endpoint, so both see identical peer features
+    peers = get_store().observe_frame(pd.DataFrame(rows)).to_dict("records") if rows else []
+    seen = [_observe(c, f) for c, f in zip(rows, peers)]
     if ENGINE == "ml":
-        return [score_ml(p.dict()) for p in payload]
-    return [score_rules(p.dict(), RINGS) for p in payload]
+        return [score_ml(c, r, f) for c, (r, f) in zip(rows, seen)]
+    return [score_rules(c, RINGS, r, f) for c, (r, f) in zip(rows, seen)]
+
+def _claim_schema():
+    """Column schema mirroring Claim: column -> (arrow type, required, default)."""
+    import pyarrow as pa
+    return {
+        "claim_id": (pa.string(), True, None),
+        "line_of_business": (pa.string(), True, None),
+        "state": (pa.string(), True, None),
+        "incident_date": (pa.string(), False, None),
+        "report_date": (pa.string(), False, None),
+        "late_report_days": (pa.int64(), True, None),
+        "claim_amount": (pa.float64(), True, None),
+        "paid_to_date": (pa.float64(), True, None),
+        "reserve": (pa.float64(), True, None),
+        "claimant_age": (pa.int64(), True, None),
+        "injury_severity": (pa.string(), True, None),
+        "police_report": (pa.int64(), True, None),
+        "prior_claims_count": (pa.int64(), True, None),
+        "vin": (pa.string(), False, ""),
+        "provider_id": (pa.string(), False, ""),
+        "repair_shop_id": (pa.string(), False, ""),
+        "notes": (pa.string(), False, ""),
+    }
+
+def score_frame(df):
+    """Score a validated claims frame in one vectorized pass (peer features as of before each claim)."""
+    peers = get_store().observe_frame(df)
+    if "notes" in df:
+        peers["near_dup_similarity"], _ = near_dup.check_and_add_frame(df)
+    ring = RING_GRAPH.observe_frame(df)
+    if ENGINE == "ml" and MODEL is not None:
+        import pandas as pd
+        prob = MODEL.predict_proba(enrich(df))[:, 1]
+        return pd.DataFrame({"claim_id": df["claim_id"].to_numpy(),
+                             "fraud_probability": prob, "label": (prob >= 0.5).astype("int8")})
+    return score_rules_frame(df, RINGS, ring, peers)
+
+@router.post("/bulk_score_columnar")
+async def score_bulk_columnar(request: Request):
+    """
+    Columnar bulk scoring. Body is an Arrow IPC stream
+    (application/vnd.apache.arrow.stream) or Parquet (application/vnd.apache.parquet)
+    with Claim's fields as columns. Responds in the same format unless Accept says otherwise.
+    """
+    from claimsight_ai import columnar
+    if not columnar.available():
+        raise HTTPException(status_code=501, detail="pyarrow not installed")
+    body = await request.body()
+    ctype = request.headers.get("content-type")
+    try:
+        df = columnar.read_frame(body, ctype, _claim_schema())
+    except columnar.ColumnarError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    out = await run_in_threadpool(score_frame, df)
+    data, media = columnar.write_frame(out, columnar.response_kind(request.headers.get("accept"), ctype))
+    return Response(content=data, media_type=media, headers={"X-Row-Count": str(len(out))})
+
+class SimpleClaim(BaseModel):
+    claim_id: str
+    line_of_business: str = "Auto"
+    late_report_days: int = 0
+    claim_amount: float = 0.0
+    paid_to_date: float = 0.0
+    reserve: float = 0.0
+    claimant_age: int = 40
+    injury_severity: int = 0
+    police_report: int | bool = 0
+    prior_claims_count: int = 0
+    repair_shop_id: str | None = None
+    provider_id: str | None = None
+
+    # make booleans or "true"/"false" work for police_report
+    @field_validator("police_report", mode="before")
+    @classmethod
+    def coerce_police(cls, v: Any) -> int:
+        if isinstance(v, bool): return int(v)
+        if isinstance(v, (int, float)): return int(v)
+        if isinstance(v, str): return 1 if v.strip().lower() in {"1","true","yes","y"} else 0
+        return 0
+
+@router.post("/score_simple")
+def score_simple(payload: SimpleClaim):
+    """
+    Friendlier scoring: fills defaults & coerces types, then reuses the same logic.
+    """
+    # convert to the strict Claim used by /score
+    strict = Claim(**payload.model_dump())
+    return score_one(strict)
+
+@router.get("/rings/lookup")
+def ring_lookup(provider_id: str = "", repair_shop_id: str = "", policy_id: str = "",
+                vin: str = "", claim_id: str = ""):
+    """Ring stats for any combination of entity ids (read-only)."""
+    return RING_GRAPH.lookup({"claim_id": claim_id, "provider_id": provider_id,
+                              "repair_shop_id": repair_shop_id, "policy_id": policy_id, "vin": vin})
+
+@router.get("/rings/summary")
+def ring_summary():
+    return RING_GRAPH.summary()
+
 # ---- Model / Training helpers (read state from API module) ----
 try:
     # we import the api module to peek at global MODEL / EXPLAINER the service owns
@@ -131,28 +223,169 @@ def fraud_model_status():
         "data_dir": str(getattr(api_main, "DATA_DIR", Path("data")).resolve()),
     }
 
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1 << 20)))
+
 @router.post("/admin/upload_csv")
-async def admin_upload_csv(file: UploadFile = File(...)):
-    """Upload a training CSV (writes to DATA_DIR/claims.csv)."""
+async def admin_upload_csv(file: UploadFile = File(...), to_parquet: bool = False):
+    """
+    Upload a training CSV (writes to DATA_DIR/claims.csv).
+
+    The body is streamed to a temp file in UPLOAD_CHUNK_BYTES chunks while the
+    row count and SHA-256 are computed incrementally; the file is then renamed
+    into place atomically. With to_parquet=true the same pass also writes
+    DATA_DIR/claims.parquet; if that conversion fails the CSV is still saved
+    and the response carries parquet_error instead. Writes, fsync and the
+    CSV parse run in the threadpool so a large upload doesn't stall the
+    event loop.
+    """
+    import hashlib, tempfile
     if file.filename and not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="Please upload a .csv")
     data_dir = getattr(api_main, "DATA_DIR", Path(os.environ.get("DATA_DIR", "data")))
     data_dir = Path(data_dir)
     data_dir.mkdir(parents=True, exist_ok=True)
     target = data_dir / "claims.csv"
-    content = await file.read()
-    target.write_bytes(content)
+    pq_target = data_dir / "claims.parquet"
+
+    sha = hashlib.sha256()
+    newlines, size, last = 0, 0, b""
+    fd, tmp = tempfile.mkstemp(dir=data_dir, prefix=".claims.", suffix=".csv.part")
+    pq_tmp = str(pq_target) + ".part"
+    converter, parquet_rows, parquet_error = None, None, None
+
+    def drop_sidecar(e: Exception) -> None:
+        # the Parquet copy is optional: a conversion failure never costs the CSV upload
+        nonlocal converter, parquet_error
+        converter.abort()
+        if os.path.exists(pq_tmp):
+            os.unlink(pq_tmp)
+        converter, parquet_error = None, str(e)
+
+    def write_chunk(fh, chunk: bytes) -> None:
+        # file and CPU work runs off the event loop (threadpool), one chunk at a time
+        fh.write(chunk)
+        sha.update(chunk)
+        if converter is not None:
+            try:
+                converter.feed(chunk)
+            except ValueError as e:
+                drop_sidecar(e)
+
+    def finish(fh) -> None:
+        nonlocal parquet_rows
+        fh.flush()
+        os.fsync(fh.fileno())
+        fh.close()
+        if converter is not None:
+            try:
+                parquet_rows = converter.close()
+            except ValueError as e:
+                drop_sidecar(e)
+        os.replace(tmp, target)
+        if converter is not None:
+            os.replace(pq_tmp, pq_target)
+
+    if to_parquet:
+        try:
+            from claimsight_ai.columnar import CsvParquetWriter
+            converter = CsvParquetWriter(pq_tmp)
+        except ValueError as e:  # ColumnarError: pyarrow not installed
+            parquet_error = str(e)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                await run_in_threadpool(write_chunk, fh, chunk)
+                newlines += chunk.count(b"\n")
+                size += len(chunk)
+                last = chunk[-1:]
+            await run_in_threadpool(finish, fh)
+    except Exception:
+        if converter is not None:
+            converter.abort()
+        for p in (tmp, pq_tmp):
+            if os.path.exists(p):
+                os.unlink(p)
+        raise
+
     # tiny sanity check: count lines
-    line_count = content.count(b"\n") + (1 if content and not content.endswith(b"\n") else 0)
-    return {"ok": True, "path": str(target.resolve()), "approx_rows": max(0, line_count - 1)}
+    line_count = newlines + (1 if size and last != b"\n" else 0)
+    out = {"ok": True, "path": str(target.resolve()), "approx_rows": max(0, line_count - 1),
+           "bytes": size, "sha256": sha.hexdigest()}
+    if converter is not None:
+        out.update({"parquet_path": str(pq_target.resolve()), "parquet_rows": parquet_rows})
+    elif parquet_error is not None:
+        out["parquet_error"] = parquet_error
+    return out
+
+@router.post("/admin/rebuild_rings")
+def admin_rebuild_rings():
+    """Rebuild the ring graph from the historical claims store (replaces the live graph)."""
+    global RING_GRAPH
+    import time
+    from claimsight_ai.claims_store import load_claims
+    data_dir = Path(getattr(api_main, "DATA_DIR", Path(os.environ.get("DATA_DIR", "data"))))
+    t0 = time.perf_counter()
+    try:
+        df = load_claims(data_dir=data_dir)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    RING_GRAPH = RingGraph.from_frame(df, RINGS)
+    return {"ok": True, "claims": len(df), "seconds": round(time.perf_counter() - t0, 3),
+            **RING_GRAPH.summary()}
+
+@router.get("/features/peers")
+def peer_features(provider_id: str = "", repair_shop_id: str = "", policy_id: str = "", state: str = ""):
+    """Sliding-window peer features for any combination of entity ids."""
+    return get_store().read({"provider_id": provider_id, "repair_shop_id": repair_shop_id,
+                             "policy_id": policy_id, "state": state})
+
+@router.post("/admin/rebuild_features")
+def admin_rebuild_features():
+    """Rebuild the online feature store from the claims store and snapshot it."""
+    import time
+    from claimsight_ai.claims_store import load_claims
+    data_dir = Path(getattr(api_main, "DATA_DIR", Path(os.environ.get("DATA_DIR", "data"))))
+    t0 = time.perf_counter()
+    try:
+        df = load_claims(data_dir=data_dir)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    store = set_store(FeatureStore.from_frame(df))
+    path = store.snapshot()
+    return {"ok": True, "claims": len(df), "seconds": round(time.perf_counter() - t0, 3),
+            "snapshot": str(path), **store.stats()}
+
+@router.get("/near_duplicates")
+def near_duplicates(text: str, threshold: float = near_dup.THRESHOLD, top_k: int = 5):
+    """Indexed claims whose notes are Jaccard-similar to text (MinHash/LSH)."""
+    return {"results": near_dup.get_index().query(text, threshold=threshold, top_k=top_k),
+            **near_dup.get_index().stats()}
+
+@router.post("/admin/rebuild_near_dup")
+def admin_rebuild_near_dup():
+    """Rebuild the near-duplicate notes index from the claims store (claims indexed since are kept)."""
+    import time
+    from claimsight_ai.claims_store import load_claims
+    data_dir = Path(getattr(api_main, "DATA_DIR", Path(os.environ.get("DATA_DIR", "data"))))
+    t0 = time.perf_counter()
+    try:
+        df = load_claims(data_dir=data_dir)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    idx = near_dup.load_history(df)
+    return {"ok": True, "seconds": round(time.perf_counter() - t0, 3), **idx.stats()}
 
 @router.post("/admin/train")
 def admin_train_now():
     """Trigger in-process training using the API's built-in function."""
-    if _train_risk_inproc is None:
+    train = _train_risk_inproc or getattr(api_main, "train_risk_model", None)
+    if train is None:
         raise HTTPException(status_code=500, detail="Training function not available in-process.")
     try:
-        out = _train_risk_inproc()
+        out = train()
         return {"ok": True, "result": out}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training failed: {e!s}") from e
@@ -1,6 +1,25 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-def score_rules(c: Dict[str, Any], rings: Dict[str, set]) -> Dict[str, Any]:
+import numpy as np
+import pandas as pd
+
+from claimsight_ai.metrics import timed
+
+from .ring_graph import RING_MIN_CLAIMS, RING_VELOCITY as RING_MIN_VELOCITY
+
+PROVIDER_VELOCITY_30D = 15   # claims billed by one provider in 30 days
+SHOP_AVG_MULTIPLE = 3.0      # claim amount vs. the shop's 30-day average
+SHOP_MIN_CLAIMS = 5          # shop history needed before comparing
+
+@timed("fraud_rules")
+def score_rules(c: Dict[str, Any], rings: Dict[str, set],
+                ring: Optional[Dict[str, Any]] = None,
+                peers: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    ring: optional stats from RingGraph.lookup/observe for this claim.
+    peers: optional FeatureStore.read() output (provider/shop velocity), plus
+           near_dup_similarity when the notes match an earlier claim.
+    """
     risk = 0.0
     reasons = []
 
@@ -17,13 +36,100 @@ def score_rules(c: Dict[str, Any], rings: Dict[str, set]) -> Dict[str, Any]:
         risk += 0.25; reasons.append("late_report")
     if lob == "Auto" and amount > 4900 and sev in ("None","Minor") and police == 0:
         risk += 0.30; reasons.append("amount_vs_severity_no_police")
-    if provider in rings["ring_providers"] or shop in rings["ring_shops"]:
+    if provider in rings["ring_providers"] or shop in rings["ring_shops"] or (ring or {}).get("ring_flagged"):
         risk += 0.35; reasons.append("ring_link")
     if prior >= 3:
         risk += 0.20; reasons.append("frequent_prior_claims")
     if lob == "Home" and amount > 30000 and police == 0:
         risk += 0.25; reasons.append("home_inflated_no_police")
+    if ring and ring.get("ring_claims", 0) >= RING_MIN_CLAIMS and ring.get("ring_velocity_30d", 0) >= RING_MIN_VELOCITY:
+        risk += 0.20; reasons.append("ring_velocity")
+    peers = peers or {}
+    if provider and peers.get("provider_claims_30d", 0) >= PROVIDER_VELOCITY_30D:
+        risk += 0.15; reasons.append("provider_velocity")
+    shop_avg = peers.get("repair_shop_avg_amount_30d", 0.0)
+    if shop and peers.get("repair_shop_claims_30d", 0) >= SHOP_MIN_CLAIMS and amount > SHOP_AVG_MULTIPLE * shop_avg > 0:
+        risk += 0.15; reasons.append("amount_vs_shop_average")
+    if peers.get("near_dup_similarity", 0.0) > 0:
+        risk += 0.25; reasons.append("near_duplicate_notes")
 
     risk = min(1.0, risk)
     label = 1 if risk >= 0.5 else 0
     return {"fraud_probability": risk, "label": label, "reasons": reasons}
+
+@timed("fraud_rules_frame")
+def score_rules_frame(df: pd.DataFrame, rings: Dict[str, set],
+                      ring: Optional[pd.DataFrame] = None,
+                      peers: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Vectorized score_rules over a whole frame; one boolean column per reason.
+
+    ring / peers: optional RingGraph.lookup_frame / FeatureStore.observe_frame
+    output aligned with df.
+    """
+    n = len(df)
+
+    def num(col, cast=float):
+        if col not in df.columns:
+            return np.zeros(n, dtype=cast)
+        return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy().astype(cast)
+
+    def text(col):
+        if col not in df.columns:
+            return np.full(n, "", dtype=object)
+        return df[col].fillna("").astype(str).str.strip().to_numpy()
+
+    late_days = num("late_report_days", int)
+    lob = text("line_of_business")
+    sev = text("injury_severity")
+    police = num("police_report", int)
+    amount = num("claim_amount")
+    prior = num("prior_claims_count", int)
+    provider = text("provider_id")
+    shop = text("repair_shop_id")
+
+    if ring is not None and len(ring):
+        ring_flagged = ring["ring_flagged"].to_numpy(dtype=bool)
+        ring_fast = ((ring["ring_claims"].to_numpy() >= RING_MIN_CLAIMS)
+                     & (ring["ring_velocity_30d"].to_numpy() >= RING_MIN_VELOCITY))
+    else:
+        ring_flagged = ring_fast = np.zeros(n, dtype=bool)
+
+    def peer(col):
+        if peers is None or col not in peers:
+            return np.zeros(n)
+        return peers[col].to_numpy(dtype=float)
+
+    shop_avg = peer("repair_shop_avg_amount_30d")
+
+    flags = {
+        "late_report": late_days > 30,
+        "amount_vs_severity_no_police": (lob == "Auto") & (amount > 4900)
+                                        & np.isin(sev, ["None", "Minor"]) & (police == 0),
+        "ring_link": np.isin(provider, list(rings["ring_providers"]))
+                     | np.isin(shop, list(rings["ring_shops"])) | ring_flagged,
+        "frequent_prior_claims": prior >= 3,
+        "home_inflated_no_police": (lob == "Home") & (amount > 30000) & (police == 0),
+        "ring_velocity": ring_fast,
+        "provider_velocity": (provider != "") & (peer("provider_claims_30d") >= PROVIDER_VELOCITY_30D),
+        "amount_vs_shop_average": (shop != "") & (peer("repair_shop_claims_30d") >= SHOP_MIN_CLAIMS)
+                                  & (shop_avg > 0) & (amount > SHOP_AVG_MULTIPLE * shop_avg),
+        "near_duplicate_notes": peer("near_dup_similarity") > 0,
+    }
+    weights = {"late_report": 0.25, "amount_vs_severity_no_police": 0.30, "ring_link": 0.35,
+               "frequent_prior_claims": 0.20, "home_inflated_no_police": 0.25, "ring_velocity": 0.20,
+               "provider_velocity": 0.15, "amount_vs_shop_average": 0.15,
+               "near_duplicate_notes": 0.25}
+
+    risk = np.zeros(n)
+    for name, mask in flags.items():
+        risk += weights[name] * mask
+    risk = np.minimum(1.0, risk)
+
+    out = pd.DataFrame({
+        "claim_id": df["claim_id"].to_numpy() if "claim_id" in df.columns else np.arange(n),
+        "fraud_probability": risk,
+        "label": (risk >= 0.5).astype("int8"),
+    })
+    for name, mask in flags.items():
+        out[f"reason_{name}"] = mask
+    return out
@@ -0,0 +1,220 @@
+# claimsight_ai/admission.py
+"""
+Per-endpoint-class admission control and load shedding.
+
+Every request is classified by path before routing:
+
+  heavy   OCR, document triage, the FNOL pipeline, PDF packets, training, bulk scoring
+  search  /rag/search and /claims/coverage (query encode + FAISS + cross-encoder)
+  cheap   everything else (/claims/risk, /fraud/score, lookups)
+  exempt  probes, /metrics and the admin/profiling views: never queued or shed
+
+Each limited class has its own gate: at most `concurrency` requests in the
+handler, at most `queue` more waiting (FIFO) for up to `max_wait` seconds.
+A full queue is answered at once with 429; a request that waited max_wait
+without getting a slot gets 503. Both carry Retry-After, estimated from the
+class's recent service time and queue length. Because the gates are
+separate, a burst of OCR uploads fills the heavy queue and is shed there,
+while cheap scoring keeps its own slots (and the sync handlers of heavy
+requests can no longer occupy the whole threadpool).
+
+Limits are per process (per worker under api/serve.py) and configured with
+ADMISSION_LIMITS="heavy=2:8:10,search=4:32:5,cheap=64:256:2"
+(class=concurrency:queue:max_wait_s; unspecified classes keep defaults);
+ADMISSION=0 disables the gates. Queue depth, in-flight counts, admissions,
+rejections and queue wait are exported on /metrics and GET /admin/admission.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .metrics import REGISTRY, Family
+
+ADMISSION = os.getenv("ADMISSION", "1") != "0"
+_CPUS = os.cpu_count() or 1
+
+# first match wins; a prefix matches itself and its sub-paths
+ROUTE_CLASSES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("exempt", ("/healthz", "/livez", "/readyz", "/metrics", "/docs", "/openapi.json", "/admin/workers",
+                "/admin/profile", "/admin/admission", "/ocr/stats", "/fraud/health", "/reports/claim_packet/cache")),
+    ("heavy", ("/ocr", "/triage/docs", "/fnol", "/reports", "/admin/train_risk", "/fraud/admin",
+               "/fraud/bulk_score", "/fraud/bulk_score_columnar", "/claims/risk/bulk_columnar")),
+    ("search", ("/rag/search", "/claims/coverage")),
+]
+DEFAULT_CLASS = "cheap"
+
+# class -> (concurrency, queue, max_wait seconds)
+DEFAULT_LIMITS: Dict[str, Tuple[int, int, float]] = {
+    "heavy": (max(1, _CPUS), 4 * max(1, _CPUS), 10.0),
+    "search": (2 * _CPUS, 16 * _CPUS, 5.0),
+    "cheap": (64, 256, 2.0),
+}
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int, float]]:
+    out = dict(DEFAULT_LIMITS)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, vals = part.partition("=")
+        c, q, w = (vals.split(":") + ["", "", ""])[:3]
+        dc, dq, dw = out.get(name.strip(), DEFAULT_LIMITS["cheap"])
+        out[name.strip()] = (int(c or dc), int(q or dq), float(w or dw))
+    return out
+
+
+def classify(path: str) -> str:
+    for name, prefixes in ROUTE_CLASSES:
+        for p in prefixes:
+            if path == p or path.startswith(p.rstrip("/") + "/"):
+                return name
+    return DEFAULT_CLASS
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status, self.reason, self.retry_after = status, reason, retry_after
+
+
+class Gate:
+    """Concurrency limit + bounded FIFO queue. Used from one event loop only, so no locks."""
+
+    def __init__(self, name: str, concurrency: int, queue: int, max_wait: float):
+        self.name = name
+        self.concurrency, self.queue, self.max_wait = max(1, concurrency), max(0, queue), max_wait
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self.service_s = 0.05  # EWMA of time in the handler, for Retry-After
+        self._wait_hist = REGISTRY.histogram("claimsight_admission_wait_seconds",
+                                             "Time spent queued before admission", cls=name)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained."""
+        est = self.service_s * (self.queued + 1) / self.concurrency
+        return max(1, min(60, math.ceil(est)))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns seconds queued. Raises Rejected (429 full, 503 timed out)."""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            self._wait_hist.observe(0.0)
+            return 0.0
+        if len(self._waiters) >= self.queue:
+            self.rejected["queue_full"] += 1
+            raise Rejected(429, f"{self.name} queue full ({self.queue} waiting)", self.retry_after())
+        t0 = time.perf_counter()
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, self.max_wait)
+        except asyncio.TimeoutError:
+            self._drop(fut)
+            self.rejected["timeout"] += 1
+            raise Rejected(503, f"{self.name} queue wait exceeded {self.max_wait:g}s", self.retry_after())
+        except BaseException:  # client went away while queued
+            self._drop(fut)
+            raise
+        waited = time.perf_counter() - t0
+        self.admitted += 1
+        self._wait_hist.observe(waited)
+        return waited
+
+    def _drop(self, fut: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(fut)
+        except ValueError:  # already handed a slot by release(); pass it on
+            if fut.done() and not fut.cancelled():
+                self.release()
+
+    def release(self, service_s: Optional[float] = None) -> None:
+        if service_s is not None:
+            self.service_s += 0.2 * (service_s - self.service_s)
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # the slot moves to the waiter; active is unchanged
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"concurrency": self.concurrency, "queue": self.queue, "max_wait_s": self.max_wait,
+                "active": self.active, "queued": self.queued, "admitted": self.admitted,
+                "rejected": dict(self.rejected), "service_ms": round(1000 * self.service_s, 1),
+                "retry_after_s": self.retry_after()}
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying the per-class gates."""
+
+    def __init__(self, app, limits: Optional[Dict[str, Tuple[int, int, float]]] = None, enabled: bool = ADMISSION):
+        self.app = app
+        self.enabled = enabled
+        limits = limits or parse_limits(os.getenv("ADMISSION_LIMITS", ""))
+        self.gates = {name: Gate(name, *lim) for name, lim in limits.items()}
+        set_admission(self)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        gate = self.gates.get(classify(scope["path"]))
+        if gate is None:
+            return await self.app(scope, receive, send)
+        try:
+            await gate.acquire()
+        except Rejected as e:
+            return await _reject(send, e, gate.name)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.perf_counter() - t0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "classes": {n: g.stats() for n, g in self.gates.items()}}
+
+    def collect(self) -> List[Family]:
+        gates = list(self.gates.values())
+        return [
+            ("claimsight_admission_in_flight", "gauge", "Requests being handled per endpoint class",
+             [({"cls": g.name}, g.active) for g in gates]),
+            ("claimsight_admission_queued", "gauge", "Requests waiting for a slot per endpoint class",
+             [({"cls": g.name}, g.queued) for g in gates]),
+            ("claimsight_admission_admitted_total", "counter", "Requests admitted per endpoint class",
+             [({"cls": g.name}, g.admitted) for g in gates]),
+            ("claimsight_admission_rejected_total", "counter", "Requests shed per endpoint class and reason",
+             [({"cls": g.name, "reason": r}, n) for g in gates for r, n in g.rejected.items()]),
+        ]
+
+
+async def _reject(send, e: Rejected, cls: str) -> None:
+    body = json.dumps({"detail": str(e), "class": cls, "retry_after": e.retry_after}).encode()
+    await send({"type": "http.response.start", "status": e.status, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(e.retry_after).encode()), (b"x-admission-class", cls.encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+_admission: Optional[AdmissionMiddleware] = None
+
+
+def get_admission() -> Optional[AdmissionMiddleware]:
+    return _admission
+
+
+def set_admission(m: Optional[AdmissionMiddleware]) -> None:
+    global _admission
+    _admission = m
+
+
+REGISTRY.collector(lambda: _admission.collect() if _admission is not None else [])
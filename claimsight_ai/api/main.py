@@ -2,6 +2,9 @@
 from __future__ import annotations
 
 import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Optional, Dict
 
@@ -10,12 +13,19 @@ REPO_ROOT = Path(__file__).resolve().parents[2]  # repo root (parent of 'claimsi
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-import numpy as np
-import pandas as pd
-import xgboost as xgb
-import shap
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import RedirectResponse
+# numpy/pandas/xgboost/shap and the ML stacks are imported on first use or by
+# the background warm-up (claimsight_ai/warmup.py), so the process serves
+# /livez within a second of starting.
+from ..warmup import PROCESS_T0, WARMUP, Skip, Warmup
+if os.getenv("TRACEMALLOC"):  # trace allocations from boot, incl. warm-up (claimsight_ai/profiling.py)
+    from .. import profiling  # noqa: F401
+from ..metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, TimingMiddleware, observe_stage, stage, timed
+from ..admission import AdmissionMiddleware, get_admission
+from .. import deadline
+from ..deadline import DeadlineMiddleware
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 
 # ---------- ENV / Paths ----------
 APP_HOME = Path(os.environ.get("APP_HOME", Path.cwd()))
@@ -52,16 +62,8 @@ except Exception:
         metadata: Optional[Dict] = None
 
 # ---------- Local services (relative imports; no PYTHONPATH issues) ----------
-# TEMPORARILY COMMENTED OUT FOR DEBUGGING
-# from ..rag.index_policies import build_index
-# from ..rag.retriever import PolicyRetriever
-# from ..rag.reranker import rerank
-
-# from ..ocr.pii import mask_pii
-# from ..snowflake_io import df_to_snowflake, snowflake_query
-# from ..report import build_claim_packet_pdf
-
-# Create stub functions for now
+# The RAG stack (faiss, sentence-transformers) is loaded by the warm-up; the
+# stubs below stand in when it is not installed.
 def build_index():
     return {"status": "stub"}
 
@@ -72,19 +74,55 @@ class PolicyRetriever:
         return []
 
 def rerank(query, hits, top_n=5):
-    return hits[:top_n]
+    """Cross-encoder rerank; under a tight deadline only the top dense hits, or dense order."""
+    try:
+        from ..rag.reranker import rerank as _rerank
+    except Exception:
+        return hits[:top_n]
+    share = deadline.affordable("rerank")
+    n = len(hits) if share >= 1 else int(len(hits) * share)
+    if n < min(top_n, len(hits)):
+        deadline.degrade("rerank", "skipped")
+        return hits[:top_n]
+    if n < len(hits):
+        deadline.degrade("rerank", "partial", reranked=n, candidates=len(hits))
+        hits = hits[:n]
+    with stage("rerank"):
+        return _rerank(query, hits, top_n=top_n)
 
-def mask_pii(text):
-    return text
+# Presidio engines load on first use (claimsight_ai/ocr/pii.py)
+try:
+    from ..ocr.pii import mask_pii, engine as pii_engine
+except Exception:
+    def mask_pii(text):
+        return text
+
+    def pii_engine():
+        return None
 
+# Snowflake helpers share one pooled connection set (claimsight_ai/db_pool.py)
 def df_to_snowflake(df, table):
-    return {"status": "stub"}
+    try:
+        from ..snowflake_io import df_to_snowflake as _load
+    except Exception:
+        return {"status": "stub"}
+    return _load(df, table)
 
 def snowflake_query(query):
-    return pd.DataFrame()
+    try:
+        from ..snowflake_io import snowflake_query as _query
+    except Exception:
+        import pandas as pd
+        return pd.DataFrame()
+    return _query(query)
 
 def build_claim_packet_pdf(claim, cov, risk):
-    return b"PDF stub"
+    try:
+        from ..report import build_claim_packet_pdf as _build
+    except Exception:
+        return b"PDF stub"
+    with stage("pdf_render"):
+        return _build(claim, cov, risk)
 
 # ---------- Integrations (guarded; provide stubs if import fails) ----------
 try:
@@ -120,22 +158,30 @@ app = FastAPI(
     openapi_url="/openapi.json",
     root_path=ROOT_PATH,
 )
+# per-class concurrency limits + bounded queues, 429/503 when full (claimsight_ai/admission.py)
+app.add_middleware(AdmissionMiddleware)
+# X-Deadline-Ms / ?deadline_ms budgets; optional stages degrade to fit (claimsight_ai/deadline.py).
+# Outside admission, so time spent queued counts against the budget
+app.add_middleware(DeadlineMiddleware)
+# per-route latency histograms + optional Server-Timing (claimsight_ai/metrics.py); outermost,
+# so shed requests are timed too
+app.add_middleware(TimingMiddleware)
 
 # ---------- Fraud Router (Simplified Loading) ----------
-#try:
- #   from app.extensions.fraud.router import router as fraud_router
-  #  app.include_router(fraud_router)
-   # print("[INFO] Fraud detection router loaded successfully")
-#except ImportError as e:
- #   print(f"[WARNING] Fraud router not loaded: {e}")
+try:
+    from app.extensions.fraud.router import router as fraud_router
+    app.include_router(fraud_router)
+    print("[INFO] Fraud detection router loaded successfully")
+except ImportError as e:
+    print(f"[WARNING] Fraud router not loaded: {e}")
     # Create a minimal stub router for development
-  #  from fastapi import APIRouter
-   # stub_router = APIRouter(prefix="/fraud", tags=["fraud"])
-    
+    from fastapi import APIRouter
+    stub_router = APIRouter(prefix="/fraud", tags=["fraud"])
+
     @stub_router.get("/health")
     def fraud_health():
         return {"status": "stub_mode", "message": "Fraud detection not available"}
-    
+
     app.include_router(stub_router)
 
 # ========= Globals =========
@@ -150,10 +196,52 @@ def _one_hot_loss(loss_type: str):
     lt = str(loss_type).lower()
     return [1 if lt == k else 0 for k in loss_types]
 
+PEER_PROVIDER_30D = 15  # provider claims in 30 days before it is called out
+PEER_POLICY_30D = 3     # claims on one policy in 30 days
+TRIAGE_CONCURRENCY = int(os.getenv("TRIAGE_CONCURRENCY", "16"))  # files extracted at once per request
+
+def _peer_reasons(claim: dict, peers: Optional[dict] = None, dups: Optional[list] = None) -> list[str]:
+    """
+    Velocity reasons from the online feature store (O(1) reads) + near-duplicate
+    notes. peers/dups: features and near-duplicates already read for this claim.
+    """
+    from ..feature_store import get_store
+    from ..near_dup import check
+    dups = check(claim) if dups is None else dups
+    reasons = [f"Notes near-duplicate of claim {d['claim_id']} ({d['similarity']:.2f})" for d in dups[:2]]
+    if not any(claim.get(k) for k in ("provider_id", "policy_id")):
+        return reasons
+    f = get_store().read(claim) if peers is None else peers
+    if f["provider_claims_30d"] >= PEER_PROVIDER_30D:
+        reasons.append(f"Provider has {f['provider_claims_30d']} claims in 30 days")
+    if f["policy_claims_30d"] >= PEER_POLICY_30D:
+        reasons.append(f"Policy has {f['policy_claims_30d']} claims in 30 days")
+    return reasons
+
+ENDORSEMENT_CACHE_SIZE = int(os.getenv("ENDORSEMENT_CACHE_SIZE", "10000"))
+_endorsement_cache: "OrderedDict[str, list]" = OrderedDict()  # last live answer per policy
+_endorsement_lock = threading.Lock()
+
 def fetch_endorsements(policy_id: str) -> list[dict]:
-    """Prefer Duck Creek; fall back to Guidewire."""
+    """Live PAS lookup; under a tight deadline, the last endorsements seen for the policy."""
     if not policy_id:
         return []
+    if deadline.affordable("endorsements") < 1:
+        with _endorsement_lock:
+            cached = _endorsement_cache.get(policy_id)
+        deadline.degrade("endorsements", "cached" if cached is not None else "skipped")
+        return cached or []
+    endos = _fetch_endorsements_live(policy_id)
+    with _endorsement_lock:
+        _endorsement_cache[policy_id] = endos
+        _endorsement_cache.move_to_end(policy_id)
+        while len(_endorsement_cache) > ENDORSEMENT_CACHE_SIZE:
+            _endorsement_cache.popitem(last=False)
+    return endos
+
+@timed("endorsements")
+def _fetch_endorsements_live(policy_id: str) -> list[dict]:
+    """Prefer Duck Creek; fall back to Guidewire."""
     try:
         dc = pas_list_endorsements(policy_id)
         endos = dc.get("endorsements", []) or []
@@ -168,45 +256,152 @@ def fetch_endorsements(policy_id: str) -> list[dict]:
         return []
 
 # ========= Startup =========
+# Each warm-up step loads one component into the globals above. Until a step
+# finishes the endpoints use the same fallbacks as when the component is
+# missing (503 without a retriever, heuristic risk without a model).
+def _warm_index():
+    global RETRIEVER
+    try:
+        from ..rag.index_policies import INDEX_PATH, VECTOR_DIR, build_index as _build
+        from ..rag.retriever import PolicyRetriever as _Retriever
+        from ..rag.shards import read_layout
+    except ImportError as e:
+        raise Skip(f"RAG stack not installed ({e.name})")
+    built = INDEX_PATH.exists() or read_layout(VECTOR_DIR / "shards") is not None
+    out = {"index": "loaded"} if built else _build()
+    RETRIEVER = _Retriever(k=5)
+    if RETRIEVER.sharded is not None:  # VECTOR_SHARDS / SHARD_BY layout (claimsight_ai/rag/shards.py)
+        out["shards"] = RETRIEVER.sharded.stats()
+    return out
+
+def _warm_embedder():
+    try:
+        from ..rag.embeddings import get_model
+    except ImportError as e:
+        raise Skip(f"sentence-transformers not installed ({e.name})")
+    get_model().encode(["warm-up"], normalize_embeddings=True)
+
+def _warm_reranker():
+    try:
+        from ..rag.reranker import _get
+    except ImportError as e:
+        raise Skip(f"sentence-transformers not installed ({e.name})")
+    _get().predict([("warm-up", "warm-up")])
+
+def _warm_model():
+    global MODEL, EXPLAINER
+    import pandas as pd
+    model_path = MODELS_DIR / "risk_xgb.json"
+    if not model_path.exists():
+        raise Skip("Risk model not found (heuristic scoring). Train via POST /admin/train_risk")
+    import shap
+    import xgboost as xgb
+    mdl = xgb.XGBClassifier()
+    mdl.load_model(str(model_path))
+    bg = pd.DataFrame([[1000, 0, 0, 1, 0, 0]], columns=FEATURES)
+    EXPLAINER = shap.TreeExplainer(mdl, bg)
+    MODEL = mdl  # set last: risk_score checks MODEL, then uses EXPLAINER
+
+def _warm_inference():
+    # first-call costs: pandas/numpy paths, predict_proba + SHAP, feature store, near-dup index
+    claim = {"claim_id": "warm-up", "loss_type": "fire", "amount": 1000, "claimant_history_count": 0}
+    return {"score": risk_score(claim)["score"]}
+
+def _warm_pii():
+    if pii_engine() is None:
+        raise Skip("Presidio not installed (PII masking is a no-op)")
+    mask_pii("John Smith called 614-555-0199 yesterday")
+
+def _warm_features():
+    """Load the online feature store from its snapshot (claimsight_ai/feature_store.py)."""
+    from ..feature_store import get_store
+    return get_store().stats()
+
+def _warm_near_dup():
+    """Index the notes of the stored claims history (claimsight_ai/near_dup.py)."""
+    from ..claims_store import dataset
+    from ..near_dup import TEXT_FIELDS, load_history
+    try:
+        names = dataset(DATA_DIR).schema.names
+    except FileNotFoundError as e:
+        raise Skip(f"no claims store ({e})")
+    cols = [c for c in ["claim_id", *TEXT_FIELDS] if c in names]
+    if "claim_id" not in cols or len(cols) < 2:
+        raise Skip("claims store has no claim notes")
+    table = dataset(DATA_DIR).to_table(columns=cols)  # not through load_table: no need to cache it
+    return load_history(table.to_pandas()).stats()
+
+def _warm_doctype():
+    from ..ocr.doctype import get_classifier
+    return {"model": get_classifier().name}
+
+def build_warmup() -> Warmup:
+    w = Warmup()
+    if WARMUP:
+        w.add("index", _warm_index)
+        w.add("embedder", _warm_embedder)
+        w.add("reranker", _warm_reranker)
+        w.add("model", _warm_model)
+        w.add("inference", _warm_inference, after=["model"])
+        w.add("pii", _warm_pii)
+        w.add("features", _warm_features)
+        w.add("near_dup", _warm_near_dup)
+        w.add("doctype", _warm_doctype, after=["embedder"])
+    return w
+
+WARMUP_STATE = Warmup()  # replaced at startup; not ready until then
+
 @app.on_event("startup")
 def startup():
-    """SIMPLIFIED STARTUP FOR DEBUGGING"""
-    global RETRIEVER, MODEL, EXPLAINER
-    
-    print("=== API STARTUP BEGINNING ===")
+    """Schedule warm-up in the background and return: the server is live immediately."""
+    global WARMUP_STATE
+    if WARMUP_STATE.ready():  # forked by claimsight_ai/api/serve.py after the master preloaded
+        print(f"=== API WORKER {os.getpid()} STARTUP: assets preloaded by master ===")
+        return
+    print("=== API STARTUP ===")
     print(f"APP_HOME: {APP_HOME}")
     print(f"DATA_DIR: {DATA_DIR}")
     print(f"MODELS_DIR: {MODELS_DIR}")
     print(f"IS_CODESPACES: {IS_CODESPACES}")
     print(f"DOCS_AT_ROOT: {DOCS_AT_ROOT}")
-    
-    # Temporarily comment out everything complex
-    # try:
-    #     out = build_index()
-    #     print("Policy index build:", out)
-    # except Exception as e:
-    #     print("Index build error (continuing):", e)
-
-    # RETRIEVER = PolicyRetriever(k=5)
-
-    # model_path = MODELS_DIR / "risk_xgb.json"
-    # if model_path.exists():
-    #     mdl = xgb.XGBClassifier()
-    #     mdl.load_model(str(model_path))
-    #     MODEL = mdl
-    #     bg = pd.DataFrame([[1000, 0, 0, 1, 0, 0]], columns=FEATURES)
-    #     EXPLAINER = shap.TreeExplainer(MODEL, bg)
-    #     print("Loaded XGB risk model.")
-    # else:
-    #     print("Risk model not found. Train via POST /admin/train_risk")
-    
-    print("=== API STARTUP COMPLETE - BASIC MODE ===")
+    WARMUP_STATE = build_warmup().start()
+    print(f"=== API LIVE after {time.perf_counter() - PROCESS_T0:.2f}s (import {IMPORT_S:.2f}s); warm-up running ===")
 
 # ========= Health =========
 @app.get("/healthz")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/livez")
+def livez():
+    """Liveness: the process is up and serving. Never waits on warm-up."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness + startup breakdown: 503 until every warm-up step has finished."""
+    report = {"import_s": IMPORT_S, **WARMUP_STATE.report()}
+    if getattr(RETRIEVER, "sharded", None) is not None:  # live: unbuilt / unreachable shards
+        report["shards"] = RETRIEVER.sharded.stats()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint: per-stage and per-route latency histograms."""
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/admin/admission")
+def admission_stats():
+    """In-flight, queued, admitted and shed requests per endpoint class."""
+    m = get_admission()
+    return {"pid": os.getpid(), **(m.stats() if m is not None else {"enabled": False, "classes": {}})}
+
+@app.get("/admin/workers")
+def worker_stats():
+    """RSS/PSS per serving process (see claimsight_ai/api/serve.py for pre-fork mode)."""
+    from .serve import worker_memory
+    return {"pid": os.getpid(), **worker_memory()}
+
 # If docs are NOT at root, expose "/" as a redirect to /docs
 if not DOCS_AT_ROOT:
     @app.get("/", include_in_schema=False)
@@ -221,7 +416,7 @@ def rag_search(q: str, policy_id: str | None = None):
     where = {"policy_id": policy_id} if policy_id else None
     hits = RETRIEVER.search(q, where=where)
     hits = rerank(q, hits, top_n=5)
-    return {"query": q, "results": hits}
+    return {"query": q, "results": hits, "degraded": deadline.degraded()}
 
 # ========= Coverage =========
 @app.post("/claims/coverage")
@@ -229,16 +424,31 @@ def coverage_check(claim: dict):
     if RETRIEVER is None:
         raise HTTPException(status_code=503, detail="Retriever not initialized")
 
+    from ..near_dup import check_and_add
+    with stage("near_dup"):
+        near_dups = check_and_add(claim)
+    hits = coverage_hits(claim)
+    policy_id = claim.get("policy_id")
+    endorsements = fetch_endorsements(policy_id) if policy_id else []
+    return coverage_decision(claim, hits, endorsements, near_dups)
+
+def coverage_hits(claim: dict) -> list[dict]:
+    """Policy passages for the claim's loss: query encode + FAISS + rerank."""
+    if RETRIEVER is None:
+        raise HTTPException(status_code=503, detail="Retriever not initialized")
     loss_type = str(claim.get("loss_type", "")).lower()
     notes = claim.get("notes", "") or ""
     policy_id = claim.get("policy_id")
-
     q = f"Loss type: {loss_type}. Is it covered? Notes: {notes}"
     where = {"policy_id": policy_id} if policy_id else None
-    hits = RETRIEVER.search(q, where=where)
-    hits = rerank(q, hits, top_n=5)
+    with stage("retrieve"):
+        hits = RETRIEVER.search(q, where=where)
+    return rerank(q, hits, top_n=5)
 
-    endorsements = fetch_endorsements(policy_id) if policy_id else []
+def coverage_decision(claim: dict, hits: list[dict], endorsements: list[dict], near_dups: list[dict]) -> dict:
+    """Coverage rules over retrieved passages and endorsements."""
+    loss_type = str(claim.get("loss_type", "")).lower()
+    notes = claim.get("notes", "") or ""
     has_water_backup = any(
         (e.get("code", "").upper() in {"WTR-BKP", "WATER-BACKUP", "WTRBKP"})
         or ("water backup" in (e.get("desc", "").lower()))
@@ -247,6 +457,7 @@ def coverage_check(claim: dict):
 
     covered = None
     reasons, cites = [], []
+    rules_t0 = time.perf_counter()
     for h in hits:
         t = (h["text"] or "").lower()
         cites.append(f'{h["meta"].get("policy_id","unknown")} – {h["meta"].get("section","unknown")}')
@@ -270,6 +481,7 @@ def coverage_check(claim: dict):
 
     if not covered:
         covered = "unknown"; reasons.append("Insufficient evidence; manual review required.")
+    observe_stage("coverage_rules", time.perf_counter() - rules_t0)
 
     return {
         "coverage": covered,
@@ -277,11 +489,16 @@ def coverage_check(claim: dict):
         "citations": list(dict.fromkeys(cites)),
         "endorsements": [{"code": e.get("code"), "desc": e.get("desc")} for e in endorsements],
         "retrieval_preview": hits[:2],
+        "near_duplicates": near_dups,
+        "degraded": deadline.degraded(),
     }
 
 # ========= Risk =========
 @app.post("/claims/risk")
+@timed("risk_score")
 def risk_score(claim: dict):
+    import numpy as np
+    import pandas as pd
     amount = float(claim.get("amount", 0))
     prior = int(claim.get("claimant_history_count", 0))
     loss = str(claim.get("loss_type", "")).lower()
@@ -293,51 +510,240 @@ def risk_score(claim: dict):
         reasons = []
         if prior > 2: reasons.append("High prior claim count")
         if amount > 20000: reasons.append("Amount exceeds peer median")
-        return {"score": round(float(score), 3), "reasons": reasons, "top_features": ["amount","claimant_history_count"]}
+        reasons += _peer_reasons(claim)
+        return {"score": round(float(score), 3), "reasons": reasons, "top_features": ["amount","claimant_history_count"],
+                "degraded": deadline.degraded()}
 
     proba = float(MODEL.predict_proba(x)[0, 1])
-    shap_vals = EXPLAINER.shap_values(x)[0]
-    top_idx = np.argsort(-np.abs(shap_vals))[:3]
-    reasons = [f"{FEATURES[i]} ({shap_vals[i]:+.3f})" for i in top_idx]
-    return {"score": round(proba, 3), "reasons": reasons, "top_features": [FEATURES[i] for i in top_idx]}
+    if EXPLAINER is not None and deadline.affordable("shap") >= 1:
+        with stage("shap"):
+            shap_vals = EXPLAINER.shap_values(x)[0]
+        top_idx = np.argsort(-np.abs(shap_vals))[:3]
+        reasons = [f"{FEATURES[i]} ({shap_vals[i]:+.3f})" for i in top_idx]
+    else:  # no time for SHAP: global importances instead of this claim's attribution
+        deadline.degrade("shap", "skipped")
+        top_idx = np.argsort(-MODEL.feature_importances_)[:3]
+        reasons = [f"{FEATURES[i]} (global importance)" for i in top_idx]
+    reasons += _peer_reasons(claim)
+    return {"score": round(proba, 3), "reasons": reasons, "top_features": [FEATURES[i] for i in top_idx],
+            "degraded": deadline.degraded()}
+
+@timed("risk_score_frame")
+def risk_score_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized risk_score over a frame of claims (amount, claimant_history_count, loss_type)."""
+    import numpy as np
+    import pandas as pd
+    zeros = pd.Series(0, index=df.index)
+    amount = pd.to_numeric(df.get("amount", zeros), errors="coerce").fillna(0).to_numpy(dtype=float)
+    prior = pd.to_numeric(df.get("claimant_history_count", zeros), errors="coerce").fillna(0).to_numpy(dtype=int)
+    loss = df.get("loss_type", zeros.astype(str)).fillna("").astype(str).str.lower().to_numpy()
+
+    x = pd.DataFrame({"amount": amount, "claimant_history_count": prior})
+    for k in ["fire", "water", "theft", "collision"]:
+        x[k] = (loss == k).astype(int)
+    x = x[FEATURES]
+
+    out = pd.DataFrame({"claim_id": df["claim_id"].to_numpy() if "claim_id" in df else np.arange(len(df))})
+    if "provider_id" in df or "policy_id" in df:
+        from ..feature_store import get_store
+        peers = get_store().read_frame(df)
+        out["reason_provider_velocity"] = peers["provider_claims_30d"].to_numpy() >= PEER_PROVIDER_30D
+        out["reason_policy_velocity"] = peers["policy_claims_30d"].to_numpy() >= PEER_POLICY_30D
+    if MODEL is None:
+        out["score"] = np.round(np.minimum(0.99, 0.3 + amount / 50000.0 + 0.1 * prior), 3)
+        out["reason_high_prior_claims"] = prior > 2
+        out["reason_amount_above_median"] = amount > 20000
+        return out
+
+    out["score"] = np.round(MODEL.predict_proba(x)[:, 1], 3)
+    shap_vals = np.asarray(EXPLAINER.shap_values(x))
+    top_idx = np.argsort(-np.abs(shap_vals), axis=1)[:, :3]
+    names = np.asarray(FEATURES)
+    for j in range(top_idx.shape[1]):
+        out[f"top_feature_{j+1}"] = names[top_idx[:, j]]
+        out[f"top_shap_{j+1}"] = np.take_along_axis(shap_vals, top_idx[:, j:j+1], axis=1)[:, 0]
+    return out
+
+def risk_scores(claims: List[dict], peers: bool = True) -> List[dict]:
+    """
+    risk_score for many claims: one vectorized model/SHAP pass, same output per
+    claim. peers=False leaves out the feature-store / near-duplicate reasons
+    (append _peer_reasons(claim) yourself when the claim is processed).
+    """
+    if not claims:
+        return []
+    import pandas as pd
+    df = pd.DataFrame([{k: c.get(k) for k in ("claim_id", "amount", "claimant_history_count", "loss_type")}
+                       for c in claims])
+    df["amount"] = df["amount"].fillna(0)
+    df["claimant_history_count"] = df["claimant_history_count"].fillna(0)
+    frame = risk_score_frame(df)
+    out = []
+    for c, row in zip(claims, frame.to_dict("records")):
+        if MODEL is None:
+            reasons = (["High prior claim count"] if row["reason_high_prior_claims"] else []) \
+                + (["Amount exceeds peer median"] if row["reason_amount_above_median"] else [])
+            top = ["amount", "claimant_history_count"]
+        else:
+            top = [row[f"top_feature_{j}"] for j in (1, 2, 3)]
+            reasons = [f"{row[f'top_feature_{j}']} ({row[f'top_shap_{j}']:+.3f})" for j in (1, 2, 3)]
+        out.append({"score": float(row["score"]), "reasons": reasons + (_peer_reasons(c) if peers else []),
+                    "top_features": top, "degraded": deadline.degraded()})
+    return out
+
+def _risk_schema():
+    import pyarrow as pa
+    return {
+        "claim_id": (pa.string(), False, None),
+        "loss_type": (pa.string(), False, ""),
+        "amount": (pa.float64(), False, 0.0),
+        "claimant_history_count": (pa.int64(), False, 0),
+        "provider_id": (pa.string(), False, ""),
+        "policy_id": (pa.string(), False, ""),
+    }
+
+@app.post("/claims/risk/bulk_columnar")
+async def risk_score_bulk_columnar(request: Request):
+    """Columnar bulk risk scoring (Arrow IPC stream or Parquet in and out)."""
+    from .. import columnar
+    if not columnar.available():
+        raise HTTPException(status_code=501, detail="pyarrow not installed")
+    body = await request.body()
+    ctype = request.headers.get("content-type")
+    try:
+        df = columnar.read_frame(body, ctype, _risk_schema())
+    except columnar.ColumnarError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    out = await run_in_threadpool(risk_score_frame, df)
+    data, media = columnar.write_frame(out, columnar.response_kind(request.headers.get("accept"), ctype))
+    return Response(content=data, media_type=media, headers={"X-Row-Count": str(len(out))})
 
 # ========= OCR + PII =========
+async def _ocr_masked(content: bytes, content_type: Optional[str], filename: Optional[str],
+                      mask: bool = True) -> Dict:
+    """
+    OCR (process pool) + optional PII masking, through the content-addressed
+    cache. Only masked results are cached, and only when a real masking
+    engine is active, so raw text never reaches disk.
+    """
+    from ..ocr.workers import LANG, PDF_DPI, get_ocr_pool
+    cache = key = None
+    engine = pii_engine() if mask else None
+    if engine:
+        from ..ocr.cache import cache_key, get_cache
+        cache = get_cache()
+        key = cache_key(content, lang=LANG, dpi=PDF_DPI, pii=engine)
+        hit = cache.get(key)
+        if hit is not None:
+            return {"text": hit["text"], "pages": hit.get("pages", 0), "cached": True}
+    # Tesseract runs in the OCR process pool; this thread only waits on it
+    result = await run_in_threadpool(get_ocr_pool().ocr_document, content, content_type, filename)
+    text = result["text"]
+    if mask and text:
+        text = await run_in_threadpool(mask_pii, text)
+    out = {**result, "text": text, "cached": False}
+    if cache is not None and text:
+        cache.put(key, {"text": text, "pages": result["pages"]})
+    return out
+
 @app.post("/ocr")
 async def ocr_endpoint(file: UploadFile = File(...), mask_pii_flag: bool = True):
+    try:
+        from ..ocr.workers import OcrBusy
+    except Exception:
+        OcrBusy = None
     try:
         content = await file.read()
-        text = ""
-        if (file.content_type or "").startswith("image/"):
+        result = {"text": "", "pages": 0}
+        if OcrBusy is not None:
             try:
-                from PIL import Image
-                import io, pytesseract
-                img = Image.open(io.BytesIO(content))
-                text = pytesseract.image_to_string(img) or ""
-            except Exception:
-                text = ""
+                result = await _ocr_masked(content, file.content_type, file.filename, mask_pii_flag)
+            except OcrBusy as e:
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        text = result["text"]
         if not text:
             text = f"Uploaded: {file.filename}"
-        if mask_pii_flag:
-            text = mask_pii(text)
-        return {"text": text}
+            if mask_pii_flag:
+                text = mask_pii(text)
+        return {**result, "text": text}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ocr/stats")
+def ocr_stats():
+    """OCR pool throughput (pages/s), queue and error counts."""
+    try:
+        from ..ocr.workers import available, get_ocr_pool
+    except Exception as e:
+        return {"status": "unavailable", "detail": str(e)}
+    from ..ocr.cache import get_cache
+    return {"tesseract": available(), **get_ocr_pool().stats(), "cache": get_cache().stats()}
+
+@app.on_event("shutdown")
+def shutdown_ocr_pool():
+    try:
+        from ..ocr.workers import get_ocr_pool
+        get_ocr_pool().shutdown()
+    except Exception:
+        pass
+
 # ========= Triage =========
-@app.post("/triage/docs")
-async def triage_docs(files: List[UploadFile]):
+_TRIAGE_BODY = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+}}}}}
+
+@app.post("/triage/docs", openapi_extra=_TRIAGE_BODY)
+async def triage_docs(request: Request):
+    """
+    Extract (OCR / PDF text / plain text) every uploaded file concurrently as
+    its part arrives, then classify all of them in one batched embedding pass.
+    """
+    import asyncio
+    from .multipart_stream import iter_parts
+    from ..ocr.doctype import describe, get_classifier
+
+    sem = asyncio.Semaphore(TRIAGE_CONCURRENCY)
+
+    async def extract(part):
+        async with sem:  # read from the spooled part only once a slot is free
+            try:
+                return await _ocr_masked(part.data, part.content_type, part.filename)
+            except Exception:
+                return {"text": "", "pages": 0}
+            finally:
+                part.close()
+
+    parts, tasks = [], []
+    try:
+        async for part in iter_parts(request):
+            parts.append((part.filename, part.content_type))
+            tasks.append(asyncio.create_task(extract(part)))
+    except ValueError as e:
+        for t in tasks:
+            t.cancel()
+        raise HTTPException(status_code=getattr(e, "status_code", 400), detail=str(e))
+    results = await asyncio.gather(*tasks)
+
+    inputs = [describe(r["text"], fn, ct) for (fn, ct), r in zip(parts, results)]
+    labels = await run_in_threadpool(lambda: get_classifier().classify(inputs))
     out = []
-    for f in files:
-        masked = mask_pii(f.filename or "")
-        out.append({"filename": f.filename, "doc_type": "invoice", "pii_masked_excerpt": masked})
+    for (fn, ct), r, lab in zip(parts, results, labels):
+        text = r["text"]
+        out.append({"filename": fn, "content_type": ct, **lab, "pages": r.get("pages", 0),
+                    "pii_masked_excerpt": text[:200] if text else mask_pii(fn or "")})
     return out
 
 # ========= Admin: train toy model =========
 @app.post("/admin/train_risk")
 def train_risk():
+    import xgboost as xgb
     from sklearn.model_selection import train_test_split
 
-    df = pd.read_csv(DATA_DIR / "claims.csv")
+    from ..claims_store import load_claims
+    df = load_claims(columns=["loss_type", "amount", "claimant_history_count", "fraud_flag"],
+                     data_dir=DATA_DIR)
     df["fire"] = (df["loss_type"] == "fire").astype(int)
     df["water"] = (df["loss_type"] == "water").astype(int)
     df["theft"] = (df["loss_type"] == "theft").astype(int)
@@ -359,39 +765,400 @@ def train_risk():
 
 train_risk_model = train_risk
 
+# ========= Admin: live profiling =========
+@app.get("/admin/profile/cpu")
+async def profile_cpu(seconds: float = 10.0, interval: float = 0.005, format: str = "collapsed",
+                      include_idle: bool = False):
+    """
+    Sample the Python stacks of all threads for `seconds`. format=collapsed
+    (flamegraph.pl / speedscope input) or json (d3-flame-graph tree).
+    """
+    from ..profiling import ProfilerBusy, collapsed, flame_tree, sample_stacks
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="format must be collapsed or json")
+    try:
+        prof = await run_in_threadpool(sample_stacks, seconds, max(interval, 0.001), include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    headers = {"X-Profile-Seconds": str(prof["seconds"]), "X-Profile-Ticks": str(prof["ticks"])}
+    if format == "json":
+        return JSONResponse(flame_tree(prof["stacks"]), headers=headers)
+    return Response(content=collapsed(prof["stacks"]), media_type="text/plain", headers=headers)
+
+@app.post("/admin/profile/memory/start")
+def profile_memory_start(frames: int = 8):
+    from ..profiling import start_tracing
+    return start_tracing(frames)
+
+@app.post("/admin/profile/memory/stop")
+def profile_memory_stop():
+    from ..profiling import stop_tracing
+    return stop_tracing()
+
+@app.get("/admin/profile/memory")
+def profile_memory(top: int = 25, compare: bool = False):
+    """tracemalloc snapshot: top allocation sites and traced MB per owner (index/models/caches/app)."""
+    from ..profiling import memory_snapshot
+    try:
+        return memory_snapshot(top=top, compare=compare)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
 # ========= Reports =========
+def _packet_risk_input(claim: dict) -> dict:
+    """The risk fields of a claim, with the entity ids _peer_reasons reads velocity for."""
+    return {"claim_id": claim.get("claim_id"), "notes": claim.get("notes"), "loss_type": claim.get("loss_type"),
+            "amount": claim.get("amount", 0), "claimant_history_count": claim.get("claimant_history_count", 0),
+            "provider_id": claim.get("provider_id"), "policy_id": claim.get("policy_id")}
+
 @app.post("/reports/claim_packet")
-def generate_claim_packet(claim: dict):
+def generate_claim_packet(claim: dict, request: Request):
+    """
+    Case packet PDF. Packets are cached on disk under a hash of the claim,
+    its coverage/risk results and the model/index versions; the hash is the
+    ETag, so a matching If-None-Match gets 304 and repeats skip the render.
+    """
+    from ..packet_cache import etag, etag_matches, get_packet_cache, packet_key
     cov = coverage_check(claim)
-    risk = risk_score({
-        "loss_type": claim.get("loss_type"),
-        "amount": claim.get("amount", 0),
-        "claimant_history_count": claim.get("claimant_history_count", 0),
-    })
-    pdf_bytes = build_claim_packet_pdf(claim, cov, risk)
-    from fastapi.responses import Response
+    risk = risk_score(_packet_risk_input(claim))
+    key = packet_key(claim, cov, risk)
+    tag = etag(key)
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+    cache = get_packet_cache()
+    pdf_bytes = cache.get_bytes(key)
+    headers["X-Cache"] = "hit" if pdf_bytes is not None else "miss"
+    if pdf_bytes is None:
+        pdf_bytes = build_claim_packet_pdf(claim, cov, risk)
+        cache.put_bytes(key, pdf_bytes)
     filename = f"claimsight_case_packet_{claim.get('claim_id','N_A')}.pdf"
-    return Response(content=pdf_bytes, media_type="application/pdf",
-                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+@app.get("/reports/claim_packet/cache")
+def claim_packet_cache_stats():
+    from ..packet_cache import get_packet_cache, versions
+    return {**get_packet_cache().stats(), "versions": versions()}
+
+@app.post("/reports/claim_packets")
+def generate_claim_packets(claims: List[dict], workers: Optional[int] = None):
+    """
+    Case packets for many claims as a streamed ZIP: one PDF per claim plus
+    manifest.json. Risk is scored for the whole batch at once, coverage is
+    computed lazily per claim while earlier packets render in the report
+    process pool.
+    """
+    import json as _json
+    import time as _time
+    from ..report import REPORT_WORKERS, render_packets, stream_zip
+    if RETRIEVER is None:
+        raise HTTPException(status_code=503, detail="Retriever not initialized")
+    if not claims:
+        raise HTTPException(status_code=400, detail="No claims")
+    risk_in = [_packet_risk_input(c) for c in claims]
+    risks = risk_scores(risk_in, peers=False)
+
+    def jobs():
+        # same order as /reports/claim_packet: coverage (indexes the notes) before peer reasons
+        for c, r_in, risk in zip(claims, risk_in, risks):
+            try:
+                cov = coverage_check(c)
+                yield (c, cov, {**risk, "reasons": risk["reasons"] + _peer_reasons(r_in)})
+            except Exception as e:
+                yield e
+
+    def entries():
+        t0, seen, errors = _time.perf_counter(), set(), []
+        n_workers = REPORT_WORKERS if workers is None else max(0, workers)
+        for i, pdf in render_packets(jobs(), n_workers):
+            cid = claims[i].get("claim_id") or f"N_A_{i}"
+            if isinstance(pdf, Exception):
+                errors.append({"index": i, "claim_id": cid, "error": getattr(pdf, "detail", None) or str(pdf)})
+                continue
+            name = f"claimsight_case_packet_{cid}.pdf"
+            if name in seen:
+                name = f"claimsight_case_packet_{cid}_{i}.pdf"
+            seen.add(name)
+            yield name, pdf
+        secs = _time.perf_counter() - t0
+        yield "manifest.json", _json.dumps({
+            "claims": len(claims), "packets": len(seen), "errors": errors, "seconds": round(secs, 3),
+            "packets_per_s": round(len(seen) / secs, 2) if secs else None,
+        }, indent=2).encode()
+
+    return StreamingResponse(stream_zip(entries()), media_type="application/zip",
+                             headers={"Content-Disposition": 'attachment; filename="claimsight_case_packets.zip"'})
+
+# ========= FNOL pipeline =========
+_FNOL_BODY = {"requestBody": {"required": True, "content": {
+    "application/json": {"schema": {"type": "object"}},
+    "multipart/form-data": {"schema": {"type": "object", "properties": {
+        "claim": {"type": "string", "description": "Claim JSON; send it before the files"},
+        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+    }}},
+}}}
+
+@app.post("/fnol/process", openapi_extra=_FNOL_BODY)
+async def fnol_process(request: Request, packet: bool = False):
+    """
+    A new claim end to end in one call: FNOL registration, OCR + doc-type of
+    the attachments, coverage, risk, fraud and (packet=true) the case packet,
+    run as a stage graph (claimsight_ai/pipeline.py) so independent stages
+    overlap. The claim is observed once (feature store, near-duplicate index,
+    ring graph) and coverage, risk and fraud reuse that; the packet reuses
+    coverage and risk. Body: the claim as JSON, or multipart with a `claim`
+    JSON field followed by the files. Returns every result with per-stage
+    timings; a failed stage only skips the stages that need it. The claim is
+    registered and observed only once the whole body has been read (OCR may
+    still be running), so a body that fails intake (413, malformed multipart)
+    returns that error and leaves nothing behind.
+    """
+    import asyncio
+    import base64
+    import json as _json
+    import uuid
+    from ..pipeline import Dag
+
+    claim_fut = asyncio.get_running_loop().create_future()
+    intake_error: List[HTTPException] = []
+
+    async def intake(_):
+        """Read the body; start OCR of each file as soon as its part has arrived."""
+        if not request.headers.get("content-type", "").startswith("multipart/"):
+            try:
+                claim_fut.set_result(await request.json())
+            except ValueError:
+                claim_fut.set_exception(HTTPException(status_code=400, detail="Body must be claim JSON or multipart"))
+            return []
+        from .multipart_stream import iter_parts
+        sem = asyncio.Semaphore(TRIAGE_CONCURRENCY)
+
+        async def extract(part):
+            t0 = time.perf_counter()
+            async with sem:
+                try:
+                    r = await _ocr_masked(part.data, part.content_type, part.filename)
+                except Exception:
+                    r = {"text": "", "pages": 0}
+                finally:
+                    part.close()
+            return {"filename": part.filename, "content_type": part.content_type, "text": r["text"],
+                    "pages": r.get("pages", 0), "cached": r.get("cached", False),
+                    "ms": round(1000 * (time.perf_counter() - t0), 1)}
+
+        tasks = []
+        try:
+            async for part in iter_parts(request, fields=True):
+                if part.filename is not None:
+                    tasks.append(asyncio.create_task(extract(part)))
+                else:
+                    if part.name == "claim" and not claim_fut.done():
+                        try:
+                            claim_fut.set_result(_json.loads(part.data))
+                        except ValueError:
+                            claim_fut.set_exception(HTTPException(status_code=400, detail="`claim` is not valid JSON"))
+                    part.close()
+        except ValueError as e:
+            for t in tasks:
+                t.cancel()
+            intake_error.append(HTTPException(status_code=getattr(e, "status_code", 400), detail=str(e)))
+            raise intake_error[0]
+        finally:
+            if not claim_fut.done():
+                claim_fut.set_exception(HTTPException(status_code=400, detail="Missing `claim` field"))
+        return tasks
+
+    async def ocr(r):
+        return await asyncio.gather(*r["intake"])
+
+    async def claim_stage(_):
+        c = await claim_fut
+        if not isinstance(c, dict):
+            raise HTTPException(status_code=400, detail="Claim must be a JSON object")
+        return {**c, "claim_id": c.get("claim_id") or f"FNOL-{uuid.uuid4().hex[:12].upper()}"}
+
+    def register(r):
+        c = r["claim"]
+        known = ("claim_id", "policy_id", "notes", "loss_dt")
+        return cc_create_fnol(ClaimFNOL(claim_id=c["claim_id"], policy_id=c.get("policy_id"),
+                                        description=c.get("notes"), loss_date=c.get("loss_dt"),
+                                        metadata={k: v for k, v in c.items() if k not in known}))
+
+    def observe(r):
+        """Peer features as of before this claim, then record it (store, near-dup index, ring graph)."""
+        from ..feature_store import get_store
+        from ..near_dup import check_and_add
+        c = r["claim"]
+        store = get_store()
+        peers = store.read(c)
+        store.update(c)
+        with stage("near_dup"):
+            dups = check_and_add(c)
+        try:
+            from app.extensions.fraud.router import RING_GRAPH
+            ring = RING_GRAPH.observe(c)
+        except ImportError:
+            ring = None
+        return {"peers": peers, "near_duplicates": dups, "ring": ring}
+
+    def doctypes(r):
+        files = r["ocr"]
+        if not files:
+            return []
+        from ..ocr.doctype import describe, get_classifier
+        return get_classifier().classify([describe(f["text"], f["filename"], f["content_type"]) for f in files])
+
+    def coverage(r):
+        return coverage_decision(r["claim"], r["retrieve"], r["endorsements"], r["observe"]["near_duplicates"])
+
+    def risk(r):
+        c, o = r["claim"], r["observe"]
+        out = risk_scores([{k: c.get(k) for k in ("claim_id", "notes", "loss_type", "amount", "claimant_history_count")}],
+                          peers=False)[0]
+        return {**out, "reasons": out["reasons"] + _peer_reasons(c, peers=o["peers"], dups=o["near_duplicates"])}
+
+    def fraud(r):
+        try:
+            from pydantic import ValidationError
+            from app.extensions.fraud.router import ENGINE, RINGS, Claim, score_ml, score_rules
+        except ImportError as e:
+            raise Skip(f"fraud extension not loaded: {e}")
+        c, o = r["claim"], r["observe"]
+        data = {"claim_amount": c.get("amount"), "prior_claims_count": c.get("claimant_history_count"), **c}
+        try:
+            fc = Claim(**{k: v for k, v in data.items() if v is not None}).dict()
+        except ValidationError as e:
+            raise Skip("claim lacks fraud fields: " + ", ".join(str(err["loc"][-1]) for err in e.errors()))
+        peers = dict(o["peers"])
+        if o["near_duplicates"]:
+            d = o["near_duplicates"][0]
+            peers.update(near_dup_similarity=d["similarity"], near_dup_claim_id=d["claim_id"])
+        return score_ml(fc, o["ring"], peers) if ENGINE == "ml" else score_rules(fc, RINGS, o["ring"], peers)
+
+    def render_packet(r):
+        from ..packet_cache import etag, get_packet_cache, packet_key
+        c, cov, rk = r["claim"], r["coverage"], r["risk"]
+        key = packet_key(c, cov, rk)
+        cache = get_packet_cache()
+        pdf = cache.get_bytes(key)
+        hit = pdf is not None
+        if pdf is None:
+            pdf = build_claim_packet_pdf(c, cov, rk)
+            cache.put_bytes(key, pdf)
+        return {"etag": etag(key), "cache": "hit" if hit else "miss", "bytes": len(pdf),
+                "pdf_base64": base64.b64encode(pdf).decode("ascii")}
+
+    dag = Dag("fnol")
+    dag.add("intake", intake)
+    dag.add("claim", claim_stage)
+    dag.add("ocr", ocr, after=["intake"])
+    dag.add("fnol", register, after=["claim", "intake"])
+    dag.add("observe", observe, after=["claim", "intake"])
+    dag.add("retrieve", lambda r: coverage_hits(r["claim"]), after=["claim"])
+    dag.add("endorsements", lambda r: fetch_endorsements(r["claim"].get("policy_id")), after=["claim"])
+    dag.add("doctype", doctypes, after=["ocr"])
+    dag.add("coverage", coverage, after=["retrieve", "endorsements", "observe"])
+    dag.add("risk", risk, after=["claim", "observe"])
+    dag.add("fraud", fraud, after=["claim", "observe"])
+    if packet:
+        dag.add("packet", render_packet, after=["coverage", "risk"])
+    run = await dag.run()
+
+    res, stages = run["results"], run["stages"]
+    if stages["intake"]["status"] == "failed":
+        raise intake_error[0] if intake_error else HTTPException(status_code=400, detail=stages["intake"].get("error"))
+    if "claim" not in res:
+        raise HTTPException(status_code=400, detail=stages["claim"].get("error") or "Invalid claim")
+    labels = res.get("doctype") or [{} for _ in res.get("ocr", [])]
+    attachments = [{**{k: v for k, v in f.items() if k != "text"}, **lab,
+                    "pii_masked_excerpt": f["text"][:200] if f["text"] else mask_pii(f["filename"] or "")}
+                   for f, lab in zip(res.get("ocr", []), labels)]
+    return {
+        "claim_id": res["claim"]["claim_id"],
+        "fnol": res.get("fnol"),
+        "attachments": attachments,
+        "coverage": res.get("coverage"),
+        "risk": res.get("risk"),
+        "fraud": res.get("fraud"),
+        "packet": res.get("packet"),
+        "degraded": deadline.degraded(),
+        "stages": stages,
+        "critical_path": run["critical_path"],
+        "total_ms": run["total_ms"],
+    }
 
 # ========= Snowflake (optional) =========
 @app.post("/integrations/snowflake/upload_claims")
-def upload_claims_to_snowflake():
+def upload_claims_to_snowflake(limit: int = 100, table: str = "CLAIMS_SAMPLE"):
+    """Bulk load claims (limit=0 streams the whole claims store in Parquet chunks)."""
     try:
-        df = pd.read_csv(DATA_DIR / "claims.csv")
-        df_to_snowflake(df.head(100), table="CLAIMS_SAMPLE")
-        return {"status": "uploaded", "rows": int(min(len(df), 100))}
+        from ..claims_store import dataset, load_claims
+        if limit > 0:
+            df = load_claims(limit=limit, data_dir=DATA_DIR)
+            res = df_to_snowflake(df, table=table) or {}
+            return {**res, "status": res.get("status", "uploaded"), "rows": int(len(df))}
+        from ..snowflake_io import LOAD_CHUNK_ROWS, bulk_load
+        batches = dataset(DATA_DIR).to_batches(batch_size=LOAD_CHUNK_ROWS)
+        return bulk_load(batches, table)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/integrations/snowflake/sample_query")
-def snowflake_sample_query():
+def snowflake_sample_query(request: Request, limit: int = 5, page_size: Optional[int] = None,
+                           cursor: Optional[str] = None, format: Optional[str] = None):
+    """
+    Query CLAIMS_SAMPLE. JSON responses are paginated (page_size, default 1000;
+    pass next_cursor back as cursor). format=ndjson|arrow (or the matching
+    Accept header) streams record batches; with page_size/cursor they return
+    one page and put the next cursor in X-Next-Cursor.
+    """
+    sql = f'select * from "CLAIMS_SAMPLE" limit {max(int(limit), 0)}'
+    accept = (request.headers.get("accept") or "").lower()
+    kind = (format or "").lower() or ("arrow" if "arrow" in accept else "ndjson" if "ndjson" in accept else "json")
+    try:
+        from ..snowflake_io import ResultExpired, decode_cursor, encode_cursor, query_batches, query_page
+        from ..db_pool import get_pool
+        offset, result_id = decode_cursor(sql, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        # helpers unavailable (e.g. no pyarrow): unpaginated fallback
+        df = snowflake_query(sql)
+        return {"rows": df.to_dict(orient="records"), "next_cursor": None}
+    if get_pool() is None:
+        return {"rows": [], "next_cursor": None, "status": "skipped (no snowflake creds)"}
     try:
-        df = snowflake_query('select * from "CLAIMS_SAMPLE" limit 5')
-        return {"rows": df.to_dict(orient="records")}
+        if kind == "json" or page_size or cursor:
+            table, nxt, result_id = query_page(sql, offset, max(1, min(page_size or 1000, 100_000)), result_id)
+            next_cursor = encode_cursor(sql, nxt, result_id) if nxt is not None else None
+            if kind == "json":
+                return {"rows": table.to_pylist(), "next_cursor": next_cursor}
+            batches = table.to_batches()
+        else:
+            batches, next_cursor = query_batches(sql), None
+        from ..columnar import ARROW_STREAM, NDJSON, stream_batches
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return StreamingResponse(stream_batches(batches, kind), headers=headers,
+                                 media_type=ARROW_STREAM if kind == "arrow" else NDJSON)
+    except ResultExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/integrations/snowflake/pool")
+def snowflake_pool_stats():
+    """Connection pool checkouts, wait time and utilization."""
+    try:
+        from ..db_pool import get_pool
+        pool = get_pool()
+    except Exception as e:
+        return {"status": "unavailable", "detail": str(e)}
+    if pool is None:
+        return {"status": "not configured"}
+    from ..snowflake_io import RESULT_CACHE
+    return {"status": "ok", **pool.stats(), "result_cache": RESULT_CACHE.stats()}
+
 # ========= Adapters =========
 @app.get("/adapters/guidewire/policy/{policy_id}")
 def gw_policy(policy_id: str):
@@ -403,7 +1170,15 @@ def gw_claim(claim_id: str):
 
 @app.post("/adapters/guidewire/fnol")
 def gw_create_fnol(claim: dict):
-    return cc_create_fnol(ClaimFNOL(**claim))
+    from ..feature_store import get_store
+    from ..near_dup import check_and_add
+    try:
+        fnol = ClaimFNOL(**claim)
+    except (TypeError, ValueError) as e:  # validate before recording anything
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    get_store().update(claim)
+    check_and_add(claim)
+    return cc_create_fnol(fnol)
 
 @app.get("/adapters/duckcreek/policy/{policy_id}")
 def dc_policy(policy_id: str):
@@ -412,3 +1187,5 @@ def dc_policy(policy_id: str):
 @app.get("/adapters/duckcreek/policy/{policy_id}/endorsements")
 def dc_endorsements(policy_id: str):
     return pas_list_endorsements(policy_id)
+
+IMPORT_S = round(time.perf_counter() - PROCESS_T0, 3)
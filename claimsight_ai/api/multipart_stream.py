@@ -0,0 +1,127 @@
+# claimsight_ai/api/multipart_stream.py
+"""
+Incremental multipart/form-data parsing.
+
+FastAPI's UploadFile parameters are only available once the whole request
+body has been received and spooled. iter_parts() feeds request.stream()
+through python-multipart's callback parser instead and yields each file part
+as soon as its closing boundary arrives, so work on the first attachment of a
+large FNOL package starts while the rest is still uploading.
+
+Part bodies are spooled: kept in memory up to SPOOL_BYTES, then moved to a
+temp file, so parts queued behind the OCR semaphore don't sit in RAM. A
+part is capped at MAX_PART_BYTES and a whole request at MAX_REQUEST_BYTES
+(RequestTooLarge, a ValueError with status_code 413).
+"""
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import IO, AsyncIterator, Dict, List, Optional
+
+try:
+    from multipart.multipart import MultipartParser, parse_options_header
+except Exception:  # python-multipart >= 0.0.13 renamed the package
+    from python_multipart.multipart import MultipartParser, parse_options_header
+
+MAX_PART_BYTES = 64 * 2**20
+MAX_REQUEST_BYTES = int(os.getenv("MULTIPART_MAX_REQUEST_BYTES", str(256 * 2**20)))
+SPOOL_BYTES = int(os.getenv("MULTIPART_SPOOL_BYTES", str(2**20)))
+
+
+class RequestTooLarge(ValueError):
+    status_code = 413
+
+
+@dataclass
+class Part:
+    name: str
+    filename: Optional[str]
+    content_type: Optional[str]
+    file: IO[bytes]  # spooled: in memory up to SPOOL_BYTES, a temp file beyond
+
+    @property
+    def data(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def iter_parts(request, max_part_bytes: int = MAX_PART_BYTES, fields: bool = False,
+                     max_request_bytes: Optional[int] = None) -> AsyncIterator[Part]:
+    """
+    Yield file parts (and plain form fields, filename None, if fields=True) in
+    arrival order. The caller owns each yielded part and should close() it.
+    """
+    ctype, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise ValueError("Expected a multipart/form-data body")
+
+    max_request_bytes = MAX_REQUEST_BYTES if max_request_bytes is None else max_request_bytes
+    done: List[Part] = []
+    cur: Dict = {}
+    total = [0]
+
+    def on_part_begin():
+        cur.clear()
+        cur.update(headers={}, file=tempfile.SpooledTemporaryFile(SPOOL_BYTES), size=0, field=b"", value=b"")
+
+    def on_header_field(d, s, e):
+        cur["field"] += d[s:e]
+
+    def on_header_value(d, s, e):
+        cur["value"] += d[s:e]
+
+    def on_header_end():
+        cur["headers"][cur["field"].lower()] = cur["value"]
+        cur["field"], cur["value"] = b"", b""
+
+    def on_part_data(d, s, e):
+        cur["file"].write(d[s:e])
+        cur["size"] += e - s
+        total[0] += e - s
+        if cur["size"] > max_part_bytes:
+            raise RequestTooLarge(f"Part exceeds {max_part_bytes} bytes")
+        if total[0] > max_request_bytes:
+            raise RequestTooLarge(f"Request exceeds {max_request_bytes} bytes")
+
+    def on_part_end():
+        _, disp = parse_options_header(cur["headers"].get(b"content-disposition", b""))
+        filename = disp.get(b"filename")
+        ct = cur["headers"].get(b"content-type")
+        done.append(Part(
+            name=disp.get(b"name", b"").decode("utf-8", "replace"),
+            filename=filename.decode("utf-8", "replace") if filename is not None else None,
+            content_type=ct.decode("latin-1") if ct else None,
+            file=cur.pop("file"),
+        ))
+        cur.clear()
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin, "on_part_data": on_part_data, "on_part_end": on_part_end,
+        "on_header_field": on_header_field, "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            while done:
+                p = done.pop(0)
+                if fields or p.filename is not None:
+                    yield p
+                else:
+                    p.close()
+        parser.finalize()
+        while done:
+            p = done.pop(0)
+            if fields or p.filename is not None:
+                yield p
+            else:
+                p.close()
+    finally:  # parts not handed out (an error, or the caller stopped early)
+        for p in done:
+            p.close()
+        if "file" in cur:
+            cur["file"].close()
@@ -0,0 +1,343 @@
+# claimsight_ai/api/serve.py
+"""
+Pre-fork multi-worker server for the API.
+
+Plain `uvicorn --workers N` imports the app and runs the warm-up in every
+worker, so the FAISS index, policy docs/meta, MiniLM, the cross-encoder and
+the XGB model are loaded N times. Here the master process imports the app
+and runs the warm-up once (claimsight_ai/warmup.py), freezes the GC so the
+loaded objects are never written to again by collection, then forks the
+workers: they share those pages copy-on-write and start serving at once on
+a socket the master bound.
+
+The master watches the asset files (policy.faiss, policy.docs.json,
+policy.meta.json, risk_xgb.json; or SIGHUP). A rebuild rewrites several of
+them one after another, so a change counts only once two polls in a row
+have seen the same versions (AssetWatch). It then reloads them in the
+master and, only if that succeeded, replaces the workers one at a time:
+fork a new one, then SIGTERM an old one, which finishes its in-flight
+requests before exiting. Workers that die are respawned.
+
+    python -m claimsight_ai.api.serve --workers 4 --port 8000 --proxy-headers
+
+GET /admin/workers reports RSS/PSS/shared memory per process; PSS splits
+shared pages between the processes using them, so total PSS vs. the sum of
+RSS shows the saving.
+
+Online fraud state (feature store, near-duplicate index, ring graph) lives
+in process memory, so N workers recording claims would each see about 1/N
+of them. With more than one worker the master therefore loads that state
+(feature store snapshot, claims-store notes) and freezes it before forking:
+every worker answers from the same copy and records nothing. Refresh it with
+POST /fraud/admin/rebuild_features; the new snapshot is an asset, so the
+workers are replaced with ones that see it. PREFORK_ONLINE_STATE=per-worker
+keeps recording in each worker instead (undercounted, worker-dependent
+velocity and near-duplicate features; workers never write snapshots).
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+WORKERS = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+RELOAD_POLL = float(os.getenv("ASSET_RELOAD_POLL", "10"))  # seconds; 0 = only on SIGHUP
+GRACEFUL_TIMEOUT = float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+MASTER_ENV = "CLAIMSIGHT_MASTER_PID"
+ONLINE_STATE = os.getenv("PREFORK_ONLINE_STATE", "shared")  # "shared" | "per-worker"
+
+
+# ---------- memory ----------
+def process_memory(pid: int) -> Dict[str, float]:
+    """RSS/PSS/shared/private MB of a process (Linux /proc; PSS needs smaps_rollup)."""
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        try:
+            with open(f"/proc/{pid}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        fields["Rss"] = int(line.split()[1])
+        except OSError:
+            return {}
+    mb = lambda *keys: round(sum(fields.get(k, 0) for k in keys) / 1024, 1)
+    out = {"rss_mb": mb("Rss")}
+    if "Pss" in fields:
+        out.update(pss_mb=mb("Pss"), shared_mb=mb("Shared_Clean", "Shared_Dirty"),
+                   private_mb=mb("Private_Clean", "Private_Dirty"))
+    return out
+
+
+def _children(pid: int) -> List[int]:
+    out = []
+    for d in os.listdir("/proc"):
+        if not d.isdigit():
+            continue
+        try:
+            with open(f"/proc/{d}/stat") as fh:
+                stat = fh.read()
+        except OSError:
+            continue
+        if int(stat.rpartition(")")[2].split()[1]) == pid:  # field 4: ppid
+            out.append(int(d))
+    return sorted(out)
+
+
+def worker_memory(master: Optional[int] = None) -> Dict[str, Any]:
+    """Memory of the master and every worker (or just this process without a master)."""
+    if master is None and os.getenv(MASTER_ENV) and int(os.environ[MASTER_ENV]) == os.getppid():
+        master = os.getppid()
+    prefork = master is not None
+    if prefork:
+        procs = [("master", master)] + [("worker", p) for p in _children(master)]
+    else:
+        procs = [("single", os.getpid())]
+    rows = [{"pid": pid, "role": role, "self": pid == os.getpid(), **process_memory(pid)}
+            for role, pid in procs]
+    rss = sum(r.get("rss_mb", 0) for r in rows)
+    out: Dict[str, Any] = {"mode": "prefork" if prefork else "single", "processes": rows,
+                           "total_rss_mb": round(rss, 1)}
+    if all("pss_mb" in r for r in rows):
+        pss = sum(r["pss_mb"] for r in rows)
+        out.update(total_pss_mb=round(pss, 1), shared_saving_mb=round(rss - pss, 1))
+    return out
+
+
+# ---------- assets ----------
+def asset_paths() -> List[Path]:
+    from ..feature_store import SNAPSHOT_PATH
+    from .main import MODELS_DIR
+    vector_dir = Path(os.getenv("VECTOR_DIR", "/app/vectorstore"))  # see rag/retriever.py
+    from ..rag.shards import index_files
+    return [vector_dir / "policy.faiss", vector_dir / "policy.docs.json",
+            vector_dir / "policy.meta.json", *index_files(vector_dir), MODELS_DIR / "risk_xgb.json",
+            SNAPSHOT_PATH]
+
+
+def asset_versions() -> Dict[str, Optional[tuple]]:
+    out = {}
+    for p in asset_paths():
+        try:
+            st = p.stat()
+            out[str(p)] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            out[str(p)] = None
+    return out
+
+
+class AssetWatch:
+    """Asset versions as last loaded; poll() is True once a change has settled."""
+
+    def __init__(self, versions: Optional[Dict[str, Optional[tuple]]] = None):
+        self.loaded = asset_versions() if versions is None else versions
+        self.seen = self.loaded
+
+    def poll(self, current: Optional[Dict[str, Optional[tuple]]] = None) -> bool:
+        current = asset_versions() if current is None else current
+        settled, self.seen = current == self.seen, current
+        if settled and current != self.loaded:
+            self.loaded = current
+            return True
+        return False
+
+
+# ---------- online state ----------
+def freeze_online_state(frozen: bool = True) -> None:
+    """Make the feature store, near-dup index and ring graph read-only (or writable again)."""
+    from ..feature_store import get_store
+    from ..near_dup import get_index
+    get_store().frozen = frozen
+    get_index().frozen = frozen
+    try:
+        from app.extensions.fraud.router import RING_GRAPH
+        RING_GRAPH.frozen = frozen
+    except ImportError:
+        pass
+
+
+# ---------- master ----------
+class Master:
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, workers: int = WORKERS,
+                 reload_poll: float = RELOAD_POLL, **uvicorn_kw):
+        self.host, self.port, self.n = host, port, max(1, workers)
+        self.shared_state = self.n > 1 and ONLINE_STATE != "per-worker"
+        self.reload_poll = reload_poll
+        self.uvicorn_kw = uvicorn_kw
+        self.workers: Dict[int, int] = {}  # pid -> generation
+        self.generation = 0
+        self.stopping = False
+        self.reload_requested = False
+        self.sock: Optional[socket.socket] = None
+
+    def log(self, msg: str) -> None:
+        print(f"[master {os.getpid()}] {msg}", flush=True)
+
+    def preload(self) -> bool:
+        """Run the warm-up in this process; keeps the previous assets if any step failed."""
+        from . import main as api
+        from ..feature_store import reload_store
+        if self.shared_state and api.WARMUP_STATE.ready():
+            reload_store()  # pick up a rewritten snapshot
+        w = api.build_warmup().start()
+        w.wait()
+        report = w.report()
+        if report["failed"] and api.WARMUP_STATE.ready():
+            self.log(f"asset reload failed ({', '.join(report['failed'])}); keeping current workers")
+            return False
+        api.WARMUP_STATE = w
+        if self.shared_state:
+            freeze_online_state()
+        gc.unfreeze()  # let the assets replaced by a reload be collected
+        gc.collect()
+        gc.freeze()  # keep the collector from touching (and un-sharing) preloaded objects
+        return True
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker()
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = self.generation
+        return pid
+
+    def _worker(self) -> None:
+        import uvicorn
+        from . import main as api
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        if not self.shared_state:
+            from .. import feature_store
+            feature_store.SNAPSHOT_SECONDS = 0  # one snapshot file; workers must not overwrite each other
+        config = uvicorn.Config(api.app, **self.uvicorn_kw)
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def retire(self, pid: int) -> None:
+        """SIGTERM a worker and wait for its graceful exit (SIGKILL after the timeout)."""
+        self.workers.pop(pid, None)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if done:
+                return
+            time.sleep(0.05)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+    def reload(self) -> None:
+        self.log("assets changed; reloading")
+        if not self.preload():
+            return
+        self.generation += 1
+        for pid in [p for p, g in self.workers.items() if g < self.generation]:
+            self.spawn()
+            self.retire(pid)
+        self.log(f"reloaded; workers {sorted(self.workers)}")
+        self.report_memory()
+
+    def reap(self) -> None:
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid in self.workers:
+                self.workers.pop(pid)
+                if not self.stopping:
+                    self.log(f"worker {pid} exited ({status}); respawning")
+                    time.sleep(0.5)
+                    self.spawn()
+
+    def report_memory(self) -> None:
+        m = worker_memory(os.getpid())
+        rows = ", ".join(f"{r['role']} {r['pid']} rss={r.get('rss_mb')} pss={r.get('pss_mb')}"
+                         for r in m["processes"])
+        self.log(f"memory: {rows}; total rss={m['total_rss_mb']} pss={m.get('total_pss_mb')} MB")
+
+    def run(self) -> None:
+        self.sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+        os.environ[MASTER_ENV] = str(os.getpid())
+
+        t0 = time.perf_counter()
+        self.preload()
+        watch = AssetWatch()
+        self.log(f"assets loaded in {time.perf_counter() - t0:.2f}s; forking {self.n} workers")
+        if self.n > 1 and not self.shared_state:
+            self.log("PREFORK_ONLINE_STATE=per-worker: each worker records only the claims it serves")
+
+        def stop(*_):
+            self.stopping = True
+
+        def hup(*_):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, hup)
+
+        for _ in range(self.n):
+            self.spawn()
+        next_poll = time.monotonic() + self.reload_poll
+        reported = False
+        while not self.stopping:
+            time.sleep(0.2)
+            self.reap()
+            if not reported:
+                reported = True
+                self.report_memory()
+            if self.reload_poll and time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.reload_poll
+                if watch.poll():
+                    self.reload_requested = True
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+        self.log("shutting down")
+        for pid in list(self.workers):
+            self.retire(pid)
+        self.sock.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--reload-poll", type=float, default=RELOAD_POLL)
+    ap.add_argument("--log-level", default="info")
+    ap.add_argument("--proxy-headers", action="store_true")
+    a = ap.parse_args(argv)
+    Master(a.host, a.port, a.workers, a.reload_poll, log_level=a.log_level,
+           proxy_headers=a.proxy_headers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
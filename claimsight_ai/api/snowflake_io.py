@@ -1,39 +1,32 @@
-import os
-import snowflake.connector
+from contextlib import contextmanager
+
 import pandas as pd
 
+from ..db_pool import get_pool
+from ..snowflake_io import bulk_load
+
+
+@contextmanager
 def sf_conn():
-    return snowflake.connector.connect(
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        account=os.getenv("SNOWFLAKE_ACCOUNT"),       # e.g., abcd-xy123
-        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),   # e.g., COMPUTE_WH
-        database=os.getenv("SNOWFLAKE_DATABASE"),     # e.g., CLAIMS_DB
-        schema=os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC"),
-        role=os.getenv("SNOWFLAKE_ROLE"),
-    )
+    """Pooled connection (shared with claimsight_ai.snowflake_io); returned to the pool on exit."""
+    pool = get_pool()
+    if pool is None:
+        raise RuntimeError("Snowflake is not configured (set SNOWFLAKE_* or SQL_STANDIN)")
+    with pool.connection() as conn:
+        yield conn
 
 def df_to_snowflake(df: pd.DataFrame, table: str):
-    conn = sf_conn()
-    cs = conn.cursor()
-    try:
-        cols = ", ".join(f'"{c}"' for c in df.columns)
-        placeholders = ", ".join(["%s"] * len(df.columns))
-        # create table if not exists (all strings for demo)
-        cs.execute(f'create table if not exists "{table}" ({", ".join([f\'"{c}" string\' for c in df.columns])})')
-        cs.executemany(
-            f'insert into "{table}" ({cols}) values ({placeholders})',
-            [tuple(map(lambda x: None if pd.isna(x) else str(x), row)) for _, row in df.iterrows()]
-        )
-        conn.commit()
-    finally:
-        cs.close()
-        conn.close()
+    # staged Parquet + COPY INTO, chunked (see claimsight_ai.snowflake_io.bulk_load)
+    if get_pool() is None:
+        raise RuntimeError("Snowflake is not configured (set SNOWFLAKE_* or SQL_STANDIN)")
+    return bulk_load(df, table)
 
 def snowflake_query(sql: str) -> pd.DataFrame:
-    conn = sf_conn()
-    try:
-        df = pd.read_sql(sql, conn)
-        return df
-    finally:
-        conn.close()
+    with sf_conn() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            cols = [c[0] for c in cur.description] if cur.description else []
+            return pd.DataFrame(cur.fetchall(), columns=cols)
+        finally:
+            cur.close()
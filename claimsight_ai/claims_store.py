@@ -0,0 +1,245 @@
+# claimsight_ai/claims_store.py
+"""
+Partitioned Parquet claims dataset.
+
+Training, the Snowflake upload and the benchmarks used to re-parse
+DATA_DIR/claims.csv with pd.read_csv on every call. This module keeps a
+hive-partitioned Parquet copy under DATA_DIR/claims_store (rebuilt lazily when
+claims.csv / claims.parquet change), reads it memory-mapped through
+pyarrow.dataset with column projection and predicate pushdown, and caches
+results per process until the underlying files change.
+
+Builds write to a fresh temp directory next to the store and are serialized
+across processes (uvicorn workers, the CLI) by a file lock on
+DATA_DIR/claims_store.lock. The manifest records FORMAT_VERSION, so a store
+written by an older build is rebuilt even if its source hasn't changed.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+except Exception:
+    pa = None
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: builds are only serialized within the process
+    fcntl = None
+
+APP_HOME = Path(os.environ.get("APP_HOME", Path.cwd()))
+DATA_DIR = Path(os.environ.get("DATA_DIR", APP_HOME / "data"))
+PARTITION_BY = os.environ.get("CLAIMS_PARTITION_BY", "")  # "" = auto
+CACHE_SIZE = int(os.environ.get("CLAIMS_CACHE_SIZE", "8"))
+
+_AUTO_PARTITION = ("line_of_business", "loss_type")
+_MANIFEST = "_manifest.json"
+# bump when a build would write different files from the same source
+# (2: id/zip columns kept as text, integer columns as int64)
+FORMAT_VERSION = 2
+
+_lock = threading.RLock()
+_cache: "OrderedDict[Tuple, Tuple[Tuple, Any]]" = OrderedDict()
+
+
+def store_dir(data_dir: Optional[Path] = None) -> Path:
+    return Path(data_dir or DATA_DIR) / "claims_store"
+
+
+def _source(data_dir: Path) -> Optional[Path]:
+    """Newest of claims.parquet / claims.csv (the upload endpoint writes both)."""
+    cands = [p for p in (data_dir / "claims.parquet", data_dir / "claims.csv") if p.exists()]
+    return max(cands, key=lambda p: p.stat().st_mtime_ns) if cands else None
+
+
+def _stat(p: Path) -> Tuple[int, int]:
+    st = p.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def _fingerprint(root: Path) -> Tuple:
+    out = []
+    for dirpath, _, files in os.walk(root):
+        for f in files:
+            if f.endswith(".parquet"):
+                p = Path(dirpath) / f
+                out.append((str(p.relative_to(root)),) + _stat(p))
+    return tuple(sorted(out))
+
+
+@contextmanager
+def _build_lock(data_dir: Path):
+    """Exclusive across threads and processes for one data dir."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with _lock, open(data_dir / "claims_store.lock", "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        yield
+
+
+def _current(root: Path, source: Optional[Path]) -> bool:
+    manifest = root / _MANIFEST
+    if not manifest.exists():
+        return False
+    m = json.loads(manifest.read_text(encoding="utf-8"))
+    if m.get("format") != FORMAT_VERSION:
+        return False
+    return source is None or (m.get("source") == str(source) and tuple(m.get("source_stat", ())) == _stat(source))
+
+
+def build_store(source: Optional[Path] = None, partition_by: Optional[str] = None,
+                data_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """(Re)build the partitioned store from a CSV or Parquet file; swaps the directory in atomically."""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    data_dir = Path(data_dir or DATA_DIR)
+    source = Path(source) if source else _source(data_dir)
+    if source is None:
+        raise FileNotFoundError(f"No claims.csv or claims.parquet under {data_dir}")
+    with _build_lock(data_dir):
+        return _build(source, partition_by, data_dir)
+
+
+def _build(source: Path, partition_by: Optional[str], data_dir: Path) -> Dict[str, Any]:
+    root = store_dir(data_dir)
+    tmp_root = Path(tempfile.mkdtemp(prefix=root.name + ".", suffix=".building", dir=data_dir))
+    try:
+        if source.suffix.lower() == ".csv":
+            from .columnar import CsvParquetWriter
+            flat = tmp_root / "_flat.parquet"
+            w = CsvParquetWriter(flat)
+            with source.open("rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 22), b""):
+                    w.feed(chunk)
+            w.close()
+            src = ds.dataset(str(flat), format="parquet")
+        else:
+            flat = None
+            src = ds.dataset(str(source), format="parquet")
+
+        names = src.schema.names
+        part = partition_by or PARTITION_BY or next((c for c in _AUTO_PARTITION if c in names), None)
+        if part and part not in names:
+            raise ValueError(f"Partition column {part!r} not in claims columns")
+
+        ds.write_dataset(
+            src, str(tmp_root / "data"), format="parquet",
+            partitioning=[part] if part else None, partitioning_flavor="hive" if part else None,
+            existing_data_behavior="overwrite_or_ignore",
+            max_rows_per_group=1 << 17,
+        )
+        rows = src.count_rows()
+        if flat is not None:
+            flat.unlink()
+        (tmp_root / _MANIFEST).write_text(json.dumps({
+            "format": FORMAT_VERSION, "source": str(source), "source_stat": list(_stat(source)),
+            "partition_by": part, "schema": [f"{f.name}:{f.type}" for f in src.schema],
+        }), encoding="utf-8")
+
+        with _lock:
+            old = tmp_root.with_suffix(".old")
+            if root.exists():
+                root.rename(old)
+            tmp_root.rename(root)
+            shutil.rmtree(old, ignore_errors=True)
+            _cache.clear()
+    except BaseException:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        raise
+    return {"path": str(root), "source": str(source), "partition_by": part, "rows": rows}
+
+
+def ensure_store(data_dir: Optional[Path] = None) -> Path:
+    """Return the store directory, rebuilding it if missing, older than its source file or its format."""
+    data_dir = Path(data_dir or DATA_DIR)
+    root = store_dir(data_dir)
+    source = _source(data_dir)
+    with _lock:
+        if _current(root, source):
+            return root
+    if source is None:
+        raise FileNotFoundError(f"No claims data under {data_dir}")
+    with _build_lock(data_dir):
+        if not _current(root, source):  # another process may have built it meanwhile
+            _build(source, None, data_dir)
+    return root
+
+
+def _where_expr(where: Optional[Dict[str, Any]]):
+    """{"col": value} or {"col": [values]} -> dataset filter expression (pushed down)."""
+    expr = None
+    for col, val in (where or {}).items():
+        f = ds.field(col)
+        e = f.isin(list(val)) if isinstance(val, (list, tuple, set)) else (f == val)
+        expr = e if expr is None else (expr & e)
+    return expr
+
+
+def dataset(data_dir: Optional[Path] = None) -> "ds.Dataset":
+    root = ensure_store(data_dir)
+    return ds.dataset(
+        str(root / "data"), format="parquet", partitioning="hive",
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def load_table(columns: Optional[Sequence[str]] = None, where: Optional[Dict[str, Any]] = None,
+               filter=None, limit: Optional[int] = None,
+               data_dir: Optional[Path] = None) -> "pa.Table":
+    """
+    Read claims as an Arrow table.
+
+    columns: projection; where: simple equality/IN filters; filter: a raw
+    pyarrow.dataset expression; limit: stop after N rows. Results are cached
+    per process and dropped when any Parquet file in the store changes.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    root = ensure_store(data_dir)
+    fp = _fingerprint(root)
+    key = (str(root), tuple(columns) if columns else None,
+           json.dumps(where, sort_keys=True, default=str) if where else None,
+           str(filter) if filter is not None else None, limit)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == fp:
+            _cache.move_to_end(key)
+            return hit[1]
+
+    expr = _where_expr(where)
+    if filter is not None:
+        expr = filter if expr is None else (expr & filter)
+    d = dataset(data_dir)
+    cols = list(columns) if columns else None
+    table = d.head(limit, columns=cols, filter=expr) if limit is not None \
+        else d.to_table(columns=cols, filter=expr)
+
+    with _lock:
+        _cache[key] = (fp, table)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return table
+
+
+def load_claims(columns: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+                filter=None, limit: Optional[int] = None,
+                data_dir: Optional[Path] = None) -> pd.DataFrame:
+    """DataFrame view of load_table (same arguments)."""
+    return load_table(columns, where, filter, limit, data_dir).to_pandas()
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,294 @@
+# claimsight_ai/columnar.py
+"""
+Columnar (Arrow IPC / Parquet) request and response bodies for bulk endpoints.
+
+Bulk JSON endpoints make FastAPI build and validate one Pydantic object per
+row. The helpers here decode a whole Arrow IPC stream or Parquet body into a
+table, validate/cast it column by column against a small schema, and hand a
+pandas DataFrame straight to the vectorized scorers. Results go back out the
+same way.
+"""
+import io
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+NDJSON = "application/x-ndjson"
+_PARQUET_ALIASES = {PARQUET, "application/x-parquet", "application/parquet"}
+
+
+class ColumnarError(ValueError):
+    """Raised when a columnar body cannot be decoded or fails validation."""
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _kind(content_type: Optional[str]) -> str:
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct in _PARQUET_ALIASES:
+        return "parquet"
+    if ct in (ARROW_STREAM, "application/vnd.apache.arrow.file", "application/octet-stream", ""):
+        return "arrow"
+    raise ColumnarError(f"Unsupported content type: {content_type!r}")
+
+
+def read_table(body: bytes, content_type: Optional[str]) -> "pa.Table":
+    """Decode an Arrow IPC stream (or file) or Parquet body into a pyarrow Table."""
+    if pa is None:
+        raise ColumnarError("pyarrow is not installed")
+    kind = _kind(content_type)
+    try:
+        if kind == "parquet":
+            return pq.read_table(pa.BufferReader(body))
+        buf = pa.BufferReader(body)
+        try:
+            return ipc.open_stream(buf).read_all()
+        except pa.ArrowInvalid:
+            return ipc.open_file(pa.BufferReader(body)).read_all()
+    except ColumnarError:
+        raise
+    except Exception as e:
+        raise ColumnarError(f"Could not decode {kind} body: {e}") from e
+
+
+def validate(table: "pa.Table", schema: Dict[str, Tuple[Any, bool, Any]]) -> "pa.Table":
+    """
+    Validate and cast whole columns.
+
+    schema maps column -> (arrow type, required, default). Required columns
+    must be present and null-free; optional ones are filled with the default.
+    Unknown columns are dropped.
+    """
+    n = table.num_rows
+    cols, names = [], []
+    for name, (typ, required, default) in schema.items():
+        if name not in table.column_names:
+            if required:
+                raise ColumnarError(f"Missing required column: {name}")
+            cols.append(pa.nulls(n, type=typ) if default is None
+                        else pa.array([default] * n, type=typ))
+            names.append(name)
+            continue
+        col = table.column(name)
+        try:
+            col = pc.cast(col, typ)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ColumnarError(f"Column {name!r} cannot be read as {typ}: {e}") from e
+        if col.null_count:
+            if required:
+                raise ColumnarError(f"Column {name!r} has {col.null_count} null value(s)")
+            if default is not None:
+                col = pc.fill_null(col, pa.scalar(default, type=typ))
+        cols.append(col)
+        names.append(name)
+    return pa.Table.from_arrays(cols, names=names)
+
+
+def read_frame(body: bytes, content_type: Optional[str],
+               schema: Dict[str, Tuple[Any, bool, Any]]) -> pd.DataFrame:
+    """Decode + validate a columnar body and return it as a DataFrame."""
+    return validate(read_table(body, content_type), schema).to_pandas()
+
+
+def response_kind(accept: Optional[str], content_type: Optional[str]) -> str:
+    """Pick the response encoding: honour Accept, else mirror the request."""
+    for part in (accept or "").split(","):
+        ct = part.split(";")[0].strip().lower()
+        if ct in _PARQUET_ALIASES:
+            return "parquet"
+        if ct == ARROW_STREAM:
+            return "arrow"
+    try:
+        return _kind(content_type)
+    except ColumnarError:
+        return "arrow"
+
+
+def write_frame(df: pd.DataFrame, kind: str = "arrow") -> Tuple[bytes, str]:
+    """Encode a DataFrame as an Arrow IPC stream or Parquet; returns (bytes, media type)."""
+    if pa is None:
+        raise ColumnarError("pyarrow is not installed")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if kind == "parquet":
+        sink = io.BytesIO()
+        pq.write_table(table, sink, compression="zstd")
+        return sink.getvalue(), PARQUET
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as w:
+        w.write_table(table)
+    return sink.getvalue().to_pybytes(), ARROW_STREAM
+
+
+def stream_batches(batches: Iterable["pa.RecordBatch"], kind: str = "ndjson") -> Iterator[bytes]:
+    """Incrementally encode record batches as NDJSON lines or an Arrow IPC stream."""
+    if kind == "arrow":
+        sink, writer = io.BytesIO(), None
+        for b in batches:
+            if writer is None:
+                schema, writer = b.schema, ipc.new_stream(sink, b.schema)
+            elif b.schema != schema:
+                b = b.cast(schema)  # one stream, one schema: later batches widened by the source must still fit
+            writer.write_batch(b)
+            yield sink.getvalue()
+            sink.seek(0); sink.truncate()
+        if writer is not None:
+            writer.close()
+            yield sink.getvalue()
+        return
+    for b in batches:
+        if b.num_rows:
+            yield "".join(json.dumps(r, default=str) + "\n" for r in b.to_pylist()).encode()
+
+
+# identifier-like columns stay text even when every value looks numeric (zip "02134", claim_id 1)
+_ID_NAME = re.compile(r"(?:^|_)(?:id|code|zip|zipcode|postal|postcode|vin|npi|phone|number|no)$", re.I)
+_ID_CAMEL = re.compile(r"[a-z0-9](?:Id|ID|Code|Zip|No)$")
+
+
+def _id_column(name: str) -> bool:
+    return bool(_ID_NAME.search(name) or _ID_CAMEL.search(name))
+
+
+class CsvParquetWriter:
+    """
+    Incremental CSV -> Parquet converter fed with raw byte chunks.
+
+    Chunks are cut at the last newline, parsed with pyarrow's CSV reader using
+    the header and column types inferred from the first block, and appended as
+    row groups. Memory stays bounded by the chunk size. Quoted fields that
+    contain newlines are not supported.
+
+    Identifier, code and zip columns (by name, or with leading zeros) are kept
+    as text; dates and blank columns too. When a later block doesn't fit a
+    column's type, the column is widened (int to float, anything else to
+    text) and the row groups already written are rewritten once, one at a
+    time, under the wider schema.
+    """
+
+    def __init__(self, path, compression: str = "zstd"):
+        if pa is None:
+            raise ColumnarError("pyarrow is not installed")
+        import pyarrow.csv as pacsv
+        self._csv = pacsv
+        self.path = str(path)
+        self.compression = compression
+        self.rows = 0
+        self._header: Optional[bytes] = None
+        self._schema = None
+        self._tail = b""
+        self._writer = None
+        self._out = self.path
+
+    def feed(self, chunk: bytes) -> None:
+        data = self._tail + chunk
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            self._tail = data
+            return
+        self._tail = data[cut + 1:]
+        self._write_block(data[:cut + 1])
+
+    def _read(self, block: bytes, types=None, blanks_are_null: bool = False) -> "pa.Table":
+        convert = None
+        if types:
+            convert = self._csv.ConvertOptions(column_types=types, strings_can_be_null=blanks_are_null)
+        try:
+            return self._csv.read_csv(pa.BufferReader(self._header + block), convert_options=convert)
+        except pa.ArrowInvalid as e:
+            raise ColumnarError(f"CSV row {self.rows + 1}+ could not be parsed: {e}") from e
+
+    def _first_schema(self, table: "pa.Table", block: bytes) -> "pa.Schema":
+        ints = [f.name for f in table.schema if pa.types.is_integer(f.type)]
+        raw = self._read(block, {n: pa.string() for n in ints}) if ints else None
+        fields = []
+        for f in table.schema:
+            if pa.types.is_null(f.type) or pa.types.is_temporal(f.type):
+                t = pa.string()
+            elif f.name in ints and (_id_column(f.name) or
+                                     pc.any(pc.match_substring_regex(raw.column(f.name), r"^[+-]?0\d")).as_py()):
+                t = pa.string()
+            else:
+                t = f.type
+            fields.append(pa.field(f.name, t))
+        return pa.schema(fields)
+
+    def _fit(self, block: bytes) -> "pa.Table":
+        """A block that doesn't parse under the current schema: widen the columns that don't fit."""
+        text = self._read(block, {f.name: pa.string() for f in self._schema}, blanks_are_null=True)
+        fields = []
+        for f, col in zip(self._schema, text.columns):
+            t = f.type
+            for cand in ((t, pa.float64()) if pa.types.is_integer(t) else (t,)):
+                try:
+                    col.cast(cand, safe=True)
+                    t = cand
+                    break
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    t = pa.string()
+            fields.append(pa.field(f.name, t))
+        self._widen(pa.schema(fields))
+        return text.cast(self._schema)
+
+    def _widen(self, schema: "pa.Schema") -> None:
+        self._writer.close()
+        old, self._out = self._out, f"{self.path}.{self.rows}.widen"
+        self._writer = pq.ParquetWriter(self._out, schema, compression=self.compression)
+        with pq.ParquetFile(old) as src:
+            for i in range(src.metadata.num_row_groups):
+                self._writer.write_table(src.read_row_group(i).cast(schema))
+        os.unlink(old)
+        self._schema = schema
+
+    def _write_block(self, block: bytes) -> None:
+        if self._header is None:
+            nl = block.find(b"\n")
+            self._header, block = block[:nl + 1], block[nl + 1:]
+        if not block.strip():
+            return
+        if self._schema is None:
+            table = self._read(block)
+            self._schema = self._first_schema(table, block)
+            table = self._read(block, {f.name: f.type for f in self._schema})
+            self._writer = pq.ParquetWriter(self._out, self._schema, compression=self.compression)
+        else:
+            try:
+                table = self._read(block, {f.name: f.type for f in self._schema})
+            except ColumnarError:
+                table = self._fit(block)
+        if table.schema.names != self._schema.names:
+            raise ColumnarError(f"CSV row {self.rows + 1}+ has columns {table.schema.names}, "
+                                f"expected {self._schema.names}")
+        self._writer.write_table(table.cast(self._schema))
+        self.rows += table.num_rows
+
+    def close(self) -> int:
+        if self._tail:
+            self._write_block(self._tail + b"\n")
+            self._tail = b""
+        if self._writer is None:
+            raise ColumnarError("CSV has no data rows")
+        self._writer.close()
+        if self._out != self.path:
+            os.replace(self._out, self.path)
+        return self.rows
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._out != self.path and os.path.exists(self._out):
+            os.unlink(self._out)
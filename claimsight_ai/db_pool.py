@@ -0,0 +1,253 @@
+# claimsight_ai/db_pool.py
+"""
+Bounded, thread-safe DB-API connection pool shared by the Snowflake helpers.
+
+Opening a Snowflake connection often costs more than the query, so both
+claimsight_ai/snowflake_io.py and claimsight_ai/api/snowflake_io.py check
+connections out of one process-wide pool instead. Connections are health
+checked on checkout (after sitting idle), evicted after MAX_IDLE seconds idle
+or MAX_LIFETIME seconds total, and the pool tracks wait time and utilization.
+
+The connection factory is pluggable: Snowflake from the SNOWFLAKE_* env vars
+by default, or a local stand-in via SQL_STANDIN=sqlite:///path.db /
+duckdb:///path.duckdb (or set_factory() in tests).
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "4"))
+MAX_IDLE = float(os.getenv("SQL_POOL_MAX_IDLE", "300"))
+MAX_LIFETIME = float(os.getenv("SQL_POOL_MAX_LIFETIME", "3600"))
+CHECK_AFTER = float(os.getenv("SQL_POOL_CHECK_AFTER", "30"))   # idle secs before a ping
+CHECKOUT_TIMEOUT = float(os.getenv("SQL_POOL_TIMEOUT", "30"))
+
+
+class PoolTimeout(RuntimeError):
+    """No connection became free within the checkout timeout."""
+
+
+class _Entry:
+    __slots__ = ("conn", "created", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn, self.created, self.last_used = conn, now, now
+
+
+class ConnectionPool:
+    def __init__(self, factory: Callable[[], Any], max_size: int = POOL_SIZE,
+                 max_idle: float = MAX_IDLE, max_lifetime: float = MAX_LIFETIME,
+                 check_after: float = CHECK_AFTER, timeout: float = CHECKOUT_TIMEOUT,
+                 paramstyle: str = "pyformat", name: str = "snowflake"):
+        self.factory = factory
+        self.max_size, self.max_idle, self.max_lifetime = max_size, max_idle, max_lifetime
+        self.check_after, self.timeout = check_after, timeout
+        self.paramstyle, self.name = paramstyle, name
+        self._idle: List[_Entry] = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._m = {"checkouts": 0, "created": 0, "closed": 0, "health_failures": 0,
+                   "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+                   "busy_seconds_total": 0.0}
+        self._started = time.monotonic()
+
+    # ---- internals ----
+    def _expired(self, e: _Entry, now: float) -> bool:
+        return (now - e.last_used > self.max_idle) or (now - e.created > self.max_lifetime)
+
+    def _close(self, e: _Entry) -> None:
+        self._m["closed"] += 1
+        try:
+            e.conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, e: _Entry) -> bool:
+        try:
+            cur = e.conn.cursor()
+            try:
+                cur.execute("select 1")
+                cur.fetchall()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            self._m["health_failures"] += 1
+            return False
+
+    def _evict_idle(self, now: float) -> None:
+        keep = []
+        for e in self._idle:
+            if self._expired(e, now):
+                self._close(e)
+            else:
+                keep.append(e)
+        self._idle = keep
+
+    # ---- public API ----
+    def acquire(self) -> Tuple[Any, _Entry]:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"{self.name} pool is closed")
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    e = self._idle.pop()  # LIFO keeps the warm ones warm
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    self._in_use += 1
+                    e = None
+                    break
+                left = deadline - now
+                if left <= 0:
+                    self._m["timeouts"] += 1
+                    raise PoolTimeout(f"{self.name} pool exhausted ({self.max_size} in use)")
+                self._cond.wait(left)
+        try:
+            if e is not None and time.monotonic() - e.last_used > self.check_after and not self._healthy(e):
+                self._close(e)
+                e = None
+            if e is None:
+                e = _Entry(self.factory())
+                with self._cond:
+                    self._m["created"] += 1
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        waited = time.monotonic() - start
+        with self._cond:
+            self._m["checkouts"] += 1
+            self._m["wait_seconds_total"] += waited
+            self._m["wait_seconds_max"] = max(self._m["wait_seconds_max"], waited)
+        e.last_used = time.monotonic()
+        return e.conn, e
+
+    def release(self, e: _Entry, discard: bool = False) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._m["busy_seconds_total"] += now - e.last_used
+            e.last_used = now
+            if discard or self._closed or self._expired(e, now):
+                self._close(e)
+            else:
+                self._idle.append(e)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a connection; it goes back to the pool unless the block raised a DB error."""
+        conn, e = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.release(e, discard=broken)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for e in self._idle:
+                self._close(e)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            m = dict(self._m)
+            up = max(time.monotonic() - self._started, 1e-9)
+            m.update({
+                "name": self.name, "max_size": self.max_size, "in_use": self._in_use,
+                "idle": len(self._idle),
+                "utilization": round(self._in_use / self.max_size, 3),
+                "avg_utilization": round(m["busy_seconds_total"] / (up * self.max_size), 4),
+                "wait_seconds_avg": round(m["wait_seconds_total"] / m["checkouts"], 6) if m["checkouts"] else 0.0,
+            })
+            return m
+
+
+# ---------- factories ----------
+def snowflake_factory() -> Optional[Callable[[], Any]]:
+    """Factory for the SNOWFLAKE_* env config, or None if not configured / not installed."""
+    try:
+        import snowflake.connector  # type: ignore
+    except Exception:
+        return None
+    env = {
+        "user": os.getenv("SNOWFLAKE_USER"),
+        "password": os.getenv("SNOWFLAKE_PASSWORD"),
+        "account": os.getenv("SNOWFLAKE_ACCOUNT"),
+        "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE"),
+        "database": os.getenv("SNOWFLAKE_DATABASE"),
+        "schema": os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC"),
+    }
+    if not all(env.values()):
+        return None
+    role = os.getenv("SNOWFLAKE_ROLE")
+    if role:
+        env["role"] = role
+    return lambda: snowflake.connector.connect(**env)
+
+
+def standin_factory(url: str) -> Tuple[Callable[[], Any], str]:
+    """sqlite:///path or duckdb:///path -> (factory, paramstyle) for offline runs and tests."""
+    scheme, _, path = url.partition(":///")
+    if scheme == "sqlite":
+        import sqlite3
+        return (lambda: sqlite3.connect(path or ":memory:", check_same_thread=False)), sqlite3.paramstyle
+    if scheme == "duckdb":
+        import duckdb  # type: ignore
+        return (lambda: duckdb.connect(path or ":memory:")), "qmark"
+    raise ValueError(f"Unsupported SQL stand-in: {url!r}")
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    """Shared pool, or None when neither Snowflake nor a stand-in is configured."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            standin = os.getenv("SQL_STANDIN")
+            if standin:
+                factory, style = standin_factory(standin)
+                _pool = ConnectionPool(factory, paramstyle=style, name=standin.split(":", 1)[0])
+            else:
+                factory = snowflake_factory()
+                if factory is None:
+                    return None
+                _pool = ConnectionPool(factory)
+        return _pool
+
+
+def set_factory(factory: Optional[Callable[[], Any]], paramstyle: str = "qmark",
+                name: str = "custom", **kw) -> Optional[ConnectionPool]:
+    """Swap the shared pool's connection factory (closes the old pool); None resets to env config."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(factory, paramstyle=paramstyle, name=name, **kw) if factory else None
+        return _pool
+
+
+def placeholder(pool: ConnectionPool) -> str:
+    return "?" if pool.paramstyle == "qmark" else "%s"
@@ -0,0 +1,156 @@
+# claimsight_ai/deadline.py
+"""
+Per-request latency budgets and degraded-stage reporting.
+
+A caller with a hard deadline (IVR, portal) sends `X-Deadline-Ms: 800` or
+`?deadline_ms=800`. DeadlineMiddleware starts the clock when the request
+arrives (so time queued in admission control counts) and puts a Budget in a
+context variable, which follows the request into the threadpool; the
+pipeline code asks it before each optional stage instead of taking a
+deadline argument:
+
+  rerank        full cross-encoder pass, only the top dense hits, or none
+                (dense-score order)
+  endorsements  live PAS lookup, or the last endorsements seen for the policy
+  shap          per-claim SHAP attribution, or the model's global importances
+
+A stage runs if its expected cost fits in the remaining time minus a small
+reserve (DEADLINE_RESERVE_MS) for the mandatory work that follows. Expected
+costs are the mean observed durations from the stage histograms in
+metrics.py (DEFAULT_COSTS until a stage has MIN_SAMPLES observations).
+Mandatory stages (query encode, FAISS, rules, the model itself) always run.
+Responses list what was degraded in `degraded` and in an X-Degraded header;
+requests without a deadline never skip a stage, but still report results
+that came back partial (an unbuilt or unreachable index shard, rag/shards.py).
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .metrics import REGISTRY, STAGE_METRIC, Family
+
+HEADER = b"x-deadline-ms"
+QUERY_PARAM = "deadline_ms"
+RESERVE_S = float(os.getenv("DEADLINE_RESERVE_MS", "10")) / 1000
+MIN_SAMPLES = 5
+DEFAULT_COSTS = {"rerank": 0.25, "endorsements": 0.15, "shap": 0.02}  # seconds
+
+_budget: ContextVar[Optional["Budget"]] = ContextVar("deadline_budget", default=None)
+_counts_lock = threading.Lock()
+_counts: Dict[Tuple[str, str], int] = {}
+
+
+def expected_cost(stage: str) -> float:
+    """Mean observed duration of a stage (seconds)."""
+    _, total, n = REGISTRY.histogram(STAGE_METRIC, stage=stage).snapshot()
+    return total / n if n >= MIN_SAMPLES else DEFAULT_COSTS.get(stage, 0.0)
+
+
+class Budget:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.perf_counter() + seconds
+        self.degraded: List[Dict[str, Any]] = []
+
+    def remaining(self) -> float:
+        return self.deadline - time.perf_counter()
+
+    def affordable(self, stage: str) -> float:
+        """Share of the stage's expected cost that fits (1.0 = all of it, 0.0 = none)."""
+        left = self.remaining() - RESERVE_S
+        if left <= 0:
+            return 0.0
+        cost = expected_cost(stage)
+        return 1.0 if cost <= left else left / cost
+
+    def degrade(self, stage: str, mode: str, **detail: Any) -> None:
+        self.degraded.append({"stage": stage, "mode": mode, **detail})
+        with _counts_lock:
+            _counts[(stage, mode)] = _counts.get((stage, mode), 0) + 1
+
+
+def current() -> Optional[Budget]:
+    return _budget.get()
+
+
+def affordable(stage: str) -> float:
+    b = _budget.get()
+    return 1.0 if b is None else b.affordable(stage)
+
+
+def degrade(stage: str, mode: str, **detail: Any) -> None:
+    b = _budget.get()
+    if b is not None:
+        b.degrade(stage, mode, **detail)
+
+
+def degraded() -> List[Dict[str, Any]]:
+    b = _budget.get()
+    return list(b.degraded) if b is not None else []
+
+
+@contextmanager
+def budget(seconds: Optional[float]) -> Iterator[Optional[Budget]]:
+    """Run a block under a budget (None = no deadline); for callers outside HTTP requests."""
+    if seconds is None:
+        yield None
+        return
+    b = Budget(seconds)
+    token = _budget.set(b)
+    try:
+        yield b
+    finally:
+        _budget.reset(token)
+
+
+def _requested_ms(scope) -> Optional[float]:
+    raw = next((v for k, v in scope["headers"] if k == HEADER), None)
+    if raw is None and scope.get("query_string") and QUERY_PARAM.encode() in scope["query_string"]:
+        vals = parse_qs(scope["query_string"].decode("latin-1")).get(QUERY_PARAM)
+        raw = vals[0].encode() if vals else None
+    try:
+        ms = float(raw) if raw is not None else None
+    except ValueError:
+        return None
+    return ms if ms is not None and ms > 0 else None
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware: starts the request's Budget and reports degradations in X-Degraded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        ms = _requested_ms(scope)
+        # without a deadline every stage is affordable, but partial results (shards) are still reported
+        b = Budget(ms / 1000 if ms is not None else math.inf)
+        token = _budget.set(b)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and b.degraded:
+                value = ", ".join(f"{d['stage']}={d['mode']}" for d in b.degraded).encode("latin-1")
+                message = {**message, "headers": [*message.get("headers", []), (b"x-degraded", value)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _budget.reset(token)
+
+
+def _collect() -> List[Family]:
+    with _counts_lock:
+        items = sorted(_counts.items())
+    return [("claimsight_degraded_total", "counter", "Optional stages skipped or cut short to meet a deadline",
+             [({"stage": s, "mode": m}, n) for (s, m), n in items])]
+
+
+REGISTRY.collector(_collect)
@@ -0,0 +1,120 @@
+# claimsight_ai/disk_cache.py
+"""
+Size-bounded, disk-backed LRU of content-addressed blobs.
+
+Entries live at root/<key[:2]>/<key><suffix>; recency is kept in memory (and
+in file mtimes, so it survives restarts) and the least recently used entries
+are deleted once the directory exceeds max_mb. Used by the OCR result cache
+and the claim-packet cache.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class DiskLRU:
+    def __init__(self, root: Path, max_mb: float, suffix: str = ".bin"):
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 2**20)
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{self.suffix}"
+
+    def _load_index(self) -> None:
+        if not self.root.exists():
+            return
+        found = []
+        for p in self.root.glob(f"*/*{self.suffix}"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            found.append((st.st_mtime, p.name[:-len(self.suffix)], st.st_size))
+        for _, key, size in sorted(found):
+            self._index[key] = size
+            self._bytes += size
+
+    def _forget(self, key: str) -> None:
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        p = self._path(key)
+        try:
+            data = p.read_bytes()
+            os.utime(p)  # recency survives restarts
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                self._forget(key)
+            return None
+        with self._lock:
+            self.hits += 1
+            if key in self._index:
+                self._index.move_to_end(key)
+        return data
+
+    def miss(self, key: str) -> None:
+        """Count a hit that turned out unusable (e.g. corrupt) as a miss and drop it."""
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+            self._forget(key)
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f"{p.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, p)
+        with self._lock:
+            self._forget(key)
+            self._index[key] = len(data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and self._index:
+                old, size = self._index.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+                try:
+                    self._path(old).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    self._path(key).unlink()
+                except FileNotFoundError:
+                    pass
+            self._index.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"enabled": self.enabled, "entries": len(self._index),
+                    "mb": round(self._bytes / 2**20, 2), "max_mb": round(self.max_bytes / 2**20, 2),
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
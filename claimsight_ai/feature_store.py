@@ -0,0 +1,574 @@
+# claimsight_ai/feature_store.py
+"""
+In-process online feature store for peer/velocity features.
+
+Keeps sliding-window claim counts and amount sums per entity (provider_id,
+repair_shop_id, policy_id, state) in day-bucket ring buffers held in compact
+numpy arrays. Each window also keeps a running total, so updates and reads
+are O(1) amortized: moving an entity forward a day only touches the buckets
+that fall out of each window. The store can be rebuilt from the claims
+dataset in one vectorized pass and is snapshotted to disk periodically.
+
+Recording is idempotent per claim_id: the store remembers the last
+SEEN_MAX claims it recorded (their day, amount and entity slots), ignores
+them when they come again (FNOL then scoring, a client retry) and leaves a
+recorded claim out of its own peer features, so scoring the same claim
+twice gives the same answer. Future dates count as today; an undated claim
+counts as of the store clock and never moves it.
+
+observe_frame() is the vectorized read-then-update loop over a batch: each
+row sees the store plus the batch rows before it, so the columnar and the
+per-claim bulk endpoints give the same features.
+
+A frozen store (pre-fork workers sharing the master's copy, see
+api/serve.py) answers reads but records nothing.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ENTITY_FIELDS = ["provider_id", "repair_shop_id", "policy_id", "state"]
+DATE_FIELDS = ["report_date", "incident_date", "loss_dt", "loss_date"]
+AMOUNT_FIELDS = ["claim_amount", "amount"]
+WINDOWS = tuple(int(w) for w in os.getenv("FEATURE_WINDOWS", "7,30").split(","))
+
+APP_HOME = Path(os.environ.get("APP_HOME", Path.cwd()))
+DATA_DIR = Path(os.environ.get("DATA_DIR", APP_HOME / "data"))
+SNAPSHOT_PATH = Path(os.getenv("FEATURE_STORE_SNAPSHOT", DATA_DIR / "feature_store.npz"))
+SNAPSHOT_SECONDS = float(os.getenv("FEATURE_STORE_SNAPSHOT_SECONDS", "300"))
+SEEN_MAX = int(os.getenv("FEATURE_STORE_SEEN_MAX", "500000"))  # claim_ids remembered for idempotent updates
+
+_DAY = 86400
+
+
+def _today() -> int:
+    return int(time.time()) // _DAY
+
+
+def _day(c: Dict[str, Any]) -> Optional[int]:
+    """Claim day from its first parseable date field (future dates clamped to today); None if undated."""
+    for f in DATE_FIELDS:
+        v = c.get(f)
+        if v:
+            try:
+                d = datetime.fromisoformat(str(v)[:10]).replace(tzinfo=timezone.utc)
+                return min(int(d.timestamp()) // _DAY, _today())
+            except ValueError:
+                continue
+    return None
+
+
+def _days(df: pd.DataFrame) -> pd.Series:
+    """_day() for every row (float, NaN where undated)."""
+    day = pd.Series(np.nan, index=df.index)
+    for f in DATE_FIELDS:
+        if f in df:
+            d = pd.to_datetime(df[f].astype(str).str[:10], format="ISO8601", errors="coerce")
+            day = day.fillna(pd.Series(d.astype("int64") // (_DAY * 10**9), index=df.index).where(d.notna()))
+    return day.clip(upper=_today())
+
+
+def _keys(df: pd.DataFrame, f: str) -> pd.Series:
+    return df[f].fillna("").astype(str).str.strip() if f in df else pd.Series("", index=df.index)
+
+
+def _amounts(df: pd.DataFrame) -> np.ndarray:
+    """_amount() for every row."""
+    out = pd.Series(np.nan, index=df.index)
+    for f in AMOUNT_FIELDS:
+        if f in df:
+            present = df[f].notna() & (df[f].astype(str) != "")
+            out = out.where(out.notna() | ~present, pd.to_numeric(df[f], errors="coerce").fillna(0.0))
+    return out.fillna(0.0).to_numpy(dtype=np.float64)
+
+
+def _cid(c: Dict[str, Any]) -> str:
+    return str(c.get("claim_id") or "").strip()
+
+
+def _amount(c: Dict[str, Any]) -> float:
+    for f in AMOUNT_FIELDS:
+        if c.get(f) not in (None, ""):
+            try:
+                return float(c[f])
+            except (TypeError, ValueError):
+                return 0.0
+    return 0.0
+
+
+class _EntityTable:
+    """Ring-buffered day buckets for every key of one entity kind."""
+
+    def __init__(self, windows: Sequence[int], capacity: int = 1024):
+        self.windows = tuple(sorted(windows))
+        self.B = max(self.windows)
+        self.keys: Dict[str, int] = {}
+        self.cnt = np.zeros((capacity, self.B), dtype=np.int32)
+        self.amt = np.zeros((capacity, self.B), dtype=np.float64)
+        self.tot_cnt = np.zeros((capacity, len(self.windows)), dtype=np.int64)
+        self.tot_amt = np.zeros((capacity, len(self.windows)), dtype=np.float64)
+        self.last = np.full(capacity, -1, dtype=np.int64)
+
+    def _grow(self, need: int) -> None:
+        cap = len(self.last)
+        if need <= cap:
+            return
+        new = max(need, cap * 2)
+        for name in ("cnt", "amt", "tot_cnt", "tot_amt"):
+            a = getattr(self, name)
+            b = np.zeros((new,) + a.shape[1:], dtype=a.dtype)
+            b[:cap] = a
+            setattr(self, name, b)
+        last = np.full(new, -1, dtype=np.int64)
+        last[:cap] = self.last
+        self.last = last
+
+    def slot(self, key: str, create: bool) -> Optional[int]:
+        i = self.keys.get(key)
+        if i is None and create:
+            i = len(self.keys)
+            self._grow(i + 1)
+            self.keys[key] = i
+        return i
+
+    def advance(self, i: int, day: int) -> None:
+        """Move slot i forward to `day`, expiring buckets that leave each window."""
+        last = int(self.last[i])
+        if last < 0 or day - last >= self.B:
+            self.cnt[i] = 0; self.amt[i] = 0
+            self.tot_cnt[i] = 0; self.tot_amt[i] = 0
+            self.last[i] = day
+            return
+        for x in range(last + 1, day + 1):
+            for j, w in enumerate(self.windows):
+                b = (x - w) % self.B
+                self.tot_cnt[i, j] -= self.cnt[i, b]
+                self.tot_amt[i, j] -= self.amt[i, b]
+            b = x % self.B
+            self.cnt[i, b] = 0; self.amt[i, b] = 0.0
+        if day > last:
+            self.last[i] = day
+
+    def advance_many(self, idx: np.ndarray, day: np.ndarray) -> None:
+        """advance() for distinct slots idx to days day, one vectorized step per day moved."""
+        last = self.last[idx]
+        reset = (last < 0) | (day - last >= self.B)
+        r = idx[reset]
+        self.cnt[r] = 0; self.amt[r] = 0
+        self.tot_cnt[r] = 0; self.tot_amt[r] = 0
+        self.last[r] = day[reset]
+        m = ~reset & (day > last)
+        i, l, d = idx[m], last[m], day[m]
+        for k in range(1, self.B):
+            step = l + k <= d
+            if not step.any():
+                break
+            ii, x = i[step], (l + k)[step]
+            for j, w in enumerate(self.windows):
+                b = (x - w) % self.B
+                self.tot_cnt[ii, j] -= self.cnt[ii, b]
+                self.tot_amt[ii, j] -= self.amt[ii, b]
+            b = x % self.B
+            self.cnt[ii, b] = 0; self.amt[ii, b] = 0.0
+        self.last[i] = d
+
+    def add(self, key: str, day: int, amount: float) -> int:
+        i = self.slot(key, create=True)
+        if day > self.last[i]:
+            self.advance(i, day)
+        age = int(self.last[i]) - day
+        if age >= self.B:
+            return i  # older than the longest window
+        b = day % self.B
+        self.cnt[i, b] += 1
+        self.amt[i, b] += amount
+        for j, w in enumerate(self.windows):
+            if age < w:
+                self.tot_cnt[i, j] += 1
+                self.tot_amt[i, j] += amount
+        return i
+
+    def read(self, key: str, day: int) -> Optional[int]:
+        i = self.slot(key, create=False)
+        if i is None:
+            return None
+        if day > self.last[i]:
+            self.advance(i, day)
+        return i
+
+
+class FeatureStore:
+    def __init__(self, windows: Sequence[int] = WINDOWS, fields: Sequence[str] = ENTITY_FIELDS):
+        self.windows = tuple(sorted(windows))
+        self.fields = list(fields)
+        self.tables = {f: _EntityTable(self.windows) for f in self.fields}
+        self.clock = 0
+        self.updates = 0
+        # claim_id -> (day, amount, slot per field or -1), oldest first
+        self._seen: "OrderedDict[str, Tuple[int, float, Tuple[int, ...]]]" = OrderedDict()
+        self.frozen = False
+        self._lock = threading.RLock()
+        self._last_snapshot = time.monotonic()
+
+    def _prefix(self, field: str) -> str:
+        return field[:-3] if field.endswith("_id") else field
+
+    def _remember(self, cid: str, day: int, amount: float, slots: Tuple[int, ...]) -> None:
+        self._seen[cid] = (day, amount, slots)
+        while len(self._seen) > SEEN_MAX:
+            self._seen.popitem(last=False)
+
+    def update(self, c: Dict[str, Any]) -> bool:
+        """Record one claim against every entity it references; False if its claim_id was already recorded."""
+        if self.frozen:
+            return False
+        cid = _cid(c)
+        day, amount = _day(c), _amount(c)
+        with self._lock:
+            if cid and cid in self._seen:
+                return False
+            if day is None:  # undated: counted as of the store clock, never moves it
+                if not self.clock:
+                    return False
+                day = self.clock
+            self.clock = max(self.clock, day)
+            slots = []
+            for f in self.fields:
+                key = str(c.get(f) or "").strip()
+                slots.append(self.tables[f].add(key, day, amount) if key else -1)
+            if cid:
+                self._remember(cid, day, amount, tuple(slots))
+            self.updates += 1
+        self.maybe_snapshot()
+        return True
+
+    def read(self, c: Dict[str, Any]) -> Dict[str, float]:
+        """Peer features for the entities on a claim, as of the store clock (the claim itself excluded)."""
+        out: Dict[str, float] = {}
+        with self._lock:
+            own = self._seen.get(_cid(c))
+            for fi, f in enumerate(self.fields):
+                t = self.tables[f]
+                key = str(c.get(f) or "").strip()
+                i = t.read(key, self.clock) if key else None
+                mine = own is not None and i is not None and own[2][fi] == i
+                p = self._prefix(f)
+                for j, w in enumerate(self.windows):
+                    n = int(t.tot_cnt[i, j]) if i is not None else 0
+                    s = float(t.tot_amt[i, j]) if i is not None else 0.0
+                    if mine and self.clock - own[0] < w:
+                        n, s = n - 1, s - own[1]
+                    out[f"{p}_claims_{w}d"] = n
+                    out[f"{p}_amount_{w}d"] = round(s, 2)
+                    out[f"{p}_avg_amount_{w}d"] = round(s / n, 2) if n else 0.0
+        return out
+
+    def read_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """read() for every row, vectorized (read-only); columns aligned with df."""
+        return self._frame(df, record=False)
+
+    def update_frame(self, df: pd.DataFrame) -> None:
+        """update() for every row in order, vectorized."""
+        self._frame(df, record=True, features=False)
+
+    def observe_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        read() then update() for every row in order, vectorized: each row sees
+        the store plus the earlier rows of the batch, as of the clock those
+        rows moved it to, exactly as the per-claim loop would.
+        """
+        return self._frame(df, record=True)
+
+    def _frame(self, df: pd.DataFrame, record: bool, features: bool = True) -> Optional[pd.DataFrame]:
+        n = len(df)
+        pos = np.arange(n)
+        cid = _keys(df, "claim_id").to_numpy()
+        has_cid = cid != ""
+        dated = _days(df)
+        day = dated.fillna(-1).to_numpy(dtype=np.int64)
+        is_dated = dated.notna().to_numpy()
+        amount = _amounts(df)
+        keys = {f: _keys(df, f).to_numpy() for f in self.fields}
+        with self._lock:
+            clock0 = self.clock
+            seen = np.fromiter((c in self._seen for c in cid), bool, n) & has_cid
+            # rows recorded: new claim_ids (first time in the batch), dated or behind a dated row
+            rec = np.zeros(n, bool)
+            if record and not self.frozen and n:
+                ok = ~seen
+                if not clock0:  # an empty store has no clock for undated rows before the first dated one
+                    first = np.flatnonzero(ok & is_dated)
+                    ok &= is_dated | (pos > first[0]) if len(first) else is_dated
+                rec = ok & ~(has_cid & pd.Series(np.where(ok, cid, None)).duplicated().to_numpy())
+            # clock each row is read at: the store clock moved by the earlier recorded rows
+            moved = np.maximum.accumulate(np.maximum(np.where(rec & is_dated, day, clock0), clock0)) if n else day
+            clock = np.concatenate(([clock0], moved[:-1])) if n else moved
+            day = np.where(is_dated, day, clock)
+            out = self._features(keys, cid, seen, rec, day, amount, clock) if features else None
+            if rec.any():
+                self._record(keys, cid, rec, day, amount)
+                self.clock = int(max(clock0, moved[-1]))
+                self.updates += int(rec.sum())
+        if rec.any():
+            self.maybe_snapshot()
+        if out is not None:
+            out.index = df.index
+        return out
+
+    def _features(self, keys, cid, seen, rec, day, amount, clock) -> pd.DataFrame:
+        n = len(cid)
+        pos = np.arange(n)
+        # a row's own earlier record (from before the batch, or an earlier row of the batch) is left out
+        own_day = np.full(n, -1, dtype=np.int64)
+        own_amt = np.zeros(n)
+        own_slots = np.full((n, len(self.fields)), -1, dtype=np.int64)
+        for r in np.flatnonzero(seen):
+            own_day[r], own_amt[r], own_slots[r] = self._seen[cid[r]]
+        first = pd.Series(np.where(rec & (cid != ""), cid, None)).dropna()
+        first = pd.Series(first.index.to_numpy(), index=first.to_numpy())
+        r0 = pd.Series(cid).map(first).fillna(-1).to_numpy(dtype=np.int64)
+        dup = ~seen & ~rec & (r0 >= 0) & (r0 < pos)
+        own_day[dup], own_amt[dup] = day[r0[dup]], amount[r0[dup]]
+        cols: Dict[str, Any] = {}
+        for fi, f in enumerate(self.fields):
+            t, key = self.tables[f], keys[f]
+            cnt = np.zeros((n, len(self.windows)), dtype=np.int64)
+            amt = np.zeros((n, len(self.windows)))
+            # the store, bucket by bucket: days clock - k for k < B
+            slot = pd.Series(key).map(t.keys).fillna(-1).to_numpy(dtype=np.int64)
+            have = slot >= 0
+            si = np.where(have, slot, 0)
+            last = np.where(have, t.last[si], -1)
+            # earlier rows of the batch: sorted (key, day, row) codes, counted by searchsorted
+            code, _ = pd.factorize(key)
+            brow = np.flatnonzero(rec & (key != ""))
+            base = int(min(day[brow].min() if len(brow) else 0, clock.min() - t.B)) if n else 0
+            span = int(max(day.max(), clock.max()) - base + 1) if n else 1
+            packed = (code[brow] * span + (day[brow] - base)) * n + brow
+            order = np.argsort(packed, kind="stable")
+            packed = packed[order]
+            csum = np.concatenate(([0.0], np.cumsum(amount[brow][order])))
+            # row r looks up [(key, clock_r - k, 0), (key, clock_r - k, r)); the order of those
+            # bounds is the same for every k, so sort them once and search with sorted needles
+            at0 = (code * span + (clock - base)) * n
+            qo = np.argsort(at0 + pos, kind="stable")
+            lo, hi = np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+            for k in range(t.B):
+                d = clock - k
+                valid = have & (d <= last) & (d > last - t.B)
+                hc = np.where(valid, t.cnt[si, d % t.B], 0)
+                ha = np.where(valid, t.amt[si, d % t.B], 0.0)
+                if len(brow):
+                    q = at0[qo] - k * n
+                    lo[qo], hi[qo] = np.searchsorted(packed, q), np.searchsorted(packed, q + qo)
+                bc = np.where(key != "", hi - lo, 0)
+                ba = np.where(key != "", csum[hi] - csum[lo], 0.0)
+                for j, w in enumerate(self.windows):
+                    if k < w:
+                        cnt[:, j] += hc + bc
+                        amt[:, j] += ha + ba
+            mine = np.where(dup, key == np.where(r0 >= 0, key[np.maximum(r0, 0)], ""),
+                            have & (own_slots[:, fi] == slot)) & (key != "")
+            p = self._prefix(f)
+            for j, w in enumerate(self.windows):
+                sub = mine & (own_day >= 0) & (clock - own_day < w)
+                c, a = cnt[:, j] - sub, amt[:, j] - np.where(sub, own_amt, 0.0)
+                cols[f"{p}_claims_{w}d"] = c
+                cols[f"{p}_amount_{w}d"] = np.round(a, 2)
+                cols[f"{p}_avg_amount_{w}d"] = np.round(np.divide(a, c, out=np.zeros(n), where=c > 0), 2)
+        return pd.DataFrame(cols)
+
+    def _record(self, keys, cid, rec, day, amount) -> None:
+        """Add the recorded rows to every table and remember their claim_ids."""
+        rows = np.flatnonzero(rec)
+        slots = np.full((len(rows), len(self.fields)), -1, dtype=np.int64)
+        for fi, f in enumerate(self.fields):
+            t = self.tables[f]
+            key = keys[f][rows]
+            m = key != ""
+            if not m.any():
+                continue
+            for k in pd.unique(key[m]):
+                t.slot(k, create=True)
+            slot = pd.Series(key[m]).map(t.keys).to_numpy(dtype=np.int64)
+            d, a = day[rows][m], amount[rows][m]
+            newest = pd.Series(d).groupby(slot).max()
+            u, top = newest.index.to_numpy(dtype=np.int64), newest.to_numpy(dtype=np.int64)
+            ahead = top > t.last[u]
+            t.advance_many(u[ahead], top[ahead])
+            age = t.last[slot] - d
+            keep = age < t.B
+            np.add.at(t.cnt, (slot[keep], d[keep] % t.B), 1)
+            np.add.at(t.amt, (slot[keep], d[keep] % t.B), a[keep])
+            for j, w in enumerate(t.windows):
+                win = age < w
+                np.add.at(t.tot_cnt[:, j], slot[win], 1)
+                np.add.at(t.tot_amt[:, j], slot[win], a[win])
+            slots[m, fi] = slot
+        named = cid[rows] != ""
+        for c, d, a, sl in zip(cid[rows][named].tolist(), day[rows][named].tolist(),
+                               amount[rows][named].tolist(), slots[named].tolist()):
+            self._seen[c] = (int(d), float(a), tuple(sl))
+        while len(self._seen) > SEEN_MAX:
+            self._seen.popitem(last=False)
+
+    # ---- bulk rebuild ----
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, windows: Sequence[int] = WINDOWS,
+                   fields: Sequence[str] = ENTITY_FIELDS) -> "FeatureStore":
+        """
+        Vectorized rebuild from historical claims (only the last max(windows)
+        days matter). Future dates count as today; undated claims count as of
+        the newest dated one.
+        """
+        fs = cls(windows, fields)
+        if not len(df):
+            return fs
+        if "claim_id" in df:  # a claim_id recorded twice counts once
+            cid = df["claim_id"].fillna("").astype(str).str.strip()
+            df = df[(cid == "") | ~cid.duplicated()]
+        day = _days(df)
+        if day.isna().all():
+            return fs  # undated claims are placed at the clock, and there is none yet
+        clock = int(day.max())
+        day = day.fillna(clock).astype(np.int64)
+        amount = pd.Series(_amounts(df), index=df.index)
+        fs.clock = clock
+
+        for f in fs.fields:
+            if f not in df:
+                continue
+            t = fs.tables[f]
+            key = df[f].fillna("").astype(str).str.strip()
+            keep = (key != "") & (day > clock - t.B)
+            g = pd.DataFrame({"k": key[keep], "d": day[keep], "a": amount[keep]}) \
+                .groupby(["k", "d"], sort=False).agg(n=("a", "size"), s=("a", "sum")).reset_index()
+            codes, uniq = pd.factorize(g["k"])
+            t._grow(len(uniq))
+            t.keys = dict(zip(uniq.tolist(), range(len(uniq))))
+            b = (g["d"].to_numpy() % t.B)
+            np.add.at(t.cnt, (codes, b), g["n"].to_numpy())
+            np.add.at(t.amt, (codes, b), g["s"].to_numpy())
+            age = clock - g["d"].to_numpy()
+            for j, w in enumerate(t.windows):
+                m = age < w
+                np.add.at(t.tot_cnt[:, j], codes[m], g["n"].to_numpy()[m])
+                np.add.at(t.tot_amt[:, j], codes[m], g["s"].to_numpy()[m])
+            t.last[:len(uniq)] = clock
+        fs.updates = len(df)
+        if "claim_id" in df:
+            fs._remember_frame(df, day, amount)
+        return fs
+
+    def _remember_frame(self, df: pd.DataFrame, day: pd.Series, amount: pd.Series) -> None:
+        """Seen entries for the rows of a rebuild that can still affect a window (most recent last)."""
+        B = max(self.windows)
+        cid = df["claim_id"].fillna("").astype(str).str.strip()
+        keep = (cid != "") & (day > self.clock - B)
+        order = day[keep].sort_values(kind="stable").index[-SEEN_MAX:]
+        slots = np.full((len(order), len(self.fields)), -1, dtype=np.int64)
+        for fi, f in enumerate(self.fields):
+            if f in df:
+                key = df.loc[order, f].fillna("").astype(str).str.strip()
+                slots[:, fi] = key.map(self.tables[f].keys).fillna(-1).to_numpy(dtype=np.int64)
+        for c, d, a, sl in zip(cid[order].tolist(), day[order].tolist(), amount[order].tolist(), slots.tolist()):
+            self._seen[c] = (int(d), float(a), tuple(sl))
+
+    # ---- snapshots ----
+    def snapshot(self, path: Optional[Path] = None) -> Path:
+        path = Path(path or SNAPSHOT_PATH)
+        with self._lock:
+            arrays: Dict[str, Any] = {"windows": np.array(self.windows), "clock": np.array(self.clock),
+                                      "fields": np.array(self.fields)}
+            for f, t in self.tables.items():
+                n = len(t.keys)
+                arrays[f"{f}.keys"] = np.array(list(t.keys), dtype=str)
+                for name in ("cnt", "amt", "tot_cnt", "tot_amt", "last"):
+                    arrays[f"{f}.{name}"] = getattr(t, name)[:n].copy()
+            seen = list(self._seen.items())
+            arrays["seen.ids"] = np.array([k for k, _ in seen], dtype=str)
+            arrays["seen.day"] = np.array([v[0] for _, v in seen], dtype=np.int64)
+            arrays["seen.amt"] = np.array([v[1] for _, v in seen], dtype=np.float64)
+            arrays["seen.slots"] = np.array([v[2] for _, v in seen], dtype=np.int64).reshape(len(seen), len(self.fields))
+            self._last_snapshot = time.monotonic()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp.npz")
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)
+        return path
+
+    def maybe_snapshot(self) -> None:
+        """Write a snapshot in the background if SNAPSHOT_SECONDS have passed."""
+        if SNAPSHOT_SECONDS <= 0 or time.monotonic() - self._last_snapshot < SNAPSHOT_SECONDS:
+            return
+        self._last_snapshot = time.monotonic()
+        threading.Thread(target=self._safe_snapshot, daemon=True).start()
+
+    def _safe_snapshot(self) -> None:
+        try:
+            self.snapshot()
+        except Exception as e:
+            print(f"[WARNING] feature store snapshot failed: {e}")
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "FeatureStore":
+        z = np.load(Path(path or SNAPSHOT_PATH), allow_pickle=False)
+        fs = cls(tuple(int(w) for w in z["windows"]), [str(f) for f in z["fields"]])
+        fs.clock = int(z["clock"])
+        for f, t in fs.tables.items():
+            keys = [str(k) for k in z[f"{f}.keys"]]
+            t._grow(len(keys))
+            t.keys = dict(zip(keys, range(len(keys))))
+            for name in ("cnt", "amt", "tot_cnt", "tot_amt", "last"):
+                getattr(t, name)[:len(keys)] = z[f"{f}.{name}"]
+        if "seen.ids" in z:
+            for c, d, a, sl in zip(z["seen.ids"].tolist(), z["seen.day"].tolist(), z["seen.amt"].tolist(),
+                                   z["seen.slots"].tolist()):
+                fs._seen[c] = (d, a, tuple(sl))
+        return fs
+
+    def stats(self) -> Dict[str, Any]:
+        return {"clock_day": self.clock, "updates": self.updates, "windows": list(self.windows), "frozen": self.frozen,
+                "claims_remembered": len(self._seen),
+                "entities": {f: len(t.keys) for f, t in self.tables.items()}}
+
+
+_store: Optional[FeatureStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> FeatureStore:
+    """Process-wide store; restored from the last snapshot if one exists."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = FeatureStore.load() if SNAPSHOT_PATH.exists() else FeatureStore()
+            except Exception as e:
+                print(f"[WARNING] feature store snapshot unreadable ({e}); starting empty")
+                _store = FeatureStore()
+        return _store
+
+
+def set_store(store: FeatureStore) -> FeatureStore:
+    """Replace the process store (a rebuild keeps the current store's frozen flag)."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            store.frozen = _store.frozen
+        _store = store
+    return store
+
+
+def reload_store() -> None:
+    """Drop the process store; the next get_store() reads the snapshot again."""
+    global _store
+    with _store_lock:
+        _store = None
@@ -0,0 +1,206 @@
+# claimsight_ai/metrics.py
+"""
+Per-stage latency histograms, Prometheus exposition and Server-Timing.
+
+Hot paths are wrapped in stage("name") (or decorated with @timed("name")):
+query encoding, FAISS search, rerank, endorsement fetch, coverage rules,
+risk scoring, fraud rules/ML, PII masking and OCR. Each observation is two
+perf_counter() calls, a bisect into fixed buckets and one short lock, so the
+layer stays on in production. TimingMiddleware adds a per-route request
+histogram and, with SERVER_TIMING=1 (or per request with an
+`X-Server-Timing: 1` header), a Server-Timing header listing the stages the
+request went through. GET /metrics serves everything in the Prometheus text
+format.
+
+Histograms are per process: under the pre-fork server (api/serve.py) every
+worker reports its own, labelled with its pid.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (name, "gauge" | "counter", help, [(labels, value), ...]) from Registry.collector()
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+# stages recorded during the current request (None outside a request)
+_request_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_stages", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hists: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], List[Family]]] = []
+
+    def histogram(self, name: str, help: str = "", **labels: str) -> Histogram:
+        key = tuple(sorted(labels.items()))
+        series = self._hists.get(name)
+        h = series.get(key) if series is not None else None
+        if h is None:
+            with self._lock:
+                series = self._hists.setdefault(name, {})
+                h = series.setdefault(key, Histogram())
+                if help:
+                    self._help.setdefault(name, help)
+        return h
+
+    def collector(self, fn: Callable[[], List[Family]]) -> None:
+        """Add gauges/counters kept elsewhere: fn() -> [(name, type, help, [(labels, value), ...])]."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hists.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        pid = str(os.getpid())
+        lines: List[str] = []
+        with self._lock:
+            items = [(n, list(s.items())) for n, s in sorted(self._hists.items())]
+            collectors = list(self._collectors)
+        for name, series in items:
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in sorted(series, key=lambda kv: kv[0]):
+                counts, total, n = h.snapshot()
+                base = ",".join(f'{k}="{_escape(v)}"' for k, v in key + (("pid", pid),))
+                cum = 0
+                for le, c in zip([*(repr(b) for b in h.buckets), "+Inf"], counts):
+                    cum += c
+                    lines.append(f'{name}_bucket{{{base},le="{le}"}} {cum}')
+                lines.append(f"{name}_sum{{{base}}} {total!r}")
+                lines.append(f"{name}_count{{{base}}} {n}")
+        for fn in collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    base = ",".join(f'{k}="{_escape(str(v))}"' for k, v in (*labels.items(), ("pid", pid)))
+                    lines.append(f"{name}{{{base}}} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, name: str) -> Dict[str, Dict[str, float]]:
+        """{label values: {count, avg_ms}} for quick JSON views."""
+        out = {}
+        with self._lock:
+            series = list(self._hists.get(name, {}).items())
+        for key, h in series:
+            _, total, n = h.snapshot()
+            out["/".join(v for _, v in key)] = {"count": n, "avg_ms": round(1000 * total / n, 3) if n else 0.0}
+        return out
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+STAGE_METRIC = "claimsight_stage_seconds"
+REQUEST_METRIC = "claimsight_http_request_seconds"
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    REGISTRY.histogram(STAGE_METRIC, "Time spent in an internal processing stage", stage=name).observe(seconds)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - t0)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of stage(); keeps the signature (FastAPI endpoints can use it)."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe_stage(name, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def server_timing(stages: List[Tuple[str, float]], total: float) -> str:
+    agg: Dict[str, float] = {}
+    for name, secs in stages:
+        agg[name] = agg.get(name, 0.0) + secs
+    parts = [f"{n};dur={1000 * s:.1f}" for n, s in agg.items()]
+    parts.append(f"total;dur={1000 * total:.1f}")
+    return ", ".join(parts)
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware: request histogram per route + optional Server-Timing header."""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        stages: List[Tuple[str, float]] = []
+        token = _request_stages.set(stages)
+        want = self.server_timing or any(k == b"x-server-timing" and v == b"1" for k, v in scope["headers"])
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if want:
+                    header = server_timing(stages, time.perf_counter() - t0).encode("latin-1")
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stages.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REGISTRY.histogram(REQUEST_METRIC, "HTTP request latency by route", method=scope["method"],
+                               route=path, status=f"{status[0] // 100}xx").observe(time.perf_counter() - t0)
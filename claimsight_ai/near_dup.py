@@ -0,0 +1,422 @@
+# claimsight_ai/near_dup.py
+"""
+Near-duplicate claim text detection with MinHash + LSH.
+
+Claim notes/descriptions are normalized, cut into character shingles and
+summarized as a MinHash signature (num_perm uint32 values). Signatures are
+split into bands; claims whose band hashes collide in any band become
+candidates, and candidates are ranked by estimated Jaccard similarity, so a
+query touches only a handful of buckets instead of the whole history.
+
+Band buckets are kept as sorted (hash, row) numpy arrays per band, searched
+with np.searchsorted; incremental adds go to a small per-band dict that is
+merged into the sorted arrays once it grows past MERGE_EVERY entries. The
+merge runs in a background thread and builds new arrays outside the lock
+(queries keep using the old arrays plus the dicts being merged), then swaps
+them in, so no request waits for a pass over the whole history.
+
+Columnar scoring uses the batched path: signatures for a whole column in
+chunked numpy passes, candidate lookup with vectorized searchsorted, one
+add_signatures() for the batch (check_and_add_frame).
+
+The API warm-up loads the index from the claims store (load_history), so
+near-duplicates of historical claims are found after a restart. A frozen
+index (pre-fork workers, see api/serve.py) answers queries but adds nothing.
+"""
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "64"))
+BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+SHINGLE = int(os.getenv("NEAR_DUP_SHINGLE", "5"))
+THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+MERGE_EVERY = int(os.getenv("NEAR_DUP_MERGE_EVERY", "50000"))
+# newest entries of one bucket compared per band; bounds the work for boilerplate notes
+MAX_CANDIDATES = int(os.getenv("NEAR_DUP_MAX_CANDIDATES", "64"))
+_CHUNK = 4_000_000  # shingle x permutation hashes per vectorized signature pass (~32 MB)
+TEXT_FIELDS = ["notes", "description"]
+
+_PRIME = np.uint64(4294967311)  # smallest prime > 2**32
+_WS = re.compile(r"\s+")
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize(text: str) -> str:
+    t = _NON_ALNUM.sub(" ", (text or "").lower())
+    return _WS.sub(" ", t).strip()
+
+
+def shingles(text: str, k: int = SHINGLE) -> np.ndarray:
+    """crc32 hashes of the character k-shingles of normalized text."""
+    t = normalize(text)
+    if not t:
+        return np.zeros(0, dtype=np.uint64)
+    if len(t) <= k:
+        grams = {t}
+    else:
+        grams = {t[i:i + k] for i in range(len(t) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def claim_text(c: Dict[str, Any]) -> str:
+    return " ".join(str(c.get(f) or "") for f in TEXT_FIELDS).strip()
+
+
+def frame_text(df) -> Optional["pd.Series"]:
+    """claim_text() for every row of a frame (None if it has no text columns)."""
+    cols = [f for f in TEXT_FIELDS if f in df]
+    if not cols:
+        return None
+    text = df[cols[0]].fillna("").astype(str)
+    for f in cols[1:]:
+        text = text + " " + df[f].fillna("").astype(str)
+    return text.str.strip()
+
+
+def _ranges(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(owner, position) for every position in the half-open ranges [lo[i], hi[i])."""
+    n = hi - lo
+    owner = np.repeat(np.arange(len(lo)), n)
+    pos = np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n, n) + np.repeat(lo, n)
+    return owner, pos
+
+
+class NearDupIndex:
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self.num_perm, self.bands, self.rows = num_perm, bands, num_perm // bands
+        self._a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+        self._mix = rng.integers(1, 2**63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._lock = threading.RLock()
+        self.ids: List[str] = []
+        self._row: Dict[str, int] = {}
+        self._sigs = np.zeros((0, num_perm), dtype=np.uint32)
+        self._n = 0
+        self._keys = [np.zeros(0, dtype=np.uint64) for _ in range(bands)]
+        self._vals = [np.zeros(0, dtype=np.int32) for _ in range(bands)]
+        self._pending: List[Dict[int, List[int]]] = [dict() for _ in range(bands)]
+        self._pending_n = 0
+        self._merging: List[Dict[int, List[int]]] = []  # pending dicts being folded in by _rebuild
+        self._merge_lock = threading.Lock()  # one rebuild of the sorted arrays at a time
+        self._merge_scheduled = False
+        self.frozen = False
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ---- hashing ----
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        sh = shingles(text)
+        if not len(sh):
+            return None
+        h = (np.outer(sh, self._a) + self._b) % _PRIME
+        return h.min(axis=0).astype(np.uint32)
+
+    def signatures(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(n, num_perm) signatures for many texts in chunked vectorized passes, and which rows had text."""
+        sh = [shingles(t) for t in texts]
+        lens = np.fromiter((len(x) for x in sh), dtype=np.int64, count=len(sh))
+        sigs = np.zeros((len(sh), self.num_perm), dtype=np.uint32)
+        todo = np.flatnonzero(lens)
+        per_chunk = max(1, _CHUNK // self.num_perm)
+        start = 0
+        while start < len(todo):
+            stop = start + max(1, int(np.searchsorted(np.cumsum(lens[todo[start:]]), per_chunk, side="right")))
+            rows = todo[start:stop]
+            flat = np.concatenate([sh[r] for r in rows])
+            h = (np.outer(flat, self._a) + self._b) % _PRIME
+            offs = np.cumsum(lens[rows]) - lens[rows]
+            sigs[rows] = np.minimum.reduceat(h, offs, axis=0).astype(np.uint32)
+            start = stop
+        return sigs, lens > 0
+
+    def _band_keys(self, sigs: np.ndarray) -> np.ndarray:
+        """(n, num_perm) signatures -> (n, bands) uint64 band hashes."""
+        s = sigs.reshape(len(sigs), self.bands, self.rows).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            return (s * self._mix).sum(axis=2, dtype=np.uint64)
+
+    # ---- updates ----
+    def _append(self, ids: Sequence[str], sigs: np.ndarray) -> np.ndarray:
+        need = self._n + len(ids)
+        if need > len(self._sigs):
+            grown = np.zeros((max(need, 2 * len(self._sigs), 1024), self.num_perm), dtype=np.uint32)
+            grown[:self._n] = self._sigs[:self._n]
+            self._sigs = grown
+        rows = np.arange(self._n, need)
+        self._sigs[self._n:need] = sigs
+        for cid, r in zip(ids, rows):
+            self._row[cid] = int(r)
+        self.ids.extend(ids)
+        self._n = need
+        return rows
+
+    def add(self, claim_id: str, text: str) -> bool:
+        """Index one claim's text (idempotent per claim_id). Returns False if nothing to index."""
+        if self.frozen:
+            return False
+        sig = self.signature(text)
+        if sig is None:
+            return False
+        with self._lock:
+            if claim_id in self._row:
+                return True
+            r = int(self._append([claim_id], sig[None, :])[0])
+            for b, key in enumerate(self._band_keys(sig[None, :])[0].tolist()):
+                self._pending[b].setdefault(key, []).append(r)
+            self._pending_n += 1
+            if self._pending_n >= MERGE_EVERY and not self._merge_scheduled:
+                self._merge_scheduled = True
+                threading.Thread(target=self._rebuild, name="near-dup-merge", daemon=True).start()
+        return True
+
+    def add_many(self, ids: Iterable[str], texts: Iterable[str]) -> int:
+        """Bulk index; band arrays are rebuilt once at the end."""
+        keep_ids, sigs = [], []
+        for cid, t in zip(ids, texts):
+            s = self.signature(t)
+            if s is not None and cid not in self._row:
+                keep_ids.append(cid); sigs.append(s)
+        if not sigs:
+            return 0
+        return self.add_signatures(keep_ids, np.vstack(sigs))
+
+    def add_signatures(self, ids: Sequence[str], sigs: np.ndarray) -> int:
+        """Bulk index precomputed (n, num_perm) signatures."""
+        with self._lock:
+            rows = self._append(list(ids), sigs.astype(np.uint32, copy=False))
+        self._rebuild(rows)
+        return len(rows)
+
+    def _rebuild(self, rows: Optional[np.ndarray] = None) -> None:
+        """Fold the pending adds (and `rows`) into the sorted band arrays; the merge runs outside self._lock."""
+        with self._merge_lock:
+            with self._lock:
+                self._merge_scheduled = False
+                pending = sorted({r for p in self._pending for rs in p.values() for r in rs})
+                if self._pending_n:
+                    self._merging, self._pending, self._pending_n = self._pending, [dict() for _ in range(self.bands)], 0
+                new = np.array(pending, dtype=np.int64)
+                if rows is not None:
+                    new = np.concatenate([new, rows.astype(np.int64)])
+                keys, vals = self._keys, self._vals
+                sigs = self._sigs[new]
+            if not len(new):
+                return
+            bkeys = self._band_keys(sigs)
+            new_keys, new_vals = [], []
+            for b in range(self.bands):
+                order = np.argsort(bkeys[:, b], kind="stable")
+                k, v = bkeys[order, b], new[order].astype(np.int32)
+                at = np.searchsorted(keys[b], k, side="right")  # O(history) insert of a sorted run
+                new_keys.append(np.insert(keys[b], at, k))
+                new_vals.append(np.insert(vals[b], at, v))
+            with self._lock:
+                self._keys, self._vals = new_keys, new_vals
+                self._merging = []
+
+    def merge(self) -> None:
+        """Fold pending adds into the sorted arrays now (normally done in the background)."""
+        self._rebuild()
+
+    # ---- queries ----
+    def query(self, text: str, threshold: float = THRESHOLD, top_k: int = 5,
+              exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Indexed claims whose estimated Jaccard similarity to text is >= threshold."""
+        sig = self.signature(text)
+        if sig is None:
+            return []
+        keys = self._band_keys(sig[None, :])[0]
+        with self._lock:
+            cand = set()
+            for b in range(self.bands):
+                key = keys[b]  # keep np.uint64 so searchsorted doesn't go through float64
+                lo = np.searchsorted(self._keys[b], key, side="left")
+                hi = np.searchsorted(self._keys[b], key, side="right")
+                cand.update(self._vals[b][max(lo, hi - MAX_CANDIDATES):hi].tolist())
+                for p in (*self._merging, self._pending):
+                    cand.update(p[b].get(int(key), ())[-MAX_CANDIDATES:])
+            if not cand:
+                return []
+            rows = np.fromiter(cand, dtype=np.int64, count=len(cand))
+            sims = (self._sigs[rows] == sig).mean(axis=1)
+            ids = [self.ids[r] for r in rows.tolist()]
+        out = [{"claim_id": cid, "similarity": round(float(s), 3)}
+               for cid, s in zip(ids, sims) if s >= threshold and cid != exclude]
+        out.sort(key=lambda d: d["similarity"], reverse=True)
+        return out[:top_k]
+
+    def _pending_arrays(self, b: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Band b of the pending/merging dicts as sorted (keys, rows) arrays (newest last per key)."""
+        items = [(k, r) for p in (*self._merging, self._pending) for k, rs in p[b].items() for r in rs]
+        if not items:
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+        k = np.fromiter((k for k, _ in items), dtype=np.uint64, count=len(items))
+        r = np.fromiter((r for _, r in items), dtype=np.int64, count=len(items))
+        order = np.lexsort((r, k))
+        return k[order], r[order]
+
+    def check_and_add_signatures(self, ids: Sequence[str], sigs: np.ndarray, ok: np.ndarray,
+                                 threshold: float = THRESHOLD) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        Batched check-then-add: for every row, the best match (similarity,
+        claim_id) among the indexed claims and the earlier rows of the batch,
+        as a loop of check_and_add() would find it; then one add_signatures()
+        for the new rows. ids: claim ids ("" = check only); ok: rows with text.
+        """
+        n = len(ids)
+        ids = np.asarray(ids, dtype=object)
+        keys = self._band_keys(sigs)
+        q_parts, c_parts = [], []  # (query row, candidate row); candidate rows >= n_hist are batch rows
+        with self._lock:
+            n_hist = self._n
+            own = np.fromiter((self._row.get(c, -1) if c else -1 for c in ids), dtype=np.int64, count=n)
+            hist_sigs = self._sigs
+            live = np.flatnonzero(ok)
+            for b in range(self.bands):
+                for K, V in ((self._keys[b], self._vals[b]), self._pending_arrays(b)):
+                    if not len(K):
+                        continue
+                    kb = keys[live, b]
+                    lo, hi = np.searchsorted(K, kb, side="left"), np.searchsorted(K, kb, side="right")
+                    q, pos = _ranges(np.maximum(lo, hi - MAX_CANDIDATES), hi)
+                    q_parts.append(live[q]); c_parts.append(V[pos].astype(np.int64))
+        # earlier rows of the same batch that share a band bucket
+        for b in range(self.bands):
+            order = live[np.lexsort((live, keys[live, b]))]
+            kb = keys[order, b]
+            for d in range(1, MAX_CANDIDATES + 1):
+                same = kb[d:] == kb[:-d]
+                if not same.any():
+                    break
+                q_parts.append(order[d:][same]); c_parts.append(n_hist + order[:-d][same])
+        best = np.zeros(n, dtype=np.float64)
+        match: List[Optional[str]] = [None] * n
+        if q_parts:
+            span = np.int64(n_hist + n)
+            pair = np.unique(np.concatenate(q_parts) * span + np.concatenate(c_parts))
+            q, c = pair // span, pair % span
+            batch = c >= n_hist
+            j = np.where(batch, c - n_hist, 0)
+            # batch rows count once indexed: an earlier row with a claim_id, not this claim again
+            keep = np.where(batch, (j < q) & (ids[j] != "") & (ids[j] != ids[q]), c != own[q])
+            q, c, j, batch = q[keep], c[keep], j[keep], batch[keep]
+            cand = np.empty((len(q), self.num_perm), dtype=np.uint32)
+            cand[batch] = sigs[j[batch]]
+            cand[~batch] = hist_sigs[c[~batch]]
+            sim = (cand == sigs[q]).mean(axis=1)
+            hit = sim >= threshold
+            q, c, sim = q[hit], c[hit], sim[hit]
+            order = np.lexsort((c, -sim, q))
+            first = order[np.r_[True, q[order][1:] != q[order][:-1]]] if len(order) else order
+            best[q[first]] = np.round(sim[first], 3)
+            with self._lock:
+                for qi, ci in zip(q[first].tolist(), c[first].tolist()):
+                    match[qi] = ids[ci - n_hist] if ci >= n_hist else self.ids[ci]
+        # index each new claim_id once (first occurrence in the batch)
+        new = ok & (ids != "") & (own < 0)
+        first_seen = ~pd.Series(ids).duplicated().to_numpy()
+        add = np.flatnonzero(new & first_seen)
+        if len(add) and not self.frozen:
+            self.add_signatures(ids[add].tolist(), sigs[add])
+        return best, match
+
+    def stats(self) -> Dict[str, Any]:
+        return {"claims": self._n, "num_perm": self.num_perm, "bands": self.bands, "frozen": self.frozen,
+                "pending": self._pending_n, "merging": bool(self._merging), "threshold": THRESHOLD,
+                "signature_mb": round(self._sigs[:self._n].nbytes / 2**20, 1)}
+
+    @classmethod
+    def from_frame(cls, df, **kw) -> "NearDupIndex":
+        """Build from a claims frame using its notes/description columns."""
+        idx = cls(**kw)
+        text = frame_text(df)
+        if text is None or "claim_id" not in df:
+            return idx
+        cid = df["claim_id"].astype(str)
+        sigs, ok = idx.signatures(text.tolist())
+        keep = ok & ~cid.duplicated().to_numpy()
+        if keep.any():
+            idx.add_signatures(cid[keep].tolist(), sigs[keep])
+        return idx
+
+
+_index: Optional[NearDupIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NearDupIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDupIndex()
+        return _index
+
+
+def set_index(idx: NearDupIndex) -> NearDupIndex:
+    """Replace the process index (a rebuild keeps the current index's frozen flag)."""
+    global _index
+    with _index_lock:
+        if _index is not None:
+            idx.frozen = _index.frozen
+        _index = idx
+    return idx
+
+
+def load_history(df) -> NearDupIndex:
+    """
+    Index a claims history frame and make it the process index. Claims the
+    current index picked up in the meantime (scored while the history was
+    loading) are carried over.
+    """
+    fresh = NearDupIndex.from_frame(df)
+    global _index
+    with _index_lock:
+        cur = _index
+        if cur is not None:
+            with cur._lock:
+                extra = [(cid, r) for cid, r in cur._row.items() if cid not in fresh._row]
+                if extra:
+                    fresh.add_signatures([cid for cid, _ in extra], cur._sigs[[r for _, r in extra]])
+                fresh.frozen = cur.frozen
+                _index = fresh
+        else:
+            _index = fresh
+    return fresh
+
+
+def check(c: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Near duplicates of a claim's text among indexed claims (read-only)."""
+    text = claim_text(c)
+    if not text:
+        return []
+    return get_index().query(text, exclude=str(c.get("claim_id") or "") or None)
+
+
+def check_and_add_frame(df) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """check_and_add() for a claims frame in one batched pass: best similarity and claim_id per row."""
+    text = frame_text(df)
+    if text is None:
+        return np.zeros(len(df)), [None] * len(df)
+    idx = get_index()
+    ids = df["claim_id"].fillna("").astype(str).str.strip().tolist() if "claim_id" in df else [""] * len(df)
+    sigs, ok = idx.signatures(text.tolist())
+    return idx.check_and_add_signatures(ids, sigs, ok)
+
+
+def check_and_add(c: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """check(), then index the claim's text if it has a claim_id."""
+    dups = check(c)
+    cid = str(c.get("claim_id") or "")
+    if cid:
+        get_index().add(cid, claim_text(c))
+    return dups
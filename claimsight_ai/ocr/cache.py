@@ -0,0 +1,70 @@
+# claimsight_ai/ocr/cache.py
+"""
+Content-addressed, disk-backed LRU cache for OCR + PII masking results.
+
+Keys are the SHA-256 of the uploaded bytes combined with everything that
+changes the output (OCR language/DPI, masking engine), so a repeat upload of
+the same invoice or police report skips Tesseract and the PII analyzer
+entirely. Only masked text is ever written; callers must not put() raw text.
+Entries are small JSON files under OCR_CACHE_DIR, evicted least recently used
+first once the directory exceeds OCR_CACHE_MB.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..disk_cache import DiskLRU
+
+APP_HOME = Path(os.environ.get("APP_HOME", Path.cwd()))
+DATA_DIR = Path(os.environ.get("DATA_DIR", APP_HOME / "data"))
+CACHE_DIR = Path(os.getenv("OCR_CACHE_DIR", DATA_DIR / "ocr_cache"))
+CACHE_MB = float(os.getenv("OCR_CACHE_MB", "256"))
+CACHE_VERSION = 1
+
+
+def cache_key(content: bytes, **settings: Any) -> str:
+    h = hashlib.sha256(content).hexdigest()
+    s = json.dumps({"v": CACHE_VERSION, **settings}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{h}|{s}".encode()).hexdigest()
+
+
+class OcrCache(DiskLRU):
+    def __init__(self, root: Path = CACHE_DIR, max_mb: float = CACHE_MB):
+        super().__init__(root, max_mb, suffix=".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            self.miss(key)
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an already-masked result."""
+        self.put_bytes(key, json.dumps({**entry, "cached_at": time.time()}).encode("utf-8"))
+
+
+_cache: Optional[OcrCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> OcrCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrCache()
+        return _cache
+
+
+def set_cache(cache: OcrCache) -> OcrCache:
+    global _cache
+    with _cache_lock:
+        _cache = cache
+    return cache
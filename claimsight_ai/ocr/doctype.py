@@ -0,0 +1,135 @@
+# claimsight_ai/ocr/doctype.py
+"""
+Document-type triage by nearest centroid over sentence embeddings.
+
+Each type (invoice, police report, medical bill, estimate, photo) has a few
+prototype descriptions; their normalized MiniLM embeddings are averaged into
+one centroid per type, computed once. Uploads are described by their
+filename words plus the start of their extracted (masked) text, all files of
+a request are encoded in a single batch, and each takes the label of the
+closest centroid. Without sentence-transformers a hashed bag-of-words
+embedding stands in so triage still works offline (with lower accuracy).
+"""
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"  # see rag/embeddings.py
+TEXT_CHARS = int(os.getenv("TRIAGE_TEXT_CHARS", "1500"))
+BATCH_SIZE = int(os.getenv("TRIAGE_BATCH_SIZE", "64"))
+
+PROTOTYPES: Dict[str, List[str]] = {
+    "invoice": [
+        "invoice number bill to amount due subtotal sales tax total payment terms remit to",
+        "repair invoice parts and labor total due please pay by due date",
+        "towing and storage invoice amount due",
+    ],
+    "police_report": [
+        "police report officer badge number incident case number narrative of the collision",
+        "traffic crash report driver vehicle statements citation issued by officer",
+        "theft report filed with the police department precinct case number",
+    ],
+    "medical_bill": [
+        "medical bill patient name hospital physician statement of charges balance due",
+        "itemized medical statement CPT procedure code diagnosis ICD insurance adjustment",
+        "emergency room visit charges radiology pharmacy patient account",
+    ],
+    "estimate": [
+        "repair estimate body shop labor hours parts list refinish paint estimate total",
+        "auto damage appraisal estimate supplement line items replace repair",
+        "contractor estimate for water damage drywall flooring mitigation scope of work",
+    ],
+    "photo": [
+        "photo image picture of vehicle damage jpg png camera",
+        "photograph of damaged property scene image",
+    ],
+}
+DOC_TYPES = list(PROTOTYPES)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def describe(text: str, filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """Classifier input: filename words + leading text; text-less images read as photos."""
+    words = " ".join(_WORD.findall((filename or "").lower()))
+    hint = "photo image picture" if (content_type or "").startswith("image/") and len(text.strip()) < 40 else ""
+    return " ".join(p for p in (hint, words, text[:TEXT_CHARS]) if p)
+
+
+class HashEmbedder:
+    """Deterministic hashed unigram+bigram embedding (offline fallback)."""
+
+    name = "hashed-bow"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: Sequence[str], batch_size: int = BATCH_SIZE, normalize_embeddings: bool = True,
+               **_) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            toks = _WORD.findall(t.lower())
+            for g in toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]:
+                h = zlib.crc32(g.encode())
+                out[i, h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+        return out
+
+
+class DocTypeClassifier:
+    def __init__(self, model=None):
+        self.model = model if model is not None else _load_model()
+        self.name = getattr(self.model, "name", None) or MODEL_NAME
+        protos = [(t, p) for t, ps in PROTOTYPES.items() for p in ps]
+        emb = self._encode([p for _, p in protos])
+        labels = np.array([DOC_TYPES.index(t) for t, _ in protos])
+        cent = np.vstack([emb[labels == k].mean(axis=0) for k in range(len(DOC_TYPES))])
+        self.centroids = cent / np.maximum(np.linalg.norm(cent, axis=1, keepdims=True), 1e-9)
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), batch_size=BATCH_SIZE,
+                                            normalize_embeddings=True), dtype=np.float32)
+
+    def classify(self, inputs: Sequence[str]) -> List[Dict[str, Any]]:
+        """One batched encode for all inputs; nearest centroid by cosine similarity."""
+        if not inputs:
+            return []
+        sims = self._encode(inputs) @ self.centroids.T
+        order = np.argsort(-sims, axis=1)
+        out = []
+        for row, o in zip(sims, order):
+            best, second = o[0], o[1]
+            out.append({"doc_type": DOC_TYPES[best], "score": round(float(row[best]), 3),
+                        "margin": round(float(row[best] - row[second]), 3)})
+        return out
+
+
+def _load_model():
+    try:
+        from ..rag.embeddings import get_model  # share the MiniLM instance with RAG
+        return get_model()
+    except Exception:
+        return HashEmbedder()
+
+
+_clf: Optional[DocTypeClassifier] = None
+_clf_lock = threading.Lock()
+
+
+def get_classifier() -> DocTypeClassifier:
+    global _clf
+    with _clf_lock:
+        if _clf is None:
+            _clf = DocTypeClassifier()
+        return _clf
+
+
+def set_classifier(clf: DocTypeClassifier) -> DocTypeClassifier:
+    global _clf
+    with _clf_lock:
+        _clf = clf
+    return clf
@@ -1,15 +1,7 @@
-try:
-    import pytesseract
-    from PIL import Image
-except Exception:
-    pytesseract = None
-
 from .pii import mask_pii
+from .workers import get_ocr_pool
 
-def ocr_and_mask(file_bytes: bytes) -> str:
-    if pytesseract is None:
-        return mask_pii("")  # OCR not configured; return empty masked text
-    import io
-    img = Image.open(io.BytesIO(file_bytes))
-    text = pytesseract.image_to_string(img) or ""
+def ocr_and_mask(file_bytes: bytes, content_type: str = "image/png") -> str:
+    # runs in the OCR process pool; returns empty masked text if OCR isn't configured
+    text = get_ocr_pool().ocr_document(file_bytes, content_type)["text"]
     return mask_pii(text)
@@ -1,17 +1,164 @@
-try:
-    from presidio_analyzer import AnalyzerEngine
-    from presidio_anonymizer import AnonymizerEngine
-    _analyzer = AnalyzerEngine()
-    _anonymizer = AnonymizerEngine()
-except Exception:
-    _analyzer = None
-    _anonymizer = None
+"""
+Tiered PII masking.
 
+Tier 1 is a cheap scan for anything Presidio could act on: digits,
+capitalized words, date words, e-mail/URL shapes. Text with none of those
+is returned as is without running the analyzer, which covers most filenames
+and short lowercase notes; everything else goes to tier 2. The scan looks at
+the raw text: business identifiers are not explained away first, because
+Presidio's pattern recognizers (US_BANK_NUMBER, US_DRIVER_LICENSE) match
+the digits inside VINs and policy/claim numbers.
+
+Tier 2 is the full Presidio analyzer (spaCy NER + recognizers). Long
+documents are cut into overlapping windows that go through the NLP pipeline
+as one batch; each window only keeps results that start in the part of it no
+other window owns. Pattern results come out exactly as in a single pass over
+the whole text (tests/test_pii.py); NER results can differ where a window
+edge cuts a sentence, which scripts/bench_pii.py counts as mismatches
+against a single pass. The engines (and the spaCy model behind them) load on
+first use or during API warm-up, not at import.
+"""
+import os
+import re
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from ..metrics import timed
+
+_engines: Optional[Tuple] = None
+_engines_lock = threading.Lock()
+
+
+def _load() -> Tuple:
+    """(analyzer, anonymizer), or (None, None) without Presidio; built once."""
+    global _engines
+    with _engines_lock:
+        if _engines is None:
+            try:
+                from presidio_analyzer import AnalyzerEngine
+                from presidio_anonymizer import AnonymizerEngine
+                _engines = (AnalyzerEngine(), AnonymizerEngine())
+            except Exception:
+                _engines = (None, None)
+        return _engines
+
+WINDOW_CHARS = int(os.getenv("PII_WINDOW_CHARS", "4000"))
+WINDOW_OVERLAP = int(os.getenv("PII_WINDOW_OVERLAP", "200"))
+PII_FAST_PATH = os.getenv("PII_FAST_PATH", "1") != "0"
+
+
+# ---------- tier 1: is there anything to analyze ----------
+_TEMPORAL = re.compile(
+    r"\b(?:today|tonight|yesterday|tomorrow|ago|last|next|day|days|week|weeks|month|months|year|years|"
+    r"morning|afternoon|evening|night|weekend|hour|hours|minute|minutes|"
+    r"mon|tue|wed|thu|fri|sat|sun|monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june|july|"
+    r"august|september|october|november|december|spring|summer|autumn|fall|winter)\b", re.I)
+# any two-letter (country) TLD, plus the generic ones Presidio's URL recognizer knows
+_CUES = re.compile(r"\d|@|://|www\.|\b[A-Z][a-z]|\b[A-Z]{2,}\b|\b[a-z0-9-]+\.(?:[a-z]{2}|com|net|org|edu|gov|mil|"
+                   r"int|info|biz|name|pro|aero|coop|museum|mobi|asia|tel|travel|jobs|cat|app|dev|xyz|online|"
+                   r"site|tech|store|shop|blog)\b")
+
+
+def needs_analysis(text: str) -> bool:
+    """False when nothing in the text could produce a Presidio result."""
+    return bool(_CUES.search(text) or _TEMPORAL.search(text))
+
+
+# ---------- tier 2: Presidio ----------
+def _windows(text: str) -> List[tuple]:
+    """(start, end, own_start, own_end) windows cut at whitespace; owned ranges tile the text."""
+    n, spans, start = len(text), [], 0
+    while True:
+        end = min(start + WINDOW_CHARS, n)
+        if end < n:
+            cut = text.rfind(" ", start + WINDOW_CHARS // 2, end)
+            end = cut if cut > 0 else end
+        spans.append((start, end))
+        if end >= n:
+            break
+        start = max(end - WINDOW_OVERLAP, start + 1)
+    # a window owns results starting before the middle of its overlap with the next one
+    bounds = [0] + [(spans[i + 1][0] + spans[i][1]) // 2 for i in range(len(spans) - 1)] + [n]
+    return [(s, e, bounds[i], bounds[i + 1]) for i, (s, e) in enumerate(spans)]
+
+
+def _analyze(texts: List[str]) -> List[list]:
+    """Analyzer results per text; long texts are windowed, all windows share one NLP batch."""
+    jobs = []  # (text index, offset, own_start, own_end, window text)
+    for i, t in enumerate(texts):
+        if len(t) <= WINDOW_CHARS:
+            jobs.append((i, 0, 0, len(t), t))
+        else:
+            jobs.extend((i, s, a, b, t[s:e]) for s, e, a, b in _windows(t))
+    results: List[list] = [[] for _ in texts]
+    analyzer, _ = _load()
+    nlp = getattr(analyzer, "nlp_engine", None)
+    batched = nlp.process_batch([j[4] for j in jobs], language="en") if hasattr(nlp, "process_batch") else None
+    for i, off, a, b, w in jobs:
+        if batched is not None:
+            item = next(batched)
+            artifacts = item[1] if isinstance(item, tuple) else item
+            found = analyzer.analyze(text=w, language="en", nlp_artifacts=artifacts)
+        else:
+            found = analyzer.analyze(text=w, language="en")
+        if off == 0 and b >= len(texts[i]):
+            results[i].extend(found)
+            continue
+        for r in found:
+            if a <= r.start + off < b:
+                r.start += off
+                r.end += off
+                results[i].append(r)
+    return results
+
+
+def _full(text: str) -> str:
+    analyzer, anonymizer = _load()
+    results = analyzer.analyze(text=text, language="en")
+    return anonymizer.anonymize(text=text, analyzer_results=results).text
+
+
+@timed("pii_mask")
+def mask_pii_batch(texts: Iterable[str]) -> List[str]:
+    """mask_pii for many texts, analyzing everything that needs it in one NLP batch."""
+    texts = list(texts)
+    analyzer, anonymizer = _load()
+    if analyzer is None or anonymizer is None:
+        return texts
+    todo = [i for i, t in enumerate(texts) if t and (not PII_FAST_PATH or needs_analysis(t))]
+    out = list(texts)
+    if not todo:
+        return out
+    try:
+        for i, res in zip(todo, _analyze([texts[i] for i in todo])):
+            out[i] = anonymizer.anonymize(text=texts[i], analyzer_results=res).text
+    except Exception:
+        return list(texts)
+    return out
+
+
+@timed("pii_mask")
 def mask_pii(text: str) -> str:
-    if not text or _analyzer is None or _anonymizer is None:
+    if not text or (PII_FAST_PATH and not needs_analysis(text)):
+        return text
+    analyzer, anonymizer = _load()
+    if analyzer is None or anonymizer is None:
         return text
     try:
-        results = _analyzer.analyze(text=text, language="en")
-        return _anonymizer.anonymize(text=text, analyzer_results=results).text
+        if len(text) <= WINDOW_CHARS:
+            return _full(text)
+        return anonymizer.anonymize(text=text, analyzer_results=_analyze([text])[0]).text
     except Exception:
         return text
+
+
+def engine() -> Optional[str]:
+    """Identity of the active masking engine (part of cache keys); None if masking is a no-op."""
+    if None in _load():
+        return None
+    try:
+        from importlib.metadata import version
+        return f"presidio-{version('presidio-analyzer')}"
+    except Exception:
+        return "presidio"
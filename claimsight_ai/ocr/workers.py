@@ -0,0 +1,233 @@
+# claimsight_ai/ocr/workers.py
+"""
+Process-pool OCR.
+
+Tesseract is CPU bound and holds the calling thread for the whole page, so
+running it inside the API process stalls everything else. Pages are farmed
+out to a ProcessPoolExecutor instead; a semaphore bounds how many pages can
+be queued or in flight (callers block, or get OcrBusy after QUEUE_TIMEOUT).
+Multi-page PDFs are written to a temp file once and every worker rasterizes
+and OCRs its own page, so pages run in parallel across cores; results are
+reassembled in page order.
+"""
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import multiprocessing as mp
+
+from ..metrics import timed
+
+WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "64"))
+QUEUE_TIMEOUT = float(os.getenv("OCR_QUEUE_TIMEOUT", "30"))
+PDF_DPI = int(os.getenv("OCR_PDF_DPI", "200"))
+LANG = os.getenv("OCR_LANG", "eng")
+START_METHOD = os.getenv("OCR_START_METHOD", "spawn")
+MIN_TEXT_LAYER = int(os.getenv("OCR_MIN_TEXT_LAYER", "20"))  # chars before a PDF page skips OCR
+
+
+def available() -> bool:
+    return importlib.util.find_spec("pytesseract") is not None
+
+
+class OcrBusy(RuntimeError):
+    """The OCR queue stayed full for longer than QUEUE_TIMEOUT."""
+
+
+def is_pdf(content: bytes, content_type: Optional[str] = None, filename: Optional[str] = None) -> bool:
+    return (content[:5] == b"%PDF-" or (content_type or "").lower() == "application/pdf"
+            or (filename or "").lower().endswith(".pdf"))
+
+
+# ---------- worker side (top level so they pickle) ----------
+def _init_worker() -> None:
+    # one Tesseract thread per process; the pool provides the parallelism
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _tesseract(img) -> str:
+    import pytesseract
+    return pytesseract.image_to_string(img, lang=LANG) or ""
+
+
+def ocr_image_bytes(content: bytes) -> str:
+    import io
+    from PIL import Image
+    return _tesseract(Image.open(io.BytesIO(content)))
+
+
+def pdf_page_count(path: str) -> int:
+    try:
+        import pypdfium2 as pdfium
+        return len(pdfium.PdfDocument(path))
+    except ImportError:
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(path)["Pages"])
+
+
+def _render_page(path: str, index: int, dpi: int):
+    try:
+        import pypdfium2 as pdfium
+        return pdfium.PdfDocument(path)[index].render(scale=dpi / 72).to_pil()
+    except ImportError:
+        from pdf2image import convert_from_path
+        return convert_from_path(path, dpi=dpi, first_page=index + 1, last_page=index + 1)[0]
+
+
+def _text_layer(path: str, index: int) -> str:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return ""
+    page = pdfium.PdfDocument(path)[index]
+    return page.get_textpage().get_text_range() or ""
+
+
+def ocr_pdf_page(path: str, index: int, dpi: int = PDF_DPI) -> str:
+    """Use the page's text layer when it has one; rasterize + OCR otherwise."""
+    text = _text_layer(path, index)
+    if len(text.strip()) >= MIN_TEXT_LAYER:
+        return text
+    if not available():
+        return text
+    return _tesseract(_render_page(path, index, dpi))
+
+
+# ---------- pool ----------
+class OcrPool:
+    def __init__(self, workers: int = WORKERS, queue_size: int = QUEUE_SIZE,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.workers = max(0, workers)  # 0 = run inline (no subprocesses)
+        self.queue_size, self.queue_timeout = max(1, queue_size), queue_timeout
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._exec: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._m = {"documents": 0, "pages": 0, "errors": 0, "rejected": 0,
+                   "in_flight": 0, "page_seconds": 0.0, "doc_seconds": 0.0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._exec is None:
+                self._exec = ProcessPoolExecutor(self.workers, mp_context=mp.get_context(START_METHOD),
+                                                 initializer=_init_worker)
+            return self._exec
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._m["rejected"] += 1
+            raise OcrBusy(f"OCR queue full ({self.queue_size} pages)")
+        with self._lock:
+            self._m["in_flight"] += 1
+        start = time.perf_counter()
+
+        def done(_f):
+            with self._lock:
+                self._m["in_flight"] -= 1
+                self._m["page_seconds"] += time.perf_counter() - start
+            self._slots.release()
+
+        if self.workers == 0:
+            fut: Future = Future()
+            try:
+                fut.set_result(fn(*args))
+            except Exception as e:
+                fut.set_exception(e)
+            done(fut)
+            return fut
+        try:
+            fut = self._executor().submit(fn, *args)
+        except Exception:
+            done(None)
+            raise
+        fut.add_done_callback(done)
+        return fut
+
+    def map_pages(self, fn: Callable, args: Sequence[tuple]) -> List[str]:
+        """Run fn(*a) for each page in the pool; results in input order ("" for failed pages)."""
+        t0 = time.perf_counter()
+        futs = [self._submit(fn, *a) for a in args]
+        out = []
+        for f in futs:
+            try:
+                out.append(f.result())
+            except Exception:
+                with self._lock:
+                    self._m["errors"] += 1
+                out.append("")
+        with self._lock:
+            self._m["documents"] += 1
+            self._m["pages"] += len(args)
+            self._m["doc_seconds"] += time.perf_counter() - t0
+        return out
+
+    @timed("ocr")
+    def ocr_document(self, content: bytes, content_type: Optional[str] = None,
+                     filename: Optional[str] = None) -> Dict[str, Any]:
+        """Text of an image (OCR), PDF (text layer or OCR per page) or text upload.
+
+        Blocking: call from a worker thread, not the event loop.
+        """
+        t0 = time.perf_counter()
+        if (content_type or "").startswith("text/"):
+            pages = [content.decode("utf-8", errors="replace")]
+        elif is_pdf(content, content_type, filename):
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as fh:
+                fh.write(content)
+            try:
+                try:
+                    n = pdf_page_count(fh.name)
+                except Exception:
+                    n = 0  # no rasterizer installed or unreadable PDF
+                pages = self.map_pages(ocr_pdf_page, [(fh.name, i, PDF_DPI) for i in range(n)]) if n else []
+            finally:
+                os.unlink(fh.name)
+        elif (content_type or "").startswith("image/") and available():
+            pages = self.map_pages(ocr_image_bytes, [(content,)])
+        else:
+            pages = []
+        secs = time.perf_counter() - t0
+        return {"text": "\n\f".join(p.strip() for p in pages).strip(), "pages": len(pages),
+                "seconds": round(secs, 3), "pages_per_s": round(len(pages) / secs, 2) if pages and secs else 0.0}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            m = dict(self._m)
+        m.update({
+            "workers": self.workers, "queue_size": self.queue_size,
+            "pages_per_s": round(m["pages"] / m["doc_seconds"], 2) if m["doc_seconds"] else 0.0,
+            "avg_page_ms": round(1000 * m["page_seconds"] / m["pages"], 1) if m["pages"] else 0.0,
+        })
+        return m
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._exec is not None:
+                self._exec.shutdown(wait=False, cancel_futures=True)
+                self._exec = None
+
+
+_pool: Optional[OcrPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OcrPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OcrPool()
+        return _pool
+
+
+def set_ocr_pool(pool: OcrPool) -> OcrPool:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool is not pool:
+            _pool.shutdown()
+        _pool = pool
+    return pool
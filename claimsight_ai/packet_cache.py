@@ -0,0 +1,96 @@
+# claimsight_ai/packet_cache.py
+"""
+Content-addressed cache for rendered claim packets.
+
+A packet is a pure function of the claim payload, its coverage and risk
+results, and the versions of the risk model and policy index behind them,
+so the PDF is stored under a hash of exactly those inputs. The same hash is
+the packet's ETag: /reports/claim_packet answers If-None-Match with 304 and
+serves repeat downloads (e.g. Streamlit reruns) without touching reportlab.
+The packet's "Generated:" line is the time of the first build, which the
+cached bytes keep.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .disk_cache import DiskLRU
+
+APP_HOME = Path(os.environ.get("APP_HOME", Path.cwd()))
+DATA_DIR = Path(os.environ.get("DATA_DIR", APP_HOME / "data"))
+MODELS_DIR = Path(os.environ.get("MODELS_DIR", APP_HOME / "models"))
+VECTOR_DIR = Path(os.getenv("VECTOR_DIR", "/app/vectorstore"))  # see rag/retriever.py
+CACHE_DIR = Path(os.getenv("PACKET_CACHE_DIR", DATA_DIR / "packet_cache"))
+CACHE_MB = float(os.getenv("PACKET_CACHE_MB", "128"))
+CACHE_VERSION = 1
+
+
+def _file_version(path: Path) -> Optional[str]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def versions() -> Dict[str, Optional[str]]:
+    """Versions of the artifacts a packet depends on (None = heuristic / no index)."""
+    return {"model": _file_version(MODELS_DIR / "risk_xgb.json"),
+            "index": _index_version()}
+
+
+def _index_version() -> Optional[str]:
+    from .rag.shards import index_files
+    shards = [v for v in (_file_version(p) for p in index_files(VECTOR_DIR)) if v]
+    single = _file_version(VECTOR_DIR / "policy.faiss")
+    if not shards:
+        return single
+    return hashlib.sha256("|".join([single or "", *shards]).encode()).hexdigest()[:16]
+
+
+def packet_key(claim: Dict[str, Any], coverage: Dict[str, Any], risk: Dict[str, Any]) -> str:
+    doc = {"v": CACHE_VERSION, "claim": claim, "coverage": coverage, "risk": risk, **versions()}
+    return hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def etag(key: str) -> str:
+    # weak: a rebuild after eviction carries a new "Generated:" time but is equivalent
+    return f'W/"{key[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    opaque = tag[2:] if tag.startswith("W/") else tag
+    for t in if_none_match.split(","):
+        t = t.strip()
+        if t == "*" or (t[2:] if t.startswith("W/") else t) == opaque:
+            return True
+    return False
+
+
+class PacketCache(DiskLRU):
+    def __init__(self, root: Path = CACHE_DIR, max_mb: float = CACHE_MB):
+        super().__init__(root, max_mb, suffix=".pdf")
+
+
+_cache: Optional[PacketCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_packet_cache() -> PacketCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PacketCache()
+        return _cache
+
+
+def set_packet_cache(cache: PacketCache) -> PacketCache:
+    global _cache
+    with _cache_lock:
+        _cache = cache
+    return cache
@@ -0,0 +1,92 @@
+# claimsight_ai/pipeline.py
+"""
+Per-request stage graph for multi-step endpoints (POST /fnol/process).
+
+Stages are added with the stages they need; run() starts every stage as
+soon as its dependencies have finished, so independent stages (OCR of the
+attachments, the endorsement lookup, retrieval, fraud scoring) overlap.
+Coroutine functions run on the event loop; plain functions go to the
+threadpool (numpy, FAISS, XGBoost and Tesseract release the GIL), which
+also carries the request's context along, so metrics stages and the
+deadline budget keep working inside them.
+
+Each stage function receives the results of the stages finished so far and
+its return value becomes its own result, which later stages reuse instead
+of recomputing. A stage that raises warmup.Skip is reported as skipped, any
+other exception as failed; either way the stages that need it are skipped
+and the rest of the graph still runs, so the caller gets partial results.
+"""
+import asyncio
+import inspect
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Sequence
+
+from fastapi.concurrency import run_in_threadpool
+
+from .metrics import observe_stage
+from .warmup import Skip
+
+
+class Dag:
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], after: Sequence[str] = ()) -> None:
+        missing = [d for d in after if d not in self._stages]
+        if missing:
+            raise ValueError(f"stage {name!r} needs unknown stage(s) {missing}; add them first")
+        self._stages[name] = {"fn": fn, "after": list(after)}
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the graph; returns {results, stages, total_ms, critical_path}."""
+        t0 = time.perf_counter()
+        results: Dict[str, Any] = {}
+        report: Dict[str, Dict[str, Any]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str) -> None:
+            st = self._stages[name]
+            if st["after"]:
+                await asyncio.wait([tasks[d] for d in st["after"]])
+            blocked = [d for d in st["after"] if report[d]["status"] != "ok"]
+            start = time.perf_counter()
+            info: Dict[str, Any] = {"after": st["after"], "start_ms": round(1000 * (start - t0), 1)}
+            if blocked:
+                report[name] = {**info, "status": "skipped", "ms": 0.0, "error": f"needs {', '.join(blocked)}"}
+                return
+            try:
+                if inspect.iscoroutinefunction(st["fn"]):
+                    results[name] = await st["fn"](results)
+                else:
+                    results[name] = await run_in_threadpool(st["fn"], results)
+                info["status"] = "ok"
+            except Skip as e:
+                info.update(status="skipped", error=str(e))
+            except Exception as e:
+                detail = getattr(e, "detail", None)  # HTTPException: an expected, reportable failure
+                info.update(status="failed", error=detail or f"{type(e).__name__}: {e}")
+                if detail is None:
+                    traceback.print_exc()
+            secs = time.perf_counter() - start
+            observe_stage(f"{self.name}.{name}", secs)
+            report[name] = {**info, "ms": round(1000 * secs, 1), "end_ms": round(1000 * (time.perf_counter() - t0), 1)}
+
+        for name in self._stages:  # insertion order is a topological order (add() checks)
+            tasks[name] = asyncio.create_task(run_stage(name))
+        await asyncio.gather(*tasks.values())
+        return {"results": results, "stages": report,
+                "total_ms": round(1000 * (time.perf_counter() - t0), 1),
+                "critical_path": critical_path(report)}
+
+
+def critical_path(report: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Chain of stages that determined the total time: the last stage to finish, then its latest dependency, ..."""
+    ends = {n: s.get("end_ms", s["start_ms"]) for n, s in report.items()}
+    if not ends:
+        return []
+    path = [max(ends, key=ends.get)]
+    while report[path[-1]]["after"]:
+        path.append(max(report[path[-1]]["after"], key=ends.get))
+    return path[::-1]
@@ -0,0 +1,192 @@
+# claimsight_ai/profiling.py
+"""
+On-demand CPU and memory profiling of the live process.
+
+CPU: sample_stacks() walks sys._current_frames() every `interval` seconds
+for a bounded window and aggregates the stacks of all threads into the
+collapsed format (`thread;outer;...;leaf count`, what flamegraph.pl,
+speedscope and inferno read) or a d3-flame-graph JSON tree. Nothing runs
+between requests; while sampling, the cost is one frame walk per thread per
+tick in the requesting thread.
+
+Memory: tracemalloc is off unless started (here or with TRACEMALLOC=<frames>
+at boot, which also covers the index/model loads during warm-up). A
+snapshot groups traced memory by source line and into coarse owners
+(index, models, caches, app, other) by the file that allocated it.
+tracemalloc only sees allocations made through Python's allocators
+(including numpy buffers), not memory malloc'ed by native libraries
+(FAISS, torch), so the snapshot also reports process RSS for comparison.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Optional
+
+MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC", "0"))
+
+_busy = threading.Lock()  # one CPU profile at a time
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running in this process."""
+
+
+# ---------- CPU ----------
+_IDLE_LEAVES = ("threading.py", "selectors.py", "queue.py", "socket.py", "ssl.py")
+_PREFIXES = sorted({p for p in sys.path if p and os.path.isdir(p)}, key=len, reverse=True)
+
+
+def _where(code) -> str:
+    path = code.co_filename
+    for p in _PREFIXES:
+        if path.startswith(p):
+            path = path[len(p):].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float = 10.0, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+    """Sample every thread's Python stack; returns collapsed-stack counts."""
+    seconds = max(0.0, min(seconds, MAX_SECONDS))
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("a CPU profile is already running")
+    try:
+        me = threading.get_ident()
+        counts: Counter = Counter()
+        samples = 0
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        while True:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                if not include_idle and os.path.basename(frame.f_code.co_filename) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_where(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(tid, f"thread-{tid}"))
+                counts[";".join(reversed(stack))] += 1
+            samples += 1
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(interval)
+        return {"seconds": round(time.perf_counter() - t0, 3), "interval": interval,
+                "ticks": samples, "stacks": counts}
+    finally:
+        _busy.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{s} {n}\n" for s, n in stacks.most_common())
+
+
+def flame_tree(stacks: Counter) -> Dict[str, Any]:
+    """d3-flame-graph JSON: {name, value, children}."""
+    root: Dict[str, Any] = {"name": "all", "value": 0, "children": {}}
+    for s, n in stacks.items():
+        node = root
+        node["value"] += n
+        for part in s.split(";"):
+            node = node["children"].setdefault(part, {"name": part, "value": 0, "children": {}})
+            node["value"] += n
+
+    def freeze(node):
+        return {"name": node["name"], "value": node["value"],
+                "children": [freeze(c) for c in sorted(node["children"].values(), key=lambda c: -c["value"])]}
+    return freeze(root)
+
+
+# ---------- memory ----------
+# file path fragments -> owner, first match wins
+OWNERS = [
+    ("index", ("faiss", "rag/retriever", "rag/index_policies")),
+    ("models", ("xgboost", "shap", "sentence_transformers", "transformers", "torch", "sklearn",
+                "presidio", "spacy", "rag/embeddings", "rag/reranker", "ocr/doctype", "joblib")),
+    ("caches", ("near_dup", "feature_store", "snowflake_io", "disk_cache", "ocr/cache", "packet_cache",
+                "ring_graph")),
+    ("app", ("claimsight_ai", "app/extensions")),
+]
+
+
+def owner(filename: str) -> str:
+    f = filename.replace(os.sep, "/")
+    for name, parts in OWNERS:
+        if any(p in f for p in parts):
+            return name
+    return "other"
+
+
+def _owner_of(tb: tracemalloc.Traceback) -> str:
+    """Innermost frame with a known owner (more frames = better attribution)."""
+    for frame in reversed(tb):  # most recent last
+        o = owner(frame.filename)
+        if o != "other":
+            return o
+    return "other"
+
+
+def start_tracing(frames: int = 1) -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, frames))
+    return memory_status()
+
+
+def stop_tracing() -> Dict[str, Any]:
+    tracemalloc.stop()
+    return memory_status()
+
+
+def memory_status() -> Dict[str, Any]:
+    out: Dict[str, Any] = {"tracing": tracemalloc.is_tracing()}
+    if out["tracing"]:
+        cur, peak = tracemalloc.get_traced_memory()
+        out.update(frames=tracemalloc.get_traceback_limit(), traced_mb=round(cur / 2**20, 2),
+                   peak_mb=round(peak / 2**20, 2), overhead_mb=round(tracemalloc.get_tracemalloc_memory() / 2**20, 2))
+    return out
+
+
+_last: Optional[tracemalloc.Snapshot] = None
+
+
+def memory_snapshot(top: int = 25, compare: bool = False) -> Dict[str, Any]:
+    """Top allocation sites and traced memory per owner (compare=True: growth since the last snapshot)."""
+    global _last
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running; start it first")
+    snap = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ])
+    if compare and _last is not None:
+        stats = snap.compare_to(_last, "lineno")
+        rows = [{"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                 "size_kb": round(s.size / 1024, 1), "size_diff_kb": round(s.size_diff / 1024, 1),
+                 "count_diff": s.count_diff} for s in stats[:top]]
+    else:
+        stats = snap.statistics("lineno")
+        rows = [{"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                 "size_kb": round(s.size / 1024, 1), "count": s.count} for s in stats[:top]]
+    by_owner: Counter = Counter()
+    for s in snap.statistics("traceback"):
+        by_owner[_owner_of(s.traceback)] += s.size
+    _last = snap
+    out = {**memory_status(), "owners_mb": {k: round(v / 2**20, 2) for k, v in by_owner.most_common()},
+           "top": rows}
+    try:
+        from .api.serve import process_memory
+        out["process"] = process_memory(os.getpid())
+    except Exception:
+        pass
+    return out
+
+
+if TRACEMALLOC_FRAMES:
+    start_tracing(TRACEMALLOC_FRAMES)
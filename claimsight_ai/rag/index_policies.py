@@ -1,12 +1,14 @@
 # services/rag/index_policies.py
-import os, glob, json, re
+import os, glob, json, re, argparse
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 
+from .shards import SHARDS, SHARD_BY, shard_names, shard_of, write_layout
+
 # ---- Portable paths (work on GH Actions + Docker) ----
 APP_HOME   = Path(os.environ.get("APP_HOME", Path.cwd()))
 VECTOR_DIR = Path(os.environ.get("VECTOR_DIR", APP_HOME / ".cache" / "vectorstore"))
@@ -47,44 +49,90 @@ def _load_text(path: Path) -> str:
     return ""
 
 
-def build_index() -> Dict[str, int]:
-    VECTOR_DIR.mkdir(parents=True, exist_ok=True)
-
-    files = sorted([Path(p) for p in glob.glob(str(POLICY_DIR / "*"))])
+def _policy_chunks(fp: Path) -> Tuple[str, List[str], List[Dict]]:
+    policy_id = fp.stem
+    text = _load_text(fp)
     docs, metas = [], []
+    if not text.strip():
+        return text, docs, metas
 
-    if not files:
-        # Write an empty but valid index + metadata so the app won't crash
-        index = faiss.IndexFlatIP(EMBED_DIM)
-        faiss.write_index(index, str(INDEX_PATH))
-        DOCS_PATH.write_text(json.dumps(docs), encoding="utf-8")
-        META_PATH.write_text(json.dumps(metas), encoding="utf-8")
-        return {"files": 0, "docs": 0}
-
-    for fp in files:
-        policy_id = fp.stem
-        text = _load_text(fp)
-        if not text.strip():
-            continue
+    sections = re.split(r"\n(?=Section\s+\d+:)", text, flags=re.IGNORECASE)
+    blocks = sections if len(sections) > 1 else [text]
 
-        sections = re.split(r"\n(?=Section\s+\d+:)", text, flags=re.IGNORECASE)
-        blocks = sections if len(sections) > 1 else [text]
+    for s in blocks:
+        section_title = (s.splitlines()[0].strip() if s.strip() else "unknown")[:120]
+        for ch in _chunk(s):
+            docs.append(ch)
+            metas.append({"policy_id": policy_id, "section": section_title})
+    return text, docs, metas
 
-        for s in blocks:
-            section_title = (s.splitlines()[0].strip() if s.strip() else "unknown")[:120]
-            for ch in _chunk(s):
-                docs.append(ch)
-                metas.append({"policy_id": policy_id, "section": section_title})
 
-    model = SentenceTransformer(MODEL_NAME)
-    vecs = model.encode(docs, normalize_embeddings=True).astype("float32")
+def _write(out_dir: Path, docs: List[str], metas: List[Dict], model: Optional[SentenceTransformer]) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    vecs = model.encode(docs, normalize_embeddings=True).astype("float32") if docs else np.zeros((0, EMBED_DIM), "float32")
 
+    # Write an empty but valid index + metadata when there is nothing to embed, so the app won't crash
     index = faiss.IndexFlatIP(vecs.shape[1] if len(vecs) else EMBED_DIM)
     if len(vecs):
         index.add(vecs)
 
-    faiss.write_index(index, str(INDEX_PATH))
-    DOCS_PATH.write_text(json.dumps(docs), encoding="utf-8")
-    META_PATH.write_text(json.dumps(metas), encoding="utf-8")
+    # Write every file to a temp name first, then swap them in (index last): a
+    # running server never loads a half-written file, and its reload waits for
+    # the versions to settle (api/serve.py).
+    tmp = f".tmp.{os.getpid()}"
+    faiss.write_index(index, str(out_dir / (INDEX_PATH.name + tmp)))
+    (out_dir / (DOCS_PATH.name + tmp)).write_text(json.dumps(docs), encoding="utf-8")
+    (out_dir / (META_PATH.name + tmp)).write_text(json.dumps(metas), encoding="utf-8")
+    for name in (DOCS_PATH.name, META_PATH.name, INDEX_PATH.name):
+        os.replace(out_dir / (name + tmp), out_dir / name)
+
+
+def build_index(shards: int = SHARDS, by: str = SHARD_BY, shard: Optional[str] = None) -> Dict[str, int]:
+    """
+    Build the policy index. shards=1 (by="hash") writes the single policy.faiss
+    under VECTOR_DIR; otherwise VECTOR_DIR/shards/<name>/ per shard (see
+    rag/shards.py). `shard` rebuilds only that shard, leaving the others as they are.
+    """
+    files = sorted([Path(p) for p in glob.glob(str(POLICY_DIR / "*"))])
+    sharded = shards > 1 or by != "hash"
+    names = shard_names(shards, by) if sharded else ["."]
+    if shard is not None and shard not in names:
+        raise ValueError(f"unknown shard {shard!r}; layout has {names}")
+    targets = [shard] if shard is not None else names
+
+    parts: Dict[str, Tuple[List[str], List[Dict]]] = {name: ([], []) for name in targets}
+    for fp in files:
+        text, docs, metas = _policy_chunks(fp)
+        if not docs:
+            continue
+        name = shard_of(fp.stem, text, shards, by) if sharded else "."
+        if name in parts:
+            parts[name][0].extend(docs)
+            parts[name][1].extend(metas)
+
+    model = SentenceTransformer(MODEL_NAME) if any(docs for docs, _ in parts.values()) else None
+    if not sharded:
+        docs, metas = parts["."]
+        _write(VECTOR_DIR, docs, metas, model)
+        return {"files": len(files), "docs": len(docs)}
+
+    root = VECTOR_DIR / "shards"
+    write_layout(root, shards, by)
+    out: Dict[str, int] = {"files": len(files), "docs": 0}
+    for name, (docs, metas) in parts.items():
+        _write(root / name, docs, metas, model)
+        stats = {"docs": len(docs), "policies": len({m["policy_id"] for m in metas})}
+        (root / name / "shard.json.tmp").write_text(json.dumps(stats), encoding="utf-8")
+        os.replace(root / name / "shard.json.tmp", root / name / "shard.json")
+        out[name] = len(docs)
+        out["docs"] += len(docs)
+    return out
+
 
-    return {"files": len(files), "docs": len(docs)}
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Build the policy vector index (optionally sharded).")
+    ap.add_argument("--shards", type=int, default=SHARDS, help="hash shards (1 = single index)")
+    ap.add_argument("--by", choices=["hash", "line"], default=SHARD_BY, help="shard by policy_id hash or policy line")
+    ap.add_argument("--shard", default=None, help="build only this shard, e.g. shard-003 or shard-auto")
+    a = ap.parse_args()
+    print(json.dumps(build_index(a.shards, a.by, a.shard)))
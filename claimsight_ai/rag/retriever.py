@@ -1,19 +1,28 @@
 import os, json
+from pathlib import Path
 from typing import List, Dict, Optional
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 
+from ..metrics import stage
+from .shards import ShardedIndex, read_layout
+
 BASE = os.getenv("VECTOR_DIR", "/app/vectorstore")
 INDEX_PATH = os.path.join(BASE, "policy.faiss")
 DOCS_PATH = os.path.join(BASE, "policy.docs.json")
 META_PATH = os.path.join(BASE, "policy.meta.json")
+SHARDS_DIR = os.path.join(BASE, "shards")  # sharded layout (rag/shards.py); preferred when present
 MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 
 class PolicyRetriever:
     def __init__(self, k: int = 5):
         self.k = k
         self.model = SentenceTransformer(MODEL_NAME)
+        self.sharded = ShardedIndex(Path(SHARDS_DIR)) if read_layout(Path(SHARDS_DIR)) else None
+        if self.sharded is not None:
+            self.docs, self.meta, self.index = [], [], None
+            return
         self.docs = json.load(open(DOCS_PATH, "r", encoding="utf-8")) if os.path.exists(DOCS_PATH) else []
         self.meta = json.load(open(META_PATH, "r", encoding="utf-8")) if os.path.exists(META_PATH) else []
         dim = 384
@@ -21,13 +30,22 @@ class PolicyRetriever:
             self.index = faiss.read_index(INDEX_PATH)
         else:
             self.index = faiss.IndexFlatIP(dim)
+        if self.index.ntotal != len(self.docs):  # caught mid-rebuild: fail the load, keep the old assets
+            raise ValueError(f"{INDEX_PATH} has {self.index.ntotal} vectors but {DOCS_PATH} has {len(self.docs)} docs")
+
+    def size(self) -> int:
+        return len(self.sharded) if self.sharded is not None else len(self.docs)
 
     def search(self, query: str, where: Optional[Dict] = None) -> List[Dict]:
-        if not self.docs:
+        if self.sharded is None and not self.docs:  # sharded: down shards are retried and reported by the search
             return []
-        qv = self.model.encode([query], normalize_embeddings=True).astype("float32")
+        with stage("query_encode"):
+            qv = self.model.encode([query], normalize_embeddings=True).astype("float32")
+        if self.sharded is not None:
+            return self._search_sharded(qv, where)
         k = min(self.k * 5, len(self.docs))
-        sims, idxs = self.index.search(qv, k)
+        with stage("faiss_search"):
+            sims, idxs = self.index.search(qv, k)
         hits = []
         for sim, idx in zip(sims[0], idxs[0]):
             if idx < 0:
@@ -41,3 +59,15 @@ class PolicyRetriever:
             if len(hits) >= self.k:
                 break
         return hits
+
+    def _search_sharded(self, qv: np.ndarray, where: Optional[Dict]) -> List[Dict]:
+        with stage("faiss_search"):
+            top = self.sharded.search(qv, self.k * 5, where)
+        hits = []
+        for (sim, shard, row), text, m in top:
+            if where and not all(str(m.get(k)) == str(v) for k, v in where.items()):
+                continue
+            hits.append({"id": f"{shard}/{row}", "distance": sim, "text": text, "meta": m})
+            if len(hits) >= self.k:
+                break
+        return hits
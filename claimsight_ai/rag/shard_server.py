@@ -0,0 +1,73 @@
+# claimsight_ai/rag/shard_server.py
+"""
+Stand-in remote shard service: serves one shard directory (rag/shards.py)
+over HTTP so a shard can be moved to another process or host without the
+API knowing more than its URL (VECTOR_SHARD_ENDPOINTS). Query vectors come
+in already encoded; the service only searches and returns rows.
+
+    python -m claimsight_ai.rag.shard_server --shard /app/vectorstore/shards/shard-003 --port 8101
+
+  GET  /info     {"shard", "docs", "dim"}
+  POST /search   {"vector": [...], "k": 25}  ->  {"hits": [[score, row], ...]}
+  POST /fetch    {"rows": [3, 17]}           ->  {"docs": [{"text", "meta"}, ...]}
+"""
+import argparse
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from .shards import LocalShard
+
+SHARD_DIR = os.getenv("SHARD_DIR", "")
+
+
+class SearchBody(BaseModel):
+    vector: List[float]
+    k: int = 5
+
+
+class FetchBody(BaseModel):
+    rows: List[int]
+
+
+def create_app(shard_dir: str = SHARD_DIR) -> FastAPI:
+    shard = LocalShard(Path(shard_dir))
+    dim = shard.index.d
+    app = FastAPI(title=f"ClaimSight policy shard {shard.name}")
+
+    @app.get("/info")
+    def info():
+        return {"shard": shard.name, "docs": len(shard), "dim": dim}
+
+    @app.post("/search")
+    async def search(body: SearchBody):
+        if len(body.vector) != dim:
+            raise HTTPException(422, f"vector has {len(body.vector)} dims; shard expects {dim}")
+        qv = np.asarray([body.vector], dtype="float32")
+        hits = await run_in_threadpool(shard.search, qv, body.k)
+        return {"hits": [[score, row] for score, _, row in hits]}
+
+    @app.post("/fetch")
+    def fetch(body: FetchBody):
+        bad = [r for r in body.rows if not 0 <= r < len(shard)]
+        if bad:
+            raise HTTPException(404, f"rows not in shard: {bad}")
+        return {"docs": [{"text": t, "meta": m} for t, m in shard.fetch(body.rows)]}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description="Serve one policy index shard over HTTP.")
+    ap.add_argument("--shard", default=SHARD_DIR, help="shard directory (VECTOR_DIR/shards/shard-NNN)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8101)
+    a = ap.parse_args()
+    uvicorn.run(create_app(a.shard), host=a.host, port=a.port)
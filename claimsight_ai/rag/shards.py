@@ -0,0 +1,292 @@
+# claimsight_ai/rag/shards.py
+"""
+Sharded policy vector store.
+
+One policy.faiss caps the index at one process's RAM and every query scans
+it on one core. With VECTOR_SHARDS=N the chunks are split into N shards
+(by crc32 of policy_id, or SHARD_BY=line: one shard per policy line - Auto,
+Home, WorkersComp, GL, other), each a self-contained directory with its own
+policy.faiss / policy.docs.json / policy.meta.json:
+
+    VECTOR_DIR/shards/layout.json         {"by": "hash", "n": 8}
+    VECTOR_DIR/shards/shard-003/...       one shard (+ shard.json stats)
+
+A shard depends only on the policy files that map to it, so build_index(shard=...)
+rebuilds one shard without touching the others (in parallel, on different
+machines). ShardedIndex searches every shard in a thread pool - FAISS
+releases the GIL, and a single-query flat search runs on one core - and
+merges the per-shard top-k lists. Each shard returns its own exact top-k,
+so the merged top-k is exactly what one big index would return - as long
+as every shard answers: a shard that isn't built or doesn't respond is left
+out, and the request is marked degraded (shards=partial) instead of failing.
+A policy_id filter under hash sharding only visits the shard that holds it.
+
+Shards can also live in other processes or hosts: VECTOR_SHARD_ENDPOINTS=
+"shard-003=http://10.0.0.7:8101,..." serves those shards through
+RemoteShard, which talks to the local stand-in service
+(python -m claimsight_ai.rag.shard_server --shard DIR --port 8101). Query
+vectors are encoded once, by the caller.
+"""
+import heapq
+import json
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..deadline import degrade
+
+SHARDS = int(os.getenv("VECTOR_SHARDS", "1"))
+SHARD_BY = os.getenv("SHARD_BY", "hash")  # "hash" | "line"
+SEARCH_THREADS = int(os.getenv("SHARD_SEARCH_THREADS", str(min(8, os.cpu_count() or 1))))
+REMOTE_TIMEOUT = float(os.getenv("SHARD_REMOTE_TIMEOUT", "2.0"))
+
+LAYOUT = "layout.json"
+LINES = ["Auto", "Home", "WorkersComp", "GL", "other"]
+# first match wins; checked against the title line, then the top of the document
+_LINE_PATTERNS = [
+    ("WorkersComp", re.compile(r"workers'?\s*comp", re.I)),
+    ("GL", re.compile(r"general liability|\bCGL\b", re.I)),
+    ("Auto", re.compile(r"\bauto\b|automobile|vehicle", re.I)),
+    ("Home", re.compile(r"homeowners?|dwelling|\bHO-\d", re.I)),
+]
+
+# one hit from one shard: (score, shard name, row in that shard)
+Hit = Tuple[float, str, int]
+
+
+def policy_line(text: str) -> str:
+    title = next((l for l in text.splitlines() if l.strip()), "")
+    for chunk in (title, text[:400]):
+        line = next((line for line, pat in _LINE_PATTERNS if pat.search(chunk)), None)
+        if line:
+            return line
+    return "other"
+
+
+def shard_names(n: int, by: str) -> List[str]:
+    if by == "line":
+        return [f"shard-{line.lower()}" for line in LINES]
+    return [f"shard-{i:03d}" for i in range(max(1, n))]
+
+
+def shard_of(policy_id: str, text: str, n: int, by: str) -> str:
+    """Shard holding a policy's chunks (stable across processes and builds)."""
+    if by == "line":
+        return f"shard-{policy_line(text).lower()}"
+    return f"shard-{zlib.crc32(policy_id.encode('utf-8')) % max(1, n):03d}"
+
+
+def write_layout(root: Path, n: int, by: str) -> Dict[str, Any]:
+    root.mkdir(parents=True, exist_ok=True)
+    layout = {"by": by, "n": len(shard_names(n, by)), "shards": shard_names(n, by)}
+    tmp = root / f".{LAYOUT}.{os.getpid()}"
+    tmp.write_text(json.dumps(layout), encoding="utf-8")
+    os.replace(tmp, root / LAYOUT)
+    return layout
+
+
+def read_layout(root: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((root / LAYOUT).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def index_files(vector_dir: Path) -> List[Path]:
+    """Files a running index depends on: the layout and every shard's files (when sharded)."""
+    root = vector_dir / "shards"
+    layout = read_layout(root)
+    if layout is None:
+        return []
+    return [root / LAYOUT] + [root / name / f for name in layout["shards"]
+                              for f in ("policy.faiss", "policy.docs.json", "policy.meta.json")]
+
+
+def merge_topk(per_shard: Iterable[Sequence[Hit]], k: int) -> List[Hit]:
+    """Exact global top-k from per-shard lists sorted by descending score (ties: shard, row)."""
+    ordered = (sorted(hits, key=lambda h: (-h[0], h[1], h[2])) for hits in per_shard)
+    return list(heapq.merge(*ordered, key=lambda h: (-h[0], h[1], h[2])))[:k]
+
+
+class LocalShard:
+    """One shard directory loaded in this process."""
+
+    def __init__(self, path: Path):
+        import faiss
+        self.name = path.name
+        self.path = path
+        self.index = faiss.read_index(str(path / "policy.faiss"))
+        self.docs = json.loads((path / "policy.docs.json").read_text(encoding="utf-8"))
+        self.meta = json.loads((path / "policy.meta.json").read_text(encoding="utf-8"))
+        if self.index.ntotal != len(self.docs):
+            raise ValueError(f"shard {self.name}: {self.index.ntotal} vectors but {len(self.docs)} docs")
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def search(self, qv: np.ndarray, k: int) -> List[Hit]:
+        k = min(k, len(self.docs))
+        if k <= 0:
+            return []
+        sims, idxs = self.index.search(qv, k)
+        return [(float(s), self.name, int(i)) for s, i in zip(sims[0], idxs[0]) if i >= 0]
+
+    def fetch(self, rows: Sequence[int]) -> List[Tuple[str, Dict[str, Any]]]:
+        return [(self.docs[r], self.meta[r] if r < len(self.meta) else {}) for r in rows]
+
+
+class RemoteShard:
+    """
+    A shard served by claimsight_ai.rag.shard_server in another process or host.
+
+    An unreachable shard doesn't fail construction: its size stays unknown
+    (len 0, `up` False) until a later call gets through.
+    """
+
+    def __init__(self, name: str, url: str, timeout: float = REMOTE_TIMEOUT):
+        import requests
+        self.name, self.url, self.timeout = name, url.rstrip("/"), timeout
+        self._http = requests.Session()
+        self._size: Optional[int] = None
+        self.up, self.error = False, None
+        self.refresh()
+
+    def _call(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        try:
+            r = self._http.request(method, self.url + path, json=body, timeout=self.timeout)
+            r.raise_for_status()
+            out = r.json()
+        except Exception as e:
+            self.up, self.error = False, f"{type(e).__name__}: {e}"
+            raise
+        self.up, self.error = True, None
+        return out
+
+    def refresh(self) -> bool:
+        """Fetch the shard's size; False if it can't be reached."""
+        try:
+            self._size = int(self._call("GET", "/info")["docs"])
+        except Exception:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return self._size or 0
+
+    def search(self, qv: np.ndarray, k: int) -> List[Hit]:
+        if self._size is None and not self.refresh():
+            raise ConnectionError(f"shard {self.name} unreachable: {self.error}")
+        out = self._call("POST", "/search", {"vector": qv[0].tolist(), "k": k})
+        return [(float(s), self.name, int(i)) for s, i in out["hits"]]
+
+    def fetch(self, rows: Sequence[int]) -> List[Tuple[str, Dict[str, Any]]]:
+        out = self._call("POST", "/fetch", {"rows": list(rows)})
+        return [(d["text"], d["meta"]) for d in out["docs"]]
+
+
+def remote_endpoints(spec: Optional[str] = None) -> Dict[str, str]:
+    spec = os.getenv("VECTOR_SHARD_ENDPOINTS", "") if spec is None else spec
+    pairs = (p.split("=", 1) for p in spec.split(",") if "=" in p)
+    return {name.strip(): url.strip() for name, url in pairs}
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max(1, SEARCH_THREADS), thread_name_prefix="shard-search")
+        return _pool
+
+
+class ShardedIndex:
+    """
+    The shards of one layout, searched together.
+
+    Shards listed in the layout with no local files and no endpoint are
+    kept in `missing`; remote shards may be down. Neither fails the index:
+    a search merges the shards that answered (each call bounded by
+    REMOTE_TIMEOUT), and the shards that didn't are reported through
+    deadline.degrade("shards", "partial", missing=[...]) and in stats().
+    """
+
+    def __init__(self, root: Path, endpoints: Optional[Dict[str, str]] = None):
+        layout = read_layout(root)
+        if layout is None:
+            raise FileNotFoundError(f"No shard layout under {root}")
+        self.root, self.by = root, layout["by"]
+        self.n = layout["n"]
+        self.names: List[str] = list(layout["shards"])
+        endpoints = remote_endpoints() if endpoints is None else endpoints
+        self.shards: Dict[str, Any] = {}
+        self.missing: List[str] = []
+        for name in self.names:
+            if name in endpoints:
+                self.shards[name] = RemoteShard(name, endpoints[name])
+            elif (root / name / "policy.faiss").exists():
+                self.shards[name] = LocalShard(root / name)
+            else:
+                self.missing.append(name)
+        if self.missing:
+            print(f"[WARNING] shards listed in {root / LAYOUT} but not built: {', '.join(self.missing)}")
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self.shards.values())
+
+    def _route_names(self, where: Optional[Dict[str, Any]]) -> List[str]:
+        if where and self.by == "hash" and where.get("policy_id") is not None:
+            return [shard_of(str(where["policy_id"]), "", self.n, "hash")]
+        return self.names
+
+    def route(self, where: Optional[Dict[str, Any]]) -> List[Any]:
+        """Shards that can hold matches for the filter."""
+        return [self.shards[n] for n in self._route_names(where) if n in self.shards]
+
+    @staticmethod
+    def _try(fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            print(f"[WARNING] shard call failed: {type(e).__name__}: {e}")
+            return None
+
+    def search(self, qv: np.ndarray, k: int, where: Optional[Dict[str, Any]] = None) -> List[Tuple[Hit, str, Dict[str, Any]]]:
+        """Exact top-k across the shards that answer -> [((score, shard, row), text, meta)]."""
+        down = [n for n in self._route_names(where) if n in self.missing]
+        targets = [s for s in self.route(where) if isinstance(s, RemoteShard) or len(s)]
+        if len(targets) == 1:
+            results = [self._try(targets[0].search, qv, k)]
+        else:
+            results = list(_executor().map(lambda s: self._try(s.search, qv, k), targets))
+        down += [s.name for s, hits in zip(targets, results) if hits is None]
+        top = merge_topk([hits for hits in results if hits], k)
+        rows: Dict[str, List[int]] = {}
+        for _, name, row in top:
+            rows.setdefault(name, []).append(row)
+        docs = {}
+        for name, rs in rows.items():
+            got = self._try(self.shards[name].fetch, rs)
+            if got is None:
+                down.append(name)
+            else:
+                docs[name] = dict(zip(rs, got))
+        if down:
+            degrade("shards", "partial", missing=sorted(set(down)))
+        return [(h, *docs[h[1]][h[2]]) for h in top if h[1] in docs]
+
+    def stats(self) -> Dict[str, Any]:
+        down = [n for n, s in self.shards.items() if isinstance(s, RemoteShard) and not s.up]
+        return {"by": self.by, "complete": not (self.missing or down), "missing": self.missing,
+                "unreachable": down,
+                "shards": {n: {"docs": len(s), "remote": isinstance(s, RemoteShard),
+                               **({"up": s.up, "error": s.error} if isinstance(s, RemoteShard) else {})}
+                           for n, s in self.shards.items()}}
@@ -1,15 +1,32 @@
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from io import BytesIO
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from reportlab.lib.pagesizes import LETTER
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
 
-def _kv_table(data: Dict[str, Any], col1="Field", col2="Value"):
-    rows = [[col1, col2]] + [[str(k), str(v)] for k, v in data.items()]
-    t = Table(rows, hAlign="LEFT")
-    t.setStyle(TableStyle([
+import multiprocessing as mp
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(os.cpu_count() or 1)))
+REPORT_START_METHOD = os.getenv("REPORT_START_METHOD", "spawn")
+
+# Styles and table styles are built once per process instead of on every
+# packet. The doc template is not: build() appends its page templates to the
+# instance, so a reused template grows by two on every packet.
+@lru_cache(maxsize=None)
+def _styles():
+    s = getSampleStyleSheet()
+    return s["Heading1"], s["Heading2"], s["Heading3"], s["BodyText"]
+
+@lru_cache(maxsize=None)
+def _table_styles():
+    kv = TableStyle([
         ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#f0f0f0")),
         ("TEXTCOLOR", (0,0), (-1,0), colors.HexColor("#333333")),
         ("BOX", (0,0), (-1,-1), 0.25, colors.black),
@@ -19,22 +36,35 @@ def _kv_table(data: Dict[str, Any], col1="Field", col2="Value"):
         ("VALIGN", (0,0), (-1,-1), "TOP"),
         ("LEFTPADDING", (0,0), (-1,-1), 6),
         ("RIGHTPADDING", (0,0), (-1,-1), 6),
-    ]))
+    ])
+    listing = TableStyle([
+        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#f0f0f0")),
+        ("BOX", (0,0), (-1,-1), 0.25, colors.black),
+        ("GRID", (0,0), (-1,-1), 0.25, colors.HexColor("#cccccc")),
+        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+    ])
+    return kv, listing
+
+def _doc(buf: BytesIO) -> SimpleDocTemplate:
+    return SimpleDocTemplate(buf, pagesize=LETTER, leftMargin=54, rightMargin=54, topMargin=54, bottomMargin=54)
+
+def _kv_table(data: Dict[str, Any], col1="Field", col2="Value"):
+    rows = [[col1, col2]] + [[str(k), str(v)] for k, v in data.items()]
+    t = Table(rows, hAlign="LEFT")
+    t.setStyle(_table_styles()[0])
     return t
 
 def build_claim_packet_pdf(payload: Dict[str, Any],
                            coverage: Dict[str, Any],
-                           risk: Dict[str, Any]) -> bytes:
+                           risk: Dict[str, Any],
+                           generated_at: Optional[datetime] = None) -> bytes:
     buf = BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=LETTER,
-                            leftMargin=54, rightMargin=54, topMargin=54, bottomMargin=54)
-    styles = getSampleStyleSheet()
-    H1, H2, H3 = styles["Heading1"], styles["Heading2"], styles["Heading3"]
-    Body = styles["BodyText"]
+    doc = _doc(buf)
+    H1, H2, H3, Body = _styles()
 
     story = []
     story.append(Paragraph("ClaimSight AI — Case Packet", H1))
-    story.append(Paragraph(datetime.utcnow().strftime("Generated: %Y-%m-%d %H:%M UTC"), Body))
+    story.append(Paragraph((generated_at or datetime.utcnow()).strftime("Generated: %Y-%m-%d %H:%M UTC"), Body))
     story.append(Spacer(1, 14))
 
     story.append(Paragraph("Claim Summary", H2))
@@ -62,12 +92,7 @@ def build_claim_packet_pdf(payload: Dict[str, Any],
     if endos:
         rows = [["Code", "Description"]] + [[e.get("code",""), e.get("desc","")] for e in endos]
         t = Table(rows, hAlign="LEFT")
-        t.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#f0f0f0")),
-            ("BOX", (0,0), (-1,-1), 0.25, colors.black),
-            ("GRID", (0,0), (-1,-1), 0.25, colors.HexColor("#cccccc")),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ]))
+        t.setStyle(_table_styles()[1])
         story.append(t)
     else:
         story.append(Paragraph("None.", Body))
@@ -78,12 +103,7 @@ def build_claim_packet_pdf(payload: Dict[str, Any],
     if cites:
         rows = [["Citation"]] + [[c] for c in cites]
         t = Table(rows, hAlign="LEFT")
-        t.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#f0f0f0")),
-            ("BOX", (0,0), (-1,-1), 0.25, colors.black),
-            ("GRID", (0,0), (-1,-1), 0.25, colors.HexColor("#cccccc")),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ]))
+        t.setStyle(_table_styles()[1])
         story.append(t)
     else:
         story.append(Paragraph("None.", Body))
@@ -101,3 +121,76 @@ def build_claim_packet_pdf(payload: Dict[str, Any],
     story.append(Paragraph("Disclaimer: Generated from synthetic data and demo logic for evaluation only.", Body))
     doc.build(story)
     return buf.getvalue()
+
+
+# ---------- batch rendering ----------
+def _init_worker():
+    _styles(); _table_styles()
+
+def render_packet(job: Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]) -> bytes:
+    payload, coverage, risk = job
+    return build_claim_packet_pdf(payload, coverage, risk)
+
+_exec, _exec_workers = None, 0
+_exec_lock = threading.Lock()
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    global _exec, _exec_workers
+    with _exec_lock:
+        if _exec is None or _exec_workers != workers:
+            if _exec is not None:
+                _exec.shutdown(wait=False)
+            _exec = ProcessPoolExecutor(workers, mp_context=mp.get_context(REPORT_START_METHOD),
+                                        initializer=_init_worker)
+            _exec_workers = workers
+        return _exec
+
+def render_packets(jobs: Iterable[Any], workers: int = REPORT_WORKERS) -> Iterator[Tuple[int, Any]]:
+    """
+    Render (payload, coverage, risk) jobs in a process pool, yielding
+    (index, pdf_bytes) in input order. A job that is an Exception (or whose
+    render fails) yields (index, exception). At most 2*workers packets are in
+    flight, so jobs can be a lazy generator over thousands of claims.
+    """
+    if workers <= 0:
+        for i, job in enumerate(jobs):
+            try:
+                yield i, job if isinstance(job, Exception) else render_packet(job)
+            except Exception as e:
+                yield i, e
+        return
+    ex, window, pending = _executor(workers), 2 * workers, []
+    def drain_one():
+        i, f = pending.pop(0)
+        try:
+            return i, f if isinstance(f, Exception) else f.result()
+        except Exception as e:
+            return i, e
+    for i, job in enumerate(jobs):
+        pending.append((i, job if isinstance(job, Exception) else ex.submit(render_packet, job)))
+        while len(pending) >= window:
+            yield drain_one()
+    while pending:
+        yield drain_one()
+
+class _ZipSink:
+    """Write-only, unseekable file object; zipfile then streams with data descriptors."""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+    def flush(self):
+        pass
+    def take(self) -> bytes:
+        out, self._chunks = b"".join(self._chunks), []
+        return out
+
+def stream_zip(entries: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk as (name, data) entries are produced."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:  # PDFs are already compressed
+        for name, data in entries:
+            zf.writestr(name, data)
+            yield sink.take()
+    yield sink.take()
@@ -1,78 +1,505 @@
 # services/snowflake_io.py
+import base64
+import hashlib
+import json
 import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
 import pandas as pd
-from typing import Optional, Dict, Any
 
-def _get_conn():
-    """Return a live Snowflake connection or None if not configured."""
+from .db_pool import ConnectionPool, get_pool, placeholder
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+
+LOAD_CHUNK_ROWS = int(os.getenv("SNOWFLAKE_LOAD_CHUNK_ROWS", "500000"))
+LOAD_COMPRESSION = os.getenv("SNOWFLAKE_LOAD_COMPRESSION", "snappy")
+QUERY_BATCH_ROWS = int(os.getenv("SNOWFLAKE_QUERY_BATCH_ROWS", "10000"))
+RESULT_CACHE_TTL = float(os.getenv("SNOWFLAKE_RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_ENTRIES = int(os.getenv("SNOWFLAKE_RESULT_CACHE_ENTRIES", "32"))
+RESULT_CACHE_MB = float(os.getenv("SNOWFLAKE_RESULT_CACHE_MB", "256"))
+# paged results are spilled here once and read back page by page (see query_page)
+SPILL_DIR = Path(os.getenv("SNOWFLAKE_RESULT_SPILL_DIR", "") or Path(tempfile.gettempdir()) / "claimsight-results")
+SPILL_TTL = float(os.getenv("SNOWFLAKE_RESULT_SPILL_TTL", "3600"))
+
+
+def snowflake_type(dtype) -> str:
+    """Snowflake column type for a pandas dtype."""
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "NUMBER(38,0)"
+    if pd.api.types.is_float_dtype(dtype):
+        return "FLOAT"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP_NTZ"
+    return "VARCHAR"
+
+
+def _arrow_chunk(df: pd.DataFrame, schema: Optional["pa.Schema"] = None) -> "pa.Table":
+    """One chunk as Arrow; object columns become nullable strings so mixed cells don't fail."""
+    obj = [c for c in df.columns if df[c].dtype == object]
+    if obj:
+        df = df.assign(**{c: df[c].astype("string") for c in obj})
+    t = pa.Table.from_pandas(df, preserve_index=False)
+    return t.cast(schema) if schema is not None else t
+
+
+def _chunks(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], chunk_rows: int):
+    if isinstance(data, pd.DataFrame):
+        for i in range(0, len(data), chunk_rows):
+            yield data.iloc[i:i + chunk_rows]
+    else:
+        # coalesce small parts (e.g. dataset record batches) into chunk_rows-sized chunks
+        buf, n = [], 0
+        for part in data:
+            if isinstance(part, (pa.Table, pa.RecordBatch)):
+                part = part.to_pandas()
+            buf.append(part)
+            n += len(part)
+            if n >= chunk_rows:
+                yield pd.concat(buf, ignore_index=True)
+                buf, n = [], 0
+        if buf:
+            yield pd.concat(buf, ignore_index=True)
+
+
+def _create_sql(table: str, df: pd.DataFrame) -> str:
+    cols = ", ".join(f'"{c}" {snowflake_type(df[c].dtype)}' for c in df.columns)
+    return f'CREATE TABLE IF NOT EXISTS "{table}" ({cols})'
+
+
+def bulk_load(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], table: str,
+              chunk_rows: int = LOAD_CHUNK_ROWS, pool: Optional[ConnectionPool] = None) -> Dict[str, Any]:
+    """
+    Load a DataFrame (or an iterable of DataFrame/Arrow chunks) into `table`.
+
+    Each chunk is written as a compressed Parquet file; on Snowflake the files
+    are PUT to the table stage and loaded with a single COPY INTO, so only one
+    chunk is held in memory at a time. The table is created from the first
+    chunk's dtypes. Local stand-ins (SQL_STANDIN) load the same Parquet files:
+    duckdb through read_parquet, anything else through executemany of the
+    typed rows.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    pool = pool or get_pool()
+    if pool is None:
+        n = len(data) if isinstance(data, pd.DataFrame) else None
+        return {"status": "skipped (no snowflake creds)", "table": table, "rows": n}
+
+    t0 = time.perf_counter()
+    tmp = Path(tempfile.mkdtemp(prefix="sf_load_"))
+    prefix = f"load_{uuid.uuid4().hex[:12]}"
+    stage = f'@%"{table}"/{prefix}/'
+    rows = chunks = nbytes = 0
+    schema = None
     try:
-        import snowflake.connector  # type: ignore
-    except Exception:
-        return None
-
-    env = {
-        "user": os.getenv("SNOWFLAKE_USER"),
-        "password": os.getenv("SNOWFLAKE_PASSWORD"),
-        "account": os.getenv("SNOWFLAKE_ACCOUNT"),
-        "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE"),
-        "database": os.getenv("SNOWFLAKE_DATABASE"),
-        "schema": os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC"),
-    }
-    if not all(env.values()):
-        return None
-
-    return snowflake.connector.connect(
-        user=env["user"],
-        password=env["password"],
-        account=env["account"],
-        warehouse=env["warehouse"],
-        database=env["database"],
-        schema=env["schema"],
-    )
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                for df in _chunks(data, max(1, chunk_rows)):
+                    if not len(df):
+                        continue
+                    if schema is None:
+                        cur.execute(_create_sql(table, df))
+                    t = _arrow_chunk(df, schema)
+                    schema = schema or t.schema
+                    f = tmp / f"{prefix}_{chunks:05d}.parquet"
+                    pq.write_table(t, f, compression=LOAD_COMPRESSION)
+                    nbytes += f.stat().st_size
+                    _load_file(cur, pool, table, f, t)
+                    f.unlink()
+                    rows += t.num_rows
+                    chunks += 1
+                    del t
+                if chunks and pool.name == "snowflake":
+                    cur.execute(f'COPY INTO "{table}" FROM {stage} FILE_FORMAT = (TYPE = PARQUET) '
+                                f'MATCH_BY_COLUMN_NAME = CASE_SENSITIVE PURGE = TRUE')
+                conn.commit()
+            finally:
+                cur.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        RESULT_CACHE.clear()  # cached reads may now be stale
+    secs = time.perf_counter() - t0
+    return {"status": "ok", "table": table, "rows": rows, "chunks": chunks,
+            "parquet_bytes": nbytes, "seconds": round(secs, 3),
+            "rows_per_s": round(rows / secs, 1) if secs > 0 else None}
+
+
+def _load_file(cur, pool: ConnectionPool, table: str, f: Path, t: "pa.Table") -> None:
+    """Stage (Snowflake) or load (stand-in) one Parquet chunk."""
+    if pool.name == "snowflake":
+        prefix = f.name.rsplit("_", 1)[0]
+        cur.execute(f"PUT 'file://{f.as_posix()}' @%\"{table}\"/{prefix}/ "
+                    f"AUTO_COMPRESS = FALSE OVERWRITE = TRUE")
+        return
+    if pool.name == "duckdb":
+        cur.execute(f'INSERT INTO "{table}" SELECT * FROM read_parquet(?)', [str(f)])
+        return
+    t = pq.read_table(f)
+    cols = [c.cast(pa.string()) if pa.types.is_temporal(c.type) else c for c in t.columns]
+    marks = ", ".join([placeholder(pool)] * t.num_columns)
+    cur.executemany(f'INSERT INTO "{table}" VALUES ({marks})', zip(*(c.to_pylist() for c in cols)))
+
 
 def df_to_snowflake(df: pd.DataFrame, table: str) -> Dict[str, Any]:
     """
-    Create table if needed and insert rows. If Snowflake isn't configured,
+    Create table if needed and bulk load rows. If Snowflake isn't configured,
     return a skip status (so the API still runs in demos).
     """
-    conn = _get_conn()
-    if conn is None:
-        return {"status": "skipped (no snowflake creds)", "table": table, "rows": len(df)}
+    return bulk_load(df, table)
 
-    cols_def = ", ".join([f'"{c}" STRING' for c in df.columns])
-    create_sql = f'CREATE TABLE IF NOT EXISTS "{table}" ({cols_def})'
+# ---------- streaming queries ----------
+_WS = re.compile(r"\s+")
+_READ_ONLY = ("select", "with", "show", "describe", "desc", "explain")
 
-    # Prepare rows as tuples of strings
-    rows = [tuple("" if pd.isna(v) else str(v) for v in rec) for rec in df.to_numpy()]
 
-    placeholders = ", ".join(["%s"] * len(df.columns))
-    insert_sql = f'INSERT INTO "{table}" VALUES ({placeholders})'
+def normalize_sql(sql: str) -> str:
+    """Cache key form: collapsed whitespace, no trailing semicolon."""
+    return _WS.sub(" ", sql).strip().rstrip(";").strip()
 
-    cur = conn.cursor()
+
+def is_read_only(sql: str) -> bool:
+    head = normalize_sql(sql).split(" ", 1)[0].lower()
+    return head in _READ_ONLY
+
+
+class ResultCache:
+    """Bounded LRU of query results (Arrow tables) with a TTL and a total byte cap."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES, max_mb: float = RESULT_CACHE_MB,
+                 ttl: float = RESULT_CACHE_TTL):
+        self.max_entries, self.max_bytes, self.ttl = max_entries, int(max_mb * 2**20), ttl
+        self._d: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            hit = self._d.get(key)
+            if hit is not None and time.monotonic() - hit[0] <= self.ttl:
+                self._d.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            if hit is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, table) -> None:
+        if self.ttl <= 0 or table.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._d:
+                self._drop(key)
+            self._d[key] = (time.monotonic(), table)
+            self._bytes += table.nbytes
+            while self._d and (len(self._d) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._d)))
+
+    def _drop(self, key: str) -> None:
+        _, t = self._d.pop(key)
+        self._bytes -= t.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._d.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._d), "mb": round(self._bytes / 2**20, 2),
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+RESULT_CACHE = ResultCache()
+
+
+def _promote(a: "pa.DataType", b: "pa.DataType") -> "pa.DataType":
+    """Narrowest type both a and b cast to losslessly: null gives way, numbers widen, anything else is a string."""
+    if a == b or pa.types.is_null(b):
+        return a
+    if pa.types.is_null(a):
+        return b
+    numeric = (pa.types.is_integer, pa.types.is_floating, pa.types.is_decimal)
+    if any(f(a) for f in numeric) and any(f(b) for f in numeric):
+        return pa.int64() if pa.types.is_integer(a) and pa.types.is_integer(b) else pa.float64()
+    return pa.string()
+
+
+def _unify(a: "pa.Schema", b: "pa.Schema") -> "pa.Schema":
+    """Column-wise _promote of two schemas of the same result."""
+    return pa.schema([pa.field(f.name, _promote(f.type, g.type)) for f, g in zip(a, b)])
+
+
+def _infer(values: Sequence[Any]) -> "pa.Array":
+    """One column of one fetched batch, typed from its own values (mixed types become strings)."""
     try:
-        cur.execute(create_sql)
-        if rows:
-            cur.executemany(insert_sql, rows)
-        conn.commit()
-        return {"status": "ok", "table": table, "rows": len(rows)}
-    finally:
-        cur.close()
-        conn.close()
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def _cast(a: "pa.Array", t: "pa.DataType") -> "pa.Array":
+    """Safe cast (raises instead of truncating); anything can still be spelled as a string."""
+    if a.type == t:
+        return a
+    try:
+        return a.cast(t, safe=True)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        if not pa.types.is_string(t):
+            raise
+        return pa.array([None if v is None else str(v) for v in a.to_pylist()], pa.string())
+
+
+def _table(batches: Sequence["pa.RecordBatch"]) -> "pa.Table":
+    """Batches of one result as a table; earlier batches are widened to the last (widest) schema."""
+    schema = batches[-1].schema
+    return pa.Table.from_batches([b if b.schema == schema else
+                                  pa.RecordBatch.from_arrays([_cast(c, f.type) for c, f in zip(b.columns, schema)],
+                                                             schema=schema)
+                                  for b in batches], schema=schema)
+
+
+def _fetch_batches(cur, batch_rows: int) -> Iterator["pa.RecordBatch"]:
+    """
+    Arrow batches from a cursor: native on Snowflake, fetchmany elsewhere.
+
+    DB-API rows carry no column types, so each batch is typed from its own
+    values and the result's schema is widened as batches arrive (a column
+    that was all NULL takes the first real type; int and float give float;
+    any other mix gives string). Values are cast with safe=True, so nothing
+    is silently truncated; a batch may therefore come with a wider schema
+    than the batches before it (see _table / _unify).
+    """
+    native = getattr(cur, "fetch_arrow_batches", None)
+    if native is not None:
+        for t in native():
+            yield from t.to_batches()
+        return
+    cols = [c[0] for c in cur.description] if cur.description else []
+    schema = None
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            break
+        arrays = [_infer(d) for d in zip(*rows)]
+        got = pa.schema([pa.field(n, a.type) for n, a in zip(cols, arrays)])
+        schema = got if schema is None else _unify(schema, got)
+        yield pa.RecordBatch.from_arrays([_cast(a, f.type) for a, f in zip(arrays, schema)], schema=schema)
+    if schema is None:
+        yield pa.RecordBatch.from_arrays([pa.array([], pa.string()) for _ in cols], names=cols)
+
+
+def query_batches(sql: str, batch_rows: int = QUERY_BATCH_ROWS,
+                  use_cache: bool = True) -> Iterator["pa.RecordBatch"]:
+    """
+    Stream a query's result as Arrow record batches.
+
+    Read-only queries are served from / stored in RESULT_CACHE (keyed by the
+    normalized SQL) as long as the result fits under the cache's byte cap;
+    larger results are streamed straight from the cursor and never held whole.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    pool = get_pool()
+    if pool is None:
+        return
+    key = normalize_sql(sql)
+    cacheable = use_cache and is_read_only(sql)
+    if cacheable:
+        hit = RESULT_CACHE.get(key)
+        if hit is not None:
+            yield from hit.to_batches(max_chunksize=batch_rows) or [pa.RecordBatch.from_pylist([], schema=hit.schema)]
+            return
+    kept, size = ([] if cacheable else None), 0
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            for b in _fetch_batches(cur, batch_rows):
+                if kept is not None:
+                    size += b.nbytes
+                    if size <= RESULT_CACHE.max_bytes:
+                        kept.append(b)
+                    else:
+                        kept = None  # too big to cache; keep streaming
+                yield b
+        finally:
+            cur.close()
+    if kept:
+        RESULT_CACHE.put(key, _table(kept))
+
+
+class ResultExpired(LookupError):
+    """A paging cursor points at a spilled result that has been swept (or never existed here)."""
+
+
+def _spill_path(result_id: str) -> Path:
+    if not re.fullmatch(r"[0-9a-f]{32}", result_id or ""):
+        raise ResultExpired("Unknown result")
+    return SPILL_DIR / f"{result_id}.parquet"
+
+
+def _sweep_spills(now: float) -> None:
+    for f in SPILL_DIR.glob("*.parquet"):
+        try:
+            if now - f.stat().st_mtime > SPILL_TTL:
+                f.unlink()
+        except OSError:
+            pass
+
+
+class _SpillWriter:
+    """Parquet file fed batch by batch (one row group each); widens the file's schema if a batch needs it."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        self._w = None
+        self.rows = 0
+
+    def write(self, b: "pa.RecordBatch") -> None:
+        if self._w is not None:
+            target = _unify(self._w.schema, b.schema)
+            if target != self._w.schema:
+                self._rewrite(target)
+        if self._w is None:
+            self._w = pq.ParquetWriter(self.tmp, b.schema)
+        self._w.write_batch(b.cast(self._w.schema) if b.schema != self._w.schema else b)
+        self.rows += b.num_rows
+
+    def _rewrite(self, schema: "pa.Schema") -> None:
+        # widening only happens a bounded number of times per column; copied one row group at a time
+        self._w.close()
+        old, self.tmp = self.tmp, self.tmp.with_name(self.tmp.name + "w")
+        src = pq.ParquetFile(old)
+        self._w = pq.ParquetWriter(self.tmp, schema)
+        for i in range(src.metadata.num_row_groups):
+            self._w.write_table(src.read_row_group(i).cast(schema))
+        old.unlink()
+
+    def close(self) -> None:
+        if self._w is not None:
+            self._w.close()
+            os.replace(self.tmp, self.path)
+
+    def abort(self) -> None:
+        if self._w is not None:
+            self._w.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+def _read_page(path: Path, offset: int, limit: int) -> Tuple["pa.Table", int]:
+    """Rows [offset, offset+limit) of a spilled result (reading only the row groups they span) and its total rows."""
+    f = pq.ParquetFile(path)
+    md = f.metadata
+    groups, start, skip = [], 0, 0
+    for i in range(md.num_row_groups):
+        n = md.row_group(i).num_rows
+        if start + n > offset and start < offset + limit:
+            if not groups:
+                skip = offset - start
+            groups.append(i)
+        start += n
+    t = f.read_row_groups(groups) if groups else f.schema_arrow.empty_table()
+    return t.slice(skip, limit), md.num_rows
+
+
+def query_page(sql: str, offset: int = 0, limit: int = 1000,
+               result_id: Optional[str] = None) -> Tuple["pa.Table", Optional[int], Optional[str]]:
+    """
+    Rows [offset, offset+limit) of a query, the next offset (None when
+    exhausted) and the id of the persisted result later pages read from.
+
+    Without a result_id the query runs once and its whole result is spilled,
+    batch by batch, to a Parquet file under SPILL_DIR; later pages pass the
+    id back and read only the row groups they span. Pages never re-run the
+    query and offsets refer to one fixed snapshot, so they stay stable
+    without an ORDER BY. A result that ends on the first page is not kept.
+    Spills are shared by every worker on the host and swept SPILL_TTL
+    seconds after their last read. Raises ResultExpired for a swept id.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    if result_id is not None:
+        path = _spill_path(result_id)
+        try:
+            table, total = _read_page(path, offset, limit)
+            os.utime(path)
+        except FileNotFoundError:
+            raise ResultExpired("Result expired; start again without a cursor")
+        end = offset + table.num_rows
+        return table, (end if end < total else None), result_id
+
+    SPILL_DIR.mkdir(parents=True, exist_ok=True)
+    _sweep_spills(time.time())
+    result_id = uuid.uuid4().hex
+    spill = _SpillWriter(_spill_path(result_id))
+    schema = None
+    try:
+        for b in query_batches(sql):
+            schema = b.schema
+            spill.write(b)
+        spill.close()
+    except BaseException:
+        spill.abort()
+        raise
+    if schema is None:
+        return pa.table({}), None, None
+    path = spill.path
+    table, total = _read_page(path, offset, limit)
+    end = offset + table.num_rows
+    if end >= total:
+        path.unlink(missing_ok=True)
+        return table, None, None
+    return table, end, result_id
+
+
+def encode_cursor(sql: str, offset: int, result_id: Optional[str] = None) -> str:
+    h = hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+    d = {"h": h, "o": offset, **({"r": result_id} if result_id else {})}
+    return base64.urlsafe_b64encode(json.dumps(d).encode()).decode().rstrip("=")
+
+
+def decode_cursor(sql: str, cursor: Optional[str]) -> Tuple[int, Optional[str]]:
+    """(offset, result id) from a pagination cursor; raises ValueError if it belongs to another query."""
+    if not cursor:
+        return 0, None
+    try:
+        d = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        h, o, r = d["h"], int(d["o"]), d.get("r")
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if h != hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12] or o < 0:
+        raise ValueError("Cursor does not match this query")
+    if r is not None and not re.fullmatch(r"[0-9a-f]{32}", str(r)):
+        raise ValueError("Malformed cursor")
+    return o, r
+
 
 def snowflake_query(sql: str) -> pd.DataFrame:
     """
     Run a SELECT and return a DataFrame. If not configured, return empty df.
+    Prefer query_batches()/query_page() for large results.
     """
-    conn = _get_conn()
-    if conn is None:
+    if get_pool() is None:
         return pd.DataFrame()
-
-    cur = conn.cursor()
-    try:
-        cur.execute(sql)
-        cols = [c[0] for c in cur.description] if cur.description else []
-        data = cur.fetchall()
-        return pd.DataFrame(data, columns=cols)
-    finally:
-        cur.close()
-        conn.close()
+    batches = list(query_batches(sql))
+    return _table(batches).to_pandas() if batches else pd.DataFrame()
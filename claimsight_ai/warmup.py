@@ -0,0 +1,113 @@
+# claimsight_ai/warmup.py
+"""
+Background warm-up for the API process.
+
+Loading the policy index, the MiniLM embedder, the cross-encoder reranker,
+the XGB model + SHAP explainer and the Presidio engines takes tens of
+seconds, and none of it is needed to answer a liveness probe. Startup only
+schedules these steps here; they run in parallel threads (most of the time
+is spent in native code or on disk) while the server is already accepting
+connections. Steps can depend on others (dummy inference after model load).
+/readyz reports ready once every step has finished, with a per-step timing
+breakdown; a failed step is reported but does not block readiness, since
+every component has a degraded fallback.
+"""
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence
+
+WARMUP = os.getenv("WARMUP", "1") != "0"
+WARMUP_THREADS = int(os.getenv("WARMUP_THREADS", "4"))
+
+PROCESS_T0 = time.perf_counter()  # as close to process start as the API import gets
+
+
+class Skip(Exception):
+    """Raised by a step whose component is not installed/configured."""
+
+
+class Warmup:
+    def __init__(self, threads: int = WARMUP_THREADS):
+        self.threads = max(1, threads)
+        self._steps: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], Any], after: Sequence[str] = ()) -> None:
+        self._steps[name] = {"fn": fn, "after": list(after), "status": "pending",
+                             "event": threading.Event()}
+
+    def _run(self, name: str) -> None:
+        step = self._steps[name]
+        for dep in step["after"]:
+            self._steps[dep]["event"].wait()
+        t0 = time.perf_counter()
+        with self._lock:
+            step.update(status="running", start_s=round(t0 - PROCESS_T0, 3))
+        try:
+            detail = step["fn"]()
+            status, err = "ok", None
+        except Skip as e:
+            status, err, detail = "skipped", str(e), None
+        except Exception as e:
+            status, err, detail = "failed", f"{type(e).__name__}: {e}", None
+            traceback.print_exc()
+        with self._lock:
+            step.update(status=status, seconds=round(time.perf_counter() - t0, 3))
+            if err:
+                step["error"] = err
+            if detail is not None:
+                step["detail"] = detail
+        step["event"].set()
+
+    def start(self) -> "Warmup":
+        """Run all steps in the background; returns immediately."""
+        self._started = time.perf_counter()
+        names = list(self._steps)
+        if not names:
+            self._finish()
+            return self
+        pool = ThreadPoolExecutor(min(self.threads, len(names)), thread_name_prefix="warmup")
+        # dependents wait on their deps inside a thread, so submit deps first
+        order = sorted(names, key=lambda n: len(self._steps[n]["after"]))
+        futs = [pool.submit(self._run, n) for n in order]
+
+        def watch():
+            for f in futs:
+                f.result()
+            pool.shutdown(wait=False)
+            self._finish()
+            r = self.report()
+            print(f"[INFO] warm-up finished in {r['warmup_s']}s: "
+                  + ", ".join(f"{n}={s['status']} {s.get('seconds', 0)}s" for n, s in r["steps"].items()))
+
+        threading.Thread(target=watch, name="warmup-watch", daemon=True).start()
+        return self
+
+    def _finish(self) -> None:
+        self._finished = time.perf_counter()
+        self._done.set()
+
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = {n: {k: v for k, v in s.items() if k not in ("fn", "event", "after")}
+                     for n, s in self._steps.items()}
+        return {
+            "ready": self.ready(),
+            "warmup_started_s": round(self._started - PROCESS_T0, 3) if self._started else None,
+            "warmup_s": round((self._finished or time.perf_counter()) - self._started, 3) if self._started else None,
+            "time_to_ready_s": round(self._finished - PROCESS_T0, 3) if self._finished else None,
+            "failed": [n for n, s in steps.items() if s["status"] == "failed"],
+            "steps": steps,
+        }
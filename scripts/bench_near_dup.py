@@ -0,0 +1,62 @@
+"""
+Query latency of the MinHash/LSH near-duplicate index at scale.
+
+Background claims are random signatures (unrelated text), so building 10M
+rows doesn't need 10M notes; the query set is real text with planted
+near-duplicates so the hit path is exercised too.
+
+    python scripts/bench_near_dup.py --claims 10000000 --queries 2000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from claimsight_ai.near_dup import NearDupIndex
+
+TEMPLATES = [
+    "Rear-ended at the intersection of {a} and {b}; bumper, trunk and tail lights damaged. Other driver left.",
+    "Water came up through the basement floor drain during heavy rain on {a}, carpet and drywall ruined.",
+    "Kitchen fire started at the stove at {a} {b}, smoke damage through first floor, fire dept responded.",
+    "Vehicle stolen from driveway overnight at {a}, keys were inside, police report filed with {b} precinct.",
+]
+STREETS = ["Main", "Elm", "Oak", "Pine", "Maple", "Cedar", "Lake", "Hill", "Park", "Ridge"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--claims", type=int, default=10_000_000)
+    ap.add_argument("--queries", type=int, default=1000)
+    ap.add_argument("--batch", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(7)
+    idx = NearDupIndex()
+    t0 = time.perf_counter()
+    for start in range(0, args.claims, args.batch):
+        n = min(args.batch, args.claims - start)
+        sigs = rng.integers(0, 2**32, size=(n, idx.num_perm), dtype=np.uint32)
+        idx.add_signatures([f"BG{start + i}" for i in range(n)], sigs)
+    build = time.perf_counter() - t0
+
+    random.seed(7)
+    texts = [random.choice(TEMPLATES).format(a=random.choice(STREETS), b=random.choice(STREETS))
+             + f" Ref {i}" for i in range(args.queries)]
+    for i, t in enumerate(texts):
+        idx.add(f"Q{i}", t)
+    probes = [t.replace("damaged", "dmg").replace(" the ", " ") for t in texts]
+
+    lat, hits = [], 0
+    for p in probes:
+        s = time.perf_counter()
+        hits += bool(idx.query(p))
+        lat.append(time.perf_counter() - s)
+    lat = np.array(lat) * 1e3
+    print(f"indexed {len(idx):,} claims in {build:.1f}s ({idx.stats()['signature_mb']} MB signatures)")
+    print(f"query ms p50={np.percentile(lat, 50):.3f} p95={np.percentile(lat, 95):.3f} "
+          f"p99={np.percentile(lat, 99):.3f}; hit rate {hits / len(probes):.2%}")
+
+
+if __name__ == "__main__":
+    main()
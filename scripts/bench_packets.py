@@ -0,0 +1,54 @@
+"""
+Claim-packet rendering throughput (packets/s), serial vs. the report process pool.
+
+Coverage and risk are fixed dicts so only PDF rendering is measured; the
+projection line shows how long a month-end run of --project packets takes.
+
+    python scripts/bench_packets.py --packets 2000 --workers 1,2,4
+"""
+import argparse
+import os
+import random
+import time
+
+from claimsight_ai.report import build_claim_packet_pdf, render_packets
+
+COVERAGE = {"coverage": "yes", "rationale": "Perils include fire/lightning/wind/hail.",
+            "citations": ["P1 – Section I Perils", "P1 – Endorsements"],
+            "endorsements": [{"code": "WTR-BKP", "desc": "Water backup, $10k sublimit"}]}
+
+
+def jobs(n, rng):
+    for i in range(n):
+        claim = {"claim_id": f"C{i:07d}", "policy_id": f"P{rng.randint(1, 5000)}",
+                 "loss_type": rng.choice(["fire", "water", "theft", "collision"]),
+                 "amount": round(rng.uniform(500, 60000), 2), "zip": f"{rng.randint(10000, 99999)}",
+                 "notes": "Insured reports damage to kitchen and living room. " * rng.randint(1, 6)}
+        risk = {"score": round(rng.random(), 3), "reasons": ["High prior claim count"],
+                "top_features": ["amount", "claimant_history_count"]}
+        yield claim, COVERAGE, risk
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--packets", type=int, default=1000)
+    ap.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, os.cpu_count() or 1})))
+    ap.add_argument("--project", type=int, default=10000)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    for job in jobs(args.packets, random.Random(1)):
+        build_claim_packet_pdf(*job)
+    serial = args.packets / (time.perf_counter() - t0)
+    print(f"serial        {serial:8.1f} packets/s  ({args.project / serial / 60:5.1f} min for {args.project})")
+
+    for w in [int(x) for x in args.workers.split(",")]:
+        list(render_packets(jobs(2 * w, random.Random(0)), workers=w))  # spin up + warm the pool
+        t0 = time.perf_counter()
+        n = sum(1 for _ in render_packets(jobs(args.packets, random.Random(1)), workers=w))
+        rate = n / (time.perf_counter() - t0)
+        print(f"workers={w:<4d} {rate:8.1f} packets/s  ({args.project / rate / 60:5.1f} min for {args.project})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput of tiered PII masking vs. one full Presidio pass per string.
+
+The corpus mirrors what the API masks: upload filenames (/triage/docs),
+short adjuster notes, and long multi-page OCR output. Every output is
+compared with the baseline, so a speedup that changes masking shows up as
+mismatches.
+
+    python scripts/bench_pii.py --docs 2000 --out pii_run.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+
+from claimsight_ai.ocr import pii
+
+FILENAMES = ["invoice_scan.pdf", "estimate_final.pdf", "photo_rear_bumper.jpg", "police_report.pdf",
+             "claim_CLM-{n}_estimate.pdf", "receipt-{n}.png", "repair_invoice_pol-{n}.pdf"]
+NOTES = ["water damage in basement after storm", "customer called about rental car",
+         "John Miller called from 614-555-{n4} about his claim", "left voicemail, awaiting photos",
+         "SSN on file 123-45-{n4}, email jmiller{n}@example.com", "tow to body shop, estimate pending",
+         "estimate for pol-{n} and 1HGCM82633A004352", "supplement on clm-000{n}"]
+PAGE = ("Insured: Maria Lopez, 42 Elm Street, Columbus OH. Policy POL-{n}. Date of loss March 3. "
+        "Vehicle VIN 1HGCM82633A004352 struck in rear at Main and Oak. Contact 614-555-{n4}. ")
+
+
+def corpus(n, long_pages, rng):
+    out = []
+    for i in range(n):
+        r = rng.random()
+        fill = {"n": rng.randint(1000, 999999), "n4": f"{rng.randint(0, 9999):04d}"}
+        if r < 0.5:
+            out.append(rng.choice(FILENAMES).format(**fill))
+        elif r < 0.95:
+            out.append(rng.choice(NOTES).format(**fill))
+        else:
+            out.append(" ".join(PAGE.format(**fill) for _ in range(long_pages)))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=2000)
+    ap.add_argument("--long-pages", type=int, default=60, help="sentences per long OCR document")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", type=Path, help="also write the run (throughput and mismatches) here as JSON")
+    args = ap.parse_args()
+    if pii.engine() is None:
+        sys.exit("presidio-analyzer / presidio-anonymizer are not installed; nothing to benchmark")
+
+    docs = corpus(args.docs, args.long_pages, random.Random(args.seed))
+    chars = sum(map(len, docs))
+
+    t0 = time.perf_counter()
+    base = [pii._full(d) for d in docs]
+    t_base = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fast = [pii.mask_pii(d) for d in docs]
+    t_fast = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = pii.mask_pii_batch(docs)
+    t_batch = time.perf_counter() - t0
+
+    skipped = sum(not pii.needs_analysis(d) for d in docs)
+    print(f"docs={len(docs)} chars={chars} fast_path_skips={skipped}")
+    run = {"meta": {"engine": pii.engine(), "python": platform.python_version(), "docs": len(docs),
+                    "chars": chars, "long_pages": args.long_pages, "seed": args.seed,
+                    "window_chars": pii.WINDOW_CHARS, "window_overlap": pii.WINDOW_OVERLAP,
+                    "fast_path_skips": skipped, "created": time.strftime("%Y-%m-%dT%H:%M:%S")}}
+    for name, secs, out in (("baseline", t_base, base), ("tiered", t_fast, fast), ("tiered_batch", t_batch, batch)):
+        bad = sum(a != b for a, b in zip(out, base))
+        print(f"{name:13s} {len(docs) / secs:9.1f} docs/s  {chars / secs / 1e3:8.1f} kchar/s  "
+              f"speedup={t_base / secs:5.2f}x  mismatches={bad}")
+        run[name] = {"docs_per_s": round(len(docs) / secs, 1), "speedup": round(t_base / secs, 2), "mismatches": bad}
+    if args.out:
+        args.out.write_text(json.dumps(run, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Offline benchmark + load-test suite with JSON baselines.
+
+Runs against synthetic data in a temporary APP_HOME (no network, no
+Snowflake; models only if their artifacts are already cached locally, with
+HF_HUB_OFFLINE=1). Two parts:
+
+  micro  hot functions timed in a loop (median of repeats): us/op, ops/s
+  load   endpoints driven in-process through the ASGI app with N concurrent
+         clients: requests/s and p50/p95/p99 latency per endpoint
+
+Results are written as JSON and compared with a baseline: a latency that grew,
+or a throughput that dropped, by more than --threshold (default 15%, and by
+more than a small absolute floor) is a regression and the exit code is 1.
+
+    python scripts/bench_suite.py                              # run + compare
+    python scripts/bench_suite.py --save-baseline              # refresh baseline
+    python scripts/bench_suite.py --only fraud --threshold 0.25 --quick
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional
+
+REPO = Path(__file__).resolve().parents[1]
+BASELINE = REPO / "scripts" / "baselines" / "bench_suite.json"
+LOWER_IS_BETTER = ("us_per_op", "p50_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = ("ops_per_s", "rps")
+BATCH = {"fraud_bulk_score_100"}  # 100 claims per request
+ABS_FLOOR = {"us_per_op": 1.0, "p50_ms": 0.2, "p95_ms": 0.5, "p99_ms": 1.0}  # ignore tiny absolute moves
+RETRIEVER_BOUND = {"rag_search", "claims_coverage"}  # only time FAISS/encode/rerank with the real retriever
+
+LOSS_TYPES = ["fire", "water", "theft", "collision", "wind"]
+NOTES = [
+    "Kitchen fire started at the stove, smoke damage through the first floor.",
+    "Water came up through the basement floor drain during heavy rain.",
+    "Vehicle stolen from driveway overnight, police report filed.",
+    "Rear-ended at the intersection; bumper and tail lights damaged.",
+    "Hail damage to roof shingles and gutters after the storm.",
+]
+
+
+def _offline_env(home: Path) -> None:
+    for k, v in {"APP_HOME": str(home), "DATA_DIR": str(home / "data"), "MODELS_DIR": str(home / "models"),
+                 "VECTOR_DIR": str(home / "vectorstore"), "OCR_WORKERS": "0", "REPORT_WORKERS": "0",
+                 "PACKET_CACHE_MB": "0", "OCR_CACHE_MB": "0", "HF_HUB_OFFLINE": "1",
+                 "TRANSFORMERS_OFFLINE": "1", "SQL_STANDIN": "",
+                 "ADMISSION": "0"}.items():  # measure handler capacity, not load shedding
+        os.environ.setdefault(k, v)
+    (home / "data").mkdir(parents=True, exist_ok=True)
+
+
+# ---------- synthetic inputs ----------
+def claim(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {"claim_id": f"B{i:07d}", "policy_id": f"P{rng.randint(1, 500)}",
+            "provider_id": f"PRV{rng.randint(1, 200)}", "loss_type": rng.choice(LOSS_TYPES),
+            "amount": round(rng.uniform(200, 60000), 2), "claimant_history_count": rng.randint(0, 5),
+            "notes": f"{rng.choice(NOTES)} Ref {rng.randint(1000, 9999)}."}
+
+
+def fraud_claim(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {"claim_id": f"F{i:07d}", "line_of_business": rng.choice(["Auto", "Home"]),
+            "state": rng.choice(["OH", "TX", "CA"]), "late_report_days": rng.randint(0, 60),
+            "claim_amount": round(rng.uniform(200, 60000), 2), "paid_to_date": 0.0, "reserve": 1000.0,
+            "claimant_age": rng.randint(18, 90), "injury_severity": rng.choice(["None", "Minor", "Major"]),
+            "police_report": rng.randint(0, 1), "prior_claims_count": rng.randint(0, 5),
+            "provider_id": f"PRV{rng.randint(1, 200)}", "repair_shop_id": f"SHOP{rng.randint(1, 50)}",
+            "notes": rng.choice(NOTES)}
+
+
+# ---------- micro ----------
+def bench(fn: Callable[[], Any], min_time: float, repeats: int) -> Dict[str, float]:
+    fn()  # warm
+    n, t = 1, 0.0
+    while True:  # calibrate loop count to ~min_time / repeats
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        t = time.perf_counter() - t0
+        if t >= min_time / repeats or n >= 1 << 20:
+            break
+        n *= 2
+    runs = [t / n]
+    for _ in range(repeats - 1):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        runs.append((time.perf_counter() - t0) / n)
+    per = median(runs)
+    return {"us_per_op": round(per * 1e6, 2), "ops_per_s": round(1 / per, 1), "loops": n}
+
+
+def micro_suite(rng: random.Random) -> Dict[str, Callable[[], Any]]:
+    import pandas as pd
+
+    import claimsight_ai.api.main as api
+    from app.extensions.fraud.router import RINGS
+    from app.extensions.fraud.scoring_rules import score_rules, score_rules_frame
+    from claimsight_ai import near_dup
+    from claimsight_ai.metrics import observe_stage
+    from claimsight_ai.ocr import pii
+    from claimsight_ai.ocr.doctype import DocTypeClassifier, HashEmbedder
+    from claimsight_ai.report import build_claim_packet_pdf
+
+    claims = [claim(rng, i) for i in range(1000)]
+    frame = pd.DataFrame(claims)
+    fclaims = [fraud_claim(rng, i) for i in range(1000)]
+    fframe = pd.DataFrame(fclaims)
+    idx = near_dup.NearDupIndex()
+    for c in claims:
+        idx.add(c["claim_id"], near_dup.claim_text(c))
+    clf = DocTypeClassifier(HashEmbedder())
+    cov = {"coverage": "yes", "rationale": "Perils include fire.", "citations": ["P1 – Perils"], "endorsements": []}
+    risk = {"score": 0.42, "reasons": ["High prior claim count"], "top_features": ["amount"]}
+    it = iter(range(1 << 30))
+    return {
+        "risk_score": lambda: api.risk_scores([claims[next(it) % 1000]], peers=False),
+        "risk_score_frame_1k": lambda: api.risk_score_frame(frame),
+        "fraud_score_rules": lambda: score_rules(fclaims[next(it) % 1000], RINGS),
+        "fraud_score_rules_frame_1k": lambda: score_rules_frame(fframe, RINGS),
+        "near_dup_query": lambda: idx.query(claims[next(it) % 1000]["notes"]),
+        "pii_needs_analysis": lambda: pii.needs_analysis(claims[next(it) % 1000]["notes"]),
+        "doctype_classify_32": lambda: clf.classify([c["notes"] for c in claims[:32]]),
+        "claim_packet_pdf": lambda: build_claim_packet_pdf(claims[0], cov, risk),
+        "metrics_observe": lambda: observe_stage("bench", 0.001),
+    }
+
+
+# ---------- load ----------
+def load_suite(rng: random.Random) -> Dict[str, Callable[[int], Dict[str, Any]]]:
+    """endpoint name -> request kwargs for the i-th request (batch endpoints get fewer requests)."""
+    claims = [claim(rng, i) for i in range(5000)]
+    fclaims = [fraud_claim(rng, i) for i in range(5000)]
+    text = ("Invoice INV-1042 for repair of kitchen fire damage. Total due $4,210. " * 20).encode()
+    return {
+        "rag_search": lambda i: {"method": "GET", "url": "/rag/search",
+                                 "params": {"q": claims[i % 5000]["notes"], "policy_id": claims[i % 5000]["policy_id"]}},
+        "claims_coverage": lambda i: {"method": "POST", "url": "/claims/coverage", "json": claims[i % 5000]},
+        "claims_risk": lambda i: {"method": "POST", "url": "/claims/risk", "json": claims[i % 5000]},
+        "fraud_score": lambda i: {"method": "POST", "url": "/fraud/score", "json": fclaims[i % 5000]},
+        "fraud_bulk_score_100": lambda i: {"method": "POST", "url": "/fraud/bulk_score",
+                                           "json": [fclaims[(i * 100 + j) % 5000] for j in range(100)]},
+        "ocr_text_upload": lambda i: {"method": "POST", "url": "/ocr",
+                                      "files": {"file": (f"invoice_{i}.txt", text, "text/plain")}},
+        "claim_packet": lambda i: {"method": "POST", "url": "/reports/claim_packet", "json": claims[i % 5000]},
+    }
+
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+
+async def _drive(app, make: Callable[[int], Dict[str, Any]], requests: int, concurrency: int,
+                 warmup: int) -> Dict[str, Any]:
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for i in range(warmup):
+            await client.request(**make(i))
+        lat: List[float] = []
+        errors = 0
+        counter = iter(range(warmup, warmup + requests))
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                t0 = time.perf_counter()
+                r = await client.request(**make(i))
+                lat.append(time.perf_counter() - t0)
+                if r.status_code >= 400:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - t0
+    lat.sort()
+    return {"requests": len(lat), "concurrency": concurrency, "errors": errors,
+            "rps": round(len(lat) / wall, 1),
+            "p50_ms": round(1000 * _pct(lat, 0.50), 3), "p95_ms": round(1000 * _pct(lat, 0.95), 3),
+            "p99_ms": round(1000 * _pct(lat, 0.99), 3)}
+
+
+# ---------- baselines ----------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of current vs. baseline, one line each.
+
+    Endpoints in RETRIEVER_BOUND are skipped when either run used the stub
+    retriever: their numbers would time an empty stub, not the search.
+    """
+    out = []
+    stub = "stub" in (current.get("meta", {}).get("retriever"), baseline.get("meta", {}).get("retriever"))
+    for section in ("micro", "load"):
+        for name, cur in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base or (stub and name in RETRIEVER_BOUND):
+                continue
+            for m in LOWER_IS_BETTER:
+                if m in cur and base.get(m):
+                    if cur[m] > base[m] * (1 + threshold) and cur[m] - base[m] > ABS_FLOOR.get(m, 0):
+                        out.append(f"{section}/{name} {m}: {base[m]} -> {cur[m]} (+{cur[m] / base[m] - 1:.0%})")
+            for m in HIGHER_IS_BETTER:
+                if m in cur and base.get(m):
+                    if cur[m] < base[m] * (1 - threshold):
+                        out.append(f"{section}/{name} {m}: {base[m]} -> {cur[m]} ({cur[m] / base[m] - 1:.0%})")
+    return out
+
+
+def environment(retriever: str) -> Dict[str, Any]:
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "cpus": os.cpu_count(), "retriever": retriever}
+
+
+def run(only: Optional[str], quick: bool, concurrency: int, requests: int) -> Dict[str, Any]:
+    import claimsight_ai.api.main as api
+
+    api.WARMUP_STATE = api.build_warmup().start()  # local artifacts only (offline env)
+    api.WARMUP_STATE.wait()
+    retriever = type(api.RETRIEVER).__module__ if api.RETRIEVER is not None else "stub"
+    if api.RETRIEVER is None:  # no local FAISS/MiniLM artifacts: exercise everything else
+        api.RETRIEVER = api.PolicyRetriever()
+
+    rng = random.Random(7)
+    results: Dict[str, Any] = {"meta": {**environment(retriever), "quick": quick,
+                                        "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                               "micro": {}, "load": {}}
+    for name, fn in micro_suite(rng).items():
+        if only and only not in name:
+            continue
+        results["micro"][name] = r = bench(fn, min_time=0.2 if quick else 1.0, repeats=3 if quick else 5)
+        print(f"micro {name:<28} {r['us_per_op']:>12.2f} us/op {r['ops_per_s']:>12.1f} ops/s", flush=True)
+    for name, make in load_suite(rng).items():
+        if only and only not in name:
+            continue
+        n = max(concurrency, requests // (4 if quick else 1) // (10 if name in BATCH else 1))
+        r = asyncio.run(_drive(api.app, make, n, concurrency, warmup=min(10, n)))
+        results["load"][name] = r
+        print(f"load  {name:<28} {r['rps']:>8.1f} req/s  p50 {r['p50_ms']:.2f}  p95 {r['p95_ms']:.2f}  "
+              f"p99 {r['p99_ms']:.2f} ms  errors {r['errors']}", flush=True)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Offline benchmark + load-test suite")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    ap.add_argument("--out", type=Path, help="also write results here")
+    ap.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "0.15")))
+    ap.add_argument("--only", help="run benchmarks whose name contains this")
+    ap.add_argument("--quick", action="store_true", help="shorter runs (noisier)")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=400, help="requests per endpoint")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="claimsight-bench-") as home:
+        _offline_env(Path(home))
+        sys.path.insert(0, str(REPO))
+        results = run(args.only, args.quick, args.concurrency, args.requests)
+
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --save-baseline")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if {k: v for k, v in baseline.get("meta", {}).items() if k in ("cpus", "retriever", "machine")} != \
+            {k: v for k, v in results["meta"].items() if k in ("cpus", "retriever", "machine")}:
+        print(f"warning: baseline was recorded on a different setup: {baseline.get('meta')}")
+    if "stub" in (baseline.get("meta", {}).get("retriever"), results["meta"]["retriever"]):
+        print(f"note: stub retriever; not comparing {', '.join(sorted(RETRIEVER_BOUND))}")
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print(f"{len(regressions)} regression(s) at threshold {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
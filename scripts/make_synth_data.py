@@ -24,3 +24,9 @@ df = pd.DataFrame(claims)
 os.makedirs("data", exist_ok=True)
 df.to_csv("data/claims.csv", index=False)
 print(f"Generated {len(df)} synthetic claims in data/claims.csv")
+
+try:
+    from claimsight_ai.claims_store import build_store
+    print("Claims store:", build_store(data_dir="data"))
+except Exception as e:
+    print("Skipping Parquet claims store build:", e)
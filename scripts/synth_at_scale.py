@@ -0,0 +1,461 @@
+"""
+Vectorized, sharded synthetic claims + policies generator.
+
+make_synth_data.py / generate_synth.py / make_fake_policies.py build rows one
+at a time in Python loops and write one CSV: fine for 2,000 claims, useless
+for load tests. Here every column of a batch is drawn at once with numpy
+(strings are assembled with pyarrow compute kernels, not per-row f-strings),
+shards are generated by a pool of worker processes and streamed to
+Parquet and/or CSV batch by batch, so memory stays flat whatever the size.
+
+Output is reproducible: batch b of shard s always draws from
+default_rng([seed, s, b]), so the same --seed gives the same files with any
+number of workers. Claims carry the columns of both the core API
+(loss_dt, loss_type, amount, zip, claimant_history_count, fraud_flag) and the
+fraud extension (line_of_business, state, incident/report dates, reserve,
+injury, provider/shop/VIN, ...), reference the generated policies, and
+include injected fraud rings: small groups of providers, a repair shop, a
+few policies and VINs that file inflated, late-reported claims in a short
+window. ring_id (-1 = none) is the ground truth.
+
+    out/claims/part-00000.parquet                  one file per shard (--format parquet)
+    out/claims_csv/part-00000.csv                  one file per shard (--format csv)
+    out/policies.parquet                           policy table
+    out/policies/P000001.txt ...                   policy documents (RAG)
+    out/rings.yaml, out/rings.json                 ring entities
+    out/manifest.json                              spec, counts, timings
+
+    python scripts/synth_at_scale.py --claims 100000000 --policies 100000 --out /data/synth
+    python scripts/synth_at_scale.py --claims 2000 --policies 50 --format csv --out data/synth
+
+The shards load straight into the claims store:
+claims_store.build_store(source=Path("out/claims")).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+LOB = np.array(["Auto", "Home", "WorkersComp", "GL"])
+LOB_P = [0.55, 0.2, 0.15, 0.1]
+LOB_BASE = np.array([3500.0, 12000.0, 18000.0, 15000.0])
+STATES = np.array(["NY", "NJ", "PA", "OH", "IL", "MI", "FL", "TX", "CA", "GA", "NC", "VA", "WA", "MA", "AZ", "CO"])
+INJ = np.array(["None", "Minor", "Moderate", "Severe", "Fatal"])
+INJ_P = [0.55, 0.22, 0.16, 0.06, 0.01]
+INJ_MULT = np.array([0.7, 1.0, 1.6, 3.0, 8.0])
+LOSS = np.array(["fire", "water", "theft", "collision"])
+# P(loss_type | line_of_business), rows in LOB order
+LOSS_P = np.array([[0.02, 0.03, 0.15, 0.80], [0.30, 0.45, 0.25, 0.0],
+                   [0.25, 0.25, 0.25, 0.25], [0.35, 0.35, 0.20, 0.10]])
+VIN_CHARS = np.frombuffer(b"ABCDEFGHJKLMNPRSTUVWXYZ0123456789", dtype=np.uint8)
+
+EPOCH = date(1970, 1, 1)
+START_DAY = (date(2018, 1, 1) - EPOCH).days
+END_DAY = (date(2025, 8, 1) - EPOCH).days
+
+ENDORSEMENTS = [
+    "Water Backup Endorsement: Water/sewer backup losses up to $10,000 are covered.",
+    "Special Personal Property: Broadens perils for Coverage C.",
+    "Identity Theft Expense Endorsement: Limited reimbursement.",
+    "Rental Reimbursement: Transportation expenses up to $40/day for 30 days.",
+    "Equipment Breakdown: Sudden mechanical or electrical breakdown is covered.",
+]
+
+POLICY_TEMPLATES = {
+    "Home": """\
+POLICY {pid} - Standard Homeowners (HO-3), {state}
+Effective {start} to {end}. Coverage A limit ${limit:,}. Deductible ${deductible:,}.
+
+Section 1: Dwelling (Coverage A)
+We cover sudden and accidental direct physical loss to the dwelling unless excluded.
+Water backup from sewers or drains is EXCLUDED unless an endorsement applies.
+
+Section 4: Perils Insured Against
+Fire, lightning, windstorm and hail are covered causes of loss.
+Flood is EXCLUDED. Wear and tear EXCLUDED.
+""",
+    "Auto": """\
+POLICY {pid} - Personal Auto Policy, {state}
+Effective {start} to {end}. Liability limit ${limit:,}. Collision deductible ${deductible:,}.
+
+Part A: Liability Coverage
+We pay damages for bodily injury or property damage for which any insured becomes legally responsible.
+
+Part D: Coverage for Damage to Your Auto
+Collision and other-than-collision losses, including theft, are covered less the deductible.
+Wear and tear, freezing and mechanical breakdown are EXCLUDED.
+""",
+    "WorkersComp": """\
+POLICY {pid} - Workers Compensation and Employers Liability, {state}
+Effective {start} to {end}. Employers liability limit ${limit:,} each accident.
+
+Part One: Workers Compensation Insurance
+We pay promptly when due the benefits required of you by the workers compensation law of {state}.
+
+Part Two: Employers Liability Insurance
+Bodily injury by accident or disease arising out of employment is covered.
+""",
+    "GL": """\
+POLICY {pid} - Commercial General Liability, {state}
+Effective {start} to {end}. Each occurrence limit ${limit:,}. Deductible ${deductible:,}.
+
+Coverage A: Bodily Injury and Property Damage Liability
+We pay sums the insured becomes legally obligated to pay because of bodily injury or property damage.
+Expected or intended injury is EXCLUDED. Pollution is EXCLUDED.
+""",
+}
+POLICY_TAIL = """
+Section 5: Endorsements
+{endorsements}
+
+Section 6: Conditions
+Insured must provide prompt notice and cooperate with investigation.
+"""
+
+
+@dataclass
+class Spec:
+    claims: int = 2000
+    policies: int = 6000
+    seed: int = 42
+    shard_rows: int = 1_000_000
+    batch_rows: int = 1 << 18
+    providers: int = 0       # 0 = scale with claims
+    shops: int = 0
+    rings: int = 0           # 0 = scale with claims
+    ring_rate: float = 0.002  # share of claims filed by rings
+    ring_window_days: int = 60
+    fraud_rate: float = 0.05  # approximate background fraud rate
+    formats: Tuple[str, ...] = ("parquet",)
+    out: str = "data/synth"
+
+    def resolved(self) -> "Spec":
+        s = Spec(**asdict(self))
+        s.providers = s.providers or max(400, s.claims // 5000)
+        s.shops = s.shops or max(300, s.claims // 5000)
+        s.rings = s.rings or max(3, min(5000, s.claims // 20000))
+        s.formats = tuple(s.formats)
+        return s
+
+
+# ---------- vectorized string helpers ----------
+def ids(prefix: str, nums: np.ndarray, width: int) -> pa.Array:
+    """prefix + zero-padded number, e.g. ids("P", [1, 2], 6) -> ["P000001", "P000002"]."""
+    s = pc.utf8_lpad(pa.array(nums, pa.int64()).cast(pa.string()), width=width, padding="0")
+    return pc.binary_join_element_wise(prefix, s, "")
+
+
+def pick(vocab: np.ndarray, idx: np.ndarray) -> pa.Array:
+    return pc.take(pa.array(vocab), pa.array(idx, pa.int32()))
+
+
+def iso_dates(days: np.ndarray) -> pa.Array:
+    return pa.array(days.astype(np.int32), pa.date32()).cast(pa.string())
+
+
+def vins(rng: np.random.Generator, n: int) -> np.ndarray:
+    chars = VIN_CHARS[rng.integers(0, len(VIN_CHARS), size=(n, 17))]
+    return chars.view("S17").ravel().astype(str)
+
+
+def draw(rng: np.random.Generator, p, n: int) -> np.ndarray:
+    return rng.choice(len(p), size=n, p=p)
+
+
+# ---------- shared tables (derived from the seed alone) ----------
+def policy_table(spec: Spec) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng([spec.seed, 1 << 30])
+    n = spec.policies
+    lob = draw(rng, LOB_P, n)
+    start = rng.integers(START_DAY - 365, END_DAY - 180, size=n)
+    return {
+        "lob": lob,
+        "state": rng.integers(0, len(STATES), size=n),
+        "start": start,
+        "end": start + 365,
+        "limit": (LOB_BASE[lob] * rng.choice([20, 30, 50, 100], size=n)).astype(np.int64),
+        "deductible": rng.choice([250, 500, 1000, 2500], size=n),
+        "endorsements": rng.integers(0, 1 << len(ENDORSEMENTS), size=n),  # bitmask
+    }
+
+
+def ring_table(spec: Spec, pol: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Ring entities; providers/shops are numbered past the background pools so only rings use them."""
+    rng = np.random.default_rng([spec.seed, 1 << 31])
+    auto = np.flatnonzero(pol["lob"] == 0)
+    auto = auto if len(auto) else np.arange(spec.policies)
+    rings = []
+    prov_next, shop_next = spec.providers + 1, spec.shops + 1
+    for r in range(spec.rings):
+        n_prov = int(rng.integers(1, 3))
+        rings.append({
+            "ring_id": r,
+            "providers": list(range(prov_next, prov_next + n_prov)),
+            "shop": shop_next,
+            "policies": rng.choice(auto, size=int(rng.integers(3, 9))).tolist(),
+            "vins": vins(rng, int(rng.integers(2, 7))).tolist(),
+            "start_day": int(rng.integers(START_DAY, END_DAY - spec.ring_window_days)),
+        })
+        prov_next += n_prov
+        shop_next += 1
+    return {"rings": rings}
+
+
+_tables: Dict[str, Any] = {}
+
+
+def _init(spec: Spec) -> None:
+    pol = policy_table(spec)
+    _tables.update(spec=spec, policies=pol, rings=ring_table(spec, pol)["rings"])
+
+
+# ---------- claims ----------
+def claims_batch(spec: Spec, pol: Dict[str, np.ndarray], rings: List[Dict[str, Any]],
+                 shard: int, batch: int, first: int, n: int) -> pa.Table:
+    """Rows first..first+n-1 as an Arrow table; every column drawn in one numpy call."""
+    rng = np.random.default_rng([spec.seed, shard, batch])
+    policy = rng.integers(0, spec.policies, size=n)
+    lob = pol["lob"][policy]
+    incident = rng.integers(START_DAY, END_DAY, size=n)
+    late = np.abs(rng.normal(5, 7, size=n)).astype(np.int64)
+    injury = draw(rng, INJ_P, n)
+    police = (rng.random(n) < np.where(lob == 0, 0.8, 0.35)).astype(np.int64)
+    amount = np.floor(LOB_BASE[lob] * INJ_MULT[injury] * rng.uniform(0.6, 1.6, size=n))
+    prior = np.maximum(0, rng.normal(0.6, 1.0, size=n)).astype(np.int64)
+    age = np.clip(rng.normal(42, 12, size=n), 18, 90).astype(np.int64)
+    # loss type conditional on line of business: inverse CDF per row
+    loss = (rng.random(n)[:, None] > np.cumsum(LOSS_P, axis=1)[lob]).sum(axis=1).clip(0, len(LOSS) - 1)
+    provider = rng.integers(1, spec.providers + 1, size=n)
+    shop = rng.integers(1, spec.shops + 1, size=n)
+    vin = vins(rng, n)
+    has_provider = lob != 1
+    is_auto = lob == 0
+
+    # background fraud: logistic in the usual red flags, calibrated around fraud_rate
+    logit = (np.log(spec.fraud_rate / (1 - spec.fraud_rate)) - 0.8
+             + 0.6 * np.log(amount / LOB_BASE[lob]) + 0.04 * late + 0.35 * prior + 0.5 * (police == 0))
+    fraud = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(np.int64)
+
+    # ring claims: Auto collisions through ring entities, inflated, late, clustered in time
+    ring_id = np.full(n, -1, dtype=np.int64)
+    in_ring = np.flatnonzero(rng.random(n) < spec.ring_rate) if rings else np.empty(0, np.int64)
+    if len(in_ring):
+        r = rng.integers(0, len(rings), size=len(in_ring))
+        ring_id[in_ring] = r
+        k = rng.integers(0, 1 << 16, size=len(in_ring))  # per-claim pick within the ring
+        provider[in_ring] = [rings[i]["providers"][j % len(rings[i]["providers"])] for i, j in zip(r, k)]
+        shop[in_ring] = [rings[i]["shop"] for i in r]
+        policy[in_ring] = [rings[i]["policies"][j % len(rings[i]["policies"])] for i, j in zip(r, k)]
+        vin[in_ring] = [rings[i]["vins"][j % len(rings[i]["vins"])] for i, j in zip(r, k)]
+        incident[in_ring] = [rings[i]["start_day"] for i in r] + rng.integers(0, spec.ring_window_days, len(in_ring))
+        lob[in_ring], loss[in_ring] = 0, 3
+        has_provider[in_ring] = is_auto[in_ring] = True
+        amount[in_ring] = np.floor(amount[in_ring] * rng.uniform(1.5, 2.5, len(in_ring)))
+        late[in_ring] += rng.integers(10, 40, len(in_ring))
+        police[in_ring] = (rng.random(len(in_ring)) < 0.3).astype(np.int64)
+        fraud[in_ring] = (rng.random(len(in_ring)) < 0.95).astype(np.int64)
+
+    paid = np.floor(amount * rng.uniform(0.1, 0.9, size=n))
+    reserve = np.floor(np.maximum(0, amount * rng.uniform(0.0, 0.6, size=n) - paid * 0.1))
+    incident_s = iso_dates(incident)
+    empty = pa.scalar("")
+    return pa.table({
+        "claim_id": ids("C", np.arange(first + 1, first + n + 1), 9),
+        "policy_id": ids("P", policy + 1, 6),
+        "line_of_business": pick(LOB, lob),
+        "state": pick(STATES, pol["state"][policy]),
+        "incident_date": incident_s,
+        "report_date": iso_dates(incident + late),
+        "late_report_days": late,
+        "claim_amount": amount,
+        "paid_to_date": paid,
+        "reserve": reserve,
+        "claimant_age": age,
+        "injury_severity": pick(INJ, injury),
+        "police_report": police,
+        "prior_claims_count": prior,
+        "vin": pc.if_else(pa.array(is_auto), pa.array(vin), empty),
+        "provider_id": pc.if_else(pa.array(has_provider), ids("PR", provider, 6), empty),
+        "repair_shop_id": pc.if_else(pa.array(is_auto), ids("RS", shop, 5), empty),
+        # core API columns
+        "loss_dt": incident_s,
+        "loss_type": pick(LOSS, loss),
+        "amount": amount,
+        "zip": pc.utf8_lpad(pa.array(rng.integers(1001, 99951, size=n)).cast(pa.string()), width=5, padding="0"),
+        "claimant_history_count": prior,
+        "fraud_flag": fraud,
+        "ring_id": ring_id,
+    })
+
+
+class _Sink:
+    """Streams batches of one shard to every requested format."""
+
+    def __init__(self, out: Path, name: str, schema: pa.Schema, formats):
+        self.writers = []
+        if "parquet" in formats:
+            import pyarrow.parquet as pq
+            self.writers.append(pq.ParquetWriter(str(out / "claims" / f"{name}.parquet"), schema, compression="zstd"))
+        if "csv" in formats:
+            import pyarrow.csv as pcsv
+            self.writers.append(pcsv.CSVWriter(str(out / "claims_csv" / f"{name}.csv"), schema))
+
+    def write(self, table: pa.Table) -> None:
+        for w in self.writers:
+            w.write_table(table)
+
+    def close(self) -> None:
+        for w in self.writers:
+            w.close()
+
+
+def write_shard(shard: int) -> Dict[str, Any]:
+    spec = _tables["spec"]
+    t0 = time.perf_counter()
+    first = shard * spec.shard_rows
+    rows = min(spec.shard_rows, spec.claims - first)
+    sink, fraud, ring = None, 0, 0
+    for b, off in enumerate(range(0, rows, spec.batch_rows)):
+        table = claims_batch(spec, _tables["policies"], _tables["rings"], shard, b,
+                             first + off, min(spec.batch_rows, rows - off))
+        if sink is None:
+            sink = _Sink(Path(spec.out), f"part-{shard:05d}", table.schema, spec.formats)
+        sink.write(table)
+        fraud += pc.sum(table["fraud_flag"]).as_py() or 0
+        ring += pc.sum(pc.greater_equal(table["ring_id"], 0)).as_py() or 0
+    if sink is not None:
+        sink.close()
+    return {"shard": shard, "rows": rows, "fraud": fraud, "ring_claims": ring,
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+
+# ---------- policies ----------
+def write_policy_docs(lo: int, hi: int) -> int:
+    spec, pol = _tables["spec"], _tables["policies"]
+    root = Path(spec.out) / "policies"
+    for i in range(lo, hi):
+        pid = f"P{i + 1:06d}"
+        mask = int(pol["endorsements"][i])
+        chosen = [e for j, e in enumerate(ENDORSEMENTS) if mask >> j & 1] or ["None."]
+        text = POLICY_TEMPLATES[LOB[pol["lob"][i]]].format(
+            pid=pid, state=STATES[pol["state"][i]], limit=int(pol["limit"][i]),
+            deductible=int(pol["deductible"][i]),
+            start=date.fromordinal(EPOCH.toordinal() + int(pol["start"][i])).isoformat(),
+            end=date.fromordinal(EPOCH.toordinal() + int(pol["end"][i])).isoformat(),
+        ) + POLICY_TAIL.format(endorsements="\n".join(f"- {e}" for e in chosen))
+        (root / f"{pid}.txt").write_text(text, encoding="utf-8")
+    return hi - lo
+
+
+def policy_arrow(spec: Spec, pol: Dict[str, np.ndarray]) -> pa.Table:
+    n = spec.policies
+    return pa.table({
+        "policy_id": ids("P", np.arange(1, n + 1), 6),
+        "line_of_business": pick(LOB, pol["lob"]),
+        "state": pick(STATES, pol["state"]),
+        "effective_date": iso_dates(pol["start"]),
+        "expiration_date": iso_dates(pol["end"]),
+        "limit": pol["limit"],
+        "deductible": pol["deductible"].astype(np.int64),
+        "endorsements": pol["endorsements"].astype(np.int64),
+    })
+
+
+def _ring_yaml(rings: List[Dict[str, Any]]) -> str:
+    provs = [f"PR{p:06d}" for r in rings for p in r["providers"]]
+    shops = [f"RS{r['shop']:05d}" for r in rings]
+    return ("ring_providers:\n" + "".join(f"  - {p}\n" for p in provs)
+            + "ring_shops:\n" + "".join(f"  - {s}\n" for s in shops))
+
+
+# ---------- driver ----------
+def generate(spec: Spec, workers: Optional[int] = None, docs: bool = True) -> Dict[str, Any]:
+    spec = spec.resolved()
+    out = Path(spec.out)
+    out.mkdir(parents=True, exist_ok=True)
+    for fmt, sub in (("parquet", "claims"), ("csv", "claims_csv")):
+        if fmt in spec.formats:
+            (out / sub).mkdir(parents=True, exist_ok=True)
+            for old in (out / sub).glob("part-*"):
+                old.unlink()
+    if docs:
+        (out / "policies").mkdir(parents=True, exist_ok=True)
+    workers = max(1, workers or os.cpu_count() or 1)
+    t0 = time.perf_counter()
+    _init(spec)
+
+    import pyarrow.parquet as pq
+    pq.write_table(policy_arrow(spec, _tables["policies"]), str(out / "policies.parquet"))
+    rings = _tables["rings"]
+    (out / "rings.yaml").write_text(_ring_yaml(rings), encoding="utf-8")
+    (out / "rings.json").write_text(json.dumps([{
+        **r, "providers": [f"PR{p:06d}" for p in r["providers"]], "shop": f"RS{r['shop']:05d}",
+        "policies": [f"P{p + 1:06d}" for p in r["policies"]],
+        "start_date": iso_dates(np.array([r["start_day"]]))[0].as_py()} for r in rings], indent=1), encoding="utf-8")
+
+    n_shards = -(-spec.claims // spec.shard_rows)
+    chunk = max(1, -(-spec.policies // (workers * 4)))
+    doc_ranges = [(lo, min(lo + chunk, spec.policies)) for lo in range(0, spec.policies, chunk)] if docs else []
+    if workers == 1:
+        shards = [write_shard(s) for s in range(n_shards)]
+        n_docs = sum(write_policy_docs(lo, hi) for lo, hi in doc_ranges)
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init, initargs=(spec,)) as pool:
+            shard_futs = [pool.submit(write_shard, s) for s in range(n_shards)]
+            doc_futs = [pool.submit(write_policy_docs, lo, hi) for lo, hi in doc_ranges]
+            shards = [f.result() for f in shard_futs]
+            n_docs = sum(f.result() for f in doc_futs)
+
+    secs = time.perf_counter() - t0
+    manifest = {
+        "spec": asdict(spec), "workers": workers, "shards": shards, "policy_docs": n_docs,
+        "claims": sum(s["rows"] for s in shards), "fraud": sum(s["fraud"] for s in shards),
+        "ring_claims": sum(s["ring_claims"] for s in shards), "rings": len(rings),
+        "seconds": round(secs, 2), "claims_per_s": round(spec.claims / secs) if secs else None,
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--claims", type=int, default=Spec.claims)
+    ap.add_argument("--policies", type=int, default=Spec.policies)
+    ap.add_argument("--seed", type=int, default=Spec.seed)
+    ap.add_argument("--out", default=Spec.out)
+    ap.add_argument("--format", default="parquet", help="parquet, csv or parquet,csv")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--shard-rows", type=int, default=Spec.shard_rows)
+    ap.add_argument("--rings", type=int, default=0, help="number of fraud rings (0 = scale with --claims)")
+    ap.add_argument("--ring-rate", type=float, default=Spec.ring_rate, help="share of claims filed by rings")
+    ap.add_argument("--fraud-rate", type=float, default=Spec.fraud_rate)
+    ap.add_argument("--providers", type=int, default=0)
+    ap.add_argument("--shops", type=int, default=0)
+    ap.add_argument("--no-docs", action="store_true", help="skip the policy .txt documents")
+    a = ap.parse_args(argv)
+    formats = tuple(f.strip() for f in a.format.split(",") if f.strip())
+    if not formats or set(formats) - {"parquet", "csv"}:
+        ap.error("--format must be parquet, csv or parquet,csv")
+    spec = Spec(claims=a.claims, policies=a.policies, seed=a.seed, out=a.out, formats=formats,
+                shard_rows=a.shard_rows, rings=a.rings, ring_rate=a.ring_rate, fraud_rate=a.fraud_rate,
+                providers=a.providers, shops=a.shops)
+    m = generate(spec, workers=a.workers, docs=not a.no_docs)
+    print(f"Wrote {m['claims']:,} claims in {len(m['shards'])} shard(s), {m['spec']['policies']:,} policies "
+          f"({m['policy_docs']:,} docs), {m['rings']} rings / {m['ring_claims']:,} ring claims, "
+          f"fraud rate {m['fraud'] / max(1, m['claims']):.3f} to {a.out} in {m['seconds']}s "
+          f"({m['claims_per_s']:,} claims/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
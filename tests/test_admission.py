@@ -0,0 +1,61 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.admission import Gate, Rejected, classify, get_admission, parse_limits
+
+
+def test_classify_and_limits():
+    assert classify("/ocr") == classify("/reports/claim_packet") == classify("/fraud/admin/train") == "heavy"
+    assert classify("/ocr/stats") == classify("/healthz") == classify("/admin/profile/cpu") == "exempt"
+    assert classify("/rag/search") == "search" and classify("/claims/risk") == classify("/fraud/score") == "cheap"
+    limits = parse_limits("heavy=1:2:0.5, cheap=:10")
+    assert limits["heavy"] == (1, 2, 0.5) and limits["cheap"][1] == 10 and limits["search"] == parse_limits("")["search"]
+
+
+def test_gate_queues_then_sheds_with_429_and_503():
+    async def run():
+        g = Gate("t", concurrency=1, queue=1, max_wait=0.05)
+        assert await g.acquire() == 0.0
+        waiter = asyncio.ensure_future(g.acquire())
+        await asyncio.sleep(0)
+        assert g.queued == 1
+        try:
+            await g.acquire()
+            raise AssertionError("expected 429")
+        except Rejected as e:
+            assert e.status == 429 and e.retry_after >= 1
+        g.release(0.01)  # hands the slot to the queued request
+        assert await waiter > 0 and g.active == 1 and g.queued == 0
+        timed_out = asyncio.ensure_future(g.acquire())
+        try:
+            await timed_out
+            raise AssertionError("expected 503")
+        except Rejected as e:
+            assert e.status == 503
+        g.release()
+        assert g.active == 0 and g.stats()["rejected"] == {"queue_full": 1, "timeout": 1}
+    asyncio.run(run())
+
+
+def test_saturated_heavy_class_is_shed_while_cheap_endpoints_answer():
+    client = TestClient(api.app)
+    assert client.get("/healthz").status_code == 200  # builds the middleware stack
+    adm = get_admission()
+    saved = adm.gates["heavy"]
+    adm.gates["heavy"] = busy = Gate("heavy", concurrency=1, queue=0, max_wait=1.0)
+    busy.active = 1  # a long OCR job holds the only slot
+    try:
+        r = client.post("/ocr", files={"file": ("a.txt", b"hello", "text/plain")})
+        assert r.status_code == 429 and int(r.headers["retry-after"]) >= 1
+        assert r.headers["x-admission-class"] == "heavy" and r.json()["class"] == "heavy"
+        assert client.post("/claims/risk", json={"amount": 10}).status_code == 200
+        stats = client.get("/admin/admission").json()
+        assert stats["classes"]["heavy"]["rejected"]["queue_full"] == 1
+        assert stats["classes"]["cheap"]["admitted"] >= 1
+        text = client.get("/metrics").text
+        assert 'claimsight_admission_rejected_total{cls="heavy",reason="queue_full",pid=' in text
+        assert "# TYPE claimsight_admission_queued gauge" in text
+    finally:
+        adm.gates["heavy"] = saved
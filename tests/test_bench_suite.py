@@ -0,0 +1,28 @@
+from scripts.bench_suite import _pct, bench, compare
+
+
+def test_compare_flags_regressions_beyond_threshold_and_floor():
+    base = {"micro": {"f": {"us_per_op": 100.0, "ops_per_s": 10000.0}, "tiny": {"us_per_op": 2.0}},
+            "load": {"e": {"rps": 500.0, "p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0}}}
+    same = {"micro": {"f": {"us_per_op": 110.0, "ops_per_s": 9100.0}, "tiny": {"us_per_op": 2.8}},
+            "load": {"e": {"rps": 450.0, "p50_ms": 11.0, "p95_ms": 22.0, "p99_ms": 34.0}}}
+    assert compare(same, base, 0.15) == []  # within threshold; tiny +40% is under the 1us floor
+    worse = {"micro": {"f": {"us_per_op": 130.0}}, "load": {"e": {"rps": 300.0, "p99_ms": 60.0}, "new": {"rps": 1}}}
+    out = compare(worse, base, 0.15)
+    assert len(out) == 3 and any("micro/f us_per_op" in l for l in out) and any("load/e rps" in l for l in out)
+
+
+def test_compare_skips_retriever_endpoints_timed_against_the_stub():
+    base = {"meta": {"retriever": "stub"},
+            "load": {"rag_search": {"p99_ms": 1.0}, "claims_risk": {"p99_ms": 10.0}}}
+    cur = {"meta": {"retriever": "claimsight_ai.rag.retriever"},
+           "load": {"rag_search": {"p99_ms": 40.0}, "claims_risk": {"p99_ms": 30.0}}}
+    assert [l.split()[0] for l in compare(cur, base, 0.15)] == ["load/claims_risk"]
+    base["meta"]["retriever"] = "claimsight_ai.rag.retriever"
+    assert len(compare(cur, base, 0.15)) == 2
+
+
+def test_bench_and_percentiles():
+    r = bench(lambda: sum(range(100)), min_time=0.02, repeats=2)
+    assert r["us_per_op"] > 0 and r["loops"] >= 1
+    assert _pct([1.0, 2.0, 3.0, 4.0, 5.0], 0.5) == 3.0 and _pct([], 0.99) == 0.0
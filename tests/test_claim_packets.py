@@ -0,0 +1,94 @@
+import io
+import json
+import zipfile
+
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.report import render_packets
+
+
+def test_batch_risk_matches_single_claim_scoring():
+    claims = [{"claim_id": "R1", "amount": 30000, "claimant_history_count": 3, "loss_type": "fire"},
+              {"claim_id": "R2", "amount": 100, "claimant_history_count": 0, "loss_type": "Water"}]
+    assert api.risk_scores(claims) == [api.risk_score(c) for c in claims]
+
+
+def test_render_packets_keeps_input_order_and_reports_failures():
+    jobs = [({"claim_id": f"C{i}"}, {"coverage": "yes"}, {"score": 0.1}) for i in range(4)]
+    jobs[2] = ValueError("coverage failed")
+    out = list(render_packets(jobs, workers=2))
+    assert [i for i, _ in out] == [0, 1, 2, 3]
+    assert isinstance(out[2][1], ValueError) and out[0][1].startswith(b"%PDF")
+
+
+def test_each_packet_builds_on_a_fresh_template(monkeypatch):
+    from claimsight_ai import report
+
+    docs = []
+
+    class Recording(report.SimpleDocTemplate):
+        def __init__(self, *a, **kw):
+            super().__init__(*a, **kw)
+            docs.append(self)
+
+    monkeypatch.setattr(report, "SimpleDocTemplate", Recording)
+    for i in range(3):
+        report.build_claim_packet_pdf({"claim_id": f"T{i}"}, {"coverage": "yes"}, {"score": 0.1})
+    assert len(docs) == 3 and len({len(d.pageTemplates) for d in docs}) == 1
+
+
+def test_claim_packets_endpoint_streams_zip(monkeypatch):
+    monkeypatch.setattr(api, "RETRIEVER", api.PolicyRetriever())
+    claims = [{"claim_id": f"Z{i}", "policy_id": "P1", "loss_type": "fire", "amount": 1000 * i,
+               "notes": f"kitchen fire number {i}"} for i in range(6)]
+    r = TestClient(api.app).post("/reports/claim_packets", params={"workers": 0}, json=claims)
+    assert r.status_code == 200 and r.headers["content-type"] == "application/zip"
+    z = zipfile.ZipFile(io.BytesIO(r.content))
+    names = z.namelist()
+    assert names[:6] == [f"claimsight_case_packet_Z{i}.pdf" for i in range(6)]
+    assert z.read(names[0]).startswith(b"%PDF")
+    manifest = json.loads(z.read("manifest.json"))
+    assert manifest["packets"] == 6 and manifest["errors"] == [] and manifest["packets_per_s"] > 0
+
+
+def test_claim_packet_etag_and_disk_cache(monkeypatch, tmp_path):
+    from claimsight_ai.packet_cache import PacketCache, set_packet_cache
+    monkeypatch.setattr(api, "RETRIEVER", api.PolicyRetriever())
+    cache = set_packet_cache(PacketCache(tmp_path, max_mb=8))
+    client = TestClient(api.app)
+    claim = {"claim_id": "E1", "policy_id": "P1", "loss_type": "fire", "amount": 5000, "notes": "garage fire"}
+    first = client.post("/reports/claim_packet", json=claim)
+    second = client.post("/reports/claim_packet", json=claim)
+    assert first.status_code == second.status_code == 200
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("miss", "hit")
+    assert first.headers["etag"] == second.headers["etag"] and first.content == second.content
+    r = client.post("/reports/claim_packet", json=claim, headers={"If-None-Match": first.headers["etag"]})
+    assert r.status_code == 304 and r.content == b""
+    other = client.post("/reports/claim_packet", json={**claim, "amount": 6000})
+    assert other.headers["etag"] != first.headers["etag"]
+    assert cache.stats()["entries"] == 2
+
+
+def test_packets_carry_velocity_reasons_like_risk(monkeypatch):
+    import time
+    from claimsight_ai import feature_store, packet_cache, report
+
+    store = feature_store.FeatureStore()
+    day = time.strftime("%Y-%m-%d", time.gmtime())
+    for i in range(api.PEER_POLICY_30D):
+        store.update({"claim_id": f"V{i}", "policy_id": "PV1", "report_date": day})
+    monkeypatch.setattr(feature_store, "_store", store)
+    monkeypatch.setattr(api, "RETRIEVER", api.PolicyRetriever())
+    claim = {"claim_id": "V9", "policy_id": "PV1", "loss_type": "fire", "amount": 100, "notes": "stove fire"}
+    expected = f"Policy has {api.PEER_POLICY_30D} claims in 30 days"
+    assert expected in api.risk_score(claim)["reasons"]
+
+    risks, render, key = [], report.render_packets, packet_cache.packet_key
+    monkeypatch.setattr(packet_cache, "packet_key", lambda c, cov, risk: risks.append(risk) or key(c, cov, risk))
+    monkeypatch.setattr(report, "render_packets", lambda jobs, n: render(
+        [j for j in jobs if risks.append(j[2]) or True], n))
+    client = TestClient(api.app)
+    assert client.post("/reports/claim_packet", json=claim).status_code == 200
+    assert client.post("/reports/claim_packets", params={"workers": 0}, json=[claim]).status_code == 200
+    assert len(risks) == 2 and all(expected in r["reasons"] for r in risks)
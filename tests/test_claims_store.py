@@ -0,0 +1,55 @@
+import os
+import time
+
+from claimsight_ai import claims_store
+
+CSV = (
+    "claim_id,policy_id,loss_type,amount,claimant_history_count,fraud_flag\n"
+    "C1,P1,fire,1000.0,0,0\n"
+    "C2,P1,water,2500.5,1,0\n"
+    "C3,P2,fire,9000.0,3,1\n"
+)
+
+
+def test_store_projects_filters_and_invalidates(tmp_path):
+    (tmp_path / "claims.csv").write_text(CSV)
+    t = claims_store.load_table(columns=["claim_id", "amount"], where={"loss_type": "fire"},
+                                data_dir=tmp_path)
+    assert t.column_names == ["claim_id", "amount"]
+    assert sorted(t.column("claim_id").to_pylist()) == ["C1", "C3"]
+    assert (tmp_path / "claims_store" / "data" / "loss_type=fire").is_dir()
+
+    # cached until the source changes
+    again = claims_store.load_table(columns=["claim_id", "amount"], where={"loss_type": "fire"},
+                                    data_dir=tmp_path)
+    assert again is t
+
+    time.sleep(0.01)
+    with open(tmp_path / "claims.csv", "a") as fh:
+        fh.write("C4,P3,fire,10.0,0,0\n")
+    os.utime(tmp_path / "claims.csv")
+    df = claims_store.load_claims(columns=["claim_id"], where={"loss_type": ["fire"]},
+                                  data_dir=tmp_path)
+    assert sorted(df["claim_id"]) == ["C1", "C3", "C4"]
+
+
+def _build_in_process(data_dir):
+    return claims_store.build_store(data_dir=data_dir)["rows"]
+
+
+def test_concurrent_builds_and_format_upgrades(tmp_path):
+    import json
+    from concurrent.futures import ProcessPoolExecutor
+
+    (tmp_path / "claims.csv").write_text(CSV)
+    with ProcessPoolExecutor(3) as pool:
+        assert list(pool.map(_build_in_process, [tmp_path] * 6)) == [3] * 6
+    leftovers = sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("claims_store"))
+    assert leftovers == ["claims_store", "claims_store.lock"]  # no half-built or old copies
+
+    manifest = tmp_path / "claims_store" / "_manifest.json"
+    m = json.loads(manifest.read_text())
+    assert m["format"] == claims_store.FORMAT_VERSION
+    manifest.write_text(json.dumps({**m, "format": 1}))  # a store from an older build, same source
+    claims_store.ensure_store(tmp_path)
+    assert json.loads(manifest.read_text())["format"] == claims_store.FORMAT_VERSION
@@ -0,0 +1,110 @@
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai import columnar
+from app.extensions.fraud.router import RINGS
+from app.extensions.fraud.scoring_rules import score_rules
+
+client = TestClient(api.app)
+
+CLAIMS = [
+    {"claim_id": "C1", "line_of_business": "Auto", "state": "OH", "late_report_days": 45,
+     "claim_amount": 5200.0, "paid_to_date": 100.0, "reserve": 0.0, "claimant_age": 33,
+     "injury_severity": "Minor", "police_report": 0, "prior_claims_count": 3,
+     "provider_id": "PR0003", "repair_shop_id": ""},
+    {"claim_id": "C2", "line_of_business": "Home", "state": "NY", "late_report_days": 2,
+     "claim_amount": 1200.0, "paid_to_date": 0.0, "reserve": 0.0, "claimant_age": 51,
+     "injury_severity": "None", "police_report": 1, "prior_claims_count": 0},
+]
+
+
+def _arrow(rows):
+    table = pa.Table.from_pylist(rows)
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as w:
+        w.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_fraud_bulk_columnar_matches_row_scoring():
+    r = client.post("/fraud/bulk_score_columnar", content=_arrow(CLAIMS),
+                    headers={"Content-Type": columnar.ARROW_STREAM})
+    assert r.status_code == 200
+    out = ipc.open_stream(r.content).read_all().to_pylist()
+    for row, claim in zip(out, CLAIMS):
+        expected = score_rules(claim, RINGS)
+        assert abs(row["fraud_probability"] - expected["fraud_probability"]) < 1e-9
+        assert row["label"] == expected["label"]
+        assert sorted(k[len("reason_"):] for k, v in row.items()
+                      if k.startswith("reason_") and v) == sorted(expected["reasons"])
+
+
+def test_fraud_bulk_columnar_rejects_bad_column():
+    bad = [dict(CLAIMS[0], claim_amount="lots")]
+    r = client.post("/fraud/bulk_score_columnar", content=_arrow(bad),
+                    headers={"Content-Type": columnar.ARROW_STREAM})
+    assert r.status_code == 422
+    assert "claim_amount" in r.json()["detail"]
+
+
+def test_risk_bulk_columnar_parquet():
+    import io
+    import pyarrow.parquet as pq
+    buf = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist([{"claim_id": "C1", "loss_type": "fire", "amount": 30000.0,
+                                          "claimant_history_count": 4}]), buf)
+    r = client.post("/claims/risk/bulk_columnar", content=buf.getvalue(),
+                    headers={"Content-Type": columnar.PARQUET})
+    assert r.status_code == 200
+    row = pq.read_table(pa.BufferReader(r.content)).to_pylist()[0]
+    single = api.risk_score({"loss_type": "fire", "amount": 30000.0, "claimant_history_count": 4})
+    assert row["score"] == single["score"]
+
+
+def test_upload_csv_streams_to_csv_and_parquet(tmp_path, monkeypatch):
+    import hashlib
+    import pyarrow.parquet as pq
+    import app.extensions.fraud.router as fraud
+
+    monkeypatch.setattr(api, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(fraud, "UPLOAD_CHUNK_BYTES", 37)  # force many partial-line chunks
+    body = b"claim_id,amount,loss_type\n" + b"".join(
+        f"C{i:05d},{i * 10.5},fire\n".encode() for i in range(200))
+    r = client.post("/fraud/admin/upload_csv?to_parquet=true",
+                    files={"file": ("claims.csv", body, "text/csv")})
+    assert r.status_code == 200
+    out = r.json()
+    assert out["approx_rows"] == 200 and out["parquet_rows"] == 200
+    assert out["sha256"] == hashlib.sha256(body).hexdigest()
+    assert (tmp_path / "claims.csv").read_bytes() == body
+    assert pq.read_table(tmp_path / "claims.parquet").column("claim_id")[199].as_py() == "C00199"
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith(".part")]
+
+
+def test_upload_csv_keeps_ids_as_text_and_never_loses_the_csv(tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+    import app.extensions.fraud.router as fraud
+
+    monkeypatch.setattr(api, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(fraud, "UPLOAD_CHUNK_BYTES", 64)
+    body = b"claim_id,zip,vin,amount,count\n" + b"".join(
+        f"{i},0{2134 + i},{100 + i},{i * 10},{i}\n".encode() for i in range(1, 40))
+    body += b"40,02174,1HGCM82633A004352,12.5,several\n"
+    r = client.post("/fraud/admin/upload_csv?to_parquet=true",
+                    files={"file": ("claims.csv", body, "text/csv")})
+    assert r.status_code == 200 and r.json()["parquet_rows"] == 40
+    t = pq.read_table(tmp_path / "claims.parquet")
+    assert t.column("claim_id")[0].as_py() == "1" and t.column("zip")[0].as_py() == "02135"
+    # later chunks that don't fit widen the column instead of failing the upload
+    assert t.column("vin")[39].as_py() == "1HGCM82633A004352"
+    assert t.column("amount").to_pylist()[-2:] == [390.0, 12.5]
+    assert t.column("count").to_pylist()[-2:] == ["39", "several"]
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith((".part", ".widen"))]
+
+    ragged = b"claim_id,amount\nC1,1\nC2,2,extra\n"
+    r = client.post("/fraud/admin/upload_csv?to_parquet=true",
+                    files={"file": ("claims.csv", ragged, "text/csv")})
+    assert r.status_code == 200 and "parquet_error" in r.json()
+    assert (tmp_path / "claims.csv").read_bytes() == ragged
@@ -0,0 +1,138 @@
+import sqlite3
+import time
+
+import pandas as pd
+
+from claimsight_ai import db_pool
+from claimsight_ai import claims_store
+from claimsight_ai import snowflake_io
+from claimsight_ai.snowflake_io import bulk_load, df_to_snowflake, snowflake_query
+
+
+def test_pooled_upload_and_query_reuse_one_connection(tmp_path):
+    path = str(tmp_path / "sf.db")
+    pool = db_pool.set_factory(lambda: sqlite3.connect(path, check_same_thread=False), paramstyle="qmark")
+    try:
+        df = pd.DataFrame({"claim_id": ["C1", "C2"], "claim_amount": [100.0, None]})
+        assert df_to_snowflake(df, "CLAIMS_SAMPLE")["rows"] == 2
+        out = snowflake_query('select * from "CLAIMS_SAMPLE"')
+        assert out["claim_id"].tolist() == ["C1", "C2"]
+        s = pool.stats()
+        assert s["checkouts"] == 2 and s["created"] == 1 and s["in_use"] == 0
+    finally:
+        db_pool.set_factory(None)
+
+
+def test_idle_connections_are_evicted_and_exhaustion_times_out(tmp_path):
+    pool = db_pool.ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False),
+                                  max_size=1, max_idle=0.05, timeout=0.05)
+    with pool.connection():
+        try:
+            pool.acquire()
+            assert False, "expected PoolTimeout"
+        except db_pool.PoolTimeout:
+            pass
+    time.sleep(0.1)
+    with pool.connection():
+        pass
+    s = pool.stats()
+    assert s["created"] == 2 and s["closed"] == 1 and s["timeouts"] == 1
+    pool.close()
+
+
+def test_bulk_load_types_chunks_and_streams_store(tmp_path):
+    path = str(tmp_path / "sf.db")
+    pool = db_pool.set_factory(lambda: sqlite3.connect(path, check_same_thread=False),
+                               paramstyle="qmark", name="sqlite")
+    try:
+        df = pd.DataFrame({
+            "claim_id": ["C1", "C2", "C3", "C4", "C5"],
+            "n": [1, 2, 3, 4, 5],
+            "amount": [1.5, None, 3.0, 4.0, 5.0],
+            "flag": [True, False, True, False, True],
+            "loss_dt": pd.to_datetime(["2025-01-01"] * 5),
+        })
+        res = bulk_load(df, "T", chunk_rows=2)
+        assert res["rows"] == 5 and res["chunks"] == 3 and res["rows_per_s"] > 0
+        ddl = snowflake_query("select sql from sqlite_master where name = 'T'").iloc[0, 0]
+        assert '"n" NUMBER(38,0)' in ddl and '"amount" FLOAT' in ddl and '"loss_dt" TIMESTAMP_NTZ' in ddl
+        out = snowflake_query('select * from "T" order by "n"')
+        assert out["n"].tolist() == [1, 2, 3, 4, 5]
+        assert pd.isna(out["amount"][1]) and out["amount"][0] == 1.5
+
+        (tmp_path / "claims.csv").write_text("claim_id,loss_type,amount\nC1,fire,1.0\nC2,water,2.0\nC3,fire,3.0\n")
+        batches = claims_store.dataset(tmp_path).to_batches(batch_size=1)
+        res = bulk_load(batches, "CLAIMS", chunk_rows=2)
+        assert res["rows"] == 3 and res["chunks"] == 2
+        assert snowflake_query('select count(*) from "CLAIMS"').iloc[0, 0] == 3
+        assert pool.stats()["created"] == 1
+    finally:
+        db_pool.set_factory(None)
+
+
+def test_sample_query_paginates_streams_and_caches(tmp_path, monkeypatch):
+    import pyarrow as pa
+    from fastapi.testclient import TestClient
+    from claimsight_ai.api.main import app
+    from claimsight_ai.snowflake_io import RESULT_CACHE
+
+    path = str(tmp_path / "sf.db")
+    monkeypatch.setattr(snowflake_io, "SPILL_DIR", tmp_path / "results")
+    db_pool.set_factory(lambda: sqlite3.connect(path, check_same_thread=False), name="sqlite")
+    try:
+        bulk_load(pd.DataFrame({"claim_id": [f"C{i}" for i in range(5)], "amount": [1.0] * 5}),
+                  "CLAIMS_SAMPLE")
+        client = TestClient(app)
+        rows, cursor, cursors, queried = [], None, [], None
+        while True:
+            r = client.get("/integrations/snowflake/sample_query",
+                           params={"limit": 10, "page_size": 2, **({"cursor": cursor} if cursor else {})})
+            assert r.status_code == 200
+            rows += r.json()["rows"]
+            cursor = r.json()["next_cursor"]
+            queried = queried or RESULT_CACHE.stats()
+            if not cursor:
+                break
+            cursors.append(cursor)
+        assert [x["claim_id"] for x in rows] == [f"C{i}" for i in range(5)]
+        # later pages come from the spilled first result, not from re-running the query
+        assert RESULT_CACHE.stats() == queried
+
+        # rows inserted after the first page don't shift the pages of that result
+        bulk_load(pd.DataFrame({"claim_id": ["C9"], "amount": [1.0]}), "CLAIMS_SAMPLE")
+        r = client.get("/integrations/snowflake/sample_query",
+                       params={"limit": 10, "page_size": 2, "cursor": cursors[-1]})
+        assert [x["claim_id"] for x in r.json()["rows"]] == ["C4"] and r.json()["next_cursor"] is None
+        for f in snowflake_io.SPILL_DIR.glob("*.parquet"):
+            f.unlink()
+        assert client.get("/integrations/snowflake/sample_query",
+                          params={"limit": 10, "page_size": 2, "cursor": cursors[0]}).status_code == 410
+
+        r = client.get("/integrations/snowflake/sample_query", params={"limit": 10, "format": "ndjson"})
+        assert len(r.text.strip().splitlines()) == 6
+        r = client.get("/integrations/snowflake/sample_query", params={"limit": 10},
+                       headers={"Accept": "application/vnd.apache.arrow.stream"})
+        assert pa.ipc.open_stream(r.content).read_all().num_rows == 6
+        assert client.get("/integrations/snowflake/sample_query",
+                          params={"limit": 3, "cursor": cursor or "bogus"}).status_code == 400
+    finally:
+        db_pool.set_factory(None)
+
+
+def test_fetched_batches_widen_instead_of_truncating(tmp_path):
+    path = str(tmp_path / "sf.db")
+    db_pool.set_factory(lambda: sqlite3.connect(path, check_same_thread=False), name="sqlite")
+    try:
+        with db_pool.get_pool().connection() as conn:
+            conn.execute('CREATE TABLE "T" (n, x, s)')
+            conn.executemany('INSERT INTO "T" VALUES (?, ?, ?)',
+                             [(1, None, "a"), (2, None, "b"), (2.5, 7, 3), (3, 8.5, "c")])
+            conn.commit()
+        batches = list(snowflake_io.query_batches('select * from "T"', batch_rows=2, use_cache=False))
+        assert str(batches[0].schema.field("x").type) == "null"
+        out = snowflake_query('select * from "T"')
+        assert out["n"].tolist() == [1.0, 2.0, 2.5, 3.0]
+        assert out["x"].tolist()[2:] == [7.0, 8.5] and out["x"][:2].isna().all()
+        assert out["s"].tolist() == ["a", "b", "3", "c"]
+    finally:
+        db_pool.set_factory(None)
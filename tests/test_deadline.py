@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai import deadline
+
+
+def test_budget_decides_optional_stages():
+    assert deadline.affordable("endorsements") == 1.0  # no deadline: never degrade
+    with deadline.budget(10.0):
+        assert deadline.affordable("endorsements") == 1.0
+    with deadline.budget(0.001) as b:
+        assert deadline.affordable("endorsements") == 0.0
+        deadline.degrade("rerank", "skipped")
+        assert deadline.degraded() == [{"stage": "rerank", "mode": "skipped"}] == b.degraded
+    assert deadline.degraded() == []
+
+
+def test_coverage_falls_back_to_cached_endorsements_and_reports_it(monkeypatch):
+    monkeypatch.setattr(api, "RETRIEVER", api.PolicyRetriever())
+    client = TestClient(api.app)
+    claim = {"claim_id": "D1", "policy_id": "P-DL-1", "loss_type": "water"}
+    full = client.post("/claims/coverage", json=claim)
+    assert full.json()["degraded"] == [] and "x-degraded" not in full.headers
+
+    r = client.post("/claims/coverage", json=claim, headers={"X-Deadline-Ms": "1"})
+    assert r.status_code == 200
+    assert r.json()["degraded"] == [{"stage": "endorsements", "mode": "cached"}]
+    assert r.json()["endorsements"] == full.json()["endorsements"]
+    assert r.headers["x-degraded"] == "endorsements=cached"
+
+    r = client.post("/claims/coverage?deadline_ms=1", json={**claim, "policy_id": "P-DL-unseen"})
+    assert r.json()["degraded"] == [{"stage": "endorsements", "mode": "skipped"}]
+    assert 'claimsight_degraded_total{stage="endorsements",mode="cached",pid=' in client.get("/metrics").text
+
+
+def test_risk_skips_shap_under_tight_deadline(monkeypatch):
+    import shap
+    import xgboost as xgb
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((200, len(api.FEATURES))), columns=api.FEATURES)
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=2).fit(X, (X["amount"] > 0.5).astype(int))
+    monkeypatch.setattr(api, "EXPLAINER", shap.TreeExplainer(model))
+    monkeypatch.setattr(api, "MODEL", model)
+    client = TestClient(api.app)
+    claim = {"amount": 30000, "claimant_history_count": 1, "loss_type": "fire"}
+
+    full = client.post("/claims/risk", json=claim).json()
+    fast = client.post("/claims/risk", json=claim, headers={"X-Deadline-Ms": "1"}).json()
+    assert full["degraded"] == [] and fast["degraded"] == [{"stage": "shap", "mode": "skipped"}]
+    assert fast["score"] == full["score"]
+    assert fast["top_features"][0] == "amount" and "global importance" in fast["reasons"][0]
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from claimsight_ai.feature_store import FeatureStore
+
+CLAIMS = pd.DataFrame({
+    "provider_id": ["PR1", "PR1", "PR1", "PR2", "PR1"],
+    "state": ["OH", "OH", "NY", "OH", "OH"],
+    "claim_amount": [100.0, 200.0, 300.0, 50.0, 400.0],
+    "report_date": ["2025-01-01", "2025-01-20", "2025-01-28", "2025-01-28", "2025-02-03"],
+})
+
+
+def test_sliding_windows_expire_and_batch_matches_incremental(tmp_path):
+    inc = FeatureStore(windows=(7, 30))
+    inc.update_frame(CLAIMS)
+    f = inc.read({"provider_id": "PR1", "state": "OH"})
+    # clock is 2025-02-03: the 01-01 claim has left the 30-day window
+    assert f["provider_claims_30d"] == 3 and f["provider_amount_30d"] == 900.0
+    assert f["provider_claims_7d"] == 2 and f["provider_avg_amount_7d"] == 350.0
+    assert f["state_claims_30d"] == 3
+    assert inc.read({"provider_id": "unknown"})["provider_claims_30d"] == 0
+
+    batch = FeatureStore.from_frame(CLAIMS, windows=(7, 30))
+    assert batch.read({"provider_id": "PR1", "state": "OH"}) == f
+
+    restored = FeatureStore.load(inc.snapshot(tmp_path / "fs.npz"))
+    assert restored.read({"provider_id": "PR1", "state": "OH"}) == f
+
+
+def test_updates_are_idempotent_per_claim_id(tmp_path):
+    fs = FeatureStore(windows=(7, 30))
+    claim = {"claim_id": "C1", "provider_id": "PR9", "claim_amount": 500.0, "report_date": "2025-03-01"}
+    first = fs.read(claim)
+    assert fs.update(claim) and not fs.update(claim) and not fs.update(dict(claim))
+    assert fs.read({"provider_id": "PR9"})["provider_claims_30d"] == 1
+    assert fs.read(claim) == first  # a recorded claim is left out of its own features
+    restored = FeatureStore.load(fs.snapshot(tmp_path / "fs.npz"))
+    assert not restored.update(claim)
+    assert restored.read(claim) == first
+
+    rebuilt = FeatureStore.from_frame(pd.DataFrame([claim] * 4), windows=(7, 30))
+    assert rebuilt.read({"provider_id": "PR9"})["provider_claims_30d"] == 1
+    assert not rebuilt.update(claim)
+
+
+def test_undated_and_future_claims_do_not_move_the_clock():
+    fs = FeatureStore.from_frame(pd.DataFrame({"provider_id": ["PR1"] * 20, "claim_amount": [10.0] * 20,
+                                               "report_date": ["2025-06-01"] * 20}), windows=(7, 30))
+    assert fs.update({"claim_id": "U1", "provider_id": "PR1", "claim_amount": 5.0})
+    assert fs.read({"provider_id": "PR1"})["provider_claims_30d"] == 21  # counted as of the clock
+    assert FeatureStore(windows=(7, 30)).update({"claim_id": "U2", "provider_id": "PR1"}) is False
+
+    fs.update({"claim_id": "F1", "provider_id": "PR2", "report_date": "2999-01-01"})
+    assert fs.clock == int(time.time()) // 86400  # clamped to today
+
+
+def test_frame_path_matches_the_per_claim_loop():
+    rng = np.random.default_rng(5)
+    days = pd.Timestamp("2025-05-01") + pd.to_timedelta(rng.integers(0, 45, 300), "D")
+    claims = pd.DataFrame({
+        "claim_id": [f"C{i}" for i in rng.integers(0, 250, 300)],
+        "provider_id": [f"PR{i}" for i in rng.integers(0, 6, 300)],
+        "state": rng.choice(["OH", "NY", ""], 300),
+        "claim_amount": rng.integers(1, 900, 300).astype(float),
+        "report_date": np.where(rng.random(300) < 0.9, days.strftime("%Y-%m-%d"), None),
+    })
+    history, batch = claims[:150], claims[150:]
+    loop, frame = FeatureStore(windows=(7, 30)), FeatureStore(windows=(7, 30))
+    for c in history.to_dict("records"):
+        loop.update(c)
+    frame.update_frame(history)
+    expected = []
+    for c in batch.to_dict("records"):
+        expected.append(loop.read(c))
+        loop.update(c)
+    got = frame.observe_frame(batch)
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), pd.DataFrame(expected)[got.columns],
+                                  check_dtype=False)
+    assert (frame.clock, frame.updates) == (loop.clock, loop.updates)
+    probe = claims.sample(50, random_state=1)
+    pd.testing.assert_frame_equal(frame.read_frame(probe).reset_index(drop=True),
+                                  pd.DataFrame([loop.read(c) for c in probe.to_dict("records")]),
+                                  check_dtype=False)
+
+
+def test_guidewire_fnol_validates_before_recording_and_reads_loss_date(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import claimsight_ai.api.main as api
+    from claimsight_ai import feature_store, near_dup
+
+    monkeypatch.setattr(feature_store, "_store", None)
+    monkeypatch.setattr(near_dup, "_index", None)
+    fs = feature_store.set_store(FeatureStore(windows=(7, 30)))
+    idx = near_dup.set_index(near_dup.NearDupIndex())
+    client = TestClient(api.app)
+
+    r = client.post("/adapters/guidewire/fnol", json={"claim_id": "G1", "policy_id": "P9", "amount": 10})
+    assert r.status_code == 422
+    assert fs.read({"policy_id": "P9"})["policy_claims_30d"] == 0 and len(idx) == 0
+
+    r = client.post("/adapters/guidewire/fnol", json={"claim_id": "G2", "policy_id": "P9",
+                                                      "description": "hail", "loss_date": "2025-05-04"})
+    assert r.status_code == 200
+    assert fs.clock == (pd.Timestamp("2025-05-04") - pd.Timestamp("1970-01-01")).days
+    assert fs.read({"policy_id": "P9"})["policy_claims_30d"] == 1
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.pipeline import Dag
+from claimsight_ai.warmup import Skip
+
+
+def test_dag_overlaps_independent_stages_and_skips_dependents_of_failures():
+    def slow(name):
+        def fn(r):
+            time.sleep(0.2)
+            return name
+        return fn
+
+    def boom(r):
+        raise RuntimeError("down")
+
+    def optional(r):
+        raise Skip("not installed")
+
+    dag = Dag("test")
+    dag.add("a", slow("a"))
+    dag.add("b", slow("b"))
+    dag.add("c", lambda r: r["a"] + r["b"], after=["a", "b"])
+    dag.add("bad", boom)
+    dag.add("after_bad", lambda r: 1, after=["bad", "a"])
+    dag.add("opt", optional)
+    t0 = time.perf_counter()
+    out = asyncio.run(dag.run())
+    assert time.perf_counter() - t0 < 0.38  # a and b ran side by side
+    assert out["results"]["c"] == "ab" and "after_bad" not in out["results"]
+    assert out["stages"]["bad"]["status"] == "failed" and "down" in out["stages"]["bad"]["error"]
+    assert (out["stages"]["after_bad"]["status"], out["stages"]["after_bad"]["error"]) == ("skipped", "needs bad")
+    assert out["stages"]["opt"]["status"] == "skipped"
+    assert out["critical_path"][-1] == "c" and out["critical_path"][0] in ("a", "b")
+
+
+def test_fnol_process_runs_every_stage_once_and_reports_timings(monkeypatch, tmp_path):
+    from claimsight_ai import packet_cache
+    monkeypatch.setattr(api, "RETRIEVER", api.PolicyRetriever())
+    monkeypatch.setattr(packet_cache, "_cache", None)
+    packet_cache.set_packet_cache(packet_cache.PacketCache(tmp_path))
+    client = TestClient(api.app)
+    claim = {"claim_id": "FN1", "policy_id": "P-FN-1", "loss_type": "water", "amount": 12000,
+             "claimant_history_count": 1, "notes": "Basement flooded after the sump pump failed during the storm",
+             "line_of_business": "Home", "state": "OH", "late_report_days": 3, "paid_to_date": 0, "reserve": 5000,
+             "claimant_age": 40, "injury_severity": "None", "police_report": 0, "provider_id": "PR-FN-1"}
+    r = client.post("/fnol/process?packet=true", files=[
+        ("claim", (None, json.dumps(claim))),
+        ("files", ("estimate.txt", b"Repair estimate: drywall and flooring, total $4,000", "text/plain")),
+    ])
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["claim_id"] == "FN1"
+    for name in ("intake", "ocr", "claim", "fnol", "observe", "retrieve", "endorsements", "doctype",
+                 "coverage", "risk", "fraud", "packet"):
+        assert body["stages"][name]["status"] == "ok", (name, body["stages"][name])
+        assert body["stages"][name]["ms"] >= 0
+    assert body["attachments"][0]["filename"] == "estimate.txt" and "doc_type" in body["attachments"][0]
+    assert body["coverage"]["coverage"] and "fraud_probability" in body["fraud"] and "score" in body["risk"]
+    # observed once: the claim is not its own near-duplicate
+    assert body["coverage"]["near_duplicates"] == [] and not any("FN1" in x for x in body["risk"]["reasons"])
+    assert body["packet"]["bytes"] > 0 and body["critical_path"][0] in ("intake", "claim")
+
+    again = client.post("/fnol/process", json={**claim, "claim_id": "FN2"}).json()
+    assert again["coverage"]["near_duplicates"][0]["claim_id"] == "FN1" and again["packet"] is None
+
+    partial = client.post("/fnol/process", json={"amount": 100, "loss_type": "fire"}).json()
+    assert partial["claim_id"].startswith("FNOL-") and partial["stages"]["fraud"]["status"] == "skipped"
+    assert partial["risk"] is not None
+    assert client.post("/fnol/process", files=[("files", ("a.txt", b"x", "text/plain"))]).status_code == 400
+
+
+def test_fnol_process_returns_intake_errors_before_recording_the_claim(monkeypatch):
+    from claimsight_ai import feature_store
+    from claimsight_ai.api import multipart_stream
+
+    monkeypatch.setattr(api, "RETRIEVER", api.PolicyRetriever())
+    monkeypatch.setattr(feature_store, "_store", None)
+    fs = feature_store.set_store(feature_store.FeatureStore(windows=(7, 30)))
+    monkeypatch.setattr(multipart_stream, "MAX_REQUEST_BYTES", 4000)
+    registered = []
+    monkeypatch.setattr(api, "cc_create_fnol", lambda m: registered.append(m) or {"status": "mocked"})
+    claim = {"claim_id": "BIG1", "policy_id": "P-BIG-1", "amount": 100, "loss_type": "fire"}
+    r = TestClient(api.app).post("/fnol/process", files=[
+        ("claim", (None, json.dumps(claim))),
+        ("files", ("scan.txt", b"x" * 8000, "text/plain")),
+    ])
+    assert r.status_code == 413
+    assert registered == [] and fs.read({"policy_id": "P-BIG-1"})["policy_claims_30d"] == 0
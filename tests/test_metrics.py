@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.metrics import Histogram, Registry, stage, timed
+
+
+def test_histogram_buckets_and_exposition():
+    reg = Registry()
+    h = reg.histogram("x_seconds", "test", stage="a")
+    for v in (0.0005, 0.003, 0.003, 100.0):
+        h.observe(v)
+    assert reg.histogram("x_seconds", stage="a") is h
+    text = reg.render()
+    assert "# TYPE x_seconds histogram" in text
+    assert 'x_seconds_bucket{stage="a",pid=' in text
+    lines = {l.split(" ")[0].split(",le=")[-1]: l.split(" ")[1] for l in text.splitlines() if "_bucket" in l}
+    assert lines['"0.001"}'] == "1" and lines['"0.005"}'] == "3" and lines['"+Inf"}'] == "4"
+    assert isinstance(Histogram().snapshot(), tuple)
+
+
+def test_stage_timing_server_timing_and_metrics(monkeypatch):
+    monkeypatch.setattr(api, "RETRIEVER", api.PolicyRetriever())
+
+    @timed("unit_stage")
+    def work():
+        with stage("inner"):
+            return 1
+
+    assert work() == 1
+    client = TestClient(api.app)
+    r = client.post("/claims/coverage", json={"claim_id": "M1", "policy_id": "P1", "loss_type": "fire"},
+                    headers={"X-Server-Timing": "1"})
+    assert r.status_code == 200
+    timing = r.headers["server-timing"]
+    for name in ("near_dup", "retrieve", "endorsements", "coverage_rules", "total"):
+        assert f"{name};dur=" in timing
+    assert "server-timing" not in client.post("/claims/risk", json={"amount": 10}).headers
+
+    body = client.get("/metrics")
+    assert body.headers["content-type"].startswith("text/plain")
+    text = body.text
+    assert 'claimsight_stage_seconds_count{stage="risk_score"' in text
+    assert 'claimsight_stage_seconds_count{stage="unit_stage"' in text
+    assert 'route="/claims/coverage",status="2xx"' in text
@@ -0,0 +1,57 @@
+from claimsight_ai.near_dup import NearDupIndex
+
+NOTE = "Rear-ended at the light on Main St, bumper and trunk damaged, other driver fled the scene."
+
+
+def test_finds_near_duplicates_from_bulk_and_incremental_adds():
+    idx = NearDupIndex()
+    idx.add_many(["C1", "C2"], [NOTE, "Kitchen fire started by stove, smoke damage to cabinets."])
+    idx.add("C3", NOTE.replace("Main St", "Elm St"))
+
+    hits = idx.query(NOTE.upper() + "!!", exclude="C1")
+    assert [h["claim_id"] for h in hits] == ["C3"]
+    assert hits[0]["similarity"] >= 0.7
+    assert idx.query("Hail damage to roof shingles and gutters.") == []
+    assert not idx.add("C4", "   ")
+
+
+def test_background_merge_and_history_load_keep_every_claim(monkeypatch):
+    import pandas as pd
+    from claimsight_ai import near_dup
+
+    monkeypatch.setattr(near_dup, "MERGE_EVERY", 2)
+    idx = near_dup.set_index(NearDupIndex())
+    for i in range(5):
+        idx.add(f"N{i}", NOTE + f" unit {i}")
+    idx.merge()  # whatever the background merge has not folded in yet
+    assert idx.stats()["pending"] == 0 and len(idx._keys[0]) == 5
+    assert {h["claim_id"] for h in idx.query(NOTE)} == {f"N{i}" for i in range(5)}
+
+    hail = "Hail storm dented the roof, hood and both doors while parked at the mall."
+    hist = pd.DataFrame({"claim_id": ["H1"], "notes": [hail]})
+    loaded = near_dup.load_history(hist)
+    assert near_dup.get_index() is loaded and len(loaded) == 6  # N0..N4 carried over
+    assert [h["claim_id"] for h in near_dup.check({"claim_id": "N9", "notes": hail + "!"})] == ["H1"]
+    near_dup.set_index(NearDupIndex())
+
+
+def test_batched_check_and_add_matches_a_loop_of_single_calls():
+    import numpy as np
+    import pandas as pd
+    from claimsight_ai import near_dup
+
+    notes = [NOTE, "Kitchen fire started by stove, smoke damage to cabinets.", NOTE.replace("Main", "Oak"),
+             "", "kitchen fire started by the stove; smoke damage to cabinets", NOTE, "Hail on roof."]
+    df = pd.DataFrame({"claim_id": ["B1", "B2", "B3", "B4", "B5", "B1", ""], "notes": notes})
+    history = pd.DataFrame({"claim_id": ["H1"], "notes": [NOTE + " Police report filed."]})
+
+    near_dup.set_index(NearDupIndex.from_frame(history))
+    loop = [(near_dup.check_and_add(c) or [{}])[0] for c in df.to_dict("records")]
+    looped = near_dup.get_index()
+
+    batched = near_dup.set_index(NearDupIndex.from_frame(history))
+    sim, match = near_dup.check_and_add_frame(df)
+    assert np.allclose(sim, [d.get("similarity", 0.0) for d in loop])
+    assert match[1] is None and match[4] == "B2" and match[5] is not None
+    assert batched.ids == looped.ids  # same claims indexed, once each
+    near_dup.set_index(NearDupIndex())
@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.ocr import cache as ocr_cache
+from claimsight_ai.ocr import workers
+
+
+def test_lru_evicts_oldest_and_survives_restart(tmp_path):
+    c = ocr_cache.OcrCache(tmp_path, max_mb=300 / 2**20)  # room for ~3 entries
+    keys = [ocr_cache.cache_key(bytes([i]), lang="eng") for i in range(4)]
+    for k in keys[:3]:
+        c.put(k, {"text": "x" * 20, "pages": 1})
+    assert c.get(keys[0])["text"] == "x" * 20  # keys[0] is now most recent
+    c.put(keys[3], {"text": "y" * 20, "pages": 1})
+    assert c.get(keys[1]) is None and c.evictions == 1
+    assert c.stats()["hit_rate"] == 0.5
+
+    again = ocr_cache.OcrCache(tmp_path, max_mb=1)
+    assert again.get(keys[3])["text"] == "y" * 20
+    assert ocr_cache.cache_key(b"a", lang="eng") != ocr_cache.cache_key(b"a", lang="deu")
+
+
+class _CountingPool(workers.OcrPool):
+    calls = 0
+
+    def ocr_document(self, content, content_type=None, filename=None):
+        _CountingPool.calls += 1
+        return {"text": "Call John at 555-1234", "pages": 1, "seconds": 0.0, "pages_per_s": 0.0}
+
+
+def test_repeat_upload_is_served_masked_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "pii_engine", lambda: "test-masker")
+    monkeypatch.setattr(api, "mask_pii", lambda t: t.replace("John", "<PERSON>").replace("555-1234", "<PHONE>"))
+    cache = ocr_cache.set_cache(ocr_cache.OcrCache(tmp_path))
+    workers.set_ocr_pool(_CountingPool(workers=0))
+    try:
+        client = TestClient(api.app)
+        files = {"file": ("inv.png", b"\x89PNG fake bytes", "image/png")}
+        first = client.post("/ocr", files=files).json()
+        second = client.post("/ocr", files=files).json()
+        assert first["text"] == second["text"] == "Call <PERSON> at <PHONE>"
+        assert (first["cached"], second["cached"]) == (False, True)
+        assert _CountingPool.calls == 1
+        stored = next(tmp_path.glob("*/*.json")).read_text()
+        assert "John" not in stored and "555-1234" not in stored
+        assert client.get("/ocr/stats").json()["cache"]["hits"] == 1
+    finally:
+        workers.set_ocr_pool(workers.OcrPool())
+        ocr_cache.set_cache(ocr_cache.OcrCache())
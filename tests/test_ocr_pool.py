@@ -0,0 +1,30 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.ocr.workers import OcrPool
+
+
+def _fake_page(path, index):
+    time.sleep(0.05 * (3 - index % 3))  # later pages finish first
+    return f"{path}:{index}"
+
+
+def test_pages_run_in_workers_and_come_back_in_order():
+    pool = OcrPool(workers=2, queue_size=3)
+    try:
+        out = pool.map_pages(_fake_page, [("doc", i) for i in range(6)])
+        assert out == [f"doc:{i}" for i in range(6)]
+        s = pool.stats()
+        assert s["pages"] == 6 and s["in_flight"] == 0 and s["pages_per_s"] > 0
+    finally:
+        pool.shutdown()
+
+
+def test_ocr_endpoint_falls_back_for_unknown_uploads():
+    client = TestClient(api.app)
+    r = client.post("/ocr", files={"file": ("blob.bin", b"\x00\x01", "application/octet-stream")})
+    assert r.status_code == 200
+    assert r.json()["text"] == "Uploaded: blob.bin" and r.json()["pages"] == 0
+    assert "pages_per_s" in client.get("/ocr/stats").json()
@@ -0,0 +1,78 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from claimsight_ai.ocr import pii
+
+
+def test_fast_path_only_skips_text_with_nothing_to_analyze():
+    assert not pii.needs_analysis("invoice_scan.pdf")
+    assert not pii.needs_analysis("water damage in basement after storm")
+    # Presidio's bank-number / driver-license patterns match digits inside business identifiers
+    assert pii.needs_analysis("estimate for pol-00123 and 1HGCM82633A004352")
+    assert pii.needs_analysis("clm-000123456789")
+    assert pii.needs_analysis("see claimsight.de for details")
+    assert pii.needs_analysis("John called about the estimate")
+    assert pii.needs_analysis("damage reported yesterday")
+    assert pii.needs_analysis("call 614-555-0199")
+
+
+def test_windows_overlap_and_owned_ranges_tile_the_text():
+    old = pii.WINDOW_CHARS, pii.WINDOW_OVERLAP
+    pii.WINDOW_CHARS, pii.WINDOW_OVERLAP = 50, 20
+    try:
+        text = " ".join(f"w{i}" for i in range(60))
+        w = pii._windows(text)
+        assert w[0][2] == 0 and w[-1][3] == len(text)
+        assert all(a[3] == b[2] and a[1] > b[0] for a, b in zip(w, w[1:]))
+    finally:
+        pii.WINDOW_CHARS, pii.WINDOW_OVERLAP = old
+
+
+class PatternAnalyzer:
+    """Stand-in for Presidio's pattern recognizers (no NLP engine, so no batching)."""
+
+    PATTERNS = [("PHONE_NUMBER", re.compile(r"\b\d{3}-\d{3}-\d{4}\b")),
+                ("EMAIL_ADDRESS", re.compile(r"\b[\w.]+@[\w.]+\.com\b")),
+                ("PERSON", re.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b"))]
+
+    def analyze(self, text, language, nlp_artifacts=None):
+        return [SimpleNamespace(start=m.start(), end=m.end(), entity_type=e)
+                for e, rx in self.PATTERNS for m in rx.finditer(text)]
+
+
+class TagAnonymizer:
+    def anonymize(self, text, analyzer_results):
+        for r in sorted(analyzer_results, key=lambda r: -r.start):
+            text = text[:r.start] + f"<{r.entity_type}>" + text[r.end:]
+        return SimpleNamespace(text=text)
+
+
+def test_windowed_analysis_matches_a_single_pass(monkeypatch):
+    monkeypatch.setattr(pii, "_engines", (PatternAnalyzer(), TagAnonymizer()))
+    monkeypatch.setattr(pii, "WINDOW_CHARS", 300)
+    monkeypatch.setattr(pii, "WINDOW_OVERLAP", 60)
+    page = " ".join(f"Maria Lopez called from 614-555-{i:04d}, mail m{i}@example.com about claim {i}."
+                    for i in range(120))
+    assert len(pii._windows(page)) > 30
+    assert pii.mask_pii(page) == pii._full(page)
+    assert pii.mask_pii_batch([page, "short lowercase note", page[:250]]) == \
+        [pii._full(page), "short lowercase note", pii._full(page[:250])]
+
+
+def test_fast_path_masks_exactly_like_a_full_presidio_pass():
+    pytest.importorskip("presidio_analyzer")
+    pytest.importorskip("presidio_anonymizer")
+    if pii.engine() is None:
+        pytest.skip("Presidio engines could not be built (spaCy model missing)")
+    page = ("Insured: Maria Lopez, 42 Elm Street, Columbus OH. Policy POL-88213. Date of loss March 3. "
+            "Vehicle VIN 1HGCM82633A004352 struck in rear. Contact 614-555-0142. ")
+    corpus = ["invoice_scan.pdf", "photo_rear_bumper.jpg", "claim_CLM-000123456789_estimate.pdf",
+              "clm-000123456789", "P123456789", "estimate for pol-00123 and 1HGCM82633A004352",
+              "water damage in basement after storm", "left voicemail, awaiting photos",
+              "john called from 614-555-0199 yesterday", "mail jmiller77@example.com",
+              "see claimsight.de for details", page * 80]
+    full = [pii._full(t) for t in corpus]
+    assert [pii.mask_pii(t) for t in corpus] == full
+    assert pii.mask_pii_batch(corpus) == full
@@ -0,0 +1,95 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.api.serve import AssetWatch, process_memory
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+def _get(port, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as r:
+        return json.loads(r.read())
+
+
+def _wait_workers(port, n, exclude=(), timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            body = _get(port, "/admin/workers")
+            workers = [p["pid"] for p in body["processes"] if p["role"] == "worker"]
+            if len(workers) == n and not set(workers) & set(exclude):
+                return body
+        except Exception:
+            pass
+        time.sleep(0.3)
+    raise AssertionError("workers did not come up")
+
+
+def test_single_process_memory_report():
+    assert process_memory(os.getpid())["rss_mb"] > 0
+    body = TestClient(api.app).get("/admin/workers").json()
+    assert body["mode"] == "single" and [p["pid"] for p in body["processes"]] == [os.getpid()]
+
+
+def test_asset_watch_waits_for_a_rebuild_to_settle():
+    watch = AssetWatch({"policy.faiss": (1, 1.0), "policy.docs.json": (1, 1.0)})
+    assert not watch.poll({"policy.faiss": (1, 1.0), "policy.docs.json": (2, 2.0)})  # docs rewritten, index not yet
+    assert not watch.poll({"policy.faiss": (2, 2.0), "policy.docs.json": (2, 2.0)})
+    assert watch.poll({"policy.faiss": (2, 2.0), "policy.docs.json": (2, 2.0)})
+    assert not watch.poll({"policy.faiss": (2, 2.0), "policy.docs.json": (2, 2.0)})
+
+
+def test_prefork_master_shares_assets_and_reloads_on_change(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    vs = tmp_path / "vs"
+    vs.mkdir()
+    env = {**os.environ, "MODELS_DIR": str(tmp_path / "models"), "VECTOR_DIR": str(vs), "PYTHONPATH": str(REPO)}
+    proc = subprocess.Popen([sys.executable, "-m", "claimsight_ai.api.serve", "--host", "127.0.0.1",
+                             "--port", str(port), "--workers", "2", "--reload-poll", "0.2",
+                             "--log-level", "warning"], cwd=tmp_path, env=env)
+    try:
+        body = _wait_workers(port, 2)
+        assert body["mode"] == "prefork"
+        assert _get(port, "/readyz")["ready"]
+        old = [p["pid"] for p in body["processes"] if p["role"] == "worker"]
+        if "total_pss_mb" in body:
+            assert body["shared_saving_mb"] > 0
+        (vs / "policy.docs.json").write_text("[]")  # asset change -> reload + rolling restart
+        body = _wait_workers(port, 2, exclude=old)
+        assert len([p for p in body["processes"] if p["role"] == "master"]) == 1
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(30) == 0
+
+
+def test_frozen_online_state_is_read_only_in_workers():
+    from claimsight_ai.api.serve import freeze_online_state
+    from claimsight_ai.feature_store import get_store
+    from claimsight_ai.near_dup import get_index
+
+    claim = {"claim_id": "PF-1", "line_of_business": "auto", "state": "OH", "late_report_days": 1,
+             "claim_amount": 900.0, "paid_to_date": 0.0, "reserve": 0.0, "claimant_age": 40,
+             "injury_severity": "low", "police_report": 1, "prior_claims_count": 0,
+             "provider_id": "PF-PROV", "notes": "Side mirror clipped in the parking garage of the office."}
+    client = TestClient(api.app)
+    freeze_online_state()
+    try:
+        updates, indexed = get_store().updates, len(get_index())
+        for _ in range(3):
+            assert client.post("/fraud/score", json=claim).status_code == 200
+        assert client.get("/fraud/features/peers", params={"provider_id": "PF-PROV"}).json()["provider_claims_30d"] == 0
+        assert get_store().updates == updates and len(get_index()) == indexed
+    finally:
+        freeze_online_state(False)
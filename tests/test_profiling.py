@@ -0,0 +1,43 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+
+
+def _spin_for_profiler(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_cpu_profile_collapsed_and_json():
+    stop = threading.Event()
+    t = threading.Thread(target=_spin_for_profiler, args=(stop,), name="busy")
+    t.start()
+    try:
+        client = TestClient(api.app)
+        r = client.get("/admin/profile/cpu", params={"seconds": 0.3})
+        assert r.status_code == 200 and int(r.headers["x-profile-ticks"]) > 5
+        busy = [l for l in r.text.splitlines() if l.startswith("busy;")]
+        assert busy and "_spin_for_profiler" in busy[0] and busy[0].rsplit(" ", 1)[1].isdigit()
+        tree = client.get("/admin/profile/cpu", params={"seconds": 0.1, "format": "json"}).json()
+        assert tree["name"] == "all" and "busy" in [c["name"] for c in tree["children"]]
+    finally:
+        stop.set()
+        t.join()
+
+
+def test_memory_snapshot_attributes_owners():
+    client = TestClient(api.app)
+    assert client.get("/admin/profile/memory").status_code == 400
+    assert client.post("/admin/profile/memory/start", params={"frames": 4}).json()["tracing"]
+    try:
+        from claimsight_ai.near_dup import NearDupIndex
+        keep = [NearDupIndex() for _ in range(3)]  # noqa: F841
+        first = client.get("/admin/profile/memory", params={"top": 5}).json()
+        assert first["top"] and first["owners_mb"].get("caches", 0) > 0
+        diff = client.get("/admin/profile/memory", params={"compare": True}).json()
+        assert "size_diff_kb" in diff["top"][0]
+    finally:
+        assert not client.post("/admin/profile/memory/stop").json()["tracing"]
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from app.extensions.fraud import ring_graph
+from app.extensions.fraud.ring_graph import RingGraph
+
+CLAIMS = [
+    {"claim_id": "C1", "provider_id": "PR1", "repair_shop_id": "RS1", "policy_id": "P1", "report_date": "2025-01-01",
+     "claim_amount": 100},
+    {"claim_id": "C2", "provider_id": "PR2", "repair_shop_id": "RS1", "policy_id": "P1", "report_date": "2025-01-03",
+     "claim_amount": 200},
+    {"claim_id": "C3", "provider_id": "PR2", "repair_shop_id": "RS1", "vin": "VIN9", "report_date": "2025-01-05",
+     "claim_amount": 300},
+    {"claim_id": "C4", "provider_id": "PR7", "repair_shop_id": "RS1", "report_date": "2025-01-06", "claim_amount": 50},
+]
+
+
+def test_incremental_matches_batch_and_flags_only_direct_neighbours():
+    seeds = {"ring_providers": ["PR1"], "ring_shops": []}
+    inc = RingGraph(seeds)
+    for c in CLAIMS:
+        inc.observe(c)
+    batch = RingGraph.from_frame(pd.DataFrame(CLAIMS), seeds)
+
+    for g in (inc, batch):
+        ring = g.lookup(CLAIMS[2])
+        assert ring["ring_claims"] == 3 and ring["ring_providers"] == 2 and ring["ring_shops"] == 1
+        assert ring["ring_amount"] == 600.0
+        assert not ring["ring_flagged"]                # same ring, but shares only RS1 with seeded C1
+        assert g.lookup(CLAIMS[1])["ring_flagged"]     # shares RS1 and P1 with C1
+        assert g.lookup(CLAIMS[3])["ring_claims"] == 1  # one shared entity doesn't link
+        assert not g.lookup({"provider_id": "PR7"})["ring_flagged"]
+    assert abs(inc.lookup(CLAIMS[2])["ring_velocity_30d"] - batch.lookup(CLAIMS[2])["ring_velocity_30d"]) < 1e-3
+    assert inc.summary() == batch.summary()
+
+    # re-observing a known claim is a no-op
+    assert inc.observe(CLAIMS[0])["ring_claims"] == 3
+
+
+def test_hub_pairs_link_their_first_claims_in_both_paths(monkeypatch):
+    monkeypatch.setattr(ring_graph, "HUB_DEGREE", 2)
+    claims = [{"claim_id": f"C{i}", "provider_id": "PR1", "repair_shop_id": "BIGSHOP"} for i in range(5)]
+    inc = RingGraph()
+    for c in claims:
+        inc.observe(c)
+    batch = RingGraph.from_frame(pd.DataFrame(claims))
+    for g in (inc, batch):
+        assert g.lookup({"claim_id": "C4"})["ring_claims"] == 1
+        assert g.lookup({"claim_id": "C0"})["ring_claims"] == 2
+
+
+def test_undated_claims_do_not_move_the_clock():
+    g = RingGraph()
+    g.observe({**CLAIMS[0], "report_date": None})
+    assert g._clock == 0.0
+    g.observe(CLAIMS[1])
+    before = g.lookup(CLAIMS[1])["ring_velocity_30d"]
+    g.observe({"claim_id": "C9", "provider_id": "PR9", "repair_shop_id": "RS9"})
+    assert g.lookup(CLAIMS[1])["ring_velocity_30d"] == before
+
+
+def test_flagged_share_on_synthetic_book_stays_near_ring_rate(tmp_path):
+    import yaml
+
+    from scripts.synth_at_scale import Spec, generate
+
+    spec = Spec(claims=20000, policies=2000, rings=3, ring_rate=0.002, out=str(tmp_path), formats=("parquet",))
+    generate(spec, workers=1, docs=False)
+    df = pd.read_parquet(tmp_path / "claims")
+    seeds = yaml.safe_load((tmp_path / "rings.yaml").read_text())
+    g = RingGraph.from_frame(df, seeds)
+    ring = g.lookup_frame(df)
+    truth = df["ring_id"].to_numpy() >= 0
+    assert ring["ring_flagged"].to_numpy()[truth].all()
+    assert ring["ring_flagged"].mean() <= 2 * spec.ring_rate
+    assert ring["ring_claims"].max() < 50
@@ -0,0 +1,181 @@
+import numpy as np
+
+from claimsight_ai.rag import shards
+
+
+class ArrayShard:
+    """Exact inner-product shard over an in-memory matrix (what IndexFlatIP computes)."""
+
+    def __init__(self, name, vecs, metas):
+        self.name, self.vecs, self.metas = name, vecs, metas
+
+    def __len__(self):
+        return len(self.vecs)
+
+    def search(self, qv, k):
+        sims = self.vecs @ qv[0]
+        order = np.argsort(-sims, kind="stable")[:k]
+        return [(float(sims[i]), self.name, int(i)) for i in order]
+
+    def fetch(self, rows):
+        return [(f"text {self.name}/{r}", self.metas[r]) for r in rows]
+
+
+def test_shard_assignment_is_stable_and_covers_every_shard():
+    ids = [f"P{i:06d}" for i in range(400)]
+    names = {shards.shard_of(p, "", 8, "hash") for p in ids}
+    assert names == set(shards.shard_names(8, "hash"))
+    assert shards.shard_of("P1", "POLICY P1 — Standard Homeowners (HO-3)\nvehicle exclusion", 0, "line") == "shard-home"
+    assert shards.policy_line("Personal Auto Policy\n") == "Auto"
+    assert shards.policy_line("Workers Compensation and Employers Liability") == "WorkersComp"
+    assert shards.policy_line("Umbrella") == "other"
+
+
+def test_sharded_search_matches_single_index_top_k(tmp_path):
+    rng = np.random.default_rng(7)
+    n, dim, k = 600, 16, 10
+    vecs = rng.standard_normal((n, dim)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    pids = [f"P{i % 50:04d}" for i in range(n)]
+
+    shards.write_layout(tmp_path, 4, "hash")
+    idx = shards.ShardedIndex(tmp_path, endpoints={})
+    assert idx.shards == {}  # nothing built yet
+    rows = {name: [] for name in shards.shard_names(4, "hash")}
+    for i, pid in enumerate(pids):
+        rows[shards.shard_of(pid, "", 4, "hash")].append(i)
+    idx.shards = {name: ArrayShard(name, vecs[r], [{"policy_id": pids[i], "global": i} for i in r])
+                  for name, r in rows.items()}
+
+    qv = rng.standard_normal((1, dim)).astype("float32")
+    expected = list(np.argsort(-(vecs @ qv[0]), kind="stable")[:k])
+    got = idx.search(qv, k)
+    assert [m["global"] for _, _, m in got] == expected
+    assert [h[0] for h, _, _ in got] == sorted((h[0] for h, _, _ in got), reverse=True)
+
+    # a policy_id filter only visits the shard holding that policy
+    home = shards.shard_of("P0007", "", 4, "hash")
+    assert [s.name for s in idx.route({"policy_id": "P0007"})] == [home]
+    assert {h[1] for h, _, _ in idx.search(qv, k, {"policy_id": "P0007"})} == {home}
+
+
+def test_merge_topk_ties_and_short_shards():
+    a = [(0.9, "shard-000", 1), (0.5, "shard-000", 0)]
+    b = [(0.9, "shard-001", 0)]
+    assert shards.merge_topk([b, a, []], 2) == [(0.9, "shard-000", 1), (0.9, "shard-001", 0)]
+    assert len(shards.merge_topk([a, b], 10)) == 3
+
+
+def test_index_files_follow_the_layout(tmp_path):
+    assert shards.index_files(tmp_path) == []
+    shards.write_layout(tmp_path / "shards", 0, "line")
+    files = shards.index_files(tmp_path)
+    assert files[0].name == "layout.json"
+    assert len(files) == 1 + 3 * len(shards.LINES)
+    assert shards.remote_endpoints("shard-auto=http://h:8101, bad") == {"shard-auto": "http://h:8101"}
+
+
+class DownShard(ArrayShard):
+    def search(self, qv, k):
+        raise TimeoutError("shard timed out")
+
+
+def test_missing_and_failing_shards_give_partial_results_marked_degraded(tmp_path):
+    from claimsight_ai import deadline
+
+    shards.write_layout(tmp_path, 3, "hash")
+    (tmp_path / "shard-002").mkdir()  # listed, but never built
+    idx = shards.ShardedIndex(tmp_path, endpoints={})
+    assert idx.missing == ["shard-000", "shard-001", "shard-002"] and not idx.stats()["complete"]
+
+    vecs = np.eye(4, dtype="float32")
+    idx.shards = {"shard-000": ArrayShard("shard-000", vecs, [{"n": i} for i in range(4)]),
+                  "shard-001": DownShard("shard-001", vecs, [{}] * 4)}
+    idx.missing = ["shard-002"]
+    with deadline.budget(float("inf")) as b:
+        got = idx.search(vecs[:1], 2)
+    assert [m["n"] for _, _, m in got] == [0, 1]
+    assert b.degraded == [{"stage": "shards", "mode": "partial", "missing": ["shard-001", "shard-002"]}]
+
+
+def test_unreachable_remote_shard_does_not_fail_the_index(tmp_path):
+    import pytest
+    pytest.importorskip("requests")
+
+    shards.write_layout(tmp_path, 1, "hash")
+    idx = shards.ShardedIndex(tmp_path, endpoints={"shard-000": "http://127.0.0.1:9"})
+    remote = idx.shards["shard-000"]
+    assert not remote.up and len(remote) == 0
+    assert idx.stats()["unreachable"] == ["shard-000"]
+    assert idx.search(np.ones((1, 4), dtype="float32"), 3) == []
+
+
+def test_retriever_retries_shards_that_were_down_at_startup(tmp_path):
+    import pytest
+    pytest.importorskip("requests")
+    pytest.importorskip("faiss")
+    pytest.importorskip("sentence_transformers")
+    from claimsight_ai import deadline
+    from claimsight_ai.rag.retriever import PolicyRetriever
+
+    class Encoder:
+        def encode(self, texts, normalize_embeddings=True):
+            return np.ones((len(texts), 4))
+
+    shards.write_layout(tmp_path, 1, "hash")
+    r = PolicyRetriever.__new__(PolicyRetriever)
+    r.k, r.model = 3, Encoder()
+    r.sharded = shards.ShardedIndex(tmp_path, endpoints={"shard-000": "http://127.0.0.1:9"})
+    assert r.size() == 0
+    with deadline.budget(float("inf")) as b:
+        assert r.search("water damage") == []
+    assert b.degraded == [{"stage": "shards", "mode": "partial", "missing": ["shard-000"]}]
+
+
+def test_local_shards_built_by_build_index_match_one_index(tmp_path, monkeypatch):
+    import pytest
+    pytest.importorskip("faiss")
+    pytest.importorskip("sentence_transformers")
+    from claimsight_ai.rag import index_policies
+
+    class HashEncoder:
+        """Deterministic bag-of-words vectors, so the test needs no model download."""
+
+        def __init__(self, name):
+            pass
+
+        def encode(self, docs, normalize_embeddings=True):
+            out = np.zeros((len(docs), index_policies.EMBED_DIM), dtype="float32")
+            for i, d in enumerate(docs):
+                for w in d.lower().split():
+                    out[i, hash(w) % out.shape[1]] += 1.0
+            return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+    policies = tmp_path / "policies"
+    policies.mkdir()
+    for i in range(12):
+        (policies / f"P{i:04d}.txt").write_text(f"POLICY P{i:04d} Personal Auto\nSection 1: coverage {i} "
+                                               f"collision deductible {i * 250} rental water hail", encoding="utf-8")
+    monkeypatch.setattr(index_policies, "SentenceTransformer", HashEncoder)
+    monkeypatch.setattr(index_policies, "POLICY_DIR", policies)
+
+    single = tmp_path / "single"
+    monkeypatch.setattr(index_policies, "VECTOR_DIR", single)
+    index_policies.build_index(1, "hash")
+    one = shards.LocalShard(single)
+
+    sharded = tmp_path / "sharded"
+    monkeypatch.setattr(index_policies, "VECTOR_DIR", sharded)
+    index_policies.build_index(3, "hash")
+    before = (sharded / "shards" / "shard-000" / "policy.faiss").stat().st_mtime_ns
+    index_policies.build_index(3, "hash", shard="shard-001")  # one shard, others untouched
+    assert (sharded / "shards" / "shard-000" / "policy.faiss").stat().st_mtime_ns == before
+
+    idx = shards.ShardedIndex(sharded / "shards", endpoints={})
+    assert idx.stats()["complete"] and len(idx) == len(one)
+    qv = HashEncoder(None).encode(["collision deductible 750"])
+    expected = one.search(qv, 5)
+    got = idx.search(qv, 5)
+    # same scores (ties may come back in another order); the best match is P0003's chunk
+    assert np.allclose([h[0] for h, _, _ in got], [s for s, _, _ in expected], atol=1e-6)
+    assert got[0][2]["policy_id"] == "P0003" == one.fetch([expected[0][2]])[0][1]["policy_id"]
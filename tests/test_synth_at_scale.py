@@ -0,0 +1,32 @@
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from claimsight_ai import claims_store
+from scripts.synth_at_scale import Spec, generate
+
+
+def test_sharded_output_is_reproducible_and_loads_into_claims_store(tmp_path):
+    spec = Spec(claims=5000, policies=40, shard_rows=2000, batch_rows=700, rings=3, ring_rate=0.02,
+                formats=("parquet", "csv"))
+    a = generate(Spec(**{**spec.__dict__, "out": str(tmp_path / "a")}), workers=2)
+    b = generate(Spec(**{**spec.__dict__, "out": str(tmp_path / "b")}), workers=1, docs=False)
+    assert a["claims"] == 5000 and len(a["shards"]) == 3 and a["policy_docs"] == 40
+    assert [(s["rows"], s["fraud"], s["ring_claims"]) for s in a["shards"]] == \
+        [(s["rows"], s["fraud"], s["ring_claims"]) for s in b["shards"]]
+
+    t = pq.read_table(tmp_path / "a" / "claims" / "part-00001.parquet")
+    assert t.equals(pq.read_table(tmp_path / "b" / "claims" / "part-00001.parquet"))
+    assert pcsv.read_csv(tmp_path / "a" / "claims_csv" / "part-00001.csv").num_rows == t.num_rows == 2000
+    assert t["claim_id"][0].as_py() == "C000002001"
+
+    claims = pq.read_table(tmp_path / "a" / "claims").to_pandas()
+    assert claims["claim_id"].is_unique
+    assert set(claims["policy_id"]) <= set(pq.read_table(tmp_path / "a" / "policies.parquet")["policy_id"].to_pylist())
+    ring = claims[claims["ring_id"] >= 0]
+    assert len(ring) == a["ring_claims"] > 0
+    assert ring["fraud_flag"].mean() > 0.8 > claims.loc[claims["ring_id"] < 0, "fraud_flag"].mean()
+    assert set(ring["provider_id"]) <= set((tmp_path / "a" / "rings.yaml").read_text().split())
+    assert (tmp_path / "a" / "policies" / "P000001.txt").read_text().startswith("POLICY P000001")
+
+    info = claims_store.build_store(source=tmp_path / "a" / "claims", data_dir=tmp_path / "a")
+    assert info["rows"] == 5000 and info["partition_by"] == "line_of_business"
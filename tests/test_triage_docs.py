@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.ocr import doctype
+
+
+def test_triage_streams_parts_and_classifies_in_one_batch():
+    class CountingEmbedder(doctype.HashEmbedder):
+        batches = []
+
+        def encode(self, texts, **kw):
+            CountingEmbedder.batches.append(len(texts))
+            return super().encode(texts, **kw)
+
+    doctype.set_classifier(doctype.DocTypeClassifier(CountingEmbedder()))
+    try:
+        files = [
+            ("files", ("a.txt", b"INVOICE #4411 bill to: amount due $1,200 subtotal tax total", "text/plain")),
+            ("files", ("b.txt", b"Police report. Officer badge 221, case number 19-88, collision narrative",
+                       "text/plain")),
+            ("files", ("c.txt", b"Body shop repair estimate: labor hours 6.5, parts list, refinish paint",
+                       "text/plain")),
+            ("files", ("d.txt", b"Hospital statement of charges, patient account, CPT code 99283", "text/plain")),
+            ("files", ("IMG_0042.jpg", b"\xff\xd8\xff not really a jpeg", "image/jpeg")),
+        ]
+        r = TestClient(api.app).post("/triage/docs", files=files)
+        assert r.status_code == 200
+        got = [d["doc_type"] for d in r.json()]
+        assert got == ["invoice", "police_report", "estimate", "medical_bill", "photo"]
+        assert CountingEmbedder.batches[-1] == 5  # one encode for the whole request
+        assert r.json()[0]["pii_masked_excerpt"].startswith("INVOICE")
+    finally:
+        doctype.set_classifier(doctype.DocTypeClassifier(doctype.HashEmbedder()))
+
+
+def test_triage_rejects_non_multipart():
+    r = TestClient(api.app).post("/triage/docs", content=b"{}", headers={"content-type": "application/json"})
+    assert r.status_code == 400
+
+
+def test_triage_caps_the_whole_request(monkeypatch):
+    from claimsight_ai.api import multipart_stream
+
+    monkeypatch.setattr(multipart_stream, "MAX_REQUEST_BYTES", 3000)
+    files = [("files", (f"{i}.txt", b"x" * 1000, "text/plain")) for i in range(5)]  # each part fits
+    r = TestClient(api.app).post("/triage/docs", files=files)
+    assert r.status_code == 413
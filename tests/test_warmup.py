@@ -0,0 +1,58 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import claimsight_ai.api.main as api
+from claimsight_ai.warmup import Skip, Warmup
+
+
+def test_warmup_runs_steps_in_background_respecting_deps():
+    gate, order = threading.Event(), []
+
+    def slow():
+        gate.wait(5)
+        order.append("model")
+
+    def skipped():
+        raise Skip("not installed")
+
+    w = Warmup(threads=2)
+    w.add("model", slow)
+    w.add("inference", lambda: order.append("inference"), after=["model"])
+    w.add("pii", skipped)
+    w.add("broken", lambda: 1 / 0)
+    t0 = time.perf_counter()
+    w.start()
+    assert time.perf_counter() - t0 < 0.5 and not w.ready()
+    gate.set()
+    assert w.wait(5)
+    r = w.report()
+    assert order == ["model", "inference"] and r["ready"]
+    assert {n: s["status"] for n, s in r["steps"].items()} == \
+        {"model": "ok", "inference": "ok", "pii": "skipped", "broken": "failed"}
+    assert r["failed"] == ["broken"] and r["time_to_ready_s"] >= r["warmup_started_s"]
+
+
+def test_livez_and_readyz(monkeypatch, tmp_path):
+    from claimsight_ai import feature_store
+
+    # keep the real warm-up out of the repo's data/, models/ and vector store
+    monkeypatch.setattr(api, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(api, "MODELS_DIR", tmp_path / "models")
+    monkeypatch.setattr(feature_store, "SNAPSHOT_PATH", tmp_path / "data" / "feature_store.npz")
+    monkeypatch.setattr(feature_store, "_store", None)
+
+    def no_index():
+        raise Skip("no policy index in tests")
+
+    monkeypatch.setattr(api, "_warm_index", no_index)
+    with TestClient(api.app) as client:
+        assert client.get("/livez").json() == {"status": "ok"}
+        assert api.WARMUP_STATE.wait(30)
+        r = client.get("/readyz")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["ready"] and body["import_s"] < 5
+        assert set(body["steps"]) == {"index", "embedder", "reranker", "model", "inference", "pii", "features", "near_dup", "doctype"}
+        assert body["steps"]["inference"]["status"] == "ok"
@@ -103,11 +103,18 @@ with tabs[2]:
             st.subheader("Case Packet")
             if st.button("Generate PDF Case Packet"):
                 try:
-                    pdf_resp = requests.post(f"{api_url}/reports/claim_packet", json=payload, timeout=60)
+                    # reruns revalidate against the last packet instead of re-downloading it
+                    last = st.session_state.get("case_packet")
+                    headers = {"If-None-Match": last["etag"]} if last else {}
+                    pdf_resp = requests.post(f"{api_url}/reports/claim_packet", json=payload,
+                                             headers=headers, timeout=60)
                     pdf_resp.raise_for_status()
+                    if pdf_resp.status_code != 304:
+                        last = {"etag": pdf_resp.headers.get("ETag", ""), "pdf": pdf_resp.content}
+                        st.session_state["case_packet"] = last
                     st.download_button(
                         label="Download Case Packet PDF",
-                        data=pdf_resp.content,
+                        data=last["pdf"],
                         file_name=f"claimsight_case_packet_{claim_id or 'N_A'}.pdf",
                         mime="application/pdf",
                     )